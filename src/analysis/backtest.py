@@ -0,0 +1,279 @@
+# analysis/backtest.py
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import tarfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+
+import numpy as np
+
+from src.engine.route_engine import RouteEngine
+from src.utils.config_store import ConfigError, parse_config
+
+# Colonnes du fichier de résultats (une ligne par route classée et par snapshot)
+BACKTEST_COLUMNS = ('snapshot', 'snapshot_date', 'conversion_method', 'rank',
+                    'sourcing_market_code', 'selling_market_code', 'profit_pct', 'final_amount_usdt')
+BACKTEST_FORMATS = ('npz', 'parquet')
+
+# Date dans le nom du snapshot : 20250131, 2025-01-31, 2025-01-31_143000...
+SNAPSHOT_DATE_RE = re.compile(r'(\d{4})-?(\d{2})-?(\d{2})(?:[T_-]?(\d{2})[:-]?(\d{2})[:-]?(\d{2}))?')
+
+
+# ========== SNAPSHOTS ==========
+
+def snapshot_date(name, mtime=None):
+    """Date ISO du snapshot : lue dans son nom, sinon date de modification, sinon ''"""
+    for match in SNAPSHOT_DATE_RE.finditer(os.path.basename(name)):
+        year, month, day, hour, minute, second = (int(g) if g else 0 for g in match.groups())
+        try:
+            return datetime(year, month, day, hour, minute, second).isoformat()
+        except ValueError:
+            continue
+    if mtime is not None:
+        return datetime.fromtimestamp(mtime).isoformat(timespec='seconds')
+    return ''
+
+
+def iter_snapshots(source):
+    """
+    Snapshots de config d'un dossier (récursif) ou d'une archive .zip / .tar[.gz]
+
+    Yields:
+        (nom, date ISO, contenu brut) pour chaque fichier .json
+    """
+    if os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for filename in sorted(files):
+                if filename.endswith('.json'):
+                    path = os.path.join(root, filename)
+                    with open(path, 'rb') as f:
+                        payload = f.read()
+                    name = os.path.relpath(path, source)
+                    yield name, snapshot_date(name, os.path.getmtime(path)), payload
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if info.filename.endswith('.json') and not info.is_dir():
+                    mtime = time.mktime(info.date_time + (0, 0, -1))
+                    yield info.filename, snapshot_date(info.filename, mtime), archive.read(info)
+    elif tarfile.is_tarfile(source):
+        with tarfile.open(source) as archive:
+            for member in archive:
+                if member.isfile() and member.name.endswith('.json'):
+                    payload = archive.extractfile(member).read()
+                    yield member.name, snapshot_date(member.name, member.mtime), payload
+    else:
+        raise ValueError(f"Source de snapshots invalide (dossier, .zip ou .tar attendu): {source}")
+
+
+# ========== ÉVALUATION ==========
+
+def evaluate_snapshot(name, payload, top_n=5, apply_threshold=True, methods=('forex',)):
+    """
+    Routes qu'aurait proposées find_routes_with_filters() sur un snapshot
+
+    Returns:
+        {'snapshot', 'routes': [(méthode, rang, sourcing, vente, profit_pct,
+        final_amount_usdt), ...], 'error'} ; une config illisible ou bloquée
+        par la validation donne error (et aucune route)
+    """
+    try:
+        config = parse_config(payload, name)
+        engine = RouteEngine(config)
+    except (ConfigError, KeyError, TypeError, ValueError) as e:
+        return {'snapshot': name, 'routes': [], 'error': str(e)}
+
+    report = engine.validation_report()
+    if report.is_blocking:
+        return {'snapshot': name, 'routes': [],
+                'error': f"{len(report.critical_errors)} erreur(s) critique(s)"}
+
+    routes = []
+    for method in methods:
+        found = engine.find_routes(top_n=top_n, skip_validation=True, apply_threshold=apply_threshold,
+                                   conversion_method=method)
+        routes.extend(
+            (method, rank, r['sourcing_market_code'], r['selling_market_code'],
+             r['profit_pct'], r['final_amount_usdt'])
+            for rank, r in enumerate(found, start=1)
+        )
+    return {'snapshot': name, 'routes': routes, 'error': None}
+
+
+def _evaluate_batch(batch, options):
+    """Lot de snapshots évalué dans un processus du pool"""
+    return [evaluate_snapshot(name, payload, **options) for name, payload in batch]
+
+
+# ========== RÉSULTATS ==========
+
+class BacktestWriter:
+    """
+    Fichier de résultats en colonnes : .npz (numpy, sans pickle) ou .parquet
+
+    Parquet (pyarrow, optionnel) écrit un groupe de lignes par lot ; npz
+    accumule les colonnes et écrit à la fermeture (remplacement atomique).
+    """
+
+    def __init__(self, path, fmt=None):
+        fmt = fmt or ('parquet' if str(path).endswith('.parquet') else 'npz')
+        if fmt not in BACKTEST_FORMATS:
+            raise ValueError(f"Format inconnu: {fmt} (attendu: {', '.join(BACKTEST_FORMATS)})")
+        self.path = str(path)
+        self.fmt = fmt
+        self.rows = 0
+        self._columns = {column: [] for column in BACKTEST_COLUMNS}
+        self._parquet = None
+        if fmt == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError as e:
+                raise ValueError(f"Format parquet indisponible (pyarrow non installé): {e}")
+
+    def write(self, snapshot, date, routes):
+        for method, rank, sourcing, selling, profit_pct, final_amount in routes:
+            self._columns['snapshot'].append(snapshot)
+            self._columns['snapshot_date'].append(date)
+            self._columns['conversion_method'].append(method)
+            self._columns['rank'].append(rank)
+            self._columns['sourcing_market_code'].append(sourcing)
+            self._columns['selling_market_code'].append(selling)
+            self._columns['profit_pct'].append(profit_pct)
+            self._columns['final_amount_usdt'].append(final_amount)
+        self.rows += len(routes)
+
+    def flush(self):
+        """Parquet : écrit le lot en cours ; npz : sans effet"""
+        if self.fmt != 'parquet' or not self._columns['snapshot']:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.table(self._arrays())
+        if self._parquet is None:
+            self._parquet = pq.ParquetWriter(self.path, table.schema)
+        self._parquet.write_table(table)
+        self._columns = {column: [] for column in BACKTEST_COLUMNS}
+
+    def close(self):
+        if self.fmt == 'parquet':
+            self.flush()
+            if self._parquet is None:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                pq.write_table(pa.table(self._arrays()), self.path)
+            else:
+                self._parquet.close()
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, **self._arrays())
+        os.replace(tmp_path, self.path)
+
+    def _arrays(self):
+        columns = self._columns
+        arrays = {column: np.array(columns[column], dtype=str) for column in BACKTEST_COLUMNS[:3]}
+        arrays['rank'] = np.array(columns['rank'], dtype=np.int32)
+        arrays['sourcing_market_code'] = np.array(columns['sourcing_market_code'], dtype=str)
+        arrays['selling_market_code'] = np.array(columns['selling_market_code'], dtype=str)
+        arrays['profit_pct'] = np.array(columns['profit_pct'], dtype=float)
+        arrays['final_amount_usdt'] = np.array(columns['final_amount_usdt'], dtype=float)
+        return arrays
+
+
+def load_backtest(path):
+    """Colonnes d'un résultat .npz (dict colonne → tableau numpy)"""
+    with np.load(path, allow_pickle=False) as data:
+        return {column: data[column] for column in BACKTEST_COLUMNS}
+
+
+# ========== EXÉCUTION ==========
+
+def run_backtest(source, output, top_n=5, methods=('forex',), apply_threshold=True,
+                 workers=None, batch_size=64, fmt=None):
+    """
+    Évalue le moteur sur chaque snapshot et écrit les routes classées
+
+    Les snapshots sont triés par date ; un contenu identique (copie datée
+    sans changement de prix) n'est évalué qu'une fois. Les lots sont
+    répartis sur un pool de processus (workers=1 : dans le processus
+    courant) et écrits au fil de l'eau, dans l'ordre des snapshots.
+
+    Returns:
+        Résumé : snapshots, évalués, lignes, erreurs, durée
+    """
+    start = time.perf_counter()
+    snapshots = sorted(iter_snapshots(source), key=lambda s: (s[1], s[0]))
+
+    # Contenus distincts, dans l'ordre de première apparition
+    unique_index, unique, order = {}, [], []
+    for name, _, payload in snapshots:
+        digest = hashlib.sha256(payload).digest()
+        if digest not in unique_index:
+            unique_index[digest] = len(unique)
+            unique.append((name, payload))
+        order.append(unique_index[digest])
+
+    options = {'top_n': top_n, 'apply_threshold': apply_threshold, 'methods': tuple(methods)}
+    batches = [unique[i:i + batch_size] for i in range(0, len(unique), batch_size)]
+    workers = workers or os.cpu_count() or 1
+
+    writer = BacktestWriter(output, fmt)
+    errors = []
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(batches) > 1 else None
+    try:
+        if pool is not None:
+            batch_results = pool.map(_evaluate_batch, batches, repeat(options))
+        else:
+            batch_results = map(_evaluate_batch, batches, repeat(options))
+
+        results = []
+        for (name, date, _), index in zip(snapshots, order):
+            while index >= len(results):
+                results.extend(next(batch_results))
+                writer.flush()
+            result = results[index]
+            if result['error']:
+                errors.append({'snapshot': name, 'error': result['error']})
+                logging.warning(f"Backtest: snapshot {name} ignoré ({result['error']})")
+            writer.write(name, date, result['routes'])
+        writer.close()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    return {
+        'snapshots': len(snapshots),
+        'evaluated': len(unique),
+        'rows': writer.rows,
+        'errors': errors,
+        'workers': workers if pool is not None else 1,
+        'elapsed_s': round(time.perf_counter() - start, 3),
+        'output': writer.path,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Backtest du classement des routes sur des snapshots de config')
+    parser.add_argument('source', help='Dossier ou archive (.zip, .tar.gz) de snapshots config.json')
+    parser.add_argument('--out', type=str, default='backtest.npz', help='Fichier .npz ou .parquet')
+    parser.add_argument('--top', type=int, default=5, help='Routes par snapshot et par méthode')
+    parser.add_argument('--method', type=str, default='forex', help='Méthode(s) : forex,bank')
+    parser.add_argument('--all', action='store_true', help='Ne pas appliquer le seuil de rentabilité')
+    parser.add_argument('--workers', type=int, default=None, help='Processus (défaut: nombre de cœurs)')
+
+    args = parser.parse_args()
+    summary = run_backtest(args.source, args.out, top_n=args.top,
+                           methods=[m.strip() for m in args.method.split(',') if m.strip()],
+                           apply_threshold=not args.all, workers=args.workers)
+    print(json.dumps(summary, ensure_ascii=False), file=sys.stderr)
@@ -8,13 +8,17 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
-import pandas as pd
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 
 from src.engine.rotation_manager import RotationManager
-from src.utils.route_params_collector import collect_route_search_parameters
+from src.utils.config_store import ConfigError, get_config_store
+from src.utils.daemon_client import DAEMON_SOCKET_ENV, DaemonError, daemon_request
+
+# Imports lourds (pandas, moteur, simulation, collecte des paramètres) faits
+# dans les commandes qui en ont besoin : --log-*, --set-loop-currency et
+# --force-transaction démarrent sans eux
 
 # --- CONFIGURATION CHEMINS ---
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
@@ -22,6 +26,8 @@ CONFIG_PATH = PROJECT_ROOT / 'config.json'
 TRANSACTIONS_FILE = str(PROJECT_ROOT / 'transactions.csv')
 DEBRIEFING_FILE = str(PROJECT_ROOT / 'debriefing.csv')
 PLAN_FILE_TPL = str(PROJECT_ROOT / 'rotation_plan_{}.json')
+# Démon de routes (--daemon) : s'il écoute, les commandes lui délèguent état, journal et scans
+DAEMON_SOCKET = os.environ.get(DAEMON_SOCKET_ENV, str(PROJECT_ROOT / '.route_daemon.sock'))
 
 # --- CONFIGURATION DU LOGGING ---
 logging.basicConfig(
@@ -33,26 +39,21 @@ logging.basicConfig(
 
 console = Console()
 
-# --- CHARGEMENT DE LA CONFIGURATION ---
-try:
-    with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-        config = json.load(f)
-    SEUIL_RENTABILITE_PCT = config.get('SEUIL_RENTABILITE_PCT', 1.5)
-    NB_CYCLES_PAR_ROTATION = config.get('NB_CYCLES_PAR_ROTATION', 3)
-    markets = config.get('markets', [])
-except (FileNotFoundError, KeyError) as e:
-    logging.error(f"Fichier config.json manquant ou invalide. Détail: {e}")
-    print(f"ERREUR: Fichier config.json manquant ou invalide.")
-    print(f"Chemin recherché: {CONFIG_PATH}")
-    print(f"Fichier existe? {CONFIG_PATH.exists()}")
-    exit()
-
-# --- IMPORTATION DU MOTEUR ---
-try:
-    from src.engine.arbitrage_engine import find_best_routes
-except ImportError as e:
-    print(f"ERREUR: Impossible d'importer arbitrage_engine: {e}")
-    exit()
+# --- CHARGEMENT DE LA CONFIGURATION (au premier besoin) ---
+# ConfigStore partagé : config.json relu uniquement s'il change (prix à jour sans redémarrage)
+config_store = get_config_store(CONFIG_PATH)
+
+
+def get_config():
+    """Config courante (relue si config.json a changé) ; arrêt si absente ou invalide"""
+    try:
+        return config_store.get()
+    except ConfigError as e:
+        logging.error(f"Fichier config.json manquant ou invalide. Détail: {e}")
+        print(f"ERREUR: Fichier config.json manquant ou invalide.")
+        print(f"Chemin recherché: {CONFIG_PATH}")
+        print(f"Fichier existe? {CONFIG_PATH.exists()}")
+        exit()
 
 # --- FONCTIONS DE SAISIE SÃCURISÃE ---
 def get_confirmed_input(prompt, validation_func=None, error_msg="Saisie invalide."):
@@ -105,7 +106,7 @@ def get_numeric_input_safe(prompt, input_type=float, min_val=0):
             continue
 
 def get_market_input(prompt, expected_market=None):
-    valid_markets = [m['currency'] for m in markets]
+    valid_markets = [m['currency'] for m in get_config().get('markets', [])]
     while True:
         value = console.input(prompt).upper()
         if value.lower() == 'annuler': return None
@@ -221,6 +222,8 @@ def robust_csv_append(filename, data_dict, max_retries=3):
 
 def safe_read_csv(filename, encoding='utf-8'):
     """Lecture CSV sÃ©curisÃ©e avec fallback d'encodage"""
+    import pandas as pd
+
     try:
         return pd.read_csv(filename, sep=';', dtype=str, encoding=encoding)
     except UnicodeDecodeError:
@@ -235,53 +238,101 @@ def safe_read_csv(filename, encoding='utf-8'):
         # Retourner un DataFrame vide si le fichier n'existe pas
         return pd.DataFrame(columns=['Date', 'Rotation_ID', 'Type', 'Market', 'Amount_USDT'])
 
-def get_current_state():
-    """Version sÃ©curisÃ©e de get_current_state"""
+def read_csv_rows(filename):
+    """
+    Lignes d'un CSV ';' en dicts, sans pandas (commandes rapides)
+
+    Mêmes replis d'encodage que safe_read_csv() ; fichier absent = aucune ligne.
+    """
+    for encoding in ('utf-8-sig', 'latin-1'):
+        try:
+            with open(filename, 'r', newline='', encoding=encoding) as f:
+                return list(csv.DictReader(f, delimiter=';'))
+        except UnicodeDecodeError:
+            continue
+        except FileNotFoundError:
+            return []
+    return []
+
+def rotation_state_from_rows(rows, plan_file_tpl=None):
+    """
+    État de la dernière rotation à partir des lignes du journal des transactions
+
+    Partagé par le calcul local et le démon (journal indexé en mémoire).
+    """
+    plan_file_tpl = plan_file_tpl or PLAN_FILE_TPL
+    rows = [row for row in rows if (row.get('Rotation_ID') or '').strip()]
+    if not rows:
+        return {"rotation_id": None, "is_finished": True}
+
+    last_rotation_id = rows[-1]['Rotation_ID']
+
+    plan_file = plan_file_tpl.format(last_rotation_id)
+    if not os.path.exists(plan_file):
+        return {"rotation_id": None, "is_finished": True}
+
     try:
-        df = safe_read_csv(TRANSACTIONS_FILE)
+        with open(plan_file, 'r', encoding='utf-8') as f:
+            plan = json.load(f)
+    except (json.JSONDecodeError, FileNotFoundError, UnicodeDecodeError) as e:
+        logging.error(f"Erreur lecture plan de vol {plan_file}: {e}")
+        console.print(f"[yellow]ATTENTION: Plan de vol corrompu pour {last_rotation_id}[/yellow]")
+        return {"rotation_id": None, "is_finished": True}
 
-        if df.empty or 'Rotation_ID' not in df.columns:
-            return {"rotation_id": None, "is_finished": True}
+    rotation_rows = [row for row in rows if row['Rotation_ID'] == last_rotation_id]
+    completed_phases = len(rotation_rows)
+    plan_phases = plan.get('plan_de_vol', {}).get('phases', [])
 
-        valid_rotations = df.dropna(subset=['Rotation_ID'])
-        if valid_rotations.empty:
-            return {"rotation_id": None, "is_finished": True}
+    if completed_phases >= len(plan_phases):
+        return {"rotation_id": last_rotation_id, "is_finished": True, "plan": plan}
 
-        last_rotation_id = valid_rotations['Rotation_ID'].iloc[-1]
+    next_phase_details = plan_phases[completed_phases] if completed_phases < len(plan_phases) else None
 
-        plan_file = PLAN_FILE_TPL.format(last_rotation_id)
-        if not os.path.exists(plan_file):
-            return {"rotation_id": None, "is_finished": True}
+    return {
+        "rotation_id": last_rotation_id,
+        "is_finished": False,
+        "plan": plan,
+        "next_phase_details": next_phase_details,
+        "last_transaction": rotation_rows[-1] if rotation_rows else None
+    }
 
-        try:
-            with open(plan_file, 'r', encoding='utf-8') as f:
-                plan = json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError, UnicodeDecodeError) as e:
-            logging.error(f"Erreur lecture plan de vol {plan_file}: {e}")
-            console.print(f"[yellow]ATTENTION: Plan de vol corrompu pour {last_rotation_id}[/yellow]")
-            return {"rotation_id": None, "is_finished": True}
-
-        rotation_df = df[df['Rotation_ID'] == last_rotation_id]
-        completed_phases = len(rotation_df)
-        plan_phases = plan.get('plan_de_vol', {}).get('phases', [])
-
-        if completed_phases >= len(plan_phases):
-            return {"rotation_id": last_rotation_id, "is_finished": True, "plan": plan}
-
-        next_phase_details = plan_phases[completed_phases] if completed_phases < len(plan_phases) else None
-
-        return {
-            "rotation_id": last_rotation_id,
-            "is_finished": False,
-            "plan": plan,
-            "next_phase_details": next_phase_details,
-            "last_transaction": rotation_df.iloc[-1].to_dict() if not rotation_df.empty else None
-        }
+def ask_daemon(op, params=None):
+    """Réponse du démon s'il tourne, None sinon (ou s'il échoue : calcul local)"""
+    try:
+        return daemon_request(op, params, socket_path=DAEMON_SOCKET)
+    except (DaemonError, OSError, ValueError) as e:
+        logging.warning(f"Démon de routes en erreur ({op}), calcul local: {e}")
+        return None
+
+def get_current_state():
+    """Version sÃ©curisÃ©e de get_current_state (démon s'il tourne, sinon lecture locale)"""
+    state = ask_daemon('state')
+    if state is not None:
+        return state
+    try:
+        return rotation_state_from_rows(read_csv_rows(TRANSACTIONS_FILE))
     except Exception as e:
         logging.error(f"Erreur critique dans get_current_state: {e}")
         console.print(f"[red]Erreur inattendue dans get_current_state: {e}[/red]")
         return {"rotation_id": None, "is_finished": True}
 
+def append_transaction(data):
+    """
+    Ajoute une ligne au journal des transactions (via le démon s'il tourne)
+
+    Pas de repli local si le démon a reçu la requête puis échoué : la ligne
+    pourrait être écrite deux fois.
+    """
+    try:
+        result = daemon_request('log', {'row': data}, socket_path=DAEMON_SOCKET)
+    except (DaemonError, OSError, ValueError) as e:
+        logging.error(f"Écriture via le démon échouée: {e}")
+        console.print(f"[bold red]Écriture via le démon échouée: {e}[/bold red]")
+        return False
+    if result is not None:
+        return result['written']
+    return robust_csv_append(TRANSACTIONS_FILE, data)
+
 def generate_new_rotation_id(last_id):
     today_str = datetime.now().strftime("%Y%m%d")
     if last_id and today_str in last_id:
@@ -319,8 +370,10 @@ def log_transaction(rotation_id, state):
             "Notes": closure_note
         }
 
-        if robust_csv_append(TRANSACTIONS_FILE, data):
+        if append_transaction(data):
             console.print(f"[green]✅ Clôture de route enregistrée[/green]")
+            # Rotation terminée : sortie de l'état chaud vers l'archive
+            RotationManager().archive_rotation(rotation_id)
 
             lecon = get_confirmed_input("Quelle leçon retenez-vous de cette rotation ? : ")
             if lecon:
@@ -364,7 +417,7 @@ def log_transaction(rotation_id, state):
     last_trans = state.get('last_transaction')
     if last_trans:
         panel_content += f"[bold]--- Étape Précédente : {last_trans.get('Type','N/A')} --- [green]✅ TERMINÉ[/green][/bold]\n"
-        panel_content += f"    - Montant : {float(last_trans.get('Amount_USDT', 0)):,.2f} USDT sur le marché {last_trans.get('Market', 'N/A')}\n\n"
+        panel_content += f"    - Montant : {float(last_trans.get('Amount_USDT') or 0):,.2f} USDT sur le marché {last_trans.get('Market', 'N/A')}\n\n"
 
     panel_content += f"[bold]--- Étape Actuelle : {transaction_type} --- [yellow]➡️ EN COURS[/yellow][/bold]\n"
     panel_content += f"    - Action Attendue : {phase_details.get('description', 'N/A')}"
@@ -480,7 +533,7 @@ def log_transaction(rotation_id, state):
 
     console.print(f"\n[dim]DEBUG - Données à écrire: {data}[/dim]")
 
-    if robust_csv_append(TRANSACTIONS_FILE, data):
+    if append_transaction(data):
         console.print(f"\n[green]✅ Transaction enregistrée avec succès.[/green]")
 
         notes_lower = data.get('Notes', '').lower()
@@ -539,7 +592,15 @@ def plan_new_rotation(last_id):
     Retourne toujours un tuple (new_rotation_id, plan) ou (None, None) en cas d'échec.
     """
     console.print("\n[yellow bold]-- ÃTAPE 1 : PLANIFICATION D'UNE NOUVELLE ROTATION --[/yellow bold]")
-    route_params = collect_route_search_parameters(markets, config)
+    from src.utils.route_params_collector import collect_route_search_parameters
+    try:
+        from src.engine.arbitrage_engine import find_best_routes
+    except ImportError as e:
+        print(f"ERREUR: Impossible d'importer arbitrage_engine: {e}")
+        exit()
+
+    config = get_config()
+    route_params = collect_route_search_parameters(config.get('markets', []), config)
     if route_params is None:
         console.print("[yellow]⚠️ Planification annulée par l'utilisateur[/yellow]")
         return None, None
@@ -547,7 +608,11 @@ def plan_new_rotation(last_id):
     console.print("Analyse des opportunitÃ©s de marchÃ© en cours...")
 
     try:
-        best_routes = find_best_routes(conversion_method=route_params['conversion_method'] )
+        best_routes = find_best_routes(
+            conversion_method=route_params['conversion_method'],
+            search_mode=config.get('ROUTE_SEARCH_MODE', 'direct'),
+            use_cache=True
+        )
     except Exception as e:
         console.print(f"[bold red]Erreur lors de l'analyse des routes: {e}[/bold red]")
         logging.error(f"Erreur find_best_routes: {e}")
@@ -569,7 +634,8 @@ def plan_new_rotation(last_id):
     choice_str = get_choice_input(f"Quelle route souhaitez-vous exÃ©cuter ? (Entrez 1-{len(best_routes)}) : ", [str(i+1) for i in range(len(best_routes))])
     if choice_str is None: return None, None
     choice = int(choice_str)
-    chosen_route = best_routes[choice - 1]
+    # Seule la route choisie est matérialisée (détails + plan de vol complet)
+    chosen_route = best_routes[choice - 1].materialize()
 
     console.print("\n[yellow bold]-- CHECKLIST DE PRÃ-VOL --[/yellow bold]")
     if get_choice_input("Les partenaires nÃ©cessaires sont-ils disponibles ? (o/n) : ", ['o','n']) != 'o': return None, None
@@ -665,7 +731,7 @@ def handle_set_loop_currency_command(args):
     loop_currency = args[2].upper()
 
     # VÃ©rifier que la devise existe
-    valid_currencies = [m['currency'] for m in markets]
+    valid_currencies = [m['currency'] for m in get_config().get('markets', [])]
     if loop_currency not in valid_currencies:
         console.print(f"[bold red]Devise invalide. Devises: {', '.join(valid_currencies)}[/bold red]")
         return
@@ -747,6 +813,114 @@ def handle_force_transaction_command(args):
     log_transaction(rotation_id, state)
 
     console.print(f"[green]â Transaction {forced_type} forcÃ©e[/green]")
+
+def handle_archive_closed_command(args):
+    """Archive les rotations clôturées (CLOTURE au journal) encore dans rotation_state.json"""
+    closed = {row['Rotation_ID'] for row in read_csv_rows(TRANSACTIONS_FILE)
+              if row.get('Type') == 'CLOTURE' and row.get('Rotation_ID')}
+    manager = RotationManager()
+    to_archive = sorted(closed & set(manager.state['active_rotations']))
+    with manager.batch():
+        for rotation_id in to_archive:
+            manager.archive_rotation(rotation_id)
+    console.print(f"[green]{len(to_archive)} rotation(s) archivée(s)[/green], "
+                  f"{len(manager.state['active_rotations'])} en cours, {len(manager.archive)} dans l'archive")
+
+
+def handle_stream_command(args):
+    """
+    Mode service : consomme des ticks de prix et publie le top-N en continu
+
+    Usage: --stream [SOURCE] [--top N] [--method forex|bank] [--once]
+    SOURCE : fichier JSONL suivi (tail), 'unix:CHEMIN' ou '-' (stdin, défaut).
+    Les messages NDJSON sont écrits sur stdout, les infos sur stderr.
+    """
+    from src.modules.price_stream import run_stream
+
+    options = args[2:]
+    source = options[0] if options and not options[0].startswith('--') else '-'
+    top_n = 5
+    method = 'forex'
+    try:
+        if '--top' in options:
+            top_n = int(options[options.index('--top') + 1])
+        if '--method' in options:
+            method = options[options.index('--method') + 1]
+    except (IndexError, ValueError):
+        console.print("[bold red]Usage: python daily_briefing.py --stream [SOURCE] [--top N] [--method forex|bank] [--once][/bold red]")
+        return
+    if method not in ('forex', 'bank'):
+        console.print(f"[bold red]Méthode invalide: {method} (forex ou bank)[/bold red]")
+        return
+
+    Console(stderr=True).print(f"[cyan]Flux de prix depuis {source} (top {top_n}, {method})...[/cyan]")
+    service = run_stream(config_store, source, top_n=top_n, conversion_method=method,
+                         follow='--once' not in options)
+    logging.info(f"Flux de prix terminé: {service.stats} latences {service.latency_report()}")
+
+
+def handle_scan_command(args):
+    """
+    Recherche de routes non interactive (planificateurs, scripts)
+
+    Toutes les combinaisons d'options sont évaluées sur un seul moteur ;
+    résultat JSON / NDJSON sur stdout ou --output, code de sortie non nul
+    si les paramètres ou la config sont invalides.
+    """
+    argv = list(args[2:])
+    if '--output' in argv[:-1]:
+        # Fichier écrit par le démon : chemin absolu
+        position = argv.index('--output') + 1
+        if argv[position] != '-':
+            argv[position] = os.path.abspath(argv[position])
+
+    # Sans délai : un scan long reste servi par le démon. Pas de repli local si le
+    # démon a reçu la requête puis échoué : les deux écriraient le même --output.
+    try:
+        remote = daemon_request('scan', {'argv': argv}, socket_path=DAEMON_SOCKET, timeout=None)
+    except (DaemonError, OSError, ValueError) as e:
+        logging.error(f"Scan via le démon échoué: {e}")
+        Console(stderr=True).print(f"[bold red]Scan via le démon échoué: {e}[/bold red]")
+        sys.exit(1)
+    if remote is not None:
+        sys.stdout.write(remote['output'])
+        sys.stderr.write(remote['errors'])
+        code = remote['code']
+    else:
+        from src.modules.route_scan import main as scan_main
+        code = scan_main(argv, get_config())
+    logging.info(f"Scan de routes terminé (code {code})")
+    if code:
+        sys.exit(code)
+
+def handle_daemon_command(args):
+    """
+    Démon de routes résident : --daemon [start|stop|stats]
+
+    start (défaut) : sert en avant-plan sur DAEMON_SOCKET jusqu'à Ctrl-C ou stop.
+    """
+    action = args[2] if len(args) > 2 else 'start'
+    if action == 'start':
+        from src.modules.route_daemon import RouteDaemon
+
+        daemon = RouteDaemon(CONFIG_PATH, TRANSACTIONS_FILE, PLAN_FILE_TPL, DAEMON_SOCKET)
+        console.print(f"[cyan]Démon de routes à l'écoute sur {DAEMON_SOCKET} (Ctrl-C pour arrêter)[/cyan]")
+        daemon.serve_forever()
+        console.print(f"[green]Démon arrêté[/green] {json.dumps(daemon.stats_report()['requests'])}")
+    elif action in ('stop', 'stats'):
+        try:
+            result = daemon_request('shutdown' if action == 'stop' else 'stats', socket_path=DAEMON_SOCKET)
+        except (DaemonError, OSError, ValueError) as e:
+            console.print(f"[bold red]Erreur démon: {e}[/bold red]")
+            return
+        if result is None:
+            console.print("[yellow]Aucun démon à l'écoute.[/yellow]")
+        else:
+            console.print_json(json.dumps(result, ensure_ascii=False))
+    else:
+        console.print("[bold red]Usage: python daily_briefing.py --daemon [start|stop|stats][/bold red]")
+
+
 def main():
     """
     Fonction principale pour le mode de planification (lorsque le script est lancÃ© sans argument).
@@ -910,6 +1084,21 @@ if __name__ == "__main__":
                     console.print(f"[bold red]❌ Erreur simulation: {e}[/bold red]")
                     logging.error(f"Erreur module simulation: {e}", exc_info=True)
 
+            elif command == '--stream':
+                logging.info("Mode service : flux de prix")
+                handle_stream_command(sys.argv)
+
+            elif command == '--scan':
+                logging.info("Scan de routes non interactif")
+                handle_scan_command(sys.argv)
+
+            elif command == '--archive-closed':
+                logging.info("Archivage des rotations clôturées")
+                handle_archive_closed_command(sys.argv)
+
+            elif command == '--daemon':
+                logging.info("Commande démon de routes")
+                handle_daemon_command(sys.argv)
 
             else:
                 console.print(f"[bold red]Commande inconnue: {command}[/bold red]")
@@ -917,6 +1106,11 @@ if __name__ == "__main__":
                 console.print("  --log-achat, --log-vente, --log-conversion, --log-cloture")
                 console.print("  --set-loop-currency DEVISE")
                 console.print("  --force-transaction TYPE")
+                console.print("  --stream [SOURCE] [--top N] [--method forex|bank] [--once]")
+                console.print("  --scan [--sourcing EUR,XAF] [--exclude RWF] [--loop XAF] [--method forex,bank]")
+                console.print("         [--capital 1000,5000] [--top N] [--mode direct|cycles] [--format json|ndjson]")
+                console.print("  --daemon [start|stop|stats]")
+                console.print("  --archive-closed")
         else:
             main()
 
@@ -1,156 +1,163 @@
 # arbitrage_engine_bis.py
 
-import json
 import logging
-import math
-
-# --- CHARGEMENT DE LA CONFIGURATION ---
-try:
-    with open('config.json', 'r', encoding='utf-8') as f:
-        config = json.load(f)
-    markets = config['markets']
-    forex_rates = config['forex_rates']
-    SEUIL_RENTABILITE_PCT = config['SEUIL_RENTABILITE_PCT']
-    NB_CYCLES_PAR_ROTATION = config.get('NB_CYCLES_PAR_ROTATION', 3)
-except (FileNotFoundError, KeyError) as e:
-    print(f"ERREUR CRITIQUE: Le fichier 'config.json' est manquant ou invalide. DÃ©tail: {e}")
-    logging.error(f"Erreur chargement config.json: {e}")
-    exit()
+import threading
+
+from src.engine.conversion_table import ConversionTable, resolve_pair_rate
+from src.engine.graph_search import DEFAULT_MAX_HOPS
+from src.engine.market_book import MarketBook
+from src.engine.route_cache import (build_route_tables, load_route_tables,
+                                    route_cache_key, save_route_tables)
+from src.engine.route_engine import RouteEngine
+from src.engine.route_matrix import REFERENCE_USDT
+from src.engine.validation_report import (ValidationReport,
+                                          config_fingerprint,
+                                          validate_config_coherence)
+from src.utils.config_store import ConfigError, get_config_store
+
+# --- CHARGEMENT DE LA CONFIGURATION (ConfigStore partagé, au premier accès) ---
+CONFIG_FILE = 'config.json'
+
+# Globals historiques du module, lus depuis CONFIG_FILE au premier accès puis
+# suivis à chaque changement du fichier (aucune E/S à l'import ; une
+# réaffectation directe par l'appelant reste prioritaire)
+_CONFIG_GLOBALS = ('config', 'markets', 'forex_rates', 'SEUIL_RENTABILITE_PCT',
+                   'NB_CYCLES_PAR_ROTATION', 'MAX_CYCLE_HOPS')
+_config_lock = threading.RLock()
+_store = None
+_store_values = {}  # Valeurs posées depuis le fichier (remplaçables au rechargement)
+# Carnet et table de la config chargée : (markets, MarketBook, forex_rates, ConversionTable)
+_compiled_config = (None, None, None, None)
+
+
+def load_config(path=CONFIG_FILE):
+    """Config du fichier (ConfigStore partagé), lève ConfigError s'il est absent ou invalide"""
+    return get_config_store(path).get()
+
+
+def _apply_config(config):
+    """Abonné du ConfigStore : met à jour les globals issus du fichier"""
+    values = {
+        'config': config,
+        'markets': config['markets'],
+        'forex_rates': config['forex_rates'],
+        'SEUIL_RENTABILITE_PCT': config['SEUIL_RENTABILITE_PCT'],
+        'NB_CYCLES_PAR_ROTATION': config.get('NB_CYCLES_PAR_ROTATION', 3),
+        'MAX_CYCLE_HOPS': config.get('MAX_CYCLE_HOPS', DEFAULT_MAX_HOPS),
+    }
+    with _config_lock:
+        for name, value in values.items():
+            if name not in globals() or globals()[name] is _store_values.get(name):
+                globals()[name] = value
+                _store_values[name] = value
+        _compile_config(config)
+    invalidate_validation_cache()
+
+
+def _compile_config(config):
+    """Carnet de marchés et table de conversion compilés une fois par version de la config"""
+    global _compiled_config
+    _compiled_config = (config['markets'], MarketBook(config['markets']),
+                        config['forex_rates'], ConversionTable(config['forex_rates']))
+
+
+def _load_module_config():
+    """Renseigne les globals de config absents à partir de CONFIG_FILE"""
+    global _store
+    with _config_lock:
+        if _store is None:
+            store = get_config_store(CONFIG_FILE)
+            try:
+                config = store.get()
+            except ConfigError as e:
+                logging.error(f"Erreur chargement {CONFIG_FILE}: {e}")
+                raise
+            _apply_config(config)
+            store.subscribe(_apply_config)
+            _store = store
+        elif not all(name in globals() for name in _CONFIG_GLOBALS):
+            _apply_config(_store.config)
+
+
+def _refresh_module_config():
+    """Relit CONFIG_FILE s'il a changé (globals et moteur par défaut mis à jour)"""
+    if _store is not None:
+        _store.refresh()
+
+
+def __getattr__(name):
+    """Accès paresseux aux globals de config (PEP 562)"""
+    if name in _CONFIG_GLOBALS:
+        _load_module_config()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _config_value(name):
+    """Global de config courant (réaffecté par l'appelant ou lu depuis CONFIG_FILE)"""
+    if name not in globals():
+        _load_module_config()
+    return globals()[name]
+
+
+# --- MOTEUR PAR DÉFAUT (clé = contenu des globals de config) ---
+_default_engine = None
+_default_engine_key = None
+_default_engine_lock = threading.Lock()
+
+
+def get_default_engine():
+    """RouteEngine des globals du module, reconstruit uniquement si leur contenu change"""
+    global _default_engine, _default_engine_key
+    _refresh_module_config()
+    engine_config = {name: _config_value(name) for name in _CONFIG_GLOBALS if name != 'config'}
+    key = (
+        config_fingerprint(engine_config['markets'], engine_config['forex_rates']),
+        engine_config['SEUIL_RENTABILITE_PCT'],
+        engine_config['NB_CYCLES_PAR_ROTATION'],
+        engine_config['MAX_CYCLE_HOPS'],
+    )
+    with _default_engine_lock:
+        if _default_engine is None or _default_engine_key != key:
+            _default_engine = RouteEngine(engine_config)
+            _default_engine_key = key
+        return _default_engine
 
 
 # --- FONCTIONS UTILITAIRES ---
-def validate_config_coherence(markets, forex_rates):
-
-    """Valide la cohérence des taux de change et prix de marché"""
-    alerts = []
-    # ========== VALIDATION PRIX NÉGATIFS ==========
-    for market in markets:
-        currency = market.get('currency', 'INCONNU')
-
-        # Vérifier buy_price
-        buy_price = market.get('buy_price', 0)
-        if buy_price < 0:
-            alerts.append({
-                'type': 'PRIX_NEGATIF',
-                'severity': 'ERROR',
-                'currency': currency,
-                'message': f"{currency}: Prix d'achat négatif ({buy_price:.4f}) - INVALIDE. Vérifiez config.json"
-            })
-
-        # Vérifier sell_price
-        sell_price = market.get('sell_price', 0)
-        if sell_price < 0:
-            alerts.append({
-                'type': 'PRIX_NEGATIF',
-                'severity': 'ERROR',
-                'message': f"{currency}: Prix de vente négatif ({sell_price:.4f}) - INVALIDE. Vérifiez config.json",
-                'severity': 'ERROR',
-            })
-
-
-        # Vérifier fee_pct
-        fee_pct = market.get('fee_pct', 0)
-        if fee_pct < 0:
-            alerts.append({
-                'type': 'FRAIS_NEGATIFS',
-                'severity': 'ERROR',
-                'currency': currency,
-                'message': f"{currency}: Frais négatifs ({fee_pct:.2f}%) - INVALIDE. Vérifiez config.json"
-            })
-
-    # ========== VALIDATION TAUX FOREX NÉGATIFS ==========
-    for pair, rate_data in forex_rates.items():
-        # Support ancien format (nombre simple)
-        if isinstance(rate_data, (int, float)):
-            if rate_data < 0:
-                alerts.append({
-                    'type': 'TAUX_NEGATIF',
-                    'severity': 'ERROR',
-                    'currency': currency,
-                    'message': f"{pair}: Taux de change négatif ({rate_data:.4f}) - INVALIDE. Vérifiez config.json"
-                })
-        # Nouveau format (bid/ask/bank_spread_pct)
-        elif isinstance(rate_data, dict):
-            if rate_data.get('bid', 0) < 0:
-                alerts.append({
-                    'type': 'TAUX_NEGATIF',
-                    'severity': 'ERROR',
-                    'currency': currency,
-                    'message': f"{pair}: Taux bid négatif ({rate_data['bid']:.4f}) - INVALIDE. Vérifiez config.json"
-                })
-            if rate_data.get('ask', 0) < 0:
-                alerts.append({
-                    'type': 'TAUX_NEGATIF',
-                    'severity': 'ERROR',
-                    'currency': currency,
-                    'message': f"{pair}: Taux ask négatif ({rate_data['ask']:.4f}) - INVALIDE. Vérifiez config.json"
-                })
-            if rate_data.get('bank_spread_pct', 0) < 0:
-                alerts.append({
-                    'type': 'SPREAD_NEGATIF',
-                    'severity': 'ERROR',
-                    'currency': currency,
-                    'message': f"{pair}: Spread bancaire négatif ({rate_data['bank_spread_pct']:.2f}%) - INVALIDE"
-                })
-    # Détecter le pivot (devise la plus présente dans forex_rates)
-    pivot_counts = {}
-    for pair in forex_rates.keys():
-        for curr in pair.split('/'):
-            pivot_counts[curr] = pivot_counts.get(curr, 0) + 1
-
-    pivot = max(pivot_counts, key=pivot_counts.get) if pivot_counts else 'EUR'
-
-    logging.info(f"Devise pivot détectée : {pivot}")
-
-    # Vérifier que chaque devise de marché a un taux vers le pivot
-    for market in markets:
-        currency = market['currency']
-        if currency == pivot:
-            continue
-
-        pair_to_pivot = f"{currency}/{pivot}"
-        pair_from_pivot = f"{pivot}/{currency}"
-
-        has_rate = (pair_to_pivot in forex_rates or pair_from_pivot in forex_rates)
-
-        if not has_rate:
-            alerts.append({
-                'type': 'TAUX_MANQUANT',
-                'severity': 'ERROR',
-                'message': f"{currency} non relié au pivot {pivot}"
-            })
-
-    # Vérifier les écarts buy/sell
-    for market in markets:
-        if market.get('buy_price', 0) > 0 and market.get('sell_price', 0) > 0:
-            spread_pct = ((market['buy_price'] - market['sell_price']) / market['sell_price']) * 100
-            print(spread_pct)
-            # Spread inversé EXTRÊME (> 10%) = Erreur manifeste
-            if spread_pct < -10:
-                alerts.append({
-                    'type': 'SPREAD_INVERSE',
-                    'severity': 'ERROR',
-                    'message': f"{market['currency']}: Spread inversé extrême ({spread_pct:.2f}%) - Vérifiez buy_price/sell_price dans config.json"
-                })
-            # Spread inversé léger (anomalie possible = opportunité)
-            elif spread_pct < -0.5:
-                alerts.append({
-                    'type': 'ANOMALIE_SPREAD',
-                    'severity': 'WARNING',
-                    'message': f"{market['currency']}: Spread inversé ({spread_pct:.2f}%) - Opportunité d'arbitrage détectée"
-                })
-            # Spread normal mais élevé
-            elif spread_pct > 15:
-                alerts.append({
-                    'type': 'SPREAD_ANORMAL',
-                    'severity': 'WARNING',
-                    'message': f"{market['currency']}: Spread élevé ({spread_pct:.2f}%)"
-                })
-
-    return alerts
+# --- CACHE DE VALIDATION (clé = empreinte marchés + taux) ---
+_validation_report = None
+
+
+def get_validation_report(markets_list, forex_rates_dict, force=False):
+    """
+    ValidationReport de la config, recalculé uniquement si son contenu change
+
+    Args:
+        force: Revalider même si l'empreinte est inchangée
+    """
+    global _validation_report
+    fingerprint = config_fingerprint(markets_list, forex_rates_dict)
+    if force or _validation_report is None or _validation_report.fingerprint != fingerprint:
+        _validation_report = ValidationReport(fingerprint, validate_config_coherence(markets_list, forex_rates_dict))
+        logging.debug(f"Config revalidée: {_validation_report}")
+    return _validation_report
+
+
+def invalidate_validation_cache():
+    """Force la revalidation au prochain appel"""
+    global _validation_report
+    _validation_report = None
 
 def get_market_data(currency_code, markets_list):
     """Récupere les données de marché pour une devise donnée"""
+    markets, book, _, _ = _compiled_config
+    if markets_list is markets:
+        # Liste de la config chargée : recherche O(1) dans le carnet compilé
+        record = book.get(currency_code)
+        if record is not None:
+            return record.raw
+    # Autre liste, ou marché incomplet écarté du carnet : parcours historique
     for market in markets_list:
         if "currency" in market and market["currency"] == currency_code:
             return market
@@ -193,74 +200,8 @@ def get_forex_rate(from_currency, to_currency, forex_rates, conversion_method='f
         found_pair = inverse_pair
     else:
         raise ValueError(f"Taux de change manquant pour {from_currency}→{to_currency}")
-        # Décomposer la paire trouvée
-    base, quote = found_pair.split('/')
-
-    # ========== ANCIEN FORMAT ==========
-    if isinstance(rate_data, (int, float)):
-        if rate_data <= 0:
-            raise ValueError(f"Taux forex invalide: {rate_data}")
-
-         # On veut quote→base, on a base/quote
-        if from_currency == base and to_currency == quote:
-            return 1.0 / rate_data
-        elif from_currency == quote and to_currency == base:
-            return rate_data
-        else:
-            raise ValueError(f"Incohérence ancien format: {found_pair}, conversion {from_currency}→{to_currency}")
-
-    # ========== NOUVEAU FORMAT ==========
-    if not isinstance(rate_data, dict):
-        raise ValueError(f"Format de taux invalide: {type(rate_data)}")
-
-    bid = rate_data.get('bid', 0)
-    ask = rate_data.get('ask', 0)
-
-    if bid <= 0 or ask <= 0:
-        raise ValueError(f"Taux bid/ask invalides: bid={bid}, ask={ask}")
-
-
-    # --- MÉTHODE BANQUE ---
-    if conversion_method == 'bank':
-        mid_rate = (bid + ask) / 2
-        spread = rate_data.get('bank_spread_pct', 0) / 100.0
-
-        if from_currency == base and to_currency == quote:
-            # On veut base→quote, on a base/quote
-            # Ex: XAF→EUR avec XAF/EUR bid=650
-            # 650 XAF = 1 EUR, donc 1 XAF = 1/650 EUR
-            # Spread défavorable : on reçoit moins
-            return (1 / mid_rate) * (1 - spread)
-
-
-        elif from_currency == quote and to_currency == base:
-            # On veut quote→base, on a base/quote
-            # Ex: EUR→XAF avec XAF/EUR bid=650
-            # On vend EUR, on reçoit 650 XAF (moins le spread)
-            return mid_rate * (1 - spread)
-
-        else:
-            raise ValueError(f"Incohérence: paire {found_pair}, conversion {from_currency}→{to_currency}")
-
-    # --- MÉTHODE FOREX ---
-    if from_currency == base and to_currency == quote:
-        # On veut base→quote, on a base/quote
-        # Ex: XAF→EUR avec XAF/EUR bid=650, ask=660
-        # On vend XAF (base) pour acheter EUR (quote)
-        # La banque achète EUR à bid → 650 XAF = 1 EUR
-        # Donc 1 XAF = 1/650 EUR
-        # Mais pour nous, c'est défavorable, donc on utilise bid (le plus bas)
-        return 1.0 / ask
-
-    elif from_currency == quote and to_currency == base:
-        # On veut quote→base, on a base/quote
-        # Ex: EUR→XAF avec XAF/EUR bid=650, ask=660
-        # On vend EUR (quote) pour acheter XAF (base)
-        # La banque achète EUR à bid → on reçoit 650 XAF par EUR
-        return bid
 
-    else:
-        raise ValueError(f"Incohérence: paire {found_pair}, conversion {from_currency}→{to_currency}")
+    return resolve_pair_rate(rate_data, found_pair, from_currency, to_currency, conversion_method)
 
 
 def convert_to_eur(amount, currency, forex_rates):
@@ -273,21 +214,11 @@ def convert_to_eur(amount, currency, forex_rates):
         return 0
 
     try:
-        # Chercher d'abord CURRENCY/EUR (ex: RWF/EUR = 1700 signifie 1700 RWF = 1 EUR)
-        pair = f"{currency}/EUR"
-        if pair in forex_rates:
-            rate = forex_rates[pair]
-            if rate > 0:
-                return amount / rate  # DIVISION au lieu de multiplication
-
-        # Sinon chercher EUR/CURRENCY
-        inverse_pair = f"EUR/{currency}"
-        if inverse_pair in forex_rates:
-            rate = forex_rates[inverse_pair]
-            if rate > 0:
-                return amount * rate
-
-        raise ValueError(f"Taux manquant pour {currency}→EUR")
+        _, _, rates, table = _compiled_config
+        if forex_rates is rates:
+            # Taux de la config chargée : table compilée au chargement
+            return amount * table.rate(currency, 'EUR')
+        return amount * get_forex_rate(currency, 'EUR', forex_rates)
     except Exception as e:
         logging.error(f"Impossible de convertir {currency} vers EUR: {e}")
         raise
@@ -319,127 +250,25 @@ def calculate_profit_route(initial_usdt, sourcing_code, selling_code,conversion_
     """
         Args ajouté:
         conversion_method: 'forex' ou 'bank'
-    """
-    # Validation des entrées
-    if initial_usdt <= 0:
-        logging.warning(f"Montant USDT initial invalide: {initial_usdt}")
-        return None
-    if not math.isfinite(initial_usdt):
-        return None
-
-    if sourcing_code == selling_code:
-        logging.warning(f"Conversion circulaire détectée: {sourcing_code} -> {selling_code}")
-        return None
-
-
-
-
-    try:
-        sourcing_market = get_market_data(sourcing_code, markets)
-        selling_market = get_market_data(selling_code, markets)
-        eur_market = get_market_data("EUR", markets)
-    except ValueError as e:
-        logging.warning(f"Marché non trouvé: {e}")
-        return None
-
-    usdt_start = float(initial_usdt)
-    usdt_for_main_cycle = usdt_start
-    details = {}
-
-    # --- ÉTAPE 1 : COÛT D'ACQUISITION RÉEL EN EUR ---
-    cost_in_eur = 0
-
-
-        # Achat direct
-    fee_multiplier = 1.0 + sourcing_market['fee_pct'] / 100.0
-    cost_local = usdt_start * sourcing_market['buy_price'] * fee_multiplier
-
-    # CORRECTION CRITIQUE : Conversion vers EUR via le taux forex
-
-    try:
-        rate_to_eur = get_forex_rate(sourcing_code, 'EUR', forex_rates,conversion_method)
-        cost_in_eur = cost_local * rate_to_eur
-
-        if cost_in_eur <= 0:
-            return None
-    except ValueError:
-        return None
-
-    details["Phase 1 (Sourcing)"] = f"Achat {usdt_start:.2f} USDT en {sourcing_code} = {cost_in_eur:.2f} EUR"
-
-    # --- ÉTAPE 2 : VENTE EN selling_currency ---
-
 
-    revenu_brut_B_local = usdt_for_main_cycle * selling_market["sell_price"]
-    fee_multiplier_sell = 1.0 - (selling_market["fee_pct"] / 100.0)  # Frais déduits
-    revenu_net_B_local = revenu_brut_B_local * fee_multiplier_sell
-
-    if revenu_net_B_local <= 0:
-        return None
-
-    details["Phase 2 (Vente)"] = f"Vente {usdt_for_main_cycle:.2f} USDT = {revenu_net_B_local:.2f} {selling_code}"
-
-    # --- ÉTAPE 3 : CONVERSION vers EUR ---
-    try:
-        rate_to_eur = get_forex_rate(selling_code, 'EUR', forex_rates,conversion_method)
-        revenue_in_eur = revenu_net_B_local * rate_to_eur
-
-        if revenue_in_eur <= 0:
-            return None
-    except ValueError:
-        return None
-
-    details["Phase 3 (Conversion)"] = f"{revenu_net_B_local:.2f} {selling_code} → {revenue_in_eur:.2f} EUR"
-
-    # --- ÉTAPE 4 : RÉINVESTISSEMENT en USDT ---
-    if eur_market['buy_price'] <= 0:
-        return None
-
-
-
-    cost_per_usdt = eur_market['buy_price'] * (1.0 + eur_market['fee_pct'] / 100.0)
-    final_usdt_amount = revenue_in_eur / cost_per_usdt
-    if final_usdt_amount <= 0:
-        return None
-
-    profit_usdt = final_usdt_amount - usdt_start
-    profit_eur = revenue_in_eur - cost_in_eur
-    profit_pct = (profit_eur / cost_in_eur) * 100 if cost_in_eur > 0 else 0
-
-    details["Phase 4 (Réinvest)"] = f"{revenue_in_eur:.2f} EUR → {final_usdt_amount:.2f} USDT"
-
-    route_str = f"{sourcing_code}'(DC)' → USDT → {selling_code} → EUR → USDT"
-
-    # --- PLAN DE VOL ---
-    plan = {'phases': []}
-
-    # Cycle 1
-    plan['phases'].append({'cycle': 1, 'phase_in_cycle': 1, 'type': 'ACHAT', 'market': sourcing_code, 'description': f"Sourcing initial en {sourcing_code}"})
-    plan['phases'].append({'cycle': 1, 'phase_in_cycle': 2, 'type': 'VENTE', 'market': selling_code, 'description': f"Vente en {selling_code}"})
-    plan['phases'].append({'cycle': 1, 'phase_in_cycle': 3, 'type': 'CONVERSION', 'market_from': selling_code, 'market_to': 'EUR', 'description': f"Conversion {selling_code}→EUR"})
+    Calcul délégué au RouteEngine de la config du module
+    """
+    return get_default_engine().calculate_profit_route(initial_usdt, sourcing_code, selling_code,
+                                                       conversion_method)
 
-    # Cycles suivants
-    for i in range(2, NB_CYCLES_PAR_ROTATION + 1):
-        plan['phases'].append({'cycle': i, 'phase_in_cycle': 1, 'type': 'ACHAT', 'market': 'EUR', 'description': f"Réinvestissement cycle {i}"})
-        plan['phases'].append({'cycle': i, 'phase_in_cycle': 2, 'type': 'VENTE', 'market': selling_code, 'description': f"Vente cycle {i}"})
-        plan['phases'].append({'cycle': i, 'phase_in_cycle': 3, 'type': 'CONVERSION', 'market_from': selling_code, 'market_to': 'EUR', 'description': f"Conversion cycle {i}"})
+def calculate_profit_routes_batch(amounts, pairs=None, conversion_method='forex'):
+    """
+    Version vectorisée de calculate_profit_route() pour dimensionner une rotation
 
-    plan['phases'].append({'cycle': NB_CYCLES_PAR_ROTATION, 'phase_in_cycle': 4, 'type': 'CLOTURE', 'market': 'EUR', 'description': "Clôture"})
+    Args:
+        amounts: Capitaux initiaux en USDT (tableau)
+        pairs: Liste de (sourcing, vente) ; par défaut toutes les paires
 
-    return {
-        "sourcing_market_code": sourcing_code,
-        "selling_market_code": selling_code,
-        "conversion_method": conversion_method,
-        "detailed_route": route_str,
-        "profit_pct": profit_pct,
-        "profit_usdt": profit_usdt,
-        "final_amount_usdt": final_usdt_amount,
-        "initial_amount_usdt": usdt_start,
-        "cost_eur": cost_in_eur,
-        "revenue_eur": revenue_in_eur,
-        "details": details,
-        "plan_de_vol": plan
-    }
+    Returns:
+        CapitalSweep : profit_usdt, profit_pct et final_amount_usdt en
+        tableaux (nb_montants, nb_paires), NaN là où la route est incalculable
+    """
+    return get_default_engine().sweep_capital(amounts, pairs, conversion_method)
 
 def find_routes_with_filters(
     top_n=5,
@@ -448,7 +277,10 @@ def find_routes_with_filters(
     sourcing_currency=None,
     excluded_markets=None,
     loop_currency=None,
-    conversion_method='forex'
+    conversion_method='forex',
+    search_mode='direct',
+    max_hops=None,
+    trade_size=None
 ):
     """
     Fonction CENTRALE pour trouver routes d'arbitrage avec filtres avancés
@@ -460,18 +292,26 @@ def find_routes_with_filters(
         sourcing_currency: Forcer devise de sourcing (ex: 'EUR')
         excluded_markets: Liste devises exclues comme marché de VENTE
         loop_currency: Devise de bouclage (prioritaire sur excluded_markets)
+        search_mode: 'direct' (sourcing → USDT → vente → EUR → USDT) ou
+            'cycles' (cycles multi-sauts dans le graphe des devises)
+        max_hops: Nombre max d'arêtes d'un cycle (défaut: MAX_CYCLE_HOPS)
+        trade_size: Taille (USDT) à exécuter sur les carnets d'ordres des
+            marchés ('depth' dans config.json) ; None = prix affichés
 
     Returns:
-        Liste de routes triées par profitabilité décroissante
+        Liste de RouteRecord (ou CycleRecord en mode 'cycles') triés par
+        profitabilité décroissante (lecture type dict, route.materialize()
+        pour un dict complet)
     """
 
     # ========== VALIDATION DE COHÉRENCE - ALLÉGÉE ==========
+    _refresh_module_config()
     if not skip_validation:
-        alerts = validate_config_coherence(markets, forex_rates)
+        # Rapport mémorisé : seule l'empreinte est recalculée si la config n'a pas changé
+        report = get_validation_report(_config_value('markets'), _config_value('forex_rates'))
 
         # Ne bloquer QUE sur erreurs critiques
-        critical_errors = [a for a in alerts if a['severity'] == 'ERROR' and
-                          a['type'] in ['TAUX_MANQUANT', 'SPREAD_INVERSE']]
+        critical_errors = report.critical_errors
 
         if critical_errors:
             print("\n" + "="*70)
@@ -485,90 +325,83 @@ def find_routes_with_filters(
             return []
 
         # Log des warnings sans bloquer
-        warnings = [a for a in alerts if a['severity'] == 'WARNING']
+        warnings = report.warnings
         if warnings:
             logging.info(f"{len(warnings)} avertissements détectés (non bloquants)")
 
-    # ========== RECHERCHE DES ROUTES ==========
-    all_routes = []
-
-    if not markets or len(markets) < 2:
-        logging.error("Pas assez de marchés configurés")
-        return []
-
-    # Normaliser les paramètres
-    excluded_markets = excluded_markets or []
-
-    for market_a in markets:
-        # Filtre sourcing (nouveau)
-        if sourcing_currency and market_a['currency'] != sourcing_currency:
-            continue
-
-        for market_b in markets:
-            if market_a['currency'] == market_b['currency']:
-                continue
+    # ========== RECHERCHE DES ROUTES (MOTEUR DE LA CONFIG) ==========
+    return get_default_engine().find_routes(
+        top_n=top_n,
+        skip_validation=True,
+        apply_threshold=apply_threshold,
+        sourcing_currency=sourcing_currency,
+        excluded_markets=excluded_markets,
+        loop_currency=loop_currency,
+        conversion_method=conversion_method,
+        search_mode=search_mode,
+        max_hops=max_hops,
+        trade_size=trade_size
+    )
 
-            # Filtre exclusions (nouveau)
-            if market_b['currency'] in excluded_markets:
-                # Exception : bouclage forcé prioritaire
-                if not (loop_currency and market_b['currency'] == loop_currency):
-                    logging.debug(f"Route {market_a['currency']}→{market_b['currency']} exclue")
-                    continue
 
-            route = calculate_profit_route(
-                    initial_usdt=1000,
-                    sourcing_code=market_a['currency'],
-                    selling_code=market_b['currency'],
-                    conversion_method=conversion_method
-            )
+# ========== CACHE DISQUE DES TABLES DE ROUTES ==========
+# Tables complètes (forex + bank) d'une config, clé = empreinte de son contenu
+ROUTE_CACHE_FILE = '.route_cache.npz'
 
-            if route:
-                    all_routes.append(route)
 
+def find_cached_routes(top_n=5, apply_threshold=True, conversion_method='forex', cache_path=None):
+    """
+    Routes directes sans filtre, lues depuis le cache disque si la config n'a pas changé
 
+    Cache absent ou périmé : validation + calcul des tables des deux méthodes
+    par le moteur par défaut, puis écriture du cache. Une config bloquée par
+    la validation n'est jamais mise en cache (mêmes messages et [] que
+    find_routes_with_filters()).
 
-    if not all_routes:
+    Returns:
+        Liste de RouteRecord, identique à find_routes_with_filters(top_n=...)
+    """
+    _refresh_module_config()
+    cache_path = cache_path or ROUTE_CACHE_FILE
+    markets_list, rates = _config_value('markets'), _config_value('forex_rates')
+    nb_cycles = _config_value('NB_CYCLES_PAR_ROTATION')
+    key = route_cache_key(markets_list, rates, nb_cycles, REFERENCE_USDT)
+
+    tables = load_route_tables(cache_path, key)
+    if tables is None:
+        if get_validation_report(markets_list, rates).is_blocking or len(markets_list) < 2:
+            return find_routes_with_filters(top_n=top_n, apply_threshold=apply_threshold,
+                                            conversion_method=conversion_method)
+        tables = build_route_tables(get_default_engine().matrix, nb_cycles)
+        save_route_tables(cache_path, key, tables)
+        logging.info(f"Cache des routes recalculé ({cache_path})")
+
+    threshold = _config_value('SEUIL_RENTABILITE_PCT') if apply_threshold else None
+    routes = tables[conversion_method].routes(top_n=top_n, threshold=threshold)
+    if not routes:
         logging.warning("Aucune route valide trouvée")
-        return []
-
-    # ========== TRI PAR PROFITABILITÉ ==========
-    sorted_routes = sorted(all_routes, key=lambda x: x.get('profit_pct', -100), reverse=True)
-
-    # ========== VALIDATION FINALE SIMPLIFIÉE ==========
-    validated_routes = []
-    for route in sorted_routes:
-        profit_pct = route.get('profit_pct', -100)
-
-        # Filtre anomalies : rejeter pertes catastrophiques ou profits impossibles
-        if profit_pct < -90:  # Perte > 90% = anomalie
-            logging.debug(f"Route rejetée (perte excessive): {route['detailed_route']} ({profit_pct:.2f}%)")
-            continue
-
-        if profit_pct > 1000:  # Profit > 1000% = anomalie
-            logging.debug(f"Route rejetée (profit suspect): {route['detailed_route']} ({profit_pct:.2f}%)")
-            continue
-
-        # Filtre seuil de rentabilité
-        if apply_threshold and profit_pct < SEUIL_RENTABILITE_PCT:
-            logging.debug(f"Route rejetée (sous seuil): {route['detailed_route']} ({profit_pct:.2f}%)")
-            continue
-
-        validated_routes.append(route)
-
-    return validated_routes[:top_n]
+    return routes
 
 
 # ========== FONCTION LEGACY (compatibilité) ==========
-def find_best_routes(top_n=5, skip_validation=False, apply_threshold=True,conversion_method='forex'):
+def find_best_routes(top_n=5, skip_validation=False, apply_threshold=True,conversion_method='forex',
+                     search_mode='direct', use_cache=False):
     """
     LEGACY - Wrapper pour compatibilité avec daily_briefing.py
     Utilise find_routes_with_filters() en interne
+
+    use_cache=True (recherche directe) : tables lues depuis ROUTE_CACHE_FILE
+    si la config n'a pas changé depuis leur calcul
     """
+    if use_cache and search_mode == 'direct' and not skip_validation:
+        return find_cached_routes(top_n=top_n, apply_threshold=apply_threshold,
+                                  conversion_method=conversion_method)
     return find_routes_with_filters(
         top_n=top_n,
         skip_validation=skip_validation,
         apply_threshold=apply_threshold,
-        conversion_method=conversion_method
+        conversion_method=conversion_method,
+        search_mode=search_mode
     )
 
 # --- FONCTION DE TEST ---
@@ -0,0 +1,102 @@
+# capital_sweep.py
+
+import logging
+
+import numpy as np
+
+from src.engine.conversion_table import method_index
+
+
+class CapitalSweep:
+    """
+    Courbes de profit d'un lot de routes pour un lot de capitaux initiaux
+
+    Tableaux (nb_montants, nb_paires) : la cellule [k, p] reproduit au bit
+    près calculate_profit_route(amounts[k], *pairs[p]) ; NaN là où
+    calculate_profit_route() renverrait None.
+    """
+
+    __slots__ = ('amounts', 'pairs', 'conversion_method',
+                 'final_amount_usdt', 'profit_usdt', 'profit_pct')
+
+    def __init__(self, amounts, pairs, conversion_method, final_amount_usdt, profit_usdt, profit_pct):
+        self.amounts = amounts
+        self.pairs = pairs
+        self.conversion_method = conversion_method
+        self.final_amount_usdt = final_amount_usdt
+        self.profit_usdt = profit_usdt
+        self.profit_pct = profit_pct
+
+    def curve(self, sourcing_code, selling_code):
+        """Dict de vecteurs (taille nb_montants) pour une paire du lot"""
+        p = self.pairs.index((sourcing_code, selling_code))
+        return {
+            'final_amount_usdt': self.final_amount_usdt[:, p],
+            'profit_usdt': self.profit_usdt[:, p],
+            'profit_pct': self.profit_pct[:, p],
+        }
+
+    def __repr__(self):
+        return (f"CapitalSweep({len(self.amounts)} montants × {len(self.pairs)} paires, "
+                f"{self.conversion_method})")
+
+
+def sweep_capital(matrix, amounts, pairs=None, conversion_method='forex'):
+    """
+    Évalue toutes les routes (sourcing, vente) pour tous les montants en un appel
+
+    Mêmes étapes et même ordre d'opérations que calculate_profit_route(),
+    diffusés sur une grille (montants × paires) ; aucun dict ni plan de vol.
+
+    Args:
+        matrix: RouteMatrix (prix, frais et taux vers EUR déjà compilés)
+        amounts: Capitaux initiaux en USDT (séquence ou tableau)
+        pairs: Liste de (sourcing, vente) en codes devise ; par défaut toutes
+            les paires ordonnées de devises distinctes
+
+    Returns:
+        CapitalSweep
+    """
+    m = method_index(conversion_method)
+    currencies = matrix.currencies
+    amounts = np.atleast_1d(np.asarray(amounts, dtype=float))
+
+    if pairs is None:
+        n = len(currencies)
+        pairs = [(currencies[a], currencies[b]) for a in range(n) for b in range(n) if a != b]
+    else:
+        pairs = [tuple(pair) for pair in pairs]
+
+    # Devise inconnue → index -1 : colonne entièrement NaN (route incalculable)
+    sourcing = np.array([matrix.index.get(a, -1) for a, _ in pairs], dtype=int)
+    selling = np.array([matrix.index.get(b, -1) for _, b in pairs], dtype=int)
+    unknown = (sourcing < 0) | (selling < 0)
+    if unknown.any():
+        logging.warning(f"{int(unknown.sum())} paires avec marché inconnu ignorées dans le balayage")
+
+    u = amounts[:, None]
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # --- ÉTAPE 1 : COÛT D'ACQUISITION EN EUR ---
+        cost_local = (u * matrix.buy_prices[sourcing]) * (1.0 + matrix.fees_pct[sourcing] / 100.0)
+        cost_eur = cost_local * matrix.rates_to_eur[m, sourcing]
+
+        # --- ÉTAPES 2-3 : VENTE PUIS CONVERSION vers EUR ---
+        revenue_local = (u * matrix.sell_prices[selling]) * (1.0 - matrix.fees_pct[selling] / 100.0)
+        revenue_eur = revenue_local * matrix.rates_to_eur[m, selling]
+
+        # --- ÉTAPE 4 : RÉINVESTISSEMENT en USDT ---
+        eur_cost = matrix.eur_cost_per_usdt if matrix.eur_available else np.nan
+        final_amount_usdt = revenue_eur / eur_cost
+        profit_usdt = final_amount_usdt - u
+        profit_pct = ((revenue_eur - cost_eur) / cost_eur) * 100
+
+        valid = ((u > 0) & np.isfinite(u)
+                 & (sourcing != selling) & ~unknown
+                 & (cost_eur > 0) & np.isfinite(cost_eur)
+                 & (revenue_local > 0) & (revenue_eur > 0) & np.isfinite(revenue_eur)
+                 & (final_amount_usdt > 0))
+
+    for values in (final_amount_usdt, profit_usdt, profit_pct):
+        values[~valid] = np.nan
+
+    return CapitalSweep(amounts, pairs, conversion_method, final_amount_usdt, profit_usdt, profit_pct)
@@ -0,0 +1,219 @@
+# conversion_table.py
+
+import hashlib
+import json
+import logging
+
+import numpy as np
+
+# --- MÉTHODES DE CONVERSION ---
+CONVERSION_METHODS = ('forex', 'bank')
+
+
+def method_index(conversion_method):
+    """Index de la méthode dans les tableaux (toute méthode autre que 'bank' = forex)"""
+    return 1 if conversion_method == 'bank' else 0
+
+
+def rates_fingerprint(forex_rates):
+    """Empreinte stable du contenu de forex_rates (indépendante de l'ordre des clés)"""
+    payload = json.dumps(forex_rates, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def resolve_pair_rate(rate_data, found_pair, from_currency, to_currency, conversion_method='forex'):
+    """
+    Taux from→to à partir de l'entrée brute de forex_rates pour la paire trouvée
+    Convention: EUR/XAF = {bid: prix achat EUR par banque, ask: prix vente EUR par banque}
+    """
+    base, quote = found_pair.split('/')
+
+    # ========== ANCIEN FORMAT ==========
+    if isinstance(rate_data, (int, float)):
+        if rate_data <= 0:
+            raise ValueError(f"Taux forex invalide: {rate_data}")
+
+         # On veut quote→base, on a base/quote
+        if from_currency == base and to_currency == quote:
+            return 1.0 / rate_data
+        elif from_currency == quote and to_currency == base:
+            return rate_data
+        else:
+            raise ValueError(f"Incohérence ancien format: {found_pair}, conversion {from_currency}→{to_currency}")
+
+    # ========== NOUVEAU FORMAT ==========
+    if not isinstance(rate_data, dict):
+        raise ValueError(f"Format de taux invalide: {type(rate_data)}")
+
+    bid = rate_data.get('bid', 0)
+    ask = rate_data.get('ask', 0)
+
+    if bid <= 0 or ask <= 0:
+        raise ValueError(f"Taux bid/ask invalides: bid={bid}, ask={ask}")
+
+
+    # --- MÉTHODE BANQUE ---
+    if conversion_method == 'bank':
+        mid_rate = (bid + ask) / 2
+        spread = rate_data.get('bank_spread_pct', 0) / 100.0
+
+        if from_currency == base and to_currency == quote:
+            # On veut base→quote, on a base/quote
+            # Ex: XAF→EUR avec XAF/EUR bid=650
+            # 650 XAF = 1 EUR, donc 1 XAF = 1/650 EUR
+            # Spread défavorable : on reçoit moins
+            return (1 / mid_rate) * (1 - spread)
+
+
+        elif from_currency == quote and to_currency == base:
+            # On veut quote→base, on a base/quote
+            # Ex: EUR→XAF avec XAF/EUR bid=650
+            # On vend EUR, on reçoit 650 XAF (moins le spread)
+            return mid_rate * (1 - spread)
+
+        else:
+            raise ValueError(f"Incohérence: paire {found_pair}, conversion {from_currency}→{to_currency}")
+
+    # --- MÉTHODE FOREX ---
+    if from_currency == base and to_currency == quote:
+        # On veut base→quote, on a base/quote
+        # Ex: XAF→EUR avec XAF/EUR bid=650, ask=660
+        # On vend XAF (base) pour acheter EUR (quote)
+        # La banque achète EUR à bid → 650 XAF = 1 EUR
+        # Donc 1 XAF = 1/650 EUR
+        # Mais pour nous, c'est défavorable, donc on utilise bid (le plus bas)
+        return 1.0 / ask
+
+    elif from_currency == quote and to_currency == base:
+        # On veut quote→base, on a base/quote
+        # Ex: EUR→XAF avec XAF/EUR bid=650, ask=660
+        # On vend EUR (quote) pour acheter XAF (base)
+        # La banque achète EUR à bid → on reçoit 650 XAF par EUR
+        return bid
+
+    else:
+        raise ValueError(f"Incohérence: paire {found_pair}, conversion {from_currency}→{to_currency}")
+
+
+class ConversionTable:
+    """
+    Table compilée des taux de change
+
+    Chaque combinaison (from, to, méthode) est résolue une seule fois dans un
+    tableau dense rates[méthode, id_from, id_to] indexé par des identifiants
+    entiers de devises (NaN = taux manquant ou invalide). Supporte l'ancien
+    format numérique et le format bid/ask/bank_spread_pct, avec la même
+    priorité que get_forex_rate() : la paire directe prime sur la paire inverse.
+    """
+
+    def __init__(self, forex_rates, currencies=()):
+        self.fingerprint = rates_fingerprint(forex_rates)
+
+        # Identifiants entiers : devises demandées puis devises des paires
+        self.currencies = []
+        self.index = {}
+        for currency in currencies:
+            self._register(currency)
+        for pair in forex_rates:
+            for currency in pair.split('/'):
+                self._register(currency)
+
+        n = len(self.currencies)
+        self.rates = np.full((len(CONVERSION_METHODS), n, n), np.nan)
+        self.rates[:, np.arange(n), np.arange(n)] = 1.0
+
+        self._direct = np.zeros((n, n), dtype=bool)
+        for pair, rate_data in forex_rates.items():
+            self._compile_pair(pair, rate_data)
+
+    def _compile_pair(self, pair, rate_data):
+        """Résout les deux sens d'une paire (la paire directe "from/to" prime)"""
+        parts = pair.split('/')
+        if len(parts) != 2 or parts[0] == parts[1]:
+            logging.warning(f"Paire forex ignorée (format invalide): {pair}")
+            return []
+        base, quote = parts
+
+        for from_currency, to_currency, is_direct in ((base, quote, True), (quote, base, False)):
+            i, j = self.index[from_currency], self.index[to_currency]
+            if self._direct[i, j] and not is_direct:
+                continue
+
+            for k, method in enumerate(CONVERSION_METHODS):
+                try:
+                    self.rates[k, i, j] = resolve_pair_rate(rate_data, pair, from_currency, to_currency, method)
+                except (ValueError, TypeError):
+                    self.rates[k, i, j] = np.nan
+            self._direct[i, j] |= is_direct
+        return [base, quote]
+
+    def update_pair(self, pair, rate_data):
+        """
+        Met à jour une seule paire sans recompiler la table
+
+        Returns:
+            Les deux devises de la paire, ou None si l'une est inconnue
+            (recompilation complète nécessaire)
+        """
+        parts = pair.split('/')
+        if len(parts) != 2 or any(c not in self.index for c in parts):
+            return None
+        self.fingerprint = None  # Contenu modifié depuis la compilation
+        return self._compile_pair(pair, rate_data)
+
+    def _register(self, currency):
+        if currency not in self.index:
+            self.index[currency] = len(self.currencies)
+            self.currencies.append(currency)
+
+    def currency_id(self, currency):
+        """Identifiant entier de la devise (None si inconnue)"""
+        return self.index.get(currency)
+
+    def lookup(self, from_currency, to_currency, conversion_method='forex'):
+        """Taux from→to, NaN si manquant ou invalide"""
+        if from_currency == to_currency:
+            return 1.0
+        i, j = self.index.get(from_currency), self.index.get(to_currency)
+        if i is None or j is None:
+            return float('nan')
+        return float(self.rates[method_index(conversion_method), i, j])
+
+    def rate(self, from_currency, to_currency, conversion_method='forex'):
+        """Taux from→to, lève ValueError si manquant ou invalide"""
+        value = self.lookup(from_currency, to_currency, conversion_method)
+        if value != value:  # NaN  # pylint: disable=comparison-with-itself
+            raise ValueError(f"Taux de change manquant pour {from_currency}→{to_currency}")
+        return value
+
+    def rates_to(self, to_currency, currencies):
+        """Tableau (méthodes, len(currencies)) des taux de chaque devise vers to_currency"""
+        result = np.full((len(CONVERSION_METHODS), len(currencies)), np.nan)
+        j = self.index.get(to_currency)
+        for pos, currency in enumerate(currencies):
+            if currency == to_currency:
+                result[:, pos] = 1.0
+                continue
+            i = self.index.get(currency)
+            if i is not None and j is not None:
+                result[:, pos] = self.rates[:, i, j]
+        return result
+
+
+# --- CACHE (une table par contenu de forex_rates) ---
+_cached_table = None
+
+
+def get_conversion_table(forex_rates):
+    """
+    Table compilée pour ce forex_rates
+
+    Recompilée uniquement si le contenu de forex_rates change ; sinon seul le
+    calcul de l'empreinte est payé.
+    """
+    global _cached_table
+    fingerprint = rates_fingerprint(forex_rates)
+    if _cached_table is None or _cached_table.fingerprint != fingerprint:
+        _cached_table = ConversionTable(forex_rates)
+        logging.debug(f"Table de conversion compilée ({len(_cached_table.currencies)} devises)")
+    return _cached_table
@@ -0,0 +1,125 @@
+# depth_ladder.py
+
+import math
+
+import numpy as np
+
+# Côtés d'un carnet : 'buy' = achat d'USDT (meilleur prix = le plus bas),
+# 'sell' = vente d'USDT (meilleur prix = le plus haut)
+DEPTH_SIDES = ('buy', 'sell')
+
+
+class DepthLadder:
+    """
+    Un côté du carnet d'ordres d'un marché, en tableaux cumulés triés
+
+    Niveaux (prix local par USDT, USDT disponibles) rangés du meilleur au
+    pire prix ; cum_usdt et cum_quote sont les volumes USDT et montants
+    locaux cumulés (premier élément 0). Le montant exécuté pour une taille
+    se lit par recherche dichotomique : O(log niveaux), vectorisé sur un
+    tableau de tailles.
+    """
+
+    __slots__ = ('prices', 'cum_usdt', 'cum_quote')
+
+    def __init__(self, prices, cum_usdt, cum_quote):
+        self.prices = prices
+        self.cum_usdt = cum_usdt
+        self.cum_quote = cum_quote
+
+    @classmethod
+    def from_levels(cls, levels, side):
+        """
+        Construit le carnet depuis config.json : [[prix, usdt], ...]
+
+        Lève ValueError si un niveau n'est pas un couple (prix > 0, usdt > 0) fini
+        """
+        if side not in DEPTH_SIDES:
+            raise ValueError(f"Côté de carnet inconnu: {side}")
+
+        rows = []
+        for level in levels:
+            try:
+                price, quantity = float(level[0]), float(level[1])
+            except (TypeError, ValueError, IndexError, KeyError):
+                raise ValueError(f"Niveau de carnet invalide: {level}")
+            if not (math.isfinite(price) and math.isfinite(quantity)) or price <= 0 or quantity <= 0:
+                raise ValueError(f"Niveau de carnet invalide: {level}")
+            rows.append((price, quantity))
+        if not rows:
+            raise ValueError("Carnet vide")
+
+        rows.sort(key=lambda row: row[0], reverse=(side == 'sell'))
+        prices = np.array([price for price, _ in rows], dtype=float)
+        quantities = np.array([quantity for _, quantity in rows], dtype=float)
+        return cls(
+            prices,
+            np.concatenate(([0.0], np.cumsum(quantities))),
+            np.concatenate(([0.0], np.cumsum(prices * quantities)))
+        )
+
+    @classmethod
+    def flat(cls, price):
+        """Liquidité illimitée à un prix unique (marché sans carnet)"""
+        return cls(np.array([price], dtype=float), np.array([0.0, np.inf]), np.array([0.0, np.inf]))
+
+    @property
+    def capacity(self):
+        """USDT disponibles au total (inf si illimité)"""
+        return float(self.cum_usdt[-1])
+
+    @property
+    def breakpoints(self):
+        """Tailles où le prix marginal change (fins de niveaux finies)"""
+        ends = self.cum_usdt[1:]
+        return ends[np.isfinite(ends)]
+
+    def quote_amount(self, size):
+        """
+        Montant local exécuté pour `size` USDT (somme prix × quantité)
+
+        NaN au-delà de la profondeur disponible ou pour une taille négative.
+        Sans carnet (flat), vaut exactement size × prix.
+        """
+        size = np.asarray(size, dtype=float)
+        k = np.clip(np.searchsorted(self.cum_usdt, size, side='left'), 1, len(self.prices))
+        with np.errstate(invalid='ignore'):
+            amount = self.cum_quote[k - 1] + (size - self.cum_usdt[k - 1]) * self.prices[k - 1]
+            amount = np.where((size >= 0) & (size <= self.cum_usdt[-1]), amount, np.nan)
+        return amount[()]
+
+    def vwap(self, size):
+        """Prix moyen pondéré d'exécution pour `size` USDT"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.quote_amount(size) / np.asarray(size, dtype=float)
+
+    def size_for_quote(self, amount, fee_multiplier=1.0):
+        """
+        USDT obtenus en dépensant `amount` (frais compris) sur ce carnet
+
+        Inverse de quote_amount() × fee_multiplier ; sans carnet, vaut
+        exactement amount / (prix × fee_multiplier).
+        """
+        amount = np.asarray(amount, dtype=float)
+        cum_cost = self.cum_quote * fee_multiplier
+        k = np.clip(np.searchsorted(cum_cost, amount, side='left'), 1, len(self.prices))
+        with np.errstate(invalid='ignore'):
+            size = self.cum_usdt[k - 1] + (amount - cum_cost[k - 1]) / (self.prices[k - 1] * fee_multiplier)
+            size = np.where((amount >= 0) & (amount <= cum_cost[-1]), size, np.nan)
+        return size[()]
+
+    def __repr__(self):
+        return f"DepthLadder({len(self.prices)} niveaux, {self.capacity:g} USDT)"
+
+
+def parse_depth(depth):
+    """
+    Carnets {'buy': DepthLadder, 'sell': DepthLadder} depuis le champ 'depth'
+    d'un marché ; lève ValueError si le champ est mal formé
+    """
+    if not isinstance(depth, dict):
+        raise ValueError("'depth' doit être un objet {buy: [...], sell: [...]}")
+    unknown = set(depth) - set(DEPTH_SIDES)
+    if unknown:
+        raise ValueError(f"Côtés de carnet inconnus: {sorted(unknown)}")
+    return {side: DepthLadder.from_levels(levels, side) for side, levels in depth.items()}
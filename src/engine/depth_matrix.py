@@ -0,0 +1,153 @@
+# depth_matrix.py
+
+import math
+
+import numpy as np
+
+from src.engine.conversion_table import method_index
+from src.engine.depth_ladder import DepthLadder
+from src.engine.route_matrix import RouteMatrix
+from src.engine.route_record import DepthRouteRecord
+
+
+def max_profitable_size(buy_ladder, sell_ladder, alpha, beta):
+    """
+    Plus grande taille u (USDT) telle que alpha·S(u) − beta·B(u) ≥ 0
+
+    B(u) et S(u) sont les montants locaux exécutés à l'achat et à la vente.
+    Les prix moyens se dégradent avec la taille, donc ce gain est concave et
+    nul en 0 : il suffit de l'évaluer aux fins de niveaux des deux carnets,
+    puis d'interpoler exactement dans le segment où il devient négatif.
+
+    Returns:
+        Taille max (0.0 si même la première unité perd), None si illimitée
+    """
+    capacity = min(buy_ladder.capacity, sell_ladder.capacity)
+    points = np.union1d(buy_ladder.breakpoints, sell_ladder.breakpoints)
+    points = points[points < capacity]
+    if math.isfinite(capacity):
+        points = np.append(points, capacity)
+
+    if len(points) == 0:
+        # Deux côtés sans carnet : marge marginale constante
+        slope = alpha * sell_ladder.prices[0] - beta * buy_ladder.prices[0]
+        return None if slope >= 0 else 0.0
+
+    gains = alpha * sell_ladder.quote_amount(points) - beta * buy_ladder.quote_amount(points)
+    negative = np.flatnonzero(gains < 0)
+    if len(negative) == 0:
+        return float(capacity)
+
+    j = negative[0]
+    u0, g0 = (0.0, 0.0) if j == 0 else (float(points[j - 1]), float(gains[j - 1]))
+    u1, g1 = float(points[j]), float(gains[j])
+    return u0 + g0 * (u1 - u0) / (g0 - g1)
+
+
+class DepthRouteMatrix(RouteMatrix):
+    """
+    RouteMatrix pour une taille d'exécution, prix lus dans les carnets d'ordres
+
+    Coût d'achat et revenu de vente de chaque devise viennent du prix moyen
+    pondéré sur son carnet pour initial_usdt (O(log niveaux) par devise),
+    puis le classement des paires est celui de RouteMatrix. Les marchés sans
+    carnet gardent leur prix affiché : mêmes résultats au bit près que
+    calculate_profit_route().
+    """
+
+    def __init__(self, currencies, buy_ladders, sell_ladders, fees_pct, rates_to_eur,
+                 eur_ladder, eur_fee_pct, size, min_profit_pct=0.0):
+        self.buy_ladders = list(buy_ladders)
+        self.sell_ladders = list(sell_ladders)
+        self.eur_ladder = eur_ladder
+        self.eur_fee_multiplier = 1.0 + eur_fee_pct / 100.0
+        self.min_profit_pct = min_profit_pct
+
+        # Prix moyens d'exécution (informatifs : les montants viennent des carnets)
+        buy_vwaps = [ladder.vwap(size) for ladder in self.buy_ladders]
+        sell_vwaps = [ladder.vwap(size) for ladder in self.sell_ladders]
+
+        eur_cost_per_usdt = None
+        if eur_ladder is not None and eur_ladder.prices[0] > 0:
+            eur_cost_per_usdt = eur_ladder.prices[0] * self.eur_fee_multiplier
+
+        super().__init__(currencies, buy_vwaps, sell_vwaps, fees_pct, rates_to_eur,
+                         eur_cost_per_usdt, size)
+
+    @classmethod
+    def from_records(cls, records, conversion_table, eur_record, size, min_profit_pct=0.0):
+        """Matrice des MarketRecord donnés (eur_record : marché de réinvestissement ou None)"""
+        currencies = [r.currency for r in records]
+        return cls(
+            currencies,
+            [r.buy_ladder() for r in records],
+            [r.sell_ladder() for r in records],
+            np.array([r.fee_pct for r in records], dtype=float),
+            conversion_table.rates_to('EUR', currencies),
+            eur_record.buy_ladder() if eur_record is not None else None,
+            eur_record.fee_pct if eur_record is not None else 0.0,
+            size,
+            min_profit_pct
+        )
+
+    @classmethod
+    def from_market_book(cls, market_book, conversion_table, initial_usdt, min_profit_pct=0.0):
+        """Matrice de tout le carnet de marchés pour la taille initial_usdt"""
+        return cls.from_records(market_book.records, conversion_table, market_book.get('EUR'),
+                                initial_usdt, min_profit_pct)
+
+    def _local_amounts(self, i):
+        """Montants exécutés sur les carnets (mêmes frais que RouteMatrix)"""
+        positions = range(len(self.currencies))[i] if isinstance(i, slice) else [i]
+        buy = np.array([self.buy_ladders[p].quote_amount(self.initial_usdt) for p in positions], dtype=float)
+        sell = np.array([self.sell_ladders[p].quote_amount(self.initial_usdt) for p in positions], dtype=float)
+        cost_local = buy * (1.0 + self.fees_pct[i] / 100.0)
+        revenue_local = sell * (1.0 - self.fees_pct[i] / 100.0)
+        if not isinstance(i, slice):
+            return cost_local[0], revenue_local[0]
+        return cost_local, revenue_local
+
+    # --- MISES À JOUR INCRÉMENTALES (carnets de la devise remplacés) ---
+    def set_market(self, i, buy_price, sell_price, fee_pct):
+        """Nouveaux prix/frais pour la position i, sans carnet (liquidité illimitée au prix affiché)"""
+        self._set_ladders(i, DepthLadder.flat(buy_price), DepthLadder.flat(sell_price), fee_pct)
+
+    def set_record(self, i, record):
+        """Position i reconstruite depuis son MarketRecord (carnets compris)"""
+        self._set_ladders(i, record.buy_ladder(), record.sell_ladder(), record.fee_pct)
+
+    def _set_ladders(self, i, buy_ladder, sell_ladder, fee_pct):
+        self.buy_ladders[i] = buy_ladder
+        self.sell_ladders[i] = sell_ladder
+        self.buy_prices[i] = buy_ladder.vwap(self.initial_usdt)
+        self.sell_prices[i] = sell_ladder.vwap(self.initial_usdt)
+        self.fees_pct[i] = fee_pct
+        if self.currencies[i] == 'EUR':
+            # Carnet de réinvestissement ; disponibilité via set_eur_cost_per_usdt()
+            self.eur_ladder = buy_ladder
+            self.eur_fee_multiplier = 1.0 + fee_pct / 100.0
+        self._refresh(i)
+
+    def max_size(self, conversion_method, a, b):
+        """Taille max rentable (≥ min_profit_pct) de la paire (a, b), None si illimitée"""
+        m = method_index(conversion_method)
+        alpha = (1.0 - self.fees_pct[b] / 100.0) * self.rates_to_eur[m, b]
+        beta = (1.0 + self.min_profit_pct / 100.0) * (1.0 + self.fees_pct[a] / 100.0) * self.rates_to_eur[m, a]
+        return max_profitable_size(self.buy_ladders[a], self.sell_ladders[b], alpha, beta)
+
+    def make_record(self, conversion_method, a, b, nb_cycles):
+        """DepthRouteRecord de la paire (a, b) : réinvestissement sur le carnet EUR"""
+        m = method_index(conversion_method)
+        revenue_eur = float(self.revenue_eur[m, b])
+        return DepthRouteRecord(
+            self.currencies[a], self.currencies[b], conversion_method,
+            initial_amount_usdt=self.initial_usdt,
+            cost_eur=float(self.cost_eur[m, a]),
+            revenue_local=float(self.revenue_local[b]),
+            revenue_eur=revenue_eur,
+            final_amount_usdt=float(self.eur_ladder.size_for_quote(revenue_eur, self.eur_fee_multiplier)),
+            nb_cycles=nb_cycles,
+            buy_vwap=float(self.buy_prices[a]),
+            sell_vwap=float(self.sell_prices[b]),
+            max_profitable_size=self.max_size(conversion_method, a, b)
+        )
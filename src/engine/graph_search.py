@@ -0,0 +1,399 @@
+# graph_search.py
+
+import math
+
+import numpy as np
+
+from src.engine.conversion_table import method_index
+from src.engine.route_matrix import (ANOMALY_MAX_PROFIT_PCT,
+                                     ANOMALY_MIN_PROFIT_PCT, REFERENCE_USDT)
+from src.engine.route_record import CycleRecord
+
+# --- PARAMÈTRES DE LA RECHERCHE MULTI-SAUTS ---
+DEFAULT_MAX_HOPS = 4
+
+# Taille max du bloc (sources × arêtes) relaxé d'un coup : mémoire bornée
+RELAXATION_BLOCK_CELLS = 2_000_000
+
+# Gain minimal (en -log) d'un cycle forex : absorbe le bruit des allers-retours neutres
+NEGATIVE_CYCLE_TOLERANCE = 1e-12
+
+
+class CurrencyGraph:
+    """
+    Graphe pondéré des devises pour la détection de cycles d'arbitrage
+
+    Nœuds : USDT + devises fiat. Arêtes :
+      - USDT → B : vente d'USDT sur le marché B (sell_price, frais déduits)
+      - A → USDT : achat d'USDT sur le marché A (buy_price, frais compris)
+      - X → Y    : conversion forex/banque depuis la ConversionTable
+    Poids = -log(taux) : un cycle de poids total négatif est rentable.
+
+    Un cycle simple passant par USDT a toujours la forme
+    USDT → B → (sauts forex) → A → USDT ; la recherche calcule donc, par un
+    Bellman-Ford borné en nombre de sauts (toutes sources à la fois), le
+    meilleur chemin forex B → A puis ferme le cycle par les deux arêtes USDT.
+    Si A = B, le cycle contient une boucle forex rentable A → … → A.
+    Les cycles forex purs (sans USDT) sont détectés par negative_cycles().
+    """
+
+    def __init__(self, market_book, conversion_table, conversion_method='forex'):
+        self.conversion_method = conversion_method
+        self.market_book = market_book
+        self.conversion_table = conversion_table
+
+        self.currencies = list(dict.fromkeys(market_book.currencies + conversion_table.currencies))
+        self.index = {c: i for i, c in enumerate(self.currencies)}
+        n = len(self.currencies)
+
+        # ========== ARÊTES USDT ==========
+        self.sell_weight = np.full(n, np.inf)   # USDT → devise
+        self.buy_weight = np.full(n, np.inf)    # devise → USDT
+        self.sell_rate = np.full(n, np.nan)
+        self.buy_cost = np.full(n, np.nan)
+        for currency, position in market_book.index.items():
+            record = market_book.records[position]
+            i = self.index[currency]
+            net_sell = record.sell_price * (1.0 - record.fee_pct / 100.0)
+            cost = record.cost_per_usdt
+            if net_sell > 0:
+                self.sell_rate[i] = net_sell
+                self.sell_weight[i] = -math.log(net_sell)
+            if cost > 0:
+                self.buy_cost[i] = cost
+                self.buy_weight[i] = math.log(cost)
+
+        # ========== ARÊTES FOREX ==========
+        ids = np.array([conversion_table.index.get(c, -1) for c in self.currencies])
+        known = np.flatnonzero(ids >= 0)
+        rates = np.full((n, n), np.nan)
+        rates[np.ix_(known, known)] = conversion_table.rates[method_index(conversion_method)][np.ix_(ids[known], ids[known])]
+        np.fill_diagonal(rates, np.nan)
+        self.fx_rates = rates
+
+        with np.errstate(invalid='ignore'):
+            src, dst = np.nonzero(np.isfinite(rates) & (rates > 0))
+        order = np.lexsort((src, dst))   # arêtes groupées par destination
+        self.edge_src = src[order]
+        self.edge_dst = dst[order]
+        self.edge_weight = -np.log(rates[self.edge_src, self.edge_dst])
+
+        self.dst_nodes, self.dst_starts = np.unique(self.edge_dst, return_index=True)
+        self._simple_paths = {}
+
+    # --- BELLMAN-FORD BORNÉ (TOUTES SOURCES) ---
+    def shortest_fx_paths(self, max_fx_hops):
+        """
+        Poids minimal des chemins forex s → v en au plus max_fx_hops sauts
+
+        Returns:
+            (dist, predecessors) : dist (N, N) et, pour chaque couche k,
+            l'arête utilisée pour atteindre v à la couche k (-1 = inchangé)
+        """
+        n = len(self.currencies)
+        dist = np.full((n, n), np.inf)
+        np.fill_diagonal(dist, 0.0)
+        predecessors = []
+
+        nb_edges = len(self.edge_src)
+        if nb_edges == 0 or max_fx_hops <= 0:
+            return dist, predecessors
+
+        edge_ids = np.arange(nb_edges)
+        group_of_edge = np.repeat(np.arange(len(self.dst_nodes)),
+                                  np.diff(np.append(self.dst_starts, nb_edges)))
+        block = max(1, RELAXATION_BLOCK_CELLS // nb_edges)
+
+        for _ in range(max_fx_hops):
+            new_dist = dist.copy()
+            pred = np.full((n, n), -1, dtype=np.int64)
+
+            for start in range(0, n, block):
+                rows = slice(start, min(n, start + block))
+                candidates = dist[rows][:, self.edge_src] + self.edge_weight        # (bloc, E)
+                best = np.minimum.reduceat(candidates, self.dst_starts, axis=1)      # (bloc, G)
+
+                # Première arête atteignant le minimum de chaque groupe
+                is_best = candidates == best[:, group_of_edge]
+                best_edge = np.minimum.reduceat(np.where(is_best, edge_ids, nb_edges), self.dst_starts, axis=1)
+
+                current = dist[rows][:, self.dst_nodes]
+                improved = best < current
+                new_dist[rows][:, self.dst_nodes] = np.where(improved, best, current)
+                pred[rows][:, self.dst_nodes] = np.where(improved, best_edge, -1)
+
+            predecessors.append(pred)
+            if np.array_equal(new_dist, dist):
+                break  # Plus aucune amélioration : couches suivantes identiques
+            dist = new_dist
+
+        return dist, predecessors
+
+    # --- CYCLES FOREX NÉGATIFS ---
+    def negative_cycles(self, max_hops=None):
+        """
+        Cycles forex rentables X → … → X (poids total négatif), hors USDT
+
+        Bellman-Ford depuis une source virtuelle reliée à toutes les devises :
+        une amélioration encore possible à la N-ième passe trahit un cycle
+        négatif, retrouvé en remontant les prédécesseurs.
+
+        Returns:
+            Liste de (chemin [X, …, X], profit_pct) triée par profit décroissant
+        """
+        n = len(self.currencies)
+        nb_edges = len(self.edge_src)
+        if nb_edges == 0:
+            return []
+
+        dist = np.zeros(n)
+        pred = np.full(n, -1, dtype=np.int64)
+        edge_ids = np.arange(nb_edges)
+        group_of_edge = np.repeat(np.arange(len(self.dst_nodes)),
+                                  np.diff(np.append(self.dst_starts, nb_edges)))
+
+        for _ in range(n):
+            candidates = dist[self.edge_src] + self.edge_weight
+            best = np.minimum.reduceat(candidates, self.dst_starts)
+            best_edge = np.minimum.reduceat(np.where(candidates == best[group_of_edge], edge_ids, nb_edges),
+                                            self.dst_starts)
+            improved = best < dist[self.dst_nodes] - NEGATIVE_CYCLE_TOLERANCE
+            if not improved.any():
+                return []
+            dist[self.dst_nodes[improved]] = best[improved]
+            pred[self.dst_nodes[improved]] = best_edge[improved]
+
+        cycles = {}
+        for start in self.dst_nodes[improved]:
+            # N remontées : on est forcément dans le cycle
+            node = int(start)
+            for _ in range(n):
+                node = int(self.edge_src[pred[node]])
+            path = [node]
+            while True:
+                path.append(int(self.edge_src[pred[path[-1]]]))
+                if path[-1] == node:
+                    break
+            path.reverse()
+
+            weight = sum(-math.log(self.fx_rates[x, y]) for x, y in zip(path, path[1:]))
+            if weight >= -NEGATIVE_CYCLE_TOLERANCE or (max_hops is not None and len(path) - 1 > max_hops):
+                continue
+            # Forme canonique : rotation démarrant au plus petit indice
+            k = path.index(min(path[:-1]))
+            canonical = tuple(path[k:-1] + path[:k + 1])
+            cycles[canonical] = float(np.expm1(-weight) * 100)
+
+        ranked = sorted(cycles.items(), key=lambda item: -item[1])
+        return [([self.currencies[i] for i in path], profit) for path, profit in ranked]
+
+    # --- REPLI : CHEMINS FOREX SIMPLES ---
+    def simple_fx_paths(self, max_fx_hops):
+        """
+        Chemins forex simples s → v en au plus max_fx_hops sauts (toutes sources)
+
+        Programmation dynamique par couche de sauts : chaque état (source, devise)
+        garde le meilleur chemin de la couche et n'est prolongé que vers des
+        devises absentes de ce chemin. Coût borné par sauts × sources × arêtes,
+        quel que soit le nombre de chemins simples (un seul chemin par état :
+        optimal tant que les meilleurs préfixes ne se croisent pas). Une boucle
+        s → … → s est fermée sans être prolongée (diagonale).
+
+        Returns:
+            (best, paths) : poids best (N, N) et chemins paths (N, N, max_fx_hops + 1)
+            complétés par -1
+        """
+        if max_fx_hops in self._simple_paths:
+            return self._simple_paths[max_fx_hops]
+
+        n = len(self.currencies)
+        nb_edges = len(self.edge_src)
+        best = np.full((n, n), np.inf)
+        best_paths = np.full((n, n, max_fx_hops + 1), -1, dtype=np.int64)
+
+        layer_dist = np.full((n, n), np.inf)
+        np.fill_diagonal(layer_dist, 0.0)
+        layer_paths = np.full((n, n, max_fx_hops + 1), -1, dtype=np.int64)
+        layer_paths[np.arange(n), np.arange(n), 0] = np.arange(n)
+
+        if nb_edges:
+            edge_ids = np.arange(nb_edges)
+            group_of_edge = np.repeat(np.arange(len(self.dst_nodes)),
+                                      np.diff(np.append(self.dst_starts, nb_edges)))
+            block = max(1, RELAXATION_BLOCK_CELLS // (nb_edges * max(1, max_fx_hops)))
+
+        for k in range(1, max_fx_hops + 1 if nb_edges else 1):
+            new_dist = np.full((n, n), np.inf)
+            new_paths = np.full((n, n, max_fx_hops + 1), -1, dtype=np.int64)
+
+            for start in range(0, n, block):
+                rows = slice(start, min(n, start + block))
+                sources = np.arange(rows.start, rows.stop)
+                candidates = layer_dist[rows][:, self.edge_src] + self.edge_weight          # (bloc, E)
+                prefixes = layer_paths[rows][:, self.edge_src, :k]                          # (bloc, E, k)
+                revisit = (prefixes == self.edge_dst[None, :, None]).any(axis=2)
+
+                # Retour à la source : boucle fermée, non prolongée
+                closing = np.where(self.edge_dst[None, :] == sources[:, None], candidates, np.inf)
+                loop_edge = closing.argmin(axis=1)
+                loop_weight = closing[np.arange(len(sources)), loop_edge]
+                better = loop_weight < best[sources, sources]
+                if better.any():
+                    looped = sources[better]
+                    best[looped, looped] = loop_weight[better]
+                    best_paths[looped, looped, :k] = layer_paths[looped, self.edge_src[loop_edge[better]], :k]
+                    best_paths[looped, looped, k] = looped
+
+                # Prolongement vers une devise absente du chemin
+                candidates = np.where(revisit, np.inf, candidates)
+                group_best = np.minimum.reduceat(candidates, self.dst_starts, axis=1)      # (bloc, G)
+                is_best = candidates == group_best[:, group_of_edge]
+                best_edge = np.minimum.reduceat(np.where(is_best, edge_ids, nb_edges), self.dst_starts, axis=1)
+                best_edge = np.minimum(best_edge, nb_edges - 1)
+
+                new_dist[rows][:, self.dst_nodes] = group_best
+                new_paths[rows][:, self.dst_nodes, :k] = layer_paths[sources[:, None], self.edge_src[best_edge], :k]
+                new_paths[rows][:, self.dst_nodes, k] = self.dst_nodes
+
+            improved = new_dist < best
+            np.fill_diagonal(improved, False)
+            best[improved] = new_dist[improved]
+            best_paths[improved] = new_paths[improved]
+            layer_dist, layer_paths = new_dist, new_paths
+
+        self._simple_paths[max_fx_hops] = (best, best_paths)
+        return best, best_paths
+
+    # --- CYCLES PASSANT PAR USDT ---
+    def ranked_cycles(self, max_hops=DEFAULT_MAX_HOPS, top_n=None, sourcing_currency=None,
+                      excluded_markets=None, loop_currency=None, threshold=None,
+                      initial_usdt=REFERENCE_USDT, nb_cycles=1):
+        """
+        Cycles USDT → B → … → A → USDT les plus rentables (CycleRecord)
+
+        Un cycle par couple (A, B) : le meilleur chemin forex B → A en au plus
+        max_hops - 2 sauts, ou, s'il repasse par une devise, celui de
+        simple_fx_paths() (pour A = B, une boucle forex rentable). Mêmes
+        filtres que find_routes_with_filters() : sourcing = A, exclusions sur le
+        marché de vente B (bouclage prioritaire), bornes d'anomalie et seuil
+        optionnel.
+        """
+        if max_hops < 2 or (top_n is not None and top_n <= 0):
+            return []
+
+        max_fx_hops = max_hops - 2
+        dist, predecessors = self.shortest_fx_paths(max_fx_hops)
+
+        # Poids total du cycle pour chaque couple (vente B, sourcing A)
+        total = self.sell_weight[:, None] + dist + self.buy_weight[None, :]
+        with np.errstate(over='ignore', invalid='ignore'):
+            profit = np.expm1(-total) * 100
+
+        lower_bound = ANOMALY_MIN_PROFIT_PCT if threshold is None else max(ANOMALY_MIN_PROFIT_PCT, threshold)
+        with np.errstate(invalid='ignore'):
+            keep = np.isfinite(total) & (profit >= lower_bound)
+
+        # A = B : uniquement via une boucle forex rentable (pas l'aller-retour sur A)
+        np.fill_diagonal(keep, np.diagonal(keep) & (np.diagonal(dist) < -NEGATIVE_CYCLE_TOLERANCE))
+
+        if sourcing_currency:
+            keep &= (np.array(self.currencies) == sourcing_currency)[None, :]
+        if excluded_markets:
+            allowed = np.array([
+                not (c in excluded_markets and not (loop_currency and c == loop_currency))
+                for c in self.currencies
+            ], dtype=bool)
+            keep &= allowed[:, None]
+
+        selling_idx, sourcing_idx = np.nonzero(keep)
+        walks, simple = self._fx_walks(predecessors, selling_idx, sourcing_idx, max_fx_hops)
+        weight = dist[selling_idx, sourcing_idx]
+
+        # Parcours non simple (sous-cycle forex) : son poids n'est qu'une borne,
+        # le couple est réévalué sur son chemin simple
+        if not simple.all():
+            simple_best, simple_paths = self.simple_fx_paths(max_fx_hops)
+            redo = np.flatnonzero(~simple)
+            weight[redo] = simple_best[selling_idx[redo], sourcing_idx[redo]]
+            walks[redo] = simple_paths[selling_idx[redo], sourcing_idx[redo]]
+
+        total = self.sell_weight[selling_idx] + weight + self.buy_weight[sourcing_idx]
+        with np.errstate(over='ignore', invalid='ignore'):
+            pair_profit = np.expm1(-total) * 100
+            valid = (np.isfinite(total) & (pair_profit >= lower_bound) & (pair_profit <= ANOMALY_MAX_PROFIT_PCT)
+                     & ((selling_idx != sourcing_idx) | (weight < -NEGATIVE_CYCLE_TOLERANCE)))
+
+        # Tri par rentabilité décroissante, égalités dans l'ordre (sourcing, vente)
+        ranked = np.flatnonzero(valid)
+        ranked = ranked[np.lexsort((selling_idx[ranked], sourcing_idx[ranked], -pair_profit[ranked]))][:top_n]
+        return self.make_records(sourcing_idx[ranked], walks[ranked], initial_usdt, nb_cycles)
+
+    def _fx_walks(self, predecessors, sources, targets, max_fx_hops):
+        """
+        Parcours forex sources → targets reconstruits couche par couche (vectorisé)
+
+        Returns:
+            (walks, simple) : walks (K, max_fx_hops + 1) complétés par -1 ;
+            simple vaut False si le parcours est incomplet ou repasse par une
+            devise (une boucle source == target ne repasse que par son départ)
+        """
+        node = targets.copy()
+        steps = [targets]
+        for pred in reversed(predecessors):
+            edge = pred[sources, node]
+            moved = edge >= 0
+            node = np.where(moved, self.edge_src[np.maximum(edge, 0)], node)
+            steps.append(np.where(moved, node, -1))   # -1 : pas de saut à cette couche
+
+        # Ordre source → target, sauts absents repoussés en fin de ligne
+        backwards = np.column_stack(steps)[:, ::-1]
+        order = np.argsort(backwards < 0, axis=1, kind='stable')
+        walks = np.full((len(targets), max_fx_hops + 1), -1, dtype=np.int64)
+        walks[:, :backwards.shape[1]] = np.take_along_axis(backwards, order, axis=1)
+
+        # Le départ d'une boucle est compté une seule fois (sa fin est la cible)
+        nodes = walks.copy()
+        nodes[:, 0] = np.where(sources == targets, -1, nodes[:, 0])
+        nodes.sort(axis=1)
+        repeated = ((nodes[:, 1:] == nodes[:, :-1]) & (nodes[:, 1:] >= 0)).any(axis=1)
+        return walks, (node == sources) & ~repeated
+
+    def make_records(self, sourcing, walks, initial_usdt=REFERENCE_USDT, nb_cycles=1):
+        """
+        CycleRecords des cycles [A, B, …, A] : sourcing = indices A, walks =
+        chemins forex B → … → A complétés par -1 ; montants calculés en bloc
+        """
+        usdt = float(initial_usdt)
+        lengths = (walks >= 0).sum(axis=1)
+        hop_rates = np.where(walks[:, 1:] >= 0, self.fx_rates[walks[:, :-1], walks[:, 1:]], 1.0)
+
+        start_amount = usdt * self.buy_cost[sourcing]
+        chain = np.cumprod(np.column_stack([usdt * self.sell_rate[walks[:, 0]], hop_rates]), axis=1)
+        end_amount = chain[:, -1]
+        final_usdt = end_amount / self.buy_cost[sourcing]
+
+        # Valorisation en EUR (indicative) si la devise de sourcing y est reliée
+        rate_to_eur = np.array([self.conversion_table.lookup(c, 'EUR', self.conversion_method)
+                                for c in self.currencies])[sourcing]
+        with np.errstate(invalid='ignore'):
+            has_eur = np.isfinite(rate_to_eur) & (rate_to_eur > 0)
+        cost_eur = start_amount * rate_to_eur
+        revenue_eur = end_amount * rate_to_eur
+
+        codes = self.currencies
+        records = []
+        for a, walk, n, start, legs, final, eur, cost, revenue in zip(
+                sourcing.tolist(), walks.tolist(), lengths.tolist(), start_amount.tolist(), chain.tolist(),
+                final_usdt.tolist(), has_eur.tolist(), cost_eur.tolist(), revenue_eur.tolist()):
+            path = [codes[a]] + [codes[i] for i in walk[:n]]
+            records.append(CycleRecord(
+                path,
+                self.conversion_method,
+                initial_amount_usdt=usdt,
+                leg_values=[start] + legs[:n],
+                final_amount_usdt=final,
+                cost_eur=cost if eur else None,
+                revenue_eur=revenue if eur else None,
+                nb_cycles=nb_cycles
+            ))
+        return records
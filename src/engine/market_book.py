@@ -0,0 +1,187 @@
+# market_book.py
+
+import hashlib
+import json
+import logging
+import math
+
+import numpy as np
+
+from src.engine.depth_ladder import DepthLadder, parse_depth
+
+# Champs indispensables au calcul des routes
+MARKET_NUMERIC_FIELDS = ('buy_price', 'sell_price', 'fee_pct')
+
+
+class MarketRecord:
+    """Marché validé (valeurs numériques converties une fois au chargement)"""
+
+    __slots__ = ('currency', 'name', 'buy_price', 'sell_price', 'fee_pct', 'position', 'raw',
+                 'buy_depth', 'sell_depth')
+
+    def __init__(self, currency, name, buy_price, sell_price, fee_pct, position, raw,
+                 buy_depth=None, sell_depth=None):
+        self.currency = currency
+        self.name = name
+        self.buy_price = buy_price
+        self.sell_price = sell_price
+        self.fee_pct = fee_pct
+        self.position = position
+        self.raw = raw
+        # Carnets optionnels (DepthLadder) ; None = liquidité illimitée au prix affiché
+        self.buy_depth = buy_depth
+        self.sell_depth = sell_depth
+
+    @property
+    def cost_per_usdt(self):
+        """Coût d'achat d'1 USDT en monnaie locale, frais compris"""
+        return self.buy_price * (1.0 + self.fee_pct / 100.0)
+
+    def buy_ladder(self):
+        """Carnet d'achat d'USDT (plat au buy_price si pas de profondeur)"""
+        return self.buy_depth if self.buy_depth is not None else DepthLadder.flat(self.buy_price)
+
+    def sell_ladder(self):
+        """Carnet de vente d'USDT (plat au sell_price si pas de profondeur)"""
+        return self.sell_depth if self.sell_depth is not None else DepthLadder.flat(self.sell_price)
+
+    def __repr__(self):
+        return f"MarketRecord({self.currency}, buy={self.buy_price}, sell={self.sell_price}, fee={self.fee_pct}%)"
+
+
+def markets_fingerprint(markets_list):
+    """Empreinte stable du contenu de la liste de marchés"""
+    payload = json.dumps(markets_list, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class MarketBook:
+    """
+    Carnet des marchés indexé par devise
+
+    Les marchés de config.json sont validés une seule fois au chargement puis
+    rangés dans des tableaux parallèles (buy_price, sell_price, fee_pct) ; la
+    devise → position est un dict, donc chaque recherche est en O(1).
+    En cas de doublon, le premier marché de la liste fait foi (comme l'ancien
+    parcours linéaire).
+    """
+
+    def __init__(self, markets_list):
+        self.fingerprint = markets_fingerprint(markets_list)
+        self.records = []
+        self.index = {}
+
+        for market in markets_list:
+            record = self._validate(market, len(self.records))
+            if record is None:
+                continue
+            if record.currency in self.index:
+                logging.warning(f"Marché en double ignoré pour les recherches: {record.currency}")
+            else:
+                self.index[record.currency] = record.position
+            self.records.append(record)
+
+        self.currencies = [r.currency for r in self.records]
+        self.buy_prices = np.array([r.buy_price for r in self.records], dtype=float)
+        self.sell_prices = np.array([r.sell_price for r in self.records], dtype=float)
+        self.fees_pct = np.array([r.fee_pct for r in self.records], dtype=float)
+
+    @staticmethod
+    def _validate(market, position):
+        """MarketRecord ou None si le marché est inutilisable"""
+        if not isinstance(market, dict) or 'currency' not in market:
+            logging.warning(f"Marché ignoré (devise manquante): {market}")
+            return None
+
+        values = {}
+        for field in MARKET_NUMERIC_FIELDS:
+            try:
+                values[field] = float(market[field])
+            except (KeyError, ValueError, TypeError):
+                logging.warning(f"Marché {market['currency']} ignoré: {field} manquant ou non numérique")
+                return None
+            if not math.isfinite(values[field]):
+                logging.warning(f"Marché {market['currency']} ignoré: {field} non fini")
+                return None
+
+        # Profondeur optionnelle : un carnet invalide est ignoré, pas le marché
+        depth = {}
+        if market.get('depth') is not None:
+            try:
+                depth = parse_depth(market['depth'])
+            except ValueError as e:
+                logging.warning(f"Carnet du marché {market['currency']} ignoré: {e}")
+
+        return MarketRecord(
+            market['currency'], market.get('name', market['currency']),
+            values['buy_price'], values['sell_price'], values['fee_pct'],
+            position, market, depth.get('buy'), depth.get('sell')
+        )
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, currency):
+        return currency in self.index
+
+    def get(self, currency):
+        """MarketRecord de la devise (None si absente)"""
+        position = self.index.get(currency)
+        return None if position is None else self.records[position]
+
+    def record(self, currency):
+        """MarketRecord de la devise, lève ValueError si absente"""
+        record = self.get(currency)
+        if record is None:
+            raise ValueError(f"Aucun marché trouvé pour la devise '{currency}'.")
+        return record
+
+    def market(self, currency):
+        """Dict d'origine (config.json) du marché, lève ValueError si absent"""
+        return self.record(currency).raw
+
+    def update(self, currency, buy_price=None, sell_price=None, fee_pct=None):
+        """
+        Met à jour les prix/frais d'un marché (record, tableaux et dict d'origine)
+
+        Returns:
+            Le MarketRecord mis à jour ; lève ValueError si la devise est
+            absente ou si une valeur n'est pas numérique et finie
+        """
+        record = self.record(currency)
+        changes = {}
+        for field, value in (('buy_price', buy_price), ('sell_price', sell_price), ('fee_pct', fee_pct)):
+            if value is None:
+                continue
+            try:
+                value = float(value)
+            except (ValueError, TypeError):
+                raise ValueError(f"Valeur non numérique pour {field}: {value}")
+            if not math.isfinite(value):
+                raise ValueError(f"Valeur non finie pour {field}: {value}")
+            changes[field] = value
+
+        for field, value in changes.items():
+            setattr(record, field, value)
+            record.raw[field] = value
+        self.buy_prices[record.position] = record.buy_price
+        self.sell_prices[record.position] = record.sell_price
+        self.fees_pct[record.position] = record.fee_pct
+
+        if changes:
+            self.fingerprint = None  # Contenu modifié depuis le chargement
+        return record
+
+
+# --- CACHE (un carnet par contenu de la liste de marchés) ---
+_cached_book = None
+
+
+def get_market_book(markets_list):
+    """Carnet pour cette liste de marchés, reconstruit uniquement si son contenu change"""
+    global _cached_book
+    fingerprint = markets_fingerprint(markets_list)
+    if _cached_book is None or _cached_book.fingerprint != fingerprint:
+        _cached_book = MarketBook(markets_list)
+        logging.debug(f"Carnet de marchés chargé ({len(_cached_book)} marchés)")
+    return _cached_book
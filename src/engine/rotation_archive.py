@@ -0,0 +1,165 @@
+# rotation_archive.py
+
+import gzip
+import json
+import logging
+import os
+import zlib
+
+
+class RotationArchive:
+    """
+    Archive des rotations terminées : ajout seul, compressée, indexée par ID
+
+    Le fichier est une suite de membres gzip (un par rotation, ligne JSON
+    {"rotation_id", "rotation"}), donc un .gz valide lisible par zcat.
+    L'index (lignes JSON {"rotation_id", "offset", "length"}) permet une
+    lecture directe d'une rotation sans décompresser le reste. Un index en
+    retard sur l'archive (crash entre les deux écritures) est complété en
+    relisant la fin de l'archive. Une rotation archivée plusieurs fois : la
+    dernière copie gagne.
+
+    Les écritures doivent être sérialisées par l'appelant (verrou du
+    RotationManager). Les lectures ne modifient aucun fichier : une fin
+    incomplète (écriture en cours dans un autre processus, ou crash) est
+    ignorée ; elle n'est tronquée et l'index complété qu'à l'ajout suivant,
+    sous le verrou.
+    """
+
+    def __init__(self, path, index_path=None):
+        self.path = str(path)
+        self.index_path = str(index_path or f"{path}.idx")
+        self._index = None
+        self._signature = None
+        self._needs_repair = False  # Fin incomplète ou index en retard vus en lecture
+
+    # --- LECTURE ---
+    def get(self, rotation_id):
+        """Rotation archivée, ou None"""
+        entry = self._entries().get(rotation_id)
+        if entry is None:
+            return None
+        offset, length = entry
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            record = json.loads(gzip.decompress(f.read(length)))
+        return record['rotation']
+
+    def __contains__(self, rotation_id):
+        return rotation_id in self._entries()
+
+    def __len__(self):
+        return len(self._entries())
+
+    def rotation_ids(self):
+        return list(self._entries())
+
+    # --- ÉCRITURE ---
+    def append(self, rotation_id, rotation):
+        """Ajoute une rotation (archive puis index, chacun fsync) ; répare d'abord une fin incomplète"""
+        entries = self._entries(repair=True)
+        member = gzip.compress(
+            (json.dumps({'rotation_id': rotation_id, 'rotation': rotation}, ensure_ascii=False) + '\n').encode('utf-8')
+        )
+        with open(self.path, 'ab') as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(member)
+            f.flush()
+            os.fsync(f.fileno())
+        self._append_index([(rotation_id, offset, len(member))])
+        entries[rotation_id] = (offset, len(member))
+        self._signature = self._read_signature()
+
+    # --- INDEX ---
+    def _read_signature(self):
+        signatures = []
+        for path in (self.path, self.index_path):
+            try:
+                stat = os.stat(path)
+                signatures.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signatures.append(None)
+        return tuple(signatures)
+
+    def _entries(self, repair=False):
+        """Index en mémoire, relu si l'archive ou l'index a changé (repair : sous le verrou d'écriture)"""
+        signature = self._read_signature()
+        if self._index is None or signature != self._signature or (repair and self._needs_repair):
+            self._needs_repair = False
+            self._index = self._load_index(repair)
+            self._signature = self._read_signature()
+        return self._index
+
+    def _load_index(self, repair):
+        entries, end = {}, 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                content = f.read()
+            complete = content[:content.rfind(b'\n') + 1]
+            if len(complete) < len(content):
+                # Ligne interrompue : ignorée (retirée si repair), l'entrée est retrouvée en relisant l'archive
+                if repair:
+                    with open(self.index_path, 'r+b') as f:
+                        f.truncate(len(complete))
+                else:
+                    self._needs_repair = True
+            for line in complete.splitlines():
+                try:
+                    entry = json.loads(line)
+                    entries[entry['rotation_id']] = (entry['offset'], entry['length'])
+                    end = max(end, entry['offset'] + entry['length'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if size < end:
+            logging.warning(f"Index {self.index_path} incohérent avec l'archive, reconstruction complète")
+            entries, end = {}, 0
+            if repair:
+                with open(self.index_path, 'w', encoding='utf-8'):
+                    pass
+            else:
+                self._needs_repair = True
+        if size > end:
+            missing = list(self._scan(end, repair))
+            if missing:
+                if repair:
+                    self._append_index(missing)
+                else:
+                    self._needs_repair = True
+                entries.update((rotation_id, (offset, length)) for rotation_id, offset, length in missing)
+        return entries
+
+    def _append_index(self, entries):
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            for rotation_id, offset, length in entries:
+                f.write(json.dumps({'rotation_id': rotation_id, 'offset': offset, 'length': length},
+                                   ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _scan(self, start, repair):
+        """Membres gzip de l'archive à partir de start : (rotation_id, offset, length)"""
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            data = f.read()
+        offset = start
+        while data:
+            decompressor = zlib.decompressobj(wbits=31)
+            try:
+                payload = decompressor.decompress(data)
+                record = json.loads(payload) if decompressor.eof else None
+            except (zlib.error, ValueError):
+                record = None
+            if record is None:
+                if repair:
+                    logging.warning(f"Archive {self.path}: {len(data)} octet(s) illisible(s) en fin de fichier, tronqué(s)")
+                    with open(self.path, 'r+b') as f:
+                        f.truncate(offset)
+                else:
+                    self._needs_repair = True
+                return
+            length = len(data) - len(decompressor.unused_data)
+            yield record['rotation_id'], offset, length
+            offset += length
+            data = decompressor.unused_data
@@ -1,18 +1,215 @@
 # rotation_manager.py - VERSION CORRIGÉE
 
+import copy
+import functools
 import json
 import logging
 import os
 import shutil
+from contextlib import contextmanager
 from datetime import datetime
 
+from src.engine.rotation_archive import RotationArchive
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus
+    fcntl = None
+
 ROTATION_STATE_FILE = 'rotation_state.json'
 BACKUP_FILE = ROTATION_STATE_FILE + '.bak' # <- NOUVELLE CONSTANTE
-class RotationManager:
-    """Gestionnaire pour choisir la devise de bouclage de cycle"""
+# Journal des mutations (ROTATION_STATE_FILE + suffixe), compacté dans le snapshot
+JOURNAL_SUFFIX = '.journal'
+JOURNAL_COMPACT_EVERY = 200
+FORCED_HISTORY_LIMIT = 100
+# Verrou inter-processus des lectures-modifications-écritures (fcntl.flock)
+LOCK_SUFFIX = '.lock'
+# Rotations terminées, hors de l'état chaud (membres gzip + index)
+ARCHIVE_SUFFIX = '.archive.gz'
+# Stockage de l'état : 'json' (snapshot + journal) ou 'sqlite' (rotation_state.db, WAL)
+ROTATION_STATE_BACKENDS = ('json', 'sqlite')
+ROTATION_STATE_BACKEND = os.environ.get('ROTATION_STATE_BACKEND', 'json')
+SQLITE_SUFFIX = '.db'
+
+
+def journal_path():
+    """Chemin du journal, suit ROTATION_STATE_FILE (redéfinissable par les tests)"""
+    return ROTATION_STATE_FILE + JOURNAL_SUFFIX
+
+
+def lock_path():
+    return ROTATION_STATE_FILE + LOCK_SUFFIX
+
+
+def archive_path():
+    return ROTATION_STATE_FILE + ARCHIVE_SUFFIX
 
-    def __init__(self):
+
+def sqlite_path():
+    """Base SQLite : ROTATION_STATE_FILE avec l'extension .db"""
+    return os.path.splitext(ROTATION_STATE_FILE)[0] + SQLITE_SUFFIX
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def serialized(method):
+    """Mutation exécutée sous le verrou, sur l'état disque le plus récent"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.locked():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def apply_journal_record(state, record):
+    """
+    Applique une mutation du journal à l'état (mutation en direct et rejeu)
+
+    Enregistrements :
+        {"op": "init", "rotation_id", "rotation": {...}}     nouvelle rotation
+        {"op": "set", "rotation_id", "fields": {...}}        champs remplacés (valeurs absolues)
+        {"op": "forced", "rotation_id", "record": {...}}     transaction forcée ajoutée
+        {"op": "archive", "rotation_id"}                     rotation retirée (copiée dans l'archive)
+        {"op": "batch", "records": [...]}                    lot (une seule ligne : tout ou rien)
+    """
+    if record['op'] == 'batch':
+        # Lot appliqué sur une copie des rotations touchées : tout ou rien
+        rotations = state['active_rotations']
+        touched = {sub_record['rotation_id'] for sub_record in record['records']}
+        work = {'active_rotations': {**rotations, **{rotation_id: copy.deepcopy(rotations[rotation_id])
+                                                     for rotation_id in touched if rotation_id in rotations}}}
+        for sub_record in record['records']:
+            apply_journal_record(work, sub_record)
+        for rotation_id in touched:
+            if rotation_id in work['active_rotations']:
+                rotations[rotation_id] = work['active_rotations'][rotation_id]
+            else:
+                rotations.pop(rotation_id, None)
+        return
+
+    rotations = state['active_rotations']
+    op, rotation_id = record['op'], record['rotation_id']
+    if op == 'init':
+        rotations[rotation_id] = record['rotation']
+        return
+    if op == 'archive':
+        del rotations[rotation_id]
+        return
+    rotation = rotations.get(rotation_id)
+    if rotation is None:
+        raise KeyError(f"Rotation inconnue: {rotation_id}")
+    if op == 'set':
+        rotation.update(record['fields'])
+    elif op == 'forced':
+        forced = rotation.setdefault('forced_transactions', [])
+        forced.append(record['record'])
+        if len(forced) > FORCED_HISTORY_LIMIT:
+            rotation['forced_transactions'] = forced[-FORCED_HISTORY_LIMIT:]
+    else:
+        raise ValueError(f"Opération de journal inconnue: {op}")
+
+
+class RotationManager:
+    """
+    Gestionnaire pour choisir la devise de bouclage de cycle
+
+    Persistance journalisée : chaque mutation ajoute une ligne JSON au
+    journal (coût constant, indépendant de la taille de l'état) ; le
+    snapshot complet n'est réécrit qu'à la compaction (toutes les
+    JOURNAL_COMPACT_EVERY mutations, ou save_state()). Au chargement, le
+    journal est rejoué au-dessus du snapshot (numéros de séquence déjà
+    inclus ignorés, fin de ligne interrompue par un crash tronquée).
+    Les mutations d'un bloc `with manager.batch():` sont écrites en une fois.
+
+    Plusieurs processus (CLI, simulation) peuvent partager le fichier :
+    chaque mutation prend un verrou exclusif (fcntl.flock sur
+    ROTATION_STATE_FILE + '.lock') et, si le snapshot ou le journal a changé
+    depuis la dernière lecture ou écriture de ce manager, relit l'état avant
+    de le modifier. `version` (numéro de séquence du journal, persisté)
+    compte les mutations écrites. Le verrou n'est pas réentrant entre deux
+    managers du même processus : pas de nouveau RotationManager() dans un
+    bloc batch().
+
+    Les rotations terminées sont déplacées par archive_rotation() dans une
+    archive compressée (RotationArchive) : l'état chargé et réécrit ne
+    contient que les rotations en cours. get_rotation() lit aussi l'archive.
+
+    Backend : RotationManager(backend=...) ou ROTATION_STATE_BACKEND choisit
+    le stockage ; 'sqlite' renvoie un SqliteRotationManager (même API,
+    tables indexées, historique des transactions forcées non limité).
+    """
+
+    def __new__(cls, backend=None):
+        backend = backend or ROTATION_STATE_BACKEND
+        if backend not in ROTATION_STATE_BACKENDS:
+            raise ValueError(f"Backend d'état inconnu: {backend} (attendu: {', '.join(ROTATION_STATE_BACKENDS)})")
+        if cls is RotationManager and backend == 'sqlite':
+            from src.engine.rotation_sqlite import SqliteRotationManager
+            cls = SqliteRotationManager
+        return super().__new__(cls)
+
+    def __init__(self, backend=None):
+        self._batch = None    # Mutations du lot en cours
+        self._undo = None     # Rotations avant le lot (None = créée dans le lot)
+        self._lock_depth = 0
+        self._disk_signature = None
+        self.archive = RotationArchive(archive_path())
+        with self.locked():
+            self._load()
+
+    @property
+    def version(self):
+        """Nombre de mutations écrites (séquence du journal)"""
+        return self._seq
+
+    def _load(self):
+        """Snapshot + rejeu du journal (verrou détenu)"""
         self.state = self.load_state()
+        self._seq = self.state.pop('journal_seq', 0)
+        self._journal_records = 0
+        self._replay_error = None
+        self._replay_journal()
+        self._disk_signature = self._read_signature()
+
+    # --- VERROU INTER-PROCESSUS ---
+    def _read_signature(self):
+        return _file_signature(ROTATION_STATE_FILE), _file_signature(journal_path())
+
+    @contextmanager
+    def locked(self):
+        """
+        Verrou exclusif sur l'état partagé (réentrant pour ce manager)
+
+        À la prise du verrou, l'état est relu si un autre processus a écrit
+        depuis (signature inode / mtime / taille du snapshot et du journal).
+        """
+        if self._lock_depth:
+            self._lock_depth += 1
+            try:
+                yield self
+            finally:
+                self._lock_depth -= 1
+            return
+
+        with open(lock_path(), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            self._lock_depth = 1
+            try:
+                if self._disk_signature is not None and self._read_signature() != self._disk_signature:
+                    logging.info(f"{ROTATION_STATE_FILE} modifié par un autre processus, état relu")
+                    self._load()
+                yield self
+            finally:
+                self._lock_depth = 0
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
 
     def _load_from_backup(self):
             """Tente de charger un état valide à partir du fichier de backup."""
@@ -100,14 +297,17 @@ class RotationManager:
             # ← Si fichier n'existe PAS (en dehors du if)
             return {"active_rotations": {}}
 
+    @serialized
     def save_state(self):
             """✅ AMÉLIORATION : Sauvegarde atomique (utilisant os.replace pour compatibilité Windows/Pytest)"""
+            if self._journal_blocked():
+                return False
             temp_file = f"{ROTATION_STATE_FILE}.tmp"
 
             try:
-                # 1. Écrire dans un fichier temporaire
+                # 1. Écrire dans un fichier temporaire (avec la séquence du journal incluse)
                 with open(temp_file, 'w', encoding='utf-8') as f:
-                    json.dump(self.state, f, indent=2, ensure_ascii=False)
+                    json.dump({**self.state, 'journal_seq': self._seq}, f, indent=2, ensure_ascii=False)
 
                 # 2. Copier l'ancienne version valide vers le backup permanent (.json -> .bak)
                 # Le .bak sera la dernière version valide connue.
@@ -119,6 +319,13 @@ class RotationManager:
                 # os.replace est plus fiable que os.rename pour l'écrasement sur Windows.
                 os.replace(temp_file, ROTATION_STATE_FILE)
 
+                # 4. Journal compacté : ses mutations sont dans le snapshot
+                # (un crash avant cette étape est sans effet, cf. journal_seq)
+                with open(journal_path(), 'w', encoding='utf-8'):
+                    pass
+                self._journal_records = 0
+                self._disk_signature = self._read_signature()
+
                 return True
 
             except Exception as e:
@@ -130,27 +337,185 @@ class RotationManager:
 
                 return False
 
+    # --- JOURNAL ---
+    def _journal(self, op, rotation_id, **data):
+        """Applique une mutation et l'ajoute au journal (ou au lot en cours)"""
+        record = {'op': op, 'rotation_id': rotation_id, **data}
+        if self._batch is not None:
+            if rotation_id not in self._undo:
+                self._undo[rotation_id] = copy.deepcopy(self.state['active_rotations'].get(rotation_id))
+            # Copie : un 'init' appliqué devient la rotation en mémoire, modifiée par la suite du lot
+            self._batch.append(copy.deepcopy(record))
+            apply_journal_record(self.state, record)
+            return True
+
+        apply_journal_record(self.state, record)
+        return self._append(record)
+
+    def _append(self, record):
+        """Écrit un enregistrement (une ligne, fsync) ; compaction périodique"""
+        if self._journal_blocked():
+            return False
+        self._seq += 1
+        record = {'seq': self._seq, **record}
+        if not os.path.exists(ROTATION_STATE_FILE) or self._journal_records + 1 >= JOURNAL_COMPACT_EVERY:
+            return self.save_state()
+        try:
+            with open(journal_path(), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            logging.error(f"Erreur écriture journal {journal_path()}: {e}")
+            return False
+        self._journal_records += 1
+        self._disk_signature = self._read_signature()
+        return True
+
+    @contextmanager
+    def batch(self):
+        """
+        Regroupe les mutations du bloc en une seule écriture à la sortie
+
+        Les mutations sont appliquées en mémoire au fil du bloc puis écrites
+        en un enregistrement de journal (ou un snapshot si compaction) ; si
+        une exception sort du bloc, l'état revient à celui d'avant le bloc et
+        rien n'est écrit. Un lot imbriqué rejoint le lot englobant. Le verrou
+        est détenu pendant tout le bloc.
+        """
+        if self._batch is not None:
+            yield self
+            return
+
+        with self.locked():
+            self._batch, self._undo = [], {}
+            try:
+                yield self
+            except BaseException:
+                rotations = self.state['active_rotations']
+                for rotation_id, rotation in self._undo.items():
+                    if rotation is None:
+                        rotations.pop(rotation_id, None)
+                    else:
+                        rotations[rotation_id] = rotation
+                logging.warning(f"Lot de {len(self._batch)} mutation(s) annulé")
+                raise
+            else:
+                if self._batch:
+                    records = self._batch
+                    self._batch = None
+                    if not self._append({'op': 'batch', 'records': records}):
+                        logging.error(f"Lot de {len(records)} mutation(s) non écrit")
+            finally:
+                self._batch, self._undo = None, None
+
+    def _journal_blocked(self):
+        """Journal non rejouable jusqu'au bout : aucune écriture (elle masquerait ou effacerait la suite)"""
+        if self._replay_error is not None:
+            logging.error(f"Journal {journal_path()} à réparer ({self._replay_error}), écriture refusée")
+            return True
+        return False
+
+    def _replay_journal(self):
+        """
+        Rejoue les mutations du journal postérieures au snapshot chargé
+
+        Seule une fin de fichier illisible (écriture interrompue par un crash)
+        est tronquée. Un enregistrement illisible suivi d'autres lignes, ou
+        qui ne s'applique pas à l'état, arrête le rejeu sans modifier le
+        fichier : le manager refuse alors d'écrire (_journal_blocked).
+        """
+        path = journal_path()
+        if not os.path.exists(path):
+            return
+
+        with open(path, 'rb') as f:
+            content = f.read()
+        lines = content.splitlines(keepends=True)
+        valid_end = replayed = 0
+        for index, line in enumerate(lines):
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError("ligne interrompue")
+                record = json.loads(line)
+                seq = record['seq']
+            except (ValueError, KeyError, TypeError) as e:
+                if index == len(lines) - 1:
+                    logging.warning(f"Journal {path}: {len(line)} octet(s) illisible(s) en fin de fichier, tronqué(s)")
+                    with open(path, 'r+b') as f:
+                        f.truncate(valid_end)
+                else:
+                    self._replay_error = f"ligne {index + 1} illisible: {e}"
+                    logging.error(f"Journal {path}: {self._replay_error}, rejeu arrêté")
+                break
+            if seq > self._seq:
+                if seq != self._seq + 1:
+                    logging.warning(f"Journal {path}: séquence {self._seq + 1} à {seq - 1} manquante")
+                try:
+                    apply_journal_record(self.state, record)
+                except (ValueError, KeyError, TypeError) as e:
+                    self._replay_error = f"séquence {seq} non applicable: {e!r}"
+                    logging.error(f"Journal {path}: {self._replay_error}, rejeu arrêté")
+                    break
+                self._seq = seq
+                replayed += 1
+            valid_end += len(line)
+            self._journal_records += 1
+
+        if replayed:
+            logging.info(f"Journal {path}: {replayed} mutation(s) rejouée(s)")
+
+    @serialized
     def init_rotation(self, rotation_id):
         """✅ AJOUT : Validation de l'ID de rotation"""
         if not rotation_id or not isinstance(rotation_id, str):
             logging.error(f"ID de rotation invalide: {rotation_id}")
             return False
 
-        self.state['active_rotations'][rotation_id] = {
+        return self._journal('init', rotation_id, rotation={
             "rotation_id": rotation_id,
             'current_cycle': 1,
             "loop_currency": None,
             "forced_transactions": [],
             "created_at": datetime.now().isoformat()
-        }
-        return self.save_state()
+        })
 
-    def get_rotation(self, rotation_id):
+    def _active_rotation(self, rotation_id):
+        """Rotation en cours (non archivée), ou None"""
         return self.state['active_rotations'].get(rotation_id)
 
+    def get_rotation(self, rotation_id):
+        """Rotation en cours, sinon rotation archivée (lecture indexée), sinon None"""
+        rotation = self._active_rotation(rotation_id)
+        if rotation is None:
+            rotation = self.archive.get(rotation_id)
+        return rotation
+
+    @serialized
+    def archive_rotation(self, rotation_id):
+        """
+        Déplace une rotation terminée (CLOTURE) de l'état vers l'archive
+
+        Copie dans l'archive d'abord, retrait journalisé ensuite : un crash
+        entre les deux laisse la rotation dans l'état (archivable à nouveau).
+        Dans un batch() annulé, la copie archivée reste mais la rotation est
+        restaurée dans l'état.
+        """
+        rotation = self._active_rotation(rotation_id)
+        if rotation is None:
+            logging.info(f"Rotation {rotation_id} absente de l'état, rien à archiver")
+            return False
+        try:
+            self.archive.append(rotation_id, {**rotation, 'archived_at': datetime.now().isoformat()})
+        except OSError as e:
+            logging.error(f"Erreur archivage rotation {rotation_id}: {e}")
+            return False
+        return self._journal('archive', rotation_id)
+
+    @serialized
     def set_loop_currency(self, rotation_id, currency):
         """Définit la devise sur laquelle on veut boucler"""
-        if rotation_id not in self.state['active_rotations']:
+        if self._active_rotation(rotation_id) is None:
             if not self.init_rotation(rotation_id):
                 return False
 
@@ -159,10 +524,10 @@ class RotationManager:
             logging.error(f"Devise invalide: {currency}")
             return False
 
-        self.state['active_rotations'][rotation_id]['loop_currency'] = currency.upper()
-        self.state['active_rotations'][rotation_id]['loop_currency_set_at'] = datetime.now().isoformat()
-
-        return self.save_state()
+        return self._journal('set', rotation_id, fields={
+            'loop_currency': currency.upper(),
+            'loop_currency_set_at': datetime.now().isoformat()
+        })
 
     def get_loop_currency(self, rotation_id):
         """Récupère la devise de bouclage"""
@@ -171,21 +536,24 @@ class RotationManager:
             return rotation.get('loop_currency')
         return None
 
+    @serialized
     def increment_cycle(self, rotation_id):
         """✅ AMÉLIORATION : Retourne le nombre de cycles"""
-        if rotation_id in self.state['active_rotations']:
-            self.state['active_rotations'][rotation_id]['current_cycle'] += 1
-            cycles = self.state['active_rotations'][rotation_id]['current_cycle']  # ← LIRE current
+        rotation = self._active_rotation(rotation_id)
+        if rotation is not None:
+            cycles = rotation['current_cycle'] + 1
 
-            if self.save_state():
+            # Valeur absolue journalisée : le rejeu ne dépend pas de l'état intermédiaire
+            if self._journal('set', rotation_id, fields={'current_cycle': cycles}):
                 logging.info(f"Rotation {rotation_id}: {cycles} cycles complétés")
                 return cycles
 
         return 0
 
+    @serialized
     def record_forced_transaction(self, rotation_id, trans_type, reason):
         """✅ AMÉLIORATION : Validation + limite d'historique"""
-        if rotation_id not in self.state['active_rotations']:
+        if self._active_rotation(rotation_id) is None:
             if not self.init_rotation(rotation_id):
                 return False
 
@@ -195,14 +563,8 @@ class RotationManager:
             "timestamp": datetime.now().isoformat()
         }
 
-        self.state['active_rotations'][rotation_id]['forced_transactions'].append(forced_record)
-
-        # ✅ AJOUT : Limiter l'historique à 100 entrées max
-        if len(self.state['active_rotations'][rotation_id]['forced_transactions']) > 100:
-            self.state['active_rotations'][rotation_id]['forced_transactions'] = \
-                self.state['active_rotations'][rotation_id]['forced_transactions'][-100:]
-
-        return self.save_state()
+        # ✅ AJOUT : Historique limité à FORCED_HISTORY_LIMIT entrées (apply_journal_record)
+        return self._journal('forced', rotation_id, record=forced_record)
 
     def get_rotation_stats(self, rotation_id):
         """✅ NOUVELLE FONCTION : Obtenir les stats d'une rotation"""
@@ -218,3 +580,20 @@ class RotationManager:
             'created_at': rotation.get('created_at'),
             'loop_currency_set_at': rotation.get('loop_currency_set_at')
         }
+
+    # --- REQUÊTES AGRÉGÉES ---
+    def forced_transactions(self, rotation_id):
+        """Historique des transactions forcées d'une rotation (JSON : FORCED_HISTORY_LIMIT dernières)"""
+        rotation = self.get_rotation(rotation_id)
+        return list(rotation.get('forced_transactions', [])) if rotation else []
+
+    def forced_transaction_counts_by_type(self):
+        """Nombre de transactions forcées par type, rotations en cours et archivées"""
+        rotations = list(self.state['active_rotations'].values())
+        rotations.extend(self.archive.get(rotation_id) for rotation_id in self.archive.rotation_ids()
+                         if rotation_id not in self.state['active_rotations'])
+        counts = {}
+        for rotation in rotations:
+            for forced in rotation.get('forced_transactions', []):
+                counts[forced.get('type')] = counts.get(forced.get('type'), 0) + 1
+        return counts
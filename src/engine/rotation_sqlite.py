@@ -0,0 +1,290 @@
+# rotation_sqlite.py
+
+import json
+import logging
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+from src.engine import rotation_manager
+from src.engine.rotation_manager import FORCED_HISTORY_LIMIT, RotationManager, serialized, sqlite_path
+
+# Champs de rotation stockés en colonnes (les autres dans extra, JSON)
+ROTATION_COLUMNS = ('current_cycle', 'loop_currency', 'created_at', 'loop_currency_set_at')
+FORCED_COLUMNS = ('type', 'reason', 'timestamp')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rotations (
+    rotation_id TEXT PRIMARY KEY,
+    current_cycle INTEGER NOT NULL DEFAULT 1,
+    loop_currency TEXT,
+    created_at TEXT,
+    loop_currency_set_at TEXT,
+    archived_at TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS rotations_archived_at ON rotations (archived_at);
+CREATE TABLE IF NOT EXISTS forced_transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    rotation_id TEXT NOT NULL REFERENCES rotations (rotation_id),
+    type TEXT,
+    reason TEXT,
+    timestamp TEXT
+);
+CREATE INDEX IF NOT EXISTS forced_transactions_rotation ON forced_transactions (rotation_id, id);
+CREATE INDEX IF NOT EXISTS forced_transactions_type ON forced_transactions (type);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class SqliteArchiveView:
+    """Rotations archivées de la base (même interface de lecture que RotationArchive)"""
+
+    def __init__(self, manager):
+        self._manager = manager
+
+    def get(self, rotation_id):
+        return self._manager._read_rotation(rotation_id, archived=True)
+
+    def __contains__(self, rotation_id):
+        return self.get(rotation_id) is not None
+
+    def __len__(self):
+        return self._manager._db.execute(
+            "SELECT COUNT(*) FROM rotations WHERE archived_at IS NOT NULL").fetchone()[0]
+
+    def rotation_ids(self):
+        return [row[0] for row in self._manager._db.execute(
+            "SELECT rotation_id FROM rotations WHERE archived_at IS NOT NULL ORDER BY archived_at")]
+
+
+class SqliteRotationManager(RotationManager):
+    """
+    RotationManager stocké dans SQLite (sqlite_path(), mode WAL)
+
+    Tables indexées : rotations (archived_at NULL = en cours) et
+    forced_transactions (historique complet, sans limite). get_rotation()
+    et state présentent les FORCED_HISTORY_LIMIT dernières transactions
+    forcées comme le backend JSON ; forced_transactions() et
+    get_rotation_stats() portent sur tout l'historique.
+
+    Chaque mutation (ou bloc batch()) est une transaction BEGIN IMMEDIATE :
+    sérialisée entre processus par SQLite, annulée sur exception. version
+    compte les transactions d'écriture (valeur vue par ce manager). Une
+    base neuve reprend l'état JSON existant (snapshot, journal, archive).
+    """
+
+    def __init__(self, backend=None):
+        self.path = sqlite_path()
+        self._lock_depth = 0
+        self._dirty = False
+        is_new = not os.path.exists(self.path)
+        self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+        self.archive = SqliteArchiveView(self)
+        with self.locked():
+            if is_new and os.path.exists(rotation_manager.ROTATION_STATE_FILE):
+                self._import_json_state()
+            self._seq = self._read_version()
+
+    # --- TRANSACTIONS ---
+    def _read_version(self):
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else 0
+
+    @contextmanager
+    def locked(self):
+        """Transaction d'écriture (BEGIN IMMEDIATE), réentrante pour ce manager"""
+        if self._lock_depth:
+            self._lock_depth += 1
+            try:
+                yield self
+            finally:
+                self._lock_depth -= 1
+            return
+
+        self._db.execute("BEGIN IMMEDIATE")
+        self._lock_depth, self._dirty = 1, False
+        try:
+            yield self
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            if self._dirty:
+                logging.warning("Transaction sur l'état des rotations annulée")
+            raise
+        else:
+            if self._dirty:
+                self._db.execute("INSERT INTO meta (key, value) VALUES ('version', 1) "
+                                 "ON CONFLICT (key) DO UPDATE SET value = value + 1")
+                self._seq = self._read_version()
+            self._db.execute("COMMIT")
+        finally:
+            self._lock_depth, self._dirty = 0, False
+
+    @contextmanager
+    def batch(self):
+        """Mutations du bloc dans une seule transaction (annulée si exception)"""
+        with self.locked():
+            yield self
+
+    def save_state(self):
+        """Point de contrôle WAL (les mutations sont déjà écrites)"""
+        try:
+            self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return True
+        except sqlite3.Error as e:
+            logging.error(f"Erreur point de contrôle {self.path}: {e}")
+            return False
+
+    # --- ÉCRITURE ---
+    def _journal(self, op, rotation_id, **data):
+        """Applique une mutation (même enregistrements que le journal JSON) dans la transaction"""
+        if op == 'init':
+            self._insert_rotation(rotation_id, data['rotation'])
+        elif op == 'set':
+            columns = {k: v for k, v in data['fields'].items() if k in ROTATION_COLUMNS}
+            extra = {k: v for k, v in data['fields'].items() if k not in ROTATION_COLUMNS}
+            if columns:
+                self._db.execute(f"UPDATE rotations SET {', '.join(f'{k} = ?' for k in columns)} "
+                                 f"WHERE rotation_id = ?", (*columns.values(), rotation_id))
+            if extra:
+                row = self._db.execute("SELECT extra FROM rotations WHERE rotation_id = ?",
+                                       (rotation_id,)).fetchone()
+                merged = {**json.loads(row['extra'] or '{}'), **extra}
+                self._db.execute("UPDATE rotations SET extra = ? WHERE rotation_id = ?",
+                                 (json.dumps(merged, ensure_ascii=False), rotation_id))
+        elif op == 'forced':
+            record = data['record']
+            self._db.execute("INSERT INTO forced_transactions (rotation_id, type, reason, timestamp) "
+                             "VALUES (?, ?, ?, ?)", (rotation_id, *(record.get(k) for k in FORCED_COLUMNS)))
+        elif op == 'archive':
+            self._db.execute("UPDATE rotations SET archived_at = ? WHERE rotation_id = ?",
+                             (data['archived_at'], rotation_id))
+        else:
+            raise ValueError(f"Opération inconnue: {op}")
+        self._dirty = True
+        return True
+
+    def _insert_rotation(self, rotation_id, rotation, archived_at=None):
+        """Rotation (re)créée avec son historique ; un ID existant est remplacé"""
+        self._db.execute("DELETE FROM forced_transactions WHERE rotation_id = ?", (rotation_id,))
+        self._db.execute("DELETE FROM rotations WHERE rotation_id = ?", (rotation_id,))
+        extra = {k: v for k, v in rotation.items()
+                 if k not in ROTATION_COLUMNS + ('rotation_id', 'forced_transactions', 'archived_at')}
+        self._db.execute(
+            "INSERT INTO rotations (rotation_id, current_cycle, loop_currency, created_at, "
+            "loop_currency_set_at, archived_at, extra) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (rotation_id, rotation.get('current_cycle', 1), rotation.get('loop_currency'),
+             rotation.get('created_at'), rotation.get('loop_currency_set_at'),
+             archived_at or rotation.get('archived_at'),
+             json.dumps(extra, ensure_ascii=False) if extra else None))
+        self._db.executemany(
+            "INSERT INTO forced_transactions (rotation_id, type, reason, timestamp) VALUES (?, ?, ?, ?)",
+            [(rotation_id, *(f.get(k) for k in FORCED_COLUMNS)) for f in rotation.get('forced_transactions', [])])
+
+    def _import_json_state(self):
+        """Reprise de l'état JSON (rotations en cours et archivées) dans une base neuve"""
+        source = RotationManager(backend='json')
+        for rotation_id in source.archive.rotation_ids():
+            rotation = source.archive.get(rotation_id)
+            self._insert_rotation(rotation_id, rotation,
+                                  archived_at=rotation.get('archived_at') or datetime.now().isoformat())
+        for rotation_id, rotation in source.state['active_rotations'].items():
+            self._insert_rotation(rotation_id, rotation)
+        self._dirty = True
+        logging.info(f"État {rotation_manager.ROTATION_STATE_FILE} importé dans {self.path}")
+
+    @serialized
+    def archive_rotation(self, rotation_id):
+        """Marque une rotation terminée comme archivée (retirée de state, lisible par get_rotation)"""
+        if self._active_rotation(rotation_id) is None:
+            logging.info(f"Rotation {rotation_id} absente de l'état, rien à archiver")
+            return False
+        return self._journal('archive', rotation_id, archived_at=datetime.now().isoformat())
+
+    # --- LECTURE ---
+    def _rotation_from_row(self, row, forced):
+        rotation = {'rotation_id': row['rotation_id'], 'current_cycle': row['current_cycle'],
+                    'loop_currency': row['loop_currency'], 'forced_transactions': forced,
+                    'created_at': row['created_at']}
+        if row['loop_currency_set_at'] is not None:
+            rotation['loop_currency_set_at'] = row['loop_currency_set_at']
+        if row['archived_at'] is not None:
+            rotation['archived_at'] = row['archived_at']
+        if row['extra']:
+            rotation.update(json.loads(row['extra']))
+        return rotation
+
+    def _read_rotation(self, rotation_id, archived=None):
+        """Rotation (archived : None = toutes, True / False = archivée ou en cours)"""
+        condition = {None: '', True: ' AND archived_at IS NOT NULL', False: ' AND archived_at IS NULL'}[archived]
+        row = self._db.execute(f"SELECT * FROM rotations WHERE rotation_id = ?{condition}",
+                               (rotation_id,)).fetchone()
+        if row is None:
+            return None
+        forced = self._db.execute(
+            "SELECT type, reason, timestamp FROM forced_transactions WHERE rotation_id = ? "
+            "ORDER BY id DESC LIMIT ?", (rotation_id, FORCED_HISTORY_LIMIT)).fetchall()
+        return self._rotation_from_row(row, [dict(f) for f in reversed(forced)])
+
+    def _active_rotation(self, rotation_id):
+        return self._read_rotation(rotation_id, archived=False)
+
+    def get_rotation(self, rotation_id):
+        """Rotation en cours ou archivée, sinon None"""
+        return self._read_rotation(rotation_id)
+
+    @property
+    def state(self):
+        """Rotations en cours, au format de rotation_state.json"""
+        forced = {}
+        for row in self._db.execute(
+                "SELECT rotation_id, type, reason, timestamp FROM ("
+                " SELECT f.*, ROW_NUMBER() OVER (PARTITION BY f.rotation_id ORDER BY f.id DESC) AS n"
+                " FROM forced_transactions f JOIN rotations r USING (rotation_id)"
+                " WHERE r.archived_at IS NULL"
+                ") WHERE n <= ? ORDER BY rotation_id, id", (FORCED_HISTORY_LIMIT,)):
+            forced.setdefault(row['rotation_id'], []).append(
+                {k: row[k] for k in FORCED_COLUMNS})
+        rows = self._db.execute("SELECT * FROM rotations WHERE archived_at IS NULL ORDER BY rowid")
+        return {'active_rotations': {
+            row['rotation_id']: self._rotation_from_row(row, forced.get(row['rotation_id'], []))
+            for row in rows
+        }}
+
+    def get_rotation_stats(self, rotation_id):
+        """Stats d'une rotation (une requête ; forced_transactions_count sur tout l'historique)"""
+        row = self._db.execute(
+            "SELECT current_cycle, loop_currency, created_at, loop_currency_set_at,"
+            " (SELECT COUNT(*) FROM forced_transactions f WHERE f.rotation_id = r.rotation_id) AS forced_count"
+            " FROM rotations r WHERE rotation_id = ?", (rotation_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'current_cycle': row['current_cycle'],
+            'cycles_completed': row['current_cycle'] - 1,
+            'loop_currency': row['loop_currency'],
+            'forced_transactions_count': row['forced_count'],
+            'created_at': row['created_at'],
+            'loop_currency_set_at': row['loop_currency_set_at']
+        }
+
+    # --- REQUÊTES AGRÉGÉES ---
+    def forced_transactions(self, rotation_id):
+        """Historique complet des transactions forcées d'une rotation"""
+        return [dict(row) for row in self._db.execute(
+            "SELECT type, reason, timestamp FROM forced_transactions WHERE rotation_id = ? ORDER BY id",
+            (rotation_id,))]
+
+    def forced_transaction_counts_by_type(self):
+        """Nombre de transactions forcées par type, toutes rotations (index sur type)"""
+        return {row[0]: row[1] for row in self._db.execute(
+            "SELECT type, COUNT(*) FROM forced_transactions GROUP BY type ORDER BY type")}
@@ -0,0 +1,157 @@
+# route_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import zipfile
+
+import numpy as np
+
+from src.engine.conversion_table import CONVERSION_METHODS
+from src.engine.route_matrix import ANOMALY_MIN_PROFIT_PCT
+from src.engine.route_record import RouteRecord
+from src.engine.validation_report import config_fingerprint
+
+# Incrémenter si le format du fichier ou le calcul des routes change
+ROUTE_CACHE_VERSION = 1
+
+# Colonnes numériques d'une table (de quoi reconstruire chaque RouteRecord)
+ROUTE_TABLE_FIELDS = ('profit_pct', 'cost_eur', 'revenue_local', 'revenue_eur', 'final_amount_usdt')
+
+
+def route_cache_key(markets_list, forex_rates, nb_cycles, initial_usdt):
+    """Empreinte du contenu qui détermine les tables (marchés, taux, paramètres, format)"""
+    payload = json.dumps({
+        'config': config_fingerprint(markets_list, forex_rates),
+        'nb_cycles': nb_cycles,
+        'initial_usdt': initial_usdt,
+        'version': ROUTE_CACHE_VERSION,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RouteTable:
+    """
+    Classement complet des routes directes pour une méthode de conversion
+
+    Colonnes triées par profitabilité décroissante (même ordre que
+    RouteMatrix.ranked_keys), sans seuil appliqué : le seuil et le top_n
+    sont appliqués à la lecture.
+    """
+
+    __slots__ = ('conversion_method', 'currencies', 'sourcing', 'selling', 'columns',
+                 'initial_usdt', 'nb_cycles')
+
+    def __init__(self, conversion_method, currencies, sourcing, selling, columns, initial_usdt, nb_cycles):
+        self.conversion_method = conversion_method
+        self.currencies = list(currencies)
+        self.sourcing = sourcing
+        self.selling = selling
+        self.columns = columns
+        self.initial_usdt = initial_usdt
+        self.nb_cycles = nb_cycles
+
+    @classmethod
+    def from_matrix(cls, matrix, conversion_method, nb_cycles):
+        """Table de toutes les paires classables de la matrice"""
+        n = len(matrix.currencies)
+        keys = matrix.ranked_keys(conversion_method)
+        pairs = [divmod(-neg_flat, n) for _, neg_flat in keys]
+        records = [matrix.make_record(conversion_method, a, b, nb_cycles) for a, b in pairs]
+        columns = {field: np.array([getattr(r, field) for r in records], dtype=float)
+                   for field in ROUTE_TABLE_FIELDS}
+        # Marge de classement : celle de la matrice, filtrée comme dans ranked_keys
+        columns['profit_pct'] = np.array([profit for profit, _ in keys], dtype=float)
+        return cls(
+            conversion_method, matrix.currencies,
+            np.array([a for a, _ in pairs], dtype=np.int32),
+            np.array([b for _, b in pairs], dtype=np.int32),
+            columns, float(matrix.initial_usdt), nb_cycles
+        )
+
+    def __len__(self):
+        return len(self.sourcing)
+
+    def routes(self, top_n=5, threshold=None):
+        """RouteRecord des top_n meilleures routes au-dessus du seuil (même filtre que ranked_keys)"""
+        lower_bound = ANOMALY_MIN_PROFIT_PCT if threshold is None else max(ANOMALY_MIN_PROFIT_PCT, threshold)
+        selected = np.flatnonzero(self.columns['profit_pct'] >= lower_bound)
+        if top_n is not None:
+            selected = selected[:max(top_n, 0)]
+        return [
+            RouteRecord(
+                self.currencies[self.sourcing[k]], self.currencies[self.selling[k]], self.conversion_method,
+                initial_amount_usdt=self.initial_usdt,
+                cost_eur=float(self.columns['cost_eur'][k]),
+                revenue_local=float(self.columns['revenue_local'][k]),
+                revenue_eur=float(self.columns['revenue_eur'][k]),
+                final_amount_usdt=float(self.columns['final_amount_usdt'][k]),
+                nb_cycles=self.nb_cycles
+            )
+            for k in selected.tolist()
+        ]
+
+
+def build_route_tables(matrix, nb_cycles):
+    """Tables des deux méthodes de conversion pour une matrice"""
+    return {method: RouteTable.from_matrix(matrix, method, nb_cycles) for method in CONVERSION_METHODS}
+
+
+def save_route_tables(path, key, tables):
+    """
+    Écrit les tables dans un .npz (binaire, sans pickle), remplacement atomique
+
+    Une erreur d'écriture est journalisée sans interrompre l'appelant.
+    """
+    first = next(iter(tables.values()))
+    arrays = {
+        'key': np.array(key),
+        'currencies': np.array(first.currencies),
+        'initial_usdt': np.array(first.initial_usdt),
+        'nb_cycles': np.array(first.nb_cycles),
+    }
+    for method, table in tables.items():
+        arrays[f'{method}_sourcing'] = table.sourcing
+        arrays[f'{method}_selling'] = table.selling
+        for field in ROUTE_TABLE_FIELDS:
+            arrays[f'{method}_{field}'] = table.columns[field]
+
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Cache des routes non écrit ({path}): {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_route_tables(path, key):
+    """
+    Tables du cache si le fichier existe et correspond à `key`, sinon None
+
+    Un fichier illisible ou d'un autre format est traité comme absent.
+    """
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if str(data['key']) != key:
+                return None
+            currencies = [str(c) for c in data['currencies']]
+            initial_usdt = float(data['initial_usdt'])
+            nb_cycles = int(data['nb_cycles'])
+            return {
+                method: RouteTable(
+                    method, currencies,
+                    data[f'{method}_sourcing'], data[f'{method}_selling'],
+                    {field: data[f'{method}_{field}'] for field in ROUTE_TABLE_FIELDS},
+                    initial_usdt, nb_cycles
+                )
+                for method in CONVERSION_METHODS
+            }
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile) as e:
+        logging.warning(f"Cache des routes ignoré ({path}): {e}")
+        return None
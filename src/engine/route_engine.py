@@ -0,0 +1,408 @@
+# route_engine.py
+
+import copy
+import logging
+import math
+import threading
+
+from src.engine.capital_sweep import sweep_capital
+from src.engine.conversion_table import ConversionTable, method_index
+from src.engine.depth_matrix import DepthRouteMatrix
+from src.engine.graph_search import DEFAULT_MAX_HOPS, CurrencyGraph
+from src.engine.market_book import MarketBook
+from src.engine.route_matrix import REFERENCE_USDT, RouteMatrix
+from src.engine.route_record import RouteRecord
+from src.engine.validation_report import (ValidationReport,
+                                          config_fingerprint,
+                                          validate_config_coherence)
+from src.utils.config_store import REQUIRED_CONFIG_KEYS, ConfigError
+
+
+class RouteEngine:
+    """
+    Moteur de routes autonome pour une config (marchés + taux + paramètres)
+
+    Chaque moteur possède son carnet de marchés, sa table de conversion, sa
+    matrice de routes et son rapport de validation : plusieurs moteurs avec
+    des configs différentes cohabitent dans un même processus, et un verrou
+    rend chaque moteur utilisable depuis plusieurs threads.
+
+    Le classement suivi (top_n pour conversion_method et les filtres donnés)
+    est incrémental : quand un prix ou un taux bouge, seules la ligne et la
+    colonne de la devise concernée sont recalculées puis fusionnées, sans
+    revalidation ni rebalayage N×N. Le classement reste exact : les paires
+    non suivies (hors top_n) sont toutes sous l'ancienne clé de coupure ; si
+    la fusion ne suffit plus à remplir le top_n au-dessus de cette coupure,
+    une resélection complète est faite.
+    """
+
+    def __init__(self, config, conversion_method='forex', top_n=5,
+                 sourcing_currency=None, excluded_markets=None, loop_currency=None,
+                 threshold=None, initial_usdt=REFERENCE_USDT):
+        self.conversion_method = conversion_method
+        self.top_n = top_n
+        self.filters = {
+            'sourcing_currency': sourcing_currency,
+            'excluded_markets': list(excluded_markets or []),
+            'loop_currency': loop_currency,
+            'threshold': threshold,
+        }
+        self.initial_usdt = initial_usdt
+
+        # Compteurs : mises à jour fusionnées vs resélections complètes
+        self.stats = {'incremental': 0, 'full': 0}
+        # Paires évaluées / élaguées par le dernier balayage complet
+        self.last_scan_stats = None
+
+        self._lock = threading.RLock()
+        self.reload(config)
+
+    @classmethod
+    def from_store(cls, store, **kwargs):
+        """Moteur sur la config d'un ConfigStore, rechargé à chaque changement du fichier"""
+        engine = cls(store.get(), **kwargs)
+        store.subscribe(engine.reload)
+        return engine
+
+    # --- CONSTRUCTION / RESÉLECTION ---
+    def reload(self, config):
+        """Remplace marchés, taux et paramètres (filtres du classement conservés)"""
+        missing = [key for key in REQUIRED_CONFIG_KEYS if key not in config]
+        if missing:
+            raise ConfigError(f"Config invalide, clés manquantes: {', '.join(missing)}")
+
+        with self._lock:
+            # Copies : les mises à jour ne modifient pas la config de l'appelant
+            self.markets = copy.deepcopy(config['markets'])
+            self.forex_rates = copy.deepcopy(config['forex_rates'])
+            self.threshold_pct = config['SEUIL_RENTABILITE_PCT']
+            self.nb_cycles = config.get('NB_CYCLES_PAR_ROTATION', 3)
+            self.max_cycle_hops = config.get('MAX_CYCLE_HOPS', DEFAULT_MAX_HOPS)
+
+            self.market_book = MarketBook(self.markets)
+            self.conversion_table = ConversionTable(self.forex_rates)
+            # Matrice, classement et rapport construits à la première utilisation
+            self._matrix = None
+            self._ranked = None
+            self._report = None
+
+    @property
+    def matrix(self):
+        """RouteMatrix de l'état courant (construite à la demande)"""
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = RouteMatrix.from_market_book(self.market_book, self.conversion_table,
+                                                            self.initial_usdt)
+            return self._matrix
+
+    def _reselect(self):
+        """Classement complet de toutes les paires"""
+        self._ranked = self.matrix.ranked_keys(self.conversion_method, top_n=self.top_n, **self.filters)
+        self.last_scan_stats = self._matrix.last_scan_stats
+        self.stats['full'] += 1
+
+    def _merge(self, positions):
+        """Remplace dans le classement les paires impliquant ces positions"""
+        n = len(self._matrix.currencies)
+        positions = set(positions)
+        cutoff = self._ranked[-1] if self.top_n is not None and len(self._ranked) >= self.top_n else None
+
+        kept = [key for key in self._ranked if not set(divmod(-key[1], n)) & positions]
+        fresh = set()
+        for i in positions:
+            fresh.update(self._matrix.pair_keys_involving(self.conversion_method, i, **self.filters))
+        merged = sorted(set(kept) | fresh, reverse=True)
+
+        if self.top_n is None or cutoff is None:
+            # Toutes les paires candidates étaient suivies : fusion exacte
+            self._ranked = merged if self.top_n is None else merged[:self.top_n]
+        elif len(merged) >= self.top_n and merged[self.top_n - 1] >= cutoff:
+            # Les paires non suivies restent sous la coupure : top_n inchangé ailleurs
+            self._ranked = merged[:self.top_n]
+        else:
+            self._reselect()
+            return
+        self.stats['incremental'] += 1
+
+    # --- API INCRÉMENTALE ---
+    def update_market(self, currency, buy=None, sell=None, fee=None):
+        """
+        Nouveau prix d'achat/vente ou frais pour un marché
+
+        Seules la ligne (sourcing) et la colonne (vente) de la devise sont
+        recalculées ; pour EUR, le coût de réinvestissement est aussi mis à jour.
+        """
+        with self._lock:
+            record = self.market_book.update(currency, buy_price=buy, sell_price=sell, fee_pct=fee)
+            if self._matrix is None:
+                return self.top_routes()
+
+            i = record.position
+            self._matrix.set_record(i, record)
+
+            if currency == 'EUR':
+                eur_cost = record.cost_per_usdt if record.buy_price > 0 else None
+                if self._matrix.set_eur_cost_per_usdt(eur_cost):
+                    self._ranked = None  # Disponibilité EUR changée : resélection
+                    return self.top_routes()
+
+            if self._ranked is not None:
+                self._merge([i])
+            return self.top_routes()
+
+    def update_rate(self, pair, rate_data):
+        """
+        Nouveau taux pour une paire forex (ancien format ou bid/ask)
+
+        Seules les devises dont le taux vers EUR change sont recalculées ;
+        une paire introduisant une devise inconnue recompile tout.
+        """
+        with self._lock:
+            self.forex_rates[pair] = rate_data
+            currencies = self.conversion_table.update_pair(pair, rate_data)
+            if currencies is None:
+                logging.info(f"Paire {pair} inconnue : recompilation complète de la table")
+                self.conversion_table = ConversionTable(self.forex_rates)
+                self._matrix = None
+                self._ranked = None
+                return self.top_routes()
+            if self._matrix is None:
+                return self.top_routes()
+
+            # Les routes directes n'utilisent que les taux vers EUR
+            positions = []
+            if 'EUR' in currencies:
+                positions = [
+                    i for i, currency in enumerate(self._matrix.currencies)
+                    if currency in currencies and currency != 'EUR'
+                ]
+            for i in positions:
+                rates = self.conversion_table.rates_to('EUR', [self._matrix.currencies[i]])[:, 0]
+                self._matrix.set_rates_to_eur(i, rates)
+
+            if positions and self._ranked is not None:
+                self._merge(positions)
+            return self.top_routes()
+
+    # --- LECTURE DU CLASSEMENT SUIVI ---
+    def ranked_pairs(self):
+        """Paires d'index (sourcing, vente) du classement courant"""
+        with self._lock:
+            if self._ranked is None:
+                self._reselect()
+            n = len(self._matrix.currencies)
+            return [divmod(-neg_flat, n) for _, neg_flat in self._ranked]
+
+    def top_routes(self):
+        """RouteRecord du classement courant (détails construits à la demande)"""
+        with self._lock:
+            return [
+                self._matrix.make_record(self.conversion_method, a, b, self.nb_cycles)
+                for a, b in self.ranked_pairs()
+            ]
+
+    # --- VALIDATION ---
+    def validation_report(self, force=False):
+        """ValidationReport de la config du moteur, recalculé si son contenu change"""
+        with self._lock:
+            fingerprint = config_fingerprint(self.markets, self.forex_rates)
+            if force or self._report is None or self._report.fingerprint != fingerprint:
+                self._report = ValidationReport(fingerprint, validate_config_coherence(self.markets, self.forex_rates))
+                logging.debug(f"Config revalidée: {self._report}")
+            return self._report
+
+    # --- CALCUL D'UNE ROUTE ---
+    def calculate_profit_route(self, initial_usdt, sourcing_code, selling_code, conversion_method='forex'):
+        """
+        Route complète sourcing → USDT → vente → EUR → USDT pour un montant donné
+
+        Returns:
+            Dict détaillé de la route (RouteRecord matérialisé), ou None si la
+            route est incalculable
+        """
+        # Validation des entrées
+        if initial_usdt <= 0:
+            logging.warning(f"Montant USDT initial invalide: {initial_usdt}")
+            return None
+        if not math.isfinite(initial_usdt):
+            return None
+
+        if sourcing_code == selling_code:
+            logging.warning(f"Conversion circulaire détectée: {sourcing_code} -> {selling_code}")
+            return None
+
+        with self._lock:
+            try:
+                sourcing_market = self.market_book.record(sourcing_code)
+                selling_market = self.market_book.record(selling_code)
+                eur_market = self.market_book.record("EUR")
+            except ValueError as e:
+                logging.warning(f"Marché non trouvé: {e}")
+                return None
+
+            usdt_start = float(initial_usdt)
+
+            # --- ÉTAPE 1 : COÛT D'ACQUISITION RÉEL EN EUR ---
+            fee_multiplier = 1.0 + sourcing_market.fee_pct / 100.0
+            cost_local = usdt_start * sourcing_market.buy_price * fee_multiplier
+            try:
+                cost_in_eur = cost_local * self.conversion_table.rate(sourcing_code, 'EUR', conversion_method)
+            except ValueError:
+                return None
+            if cost_in_eur <= 0:
+                return None
+
+            # --- ÉTAPE 2 : VENTE EN selling_currency ---
+            revenu_brut_B_local = usdt_start * selling_market.sell_price
+            fee_multiplier_sell = 1.0 - (selling_market.fee_pct / 100.0)  # Frais déduits
+            revenu_net_B_local = revenu_brut_B_local * fee_multiplier_sell
+            if revenu_net_B_local <= 0:
+                return None
+
+            # --- ÉTAPE 3 : CONVERSION vers EUR ---
+            try:
+                revenue_in_eur = revenu_net_B_local * self.conversion_table.rate(selling_code, 'EUR', conversion_method)
+            except ValueError:
+                return None
+            if revenue_in_eur <= 0:
+                return None
+
+            # --- ÉTAPE 4 : RÉINVESTISSEMENT en USDT ---
+            if eur_market.buy_price <= 0:
+                return None
+            final_usdt_amount = revenue_in_eur / eur_market.cost_per_usdt
+            if final_usdt_amount <= 0:
+                return None
+
+        # --- DÉTAILS + PLAN DE VOL (construits par RouteRecord) ---
+        route = RouteRecord(
+            sourcing_code, selling_code, conversion_method,
+            initial_amount_usdt=usdt_start,
+            cost_eur=cost_in_eur,
+            revenue_local=revenu_net_B_local,
+            revenue_eur=revenue_in_eur,
+            final_amount_usdt=final_usdt_amount,
+            nb_cycles=self.nb_cycles
+        )
+        return route.materialize()
+
+    # --- PROFONDEUR DES CARNETS ---
+    def depth_route(self, trade_size, sourcing_code, selling_code, conversion_method=None, min_profit_pct=0.0):
+        """
+        Route évaluée sur les carnets d'ordres pour trade_size USDT
+
+        Returns:
+            DepthRouteRecord (prix moyens d'exécution, taille max rentable
+            au-dessus de min_profit_pct), ou None si la route est incalculable
+        """
+        conversion_method = conversion_method or self.conversion_method
+        if sourcing_code == selling_code or not trade_size > 0:
+            return None
+
+        with self._lock:
+            records = [self.market_book.get(sourcing_code), self.market_book.get(selling_code)]
+            if None in records:
+                logging.warning(f"Marché non trouvé: {sourcing_code} ou {selling_code}")
+                return None
+            matrix = DepthRouteMatrix.from_records(records, self.conversion_table, self.market_book.get('EUR'),
+                                                   trade_size, min_profit_pct)
+
+        m = method_index(conversion_method)
+        if not (matrix.valid_sourcing[m, 0] and matrix.valid_selling[m, 1]):
+            return None
+        return matrix.make_record(conversion_method, 0, 1, self.nb_cycles)
+
+    # --- BALAYAGE DE CAPITAL ---
+    def sweep_capital(self, amounts, pairs=None, conversion_method=None):
+        """
+        calculate_profit_route() vectorisé sur des montants × paires
+
+        Returns:
+            CapitalSweep (profit_usdt, profit_pct, final_amount_usdt en
+            tableaux (nb_montants, nb_paires), NaN si route incalculable)
+        """
+        with self._lock:
+            return sweep_capital(self.matrix, amounts, pairs, conversion_method or self.conversion_method)
+
+    # --- RECHERCHE AD HOC ---
+    def find_routes(self, top_n=5, skip_validation=False, apply_threshold=True,
+                    sourcing_currency=None, excluded_markets=None, loop_currency=None,
+                    conversion_method=None, search_mode='direct', max_hops=None, trade_size=None):
+        """
+        Meilleures routes de la config du moteur pour des filtres donnés
+
+        Mêmes paramètres que find_routes_with_filters() ; conversion_method
+        vaut par défaut celle du moteur. Une config avec erreurs critiques
+        renvoie une liste vide.
+
+        Returns:
+            Liste de RouteRecord (ou CycleRecord en mode 'cycles',
+            DepthRouteRecord avec trade_size) triés par profitabilité
+            décroissante
+        """
+        conversion_method = conversion_method or self.conversion_method
+        threshold = self.threshold_pct if apply_threshold else None
+        excluded_markets = excluded_markets or []
+
+        with self._lock:
+            if not skip_validation:
+                report = self.validation_report()
+                if report.is_blocking:
+                    logging.error(f"Validation échouée: {len(report.critical_errors)} erreurs critiques détectées")
+                    return []
+                if report.warnings:
+                    logging.info(f"{len(report.warnings)} avertissements détectés (non bloquants)")
+
+            if len(self.markets) < 2:
+                logging.error("Pas assez de marchés configurés")
+                return []
+
+            # ========== RECHERCHE MULTI-SAUTS (GRAPHE DES DEVISES) ==========
+            if search_mode == 'cycles':
+                graph = CurrencyGraph(self.market_book, self.conversion_table, conversion_method)
+                max_hops = self.max_cycle_hops if max_hops is None else max_hops
+                for path, profit in graph.negative_cycles(max_hops=max_hops):
+                    logging.info(f"Cycle forex rentable détecté : {' → '.join(path)} ({profit:+.2f}%)")
+                cycles = graph.ranked_cycles(
+                    max_hops=max_hops,
+                    top_n=top_n,
+                    sourcing_currency=sourcing_currency,
+                    excluded_markets=excluded_markets,
+                    loop_currency=loop_currency,
+                    threshold=threshold,
+                    nb_cycles=self.nb_cycles
+                )
+                if not cycles:
+                    logging.warning("Aucun cycle rentable trouvé")
+                return cycles
+
+            # ========== RECHERCHE DIRECTE (MATRICE VECTORISÉE) ==========
+            if trade_size is None:
+                matrix = self.matrix
+            else:
+                # Prix moyens d'exécution lus dans les carnets pour cette taille
+                matrix = DepthRouteMatrix.from_market_book(self.market_book, self.conversion_table, trade_size,
+                                                           threshold or 0.0)
+            nb_valid_pairs = matrix.count_valid_pairs(conversion_method)
+            if nb_valid_pairs == 0:
+                logging.warning("Aucune route valide trouvée")
+                return []
+
+            ranked_pairs = matrix.ranked_pairs(
+                conversion_method,
+                top_n=top_n,
+                sourcing_currency=sourcing_currency,
+                excluded_markets=excluded_markets,
+                loop_currency=loop_currency,
+                threshold=threshold
+            )
+            self.last_scan_stats = matrix.last_scan_stats
+
+            # Enregistrements numériques légers : détails et plan de vol construits
+            # à la demande, uniquement pour les routes effectivement affichées/choisies
+            routes = [matrix.make_record(conversion_method, a, b, self.nb_cycles) for a, b in ranked_pairs]
+
+        logging.debug(f"{len(routes)} routes retenues sur {nb_valid_pairs} paires calculables "
+                      f"({self.last_scan_stats['pairs_evaluated']} évaluées, "
+                      f"{self.last_scan_stats['pairs_pruned']} élaguées)")
+        return routes
@@ -0,0 +1,346 @@
+# route_matrix.py
+
+import heapq
+
+import numpy as np
+
+from src.engine.conversion_table import CONVERSION_METHODS, method_index
+from src.engine.market_book import MarketBook
+from src.engine.route_record import RouteRecord
+
+# --- CONSTANTES DU MOTEUR VECTORISÉ ---
+REFERENCE_USDT = 1000
+
+# Bornes d'anomalie : pertes > 90% ou profits > 1000% = données suspectes
+ANOMALY_MIN_PROFIT_PCT = -90
+ANOMALY_MAX_PROFIT_PCT = 1000
+
+
+class RouteMatrix:
+    """
+    Matrice N×N des marges (sourcing × vente) calculée en une seule passe NumPy
+
+    Les prix, frais et taux vers EUR sont chargés une fois dans des tableaux ;
+    profit_pct[m, a, b] reproduit exactement calculate_profit_route() pour la
+    méthode m, le marché de sourcing a et le marché de vente b.
+    """
+
+    def __init__(self, currencies, buy_prices, sell_prices, fees_pct, rates_to_eur,
+                 eur_cost_per_usdt, initial_usdt=REFERENCE_USDT):
+        self.currencies = list(currencies)
+        self.index = {}
+        for i, currency in enumerate(self.currencies):
+            self.index.setdefault(currency, i)
+
+        self.initial_usdt = float(initial_usdt)
+        # Copies : les mises à jour incrémentales ne touchent pas aux tableaux sources
+        self.buy_prices = np.array(buy_prices, dtype=float)
+        self.sell_prices = np.array(sell_prices, dtype=float)
+        self.fees_pct = np.array(fees_pct, dtype=float)
+        self.rates_to_eur = np.array(rates_to_eur, dtype=float).reshape(len(CONVERSION_METHODS), -1)
+        self.eur_cost_per_usdt = eur_cost_per_usdt
+
+        cost_local, self.revenue_local = self._local_amounts(slice(None))
+
+        self.cost_eur = cost_local * self.rates_to_eur                # (méthodes, N)
+        self.revenue_eur = self.revenue_local * self.rates_to_eur     # (méthodes, N)
+
+        # Validité par devise : une paire (a, b) est calculable si a peut sourcer et b vendre
+        with np.errstate(invalid='ignore'):
+            self.valid_sourcing = (self.cost_eur > 0) & np.isfinite(self.cost_eur)
+            self.valid_selling = ((self.revenue_local > 0) & (self.revenue_eur > 0)
+                                  & np.isfinite(self.revenue_eur))
+
+        if not self.eur_available:
+            self.valid_sourcing[:] = False
+            self.valid_selling[:] = False
+
+        self._profit_pct = None
+        self._valid = None
+        # Compteurs du dernier ranked_keys() : paires évaluées vs élaguées
+        self.last_scan_stats = None
+
+    @property
+    def eur_available(self):
+        """Réinvestissement possible (marché EUR présent avec un prix > 0)"""
+        return self.eur_cost_per_usdt is not None and self.eur_cost_per_usdt > 0
+
+    def _local_amounts(self, i):
+        """
+        Coût d'achat (frais compris) et revenu de vente net en monnaie locale
+        pour initial_usdt, positions i (index ou slice)
+        """
+        # Même ordre d'opérations que calculate_profit_route() → résultats identiques au bit près
+        cost_local = (self.initial_usdt * self.buy_prices[i]) * (1.0 + self.fees_pct[i] / 100.0)
+        revenue_local = (self.initial_usdt * self.sell_prices[i]) * (1.0 - self.fees_pct[i] / 100.0)
+        return cost_local, revenue_local
+
+    # --- MISES À JOUR INCRÉMENTALES (une seule devise recalculée) ---
+    def _refresh(self, i):
+        """Recalcule coûts, revenus et validité de la devise i uniquement"""
+        cost_local, self.revenue_local[i] = self._local_amounts(i)
+        self.cost_eur[:, i] = cost_local * self.rates_to_eur[:, i]
+        self.revenue_eur[:, i] = self.revenue_local[i] * self.rates_to_eur[:, i]
+
+        with np.errstate(invalid='ignore'):
+            self.valid_sourcing[:, i] = (self.cost_eur[:, i] > 0) & np.isfinite(self.cost_eur[:, i])
+            self.valid_selling[:, i] = ((self.revenue_local[i] > 0) & (self.revenue_eur[:, i] > 0)
+                                        & np.isfinite(self.revenue_eur[:, i]))
+        if not self.eur_available:
+            self.valid_sourcing[:, i] = False
+            self.valid_selling[:, i] = False
+
+        self._profit_pct = None
+        self._valid = None
+
+    def set_market(self, i, buy_price, sell_price, fee_pct):
+        """Nouveaux prix/frais pour la position i"""
+        self.buy_prices[i] = buy_price
+        self.sell_prices[i] = sell_price
+        self.fees_pct[i] = fee_pct
+        self._refresh(i)
+
+    def set_record(self, i, record):
+        """Position i mise à jour depuis son MarketRecord"""
+        self.set_market(i, record.buy_price, record.sell_price, record.fee_pct)
+
+    def set_rates_to_eur(self, i, rates):
+        """Nouveaux taux vers EUR (un par méthode) pour la position i"""
+        self.rates_to_eur[:, i] = rates
+        self._refresh(i)
+
+    def set_eur_cost_per_usdt(self, eur_cost_per_usdt):
+        """
+        Nouveau coût d'1 USDT en EUR
+
+        Returns:
+            True si la disponibilité du réinvestissement a changé (toutes les
+            paires sont alors à réévaluer), False sinon
+        """
+        was_available = self.eur_available
+        self.eur_cost_per_usdt = eur_cost_per_usdt
+        if self.eur_available == was_available:
+            return False
+        for i in range(len(self.currencies)):
+            self._refresh(i)
+        return True
+
+    # --- MATRICES COMPLÈTES (analyse uniquement, jamais construites par le scan) ---
+    @property
+    def profit_pct(self):
+        """Matrice (méthodes, N, N) des marges, construite à la demande"""
+        if self._profit_pct is None:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                self._profit_pct = ((self.revenue_eur[:, None, :] - self.cost_eur[:, :, None])
+                                    / self.cost_eur[:, :, None]) * 100
+        return self._profit_pct
+
+    @property
+    def valid(self):
+        """Masque (méthodes, N, N) des paires calculables, construit à la demande"""
+        if self._valid is None:
+            n = len(self.currencies)
+            self._valid = (self.valid_sourcing[:, :, None] & self.valid_selling[:, None, :]
+                           & ~np.eye(n, dtype=bool)[None, :, :]
+                           & np.isfinite(self.profit_pct))
+        return self._valid
+
+    def count_valid_pairs(self, conversion_method='forex'):
+        """Nombre de paires calculables, sans construire la matrice"""
+        m = method_index(conversion_method)
+        both = int((self.valid_sourcing[m] & self.valid_selling[m]).sum())
+        return int(self.valid_sourcing[m].sum()) * int(self.valid_selling[m].sum()) - both
+
+    def profit_row(self, conversion_method, a):
+        """Marges de toutes les ventes pour le sourcing a (vecteur de taille N)"""
+        m = method_index(conversion_method)
+        cost = self.cost_eur[m, a]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return ((self.revenue_eur[m] - cost) / cost) * 100
+
+    @classmethod
+    def from_markets(cls, markets_list, conversion_table, initial_usdt=REFERENCE_USDT):
+        """Construit la matrice depuis la liste de marchés de config.json"""
+        return cls.from_market_book(MarketBook(markets_list), conversion_table, initial_usdt)
+
+    @classmethod
+    def from_market_book(cls, market_book, conversion_table, initial_usdt=REFERENCE_USDT):
+        """
+        Construit la matrice depuis un MarketBook (tableaux déjà validés)
+
+        Args:
+            conversion_table: ConversionTable compilée depuis forex_rates
+        """
+        rates = conversion_table.rates_to('EUR', market_book.currencies)
+
+        eur_market = market_book.get('EUR')
+        eur_cost_per_usdt = None
+        if eur_market is not None and eur_market.buy_price > 0:
+            eur_cost_per_usdt = eur_market.cost_per_usdt
+
+        return cls(
+            market_book.currencies,
+            market_book.buy_prices,
+            market_book.sell_prices,
+            market_book.fees_pct,
+            rates,
+            eur_cost_per_usdt,
+            initial_usdt
+        )
+
+    def _selling_columns(self, m, excluded_markets, loop_currency):
+        """Colonnes autorisées comme marché de vente (bouclage forcé prioritaire)"""
+        columns = self.valid_selling[m].copy()
+        if excluded_markets:
+            columns &= np.array([
+                not (c in excluded_markets and not (loop_currency and c == loop_currency))
+                for c in self.currencies
+            ], dtype=bool)
+        return columns
+
+    def profit_column(self, conversion_method, b):
+        """Marges de tous les sourcings pour la vente b (vecteur de taille N)"""
+        m = method_index(conversion_method)
+        cost = self.cost_eur[m]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return ((self.revenue_eur[m, b] - cost) / cost) * 100
+
+    def _sourcing_rows(self, m, sourcing_currency):
+        """Lignes autorisées comme marché de sourcing"""
+        rows = self.valid_sourcing[m].copy()
+        if sourcing_currency:
+            rows &= np.array([c == sourcing_currency for c in self.currencies], dtype=bool)
+        return rows
+
+    def pair_keys_involving(self, conversion_method, i, sourcing_currency=None,
+                            excluded_markets=None, loop_currency=None, threshold=None):
+        """
+        Clés de classement (marge, -index à plat) des paires candidates
+        impliquant la position i (ligne i + colonne i), mêmes filtres que
+        ranked_pairs()
+        """
+        m = method_index(conversion_method)
+        n = len(self.currencies)
+        rows = self._sourcing_rows(m, sourcing_currency)
+        columns = self._selling_columns(m, excluded_markets, loop_currency)
+        lower_bound = ANOMALY_MIN_PROFIT_PCT if threshold is None else max(ANOMALY_MIN_PROFIT_PCT, threshold)
+
+        keys = []
+        if rows[i]:
+            profit = self.profit_row(conversion_method, i)
+            with np.errstate(invalid='ignore'):
+                keep = columns & (profit >= lower_bound) & (profit <= ANOMALY_MAX_PROFIT_PCT)
+            keep[i] = False
+            for b, value in zip(np.flatnonzero(keep).tolist(), profit[keep].tolist()):
+                keys.append((value, -(i * n + b)))
+
+        if columns[i]:
+            profit = self.profit_column(conversion_method, i)
+            with np.errstate(invalid='ignore'):
+                keep = rows & (profit >= lower_bound) & (profit <= ANOMALY_MAX_PROFIT_PCT)
+            keep[i] = False
+            for a, value in zip(np.flatnonzero(keep).tolist(), profit[keep].tolist()):
+                keys.append((value, -(a * n + i)))
+
+        return keys
+
+    def ranked_pairs(self, conversion_method='forex', top_n=None, sourcing_currency=None,
+                     excluded_markets=None, loop_currency=None, threshold=None):
+        """Top_n paires d'index (sourcing, vente), de la meilleure à la pire"""
+        n = len(self.currencies)
+        keys = self.ranked_keys(conversion_method, top_n, sourcing_currency,
+                                excluded_markets, loop_currency, threshold)
+        return [divmod(-neg_flat, n) for _, neg_flat in keys]
+
+    def ranked_keys(self, conversion_method='forex', top_n=None, sourcing_currency=None,
+                    excluded_markets=None, loop_currency=None, threshold=None):
+        """
+        Sélection en flux des clés (marge, -index à plat) des top_n paires
+
+        Les lignes sont générées une à une : les candidats hors bornes d'anomalie
+        ou sous le seuil sont rejetés immédiatement, puis seuls ceux qui battent
+        le dernier du tas borné (taille top_n) y entrent. Mémoire O(N + top_n),
+        aucun tri global. En cas d'égalité, l'ordre de config.json est conservé.
+
+        Séparation-évaluation : la marge d'une ligne est majorée par celle
+        obtenue avec le meilleur revenu EUR des colonnes autorisées. Une ligne
+        dont ce majorant n'atteint ni le seuil ni la coupure courante du tas
+        n'est pas évaluée. Les lignes sont parcourues du coût d'acquisition le
+        plus bas au plus haut pour que la coupure monte vite. Compteurs dans
+        last_scan_stats.
+
+        Args:
+            threshold: seuil de rentabilité (%) ou None pour ne pas l'appliquer
+        """
+        self.last_scan_stats = {'pairs_evaluated': 0, 'pairs_pruned': 0, 'rows_pruned': 0}
+        if top_n is not None and top_n <= 0:
+            return []
+
+        m = method_index(conversion_method)
+        n = len(self.currencies)
+        columns = self._selling_columns(m, excluded_markets, loop_currency)
+        lower_bound = ANOMALY_MIN_PROFIT_PCT if threshold is None else max(ANOMALY_MIN_PROFIT_PCT, threshold)
+
+        rows = np.flatnonzero(self._sourcing_rows(m, sourcing_currency))
+        nb_columns = int(columns.sum())
+        if len(rows) == 0 or nb_columns == 0:
+            return []
+
+        # Majorants par ligne : même formule que profit_row() sur le meilleur revenu
+        # (opérations flottantes monotones → majorant exact de toute la ligne)
+        best_revenue = self.revenue_eur[m][columns].max()
+        costs = self.cost_eur[m, rows]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            row_bounds = ((best_revenue - costs) / costs) * 100
+        order = np.argsort(costs, kind='stable')
+
+        # Tas min : (marge, -index à plat) → la racine est la pire route retenue
+        heap = []
+        ordered_rows = rows[order]
+        for position, (a, bound) in enumerate(zip(ordered_rows.tolist(), row_bounds[order].tolist())):
+            cutoff = heap[0][0] if top_n is not None and len(heap) >= top_n else lower_bound
+            if bound < max(lower_bound, cutoff):
+                # Coûts croissants → majorants décroissants : toutes les lignes
+                # restantes sont élaguées
+                remaining = ordered_rows[position:]
+                self.last_scan_stats['rows_pruned'] = len(remaining)
+                self.last_scan_stats['pairs_pruned'] = nb_columns * len(remaining) - int(columns[remaining].sum())
+                break
+            self.last_scan_stats['pairs_evaluated'] += nb_columns - int(columns[a])
+
+            profit = self.profit_row(conversion_method, a)
+            with np.errstate(invalid='ignore'):
+                keep = columns & (profit >= lower_bound) & (profit <= ANOMALY_MAX_PROFIT_PCT)
+                if top_n is not None and len(heap) >= top_n:
+                    keep &= profit >= heap[0][0]
+            keep[a] = False
+
+            candidates = np.flatnonzero(keep)
+            if top_n is not None and len(candidates) > top_n:
+                # Seuls les top_n meilleurs de la ligne peuvent entrer dans le tas ;
+                # tri stable : à marge égale, l'ordre de config.json départage
+                best = np.argsort(-profit[candidates], kind='stable')[:top_n]
+                candidates = candidates[best]
+
+            for b, value in zip(candidates.tolist(), profit[candidates].tolist()):
+                key = (value, -(a * n + b))
+                if top_n is None or len(heap) < top_n:
+                    heapq.heappush(heap, key)
+                elif key > heap[0]:
+                    heapq.heapreplace(heap, key)
+
+        return sorted(heap, reverse=True)
+
+    def make_record(self, conversion_method, a, b, nb_cycles):
+        """RouteRecord numérique de la paire (a, b), sans détails ni plan de vol"""
+        m = method_index(conversion_method)
+        revenue_eur = float(self.revenue_eur[m, b])
+        return RouteRecord(
+            self.currencies[a], self.currencies[b], conversion_method,
+            initial_amount_usdt=self.initial_usdt,
+            cost_eur=float(self.cost_eur[m, a]),
+            revenue_local=float(self.revenue_local[b]),
+            revenue_eur=revenue_eur,
+            final_amount_usdt=revenue_eur / self.eur_cost_per_usdt,
+            nb_cycles=nb_cycles
+        )
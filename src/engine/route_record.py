@@ -0,0 +1,255 @@
+# route_record.py
+
+from collections.abc import Mapping
+
+# Ordre des clés du dictionnaire historique de calculate_profit_route()
+ROUTE_KEYS = (
+    "sourcing_market_code",
+    "selling_market_code",
+    "conversion_method",
+    "detailed_route",
+    "profit_pct",
+    "profit_usdt",
+    "final_amount_usdt",
+    "initial_amount_usdt",
+    "cost_eur",
+    "revenue_eur",
+    "details",
+    "plan_de_vol",
+)
+
+
+def build_route_str(sourcing_code, selling_code):
+    """Libellé lisible de la route"""
+    return f"{sourcing_code}'(DC)' → USDT → {selling_code} → EUR → USDT"
+
+
+def build_plan_de_vol(sourcing_code, selling_code, nb_cycles):
+    """Plan de vol complet : 3 phases par cycle + clôture"""
+    plan = {'phases': []}
+
+    # Cycle 1
+    plan['phases'].append({'cycle': 1, 'phase_in_cycle': 1, 'type': 'ACHAT', 'market': sourcing_code, 'description': f"Sourcing initial en {sourcing_code}"})
+    plan['phases'].append({'cycle': 1, 'phase_in_cycle': 2, 'type': 'VENTE', 'market': selling_code, 'description': f"Vente en {selling_code}"})
+    plan['phases'].append({'cycle': 1, 'phase_in_cycle': 3, 'type': 'CONVERSION', 'market_from': selling_code, 'market_to': 'EUR', 'description': f"Conversion {selling_code}→EUR"})
+
+    # Cycles suivants
+    for i in range(2, nb_cycles + 1):
+        plan['phases'].append({'cycle': i, 'phase_in_cycle': 1, 'type': 'ACHAT', 'market': 'EUR', 'description': f"Réinvestissement cycle {i}"})
+        plan['phases'].append({'cycle': i, 'phase_in_cycle': 2, 'type': 'VENTE', 'market': selling_code, 'description': f"Vente cycle {i}"})
+        plan['phases'].append({'cycle': i, 'phase_in_cycle': 3, 'type': 'CONVERSION', 'market_from': selling_code, 'market_to': 'EUR', 'description': f"Conversion cycle {i}"})
+
+    plan['phases'].append({'cycle': nb_cycles, 'phase_in_cycle': 4, 'type': 'CLOTURE', 'market': 'EUR', 'description': "Clôture"})
+
+    return plan
+
+
+class RouteRecord(Mapping):
+    """
+    Route légère : uniquement les valeurs numériques
+
+    detailed_route, details et plan_de_vol ne sont construits qu'au premier
+    accès (puis mémorisés). Se lit comme le dict historique (route['profit_pct'],
+    route.get(...)) ; materialize() retourne un vrai dict sérialisable en JSON.
+    """
+
+    __slots__ = (
+        'sourcing_market_code', 'selling_market_code', 'conversion_method',
+        'profit_pct', 'profit_usdt', 'final_amount_usdt', 'initial_amount_usdt',
+        'cost_eur', 'revenue_eur', 'revenue_local', 'nb_cycles',
+        '_detailed_route', '_details', '_plan_de_vol',
+    )
+
+    # Clés exposées en lecture type dict (étendues par les sous-classes)
+    _keys = ROUTE_KEYS
+
+    def __init__(self, sourcing_market_code, selling_market_code, conversion_method,
+                 initial_amount_usdt, cost_eur, revenue_local, revenue_eur,
+                 final_amount_usdt, nb_cycles):
+        self.sourcing_market_code = sourcing_market_code
+        self.selling_market_code = selling_market_code
+        self.conversion_method = conversion_method
+        self.initial_amount_usdt = initial_amount_usdt
+        self.cost_eur = cost_eur
+        self.revenue_local = revenue_local
+        self.revenue_eur = revenue_eur
+        self.final_amount_usdt = final_amount_usdt
+        self.profit_usdt = final_amount_usdt - initial_amount_usdt
+        self.profit_pct = ((revenue_eur - cost_eur) / cost_eur) * 100 if cost_eur > 0 else 0
+        self.nb_cycles = nb_cycles
+        self._detailed_route = None
+        self._details = None
+        self._plan_de_vol = None
+
+    # --- CHAMPS CONSTRUITS À LA DEMANDE ---
+    @property
+    def detailed_route(self):
+        if self._detailed_route is None:
+            self._detailed_route = build_route_str(self.sourcing_market_code, self.selling_market_code)
+        return self._detailed_route
+
+    @property
+    def details(self):
+        if self._details is None:
+            usdt = self.initial_amount_usdt
+            self._details = {
+                "Phase 1 (Sourcing)": f"Achat {usdt:.2f} USDT en {self.sourcing_market_code} = {self.cost_eur:.2f} EUR",
+                "Phase 2 (Vente)": f"Vente {usdt:.2f} USDT = {self.revenue_local:.2f} {self.selling_market_code}",
+                "Phase 3 (Conversion)": f"{self.revenue_local:.2f} {self.selling_market_code} → {self.revenue_eur:.2f} EUR",
+                "Phase 4 (Réinvest)": f"{self.revenue_eur:.2f} EUR → {self.final_amount_usdt:.2f} USDT",
+            }
+        return self._details
+
+    @property
+    def plan_de_vol(self):
+        if self._plan_de_vol is None:
+            self._plan_de_vol = build_plan_de_vol(self.sourcing_market_code, self.selling_market_code, self.nb_cycles)
+        return self._plan_de_vol
+
+    # --- INTERFACE MAPPING (compatibilité dict) ---
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def materialize(self):
+        """Dict complet (détails et plan de vol compris), prêt pour json.dump"""
+        return {key: getattr(self, key) for key in self._keys}
+
+    def __repr__(self):
+        return (f"RouteRecord({self.sourcing_market_code}→{self.selling_market_code}, "
+                f"{self.conversion_method}, {self.profit_pct:.2f}%)")
+
+
+# Clés des routes évaluées sur la profondeur : forme historique + exécution
+DEPTH_ROUTE_KEYS = ROUTE_KEYS + ("buy_vwap", "sell_vwap", "max_profitable_size")
+
+
+class DepthRouteRecord(RouteRecord):
+    """
+    RouteRecord évaluée sur les carnets d'ordres (taille = initial_amount_usdt)
+
+    buy_vwap / sell_vwap : prix moyens d'exécution en monnaie locale ;
+    max_profitable_size : plus grande taille (USDT) encore rentable, None si
+    la liquidité est illimitée des deux côtés.
+    """
+
+    __slots__ = ('buy_vwap', 'sell_vwap', 'max_profitable_size')
+
+    _keys = DEPTH_ROUTE_KEYS
+
+    def __init__(self, sourcing_market_code, selling_market_code, conversion_method,
+                 initial_amount_usdt, cost_eur, revenue_local, revenue_eur,
+                 final_amount_usdt, nb_cycles, buy_vwap, sell_vwap, max_profitable_size):
+        super().__init__(sourcing_market_code, selling_market_code, conversion_method,
+                         initial_amount_usdt, cost_eur, revenue_local, revenue_eur,
+                         final_amount_usdt, nb_cycles)
+        self.buy_vwap = buy_vwap
+        self.sell_vwap = sell_vwap
+        self.max_profitable_size = max_profitable_size
+
+
+# Clés des cycles multi-sauts : forme historique + chemin complet
+CYCLE_KEYS = ROUTE_KEYS + ("cycle_path", "nb_hops")
+
+
+def build_cycle_plan_de_vol(cycle_path, nb_cycles):
+    """Plan de vol d'un cycle : achat, vente puis une conversion par saut forex"""
+    sourcing_code, selling_code = cycle_path[0], cycle_path[1]
+    conversions = list(zip(cycle_path[1:-1], cycle_path[2:]))
+    plan = {'phases': []}
+
+    for i in range(1, nb_cycles + 1):
+        description = f"Sourcing initial en {sourcing_code}" if i == 1 else f"Réinvestissement cycle {i}"
+        plan['phases'].append({'cycle': i, 'phase_in_cycle': 1, 'type': 'ACHAT', 'market': sourcing_code, 'description': description})
+        plan['phases'].append({'cycle': i, 'phase_in_cycle': 2, 'type': 'VENTE', 'market': selling_code, 'description': f"Vente en {selling_code}"})
+        for k, (market_from, market_to) in enumerate(conversions, 3):
+            plan['phases'].append({'cycle': i, 'phase_in_cycle': k, 'type': 'CONVERSION', 'market_from': market_from, 'market_to': market_to, 'description': f"Conversion {market_from}→{market_to}"})
+
+    plan['phases'].append({'cycle': nb_cycles, 'phase_in_cycle': 3 + len(conversions), 'type': 'CLOTURE', 'market': sourcing_code, 'description': "Clôture"})
+
+    return plan
+
+
+class CycleRecord(RouteRecord):
+    """
+    Cycle multi-sauts : USDT achetés en A → vendus en B → conversions forex → A
+
+    Même lecture que RouteRecord (clés historiques + cycle_path, nb_hops) ;
+    detailed_route, details et plan_de_vol sont construits à la demande.
+    """
+
+    __slots__ = ('cycle_path', 'leg_values')
+
+    _keys = CYCLE_KEYS
+
+    def __init__(self, cycle_path, conversion_method, initial_amount_usdt, leg_values,
+                 final_amount_usdt, cost_eur, revenue_eur, nb_cycles):
+        # leg_values : montant détenu après chaque étape, aligné sur cycle_path
+        self.cycle_path = cycle_path
+        self.sourcing_market_code = cycle_path[0]
+        self.selling_market_code = cycle_path[1]
+        self.conversion_method = conversion_method
+        self.initial_amount_usdt = initial_amount_usdt
+        self.leg_values = leg_values
+        self.revenue_local = leg_values[1]
+        self.final_amount_usdt = final_amount_usdt
+        self.profit_usdt = final_amount_usdt - initial_amount_usdt
+        self.profit_pct = (self.profit_usdt / initial_amount_usdt) * 100 if initial_amount_usdt > 0 else 0
+        self.cost_eur = cost_eur
+        self.revenue_eur = revenue_eur
+        self.nb_cycles = nb_cycles
+        self._detailed_route = None
+        self._details = None
+        self._plan_de_vol = None
+
+    @property
+    def leg_amounts(self):
+        """(devise, montant) après chaque étape du cycle"""
+        return list(zip(self.cycle_path, self.leg_values))
+
+    @property
+    def nb_hops(self):
+        """Nombre d'arêtes du cycle (achat + vente + sauts forex)"""
+        return len(self.cycle_path)
+
+    # --- CHAMPS CONSTRUITS À LA DEMANDE ---
+    @property
+    def detailed_route(self):
+        if self._detailed_route is None:
+            self._detailed_route = " → ".join([self.sourcing_market_code, "USDT"] + self.cycle_path[1:])
+        return self._detailed_route
+
+    @property
+    def details(self):
+        if self._details is None:
+            usdt = self.initial_amount_usdt
+            legs = self.leg_amounts
+            (start_code, start_amount), (sell_code, sell_amount) = legs[0], legs[1]
+            self._details = {
+                "Phase 1 (Sourcing)": f"Achat {usdt:.2f} USDT en {start_code} = {start_amount:.2f} {start_code}",
+                "Phase 2 (Vente)": f"Vente {usdt:.2f} USDT = {sell_amount:.2f} {sell_code}",
+            }
+            for k, ((code_from, amount_from), (code_to, amount_to)) in enumerate(zip(legs[1:-1], legs[2:]), 3):
+                self._details[f"Phase {k} (Conversion)"] = f"{amount_from:.2f} {code_from} → {amount_to:.2f} {code_to}"
+            end_code, end_amount = legs[-1]
+            self._details["Réinvest"] = f"{end_amount:.2f} {end_code} → {self.final_amount_usdt:.2f} USDT"
+        return self._details
+
+    @property
+    def plan_de_vol(self):
+        if self._plan_de_vol is None:
+            self._plan_de_vol = build_cycle_plan_de_vol(self.cycle_path, self.nb_cycles)
+        return self._plan_de_vol
+
+    def __repr__(self):
+        return f"CycleRecord({self.detailed_route}, {self.conversion_method}, {self.profit_pct:.2f}%)"
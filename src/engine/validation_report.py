@@ -0,0 +1,182 @@
+# validation_report.py
+
+import hashlib
+import logging
+
+from src.engine.conversion_table import rates_fingerprint
+from src.engine.market_book import markets_fingerprint
+
+# Types d'alertes bloquantes pour la recherche de routes
+CRITICAL_ALERT_TYPES = ('TAUX_MANQUANT', 'SPREAD_INVERSE')
+
+
+def config_fingerprint(markets_list, forex_rates):
+    """Empreinte combinée marchés + taux (clé du cache de validation)"""
+    combined = markets_fingerprint(markets_list) + rates_fingerprint(forex_rates)
+    return hashlib.sha256(combined.encode('utf-8')).hexdigest()
+
+
+def validate_config_coherence(markets, forex_rates):
+
+    """Valide la cohérence des taux de change et prix de marché"""
+    alerts = []
+    # ========== VALIDATION PRIX NÉGATIFS ==========
+    for market in markets:
+        currency = market.get('currency', 'INCONNU')
+
+        # Vérifier buy_price
+        buy_price = market.get('buy_price', 0)
+        if buy_price < 0:
+            alerts.append({
+                'type': 'PRIX_NEGATIF',
+                'severity': 'ERROR',
+                'currency': currency,
+                'message': f"{currency}: Prix d'achat négatif ({buy_price:.4f}) - INVALIDE. Vérifiez config.json"
+            })
+
+        # Vérifier sell_price
+        sell_price = market.get('sell_price', 0)
+        if sell_price < 0:
+            alerts.append({
+                'type': 'PRIX_NEGATIF',
+                'severity': 'ERROR',
+                'message': f"{currency}: Prix de vente négatif ({sell_price:.4f}) - INVALIDE. Vérifiez config.json",
+                'severity': 'ERROR',
+            })
+
+
+        # Vérifier fee_pct
+        fee_pct = market.get('fee_pct', 0)
+        if fee_pct < 0:
+            alerts.append({
+                'type': 'FRAIS_NEGATIFS',
+                'severity': 'ERROR',
+                'currency': currency,
+                'message': f"{currency}: Frais négatifs ({fee_pct:.2f}%) - INVALIDE. Vérifiez config.json"
+            })
+
+    # ========== VALIDATION TAUX FOREX NÉGATIFS ==========
+    for pair, rate_data in forex_rates.items():
+        # Support ancien format (nombre simple)
+        if isinstance(rate_data, (int, float)):
+            if rate_data < 0:
+                alerts.append({
+                    'type': 'TAUX_NEGATIF',
+                    'severity': 'ERROR',
+                    'currency': currency,
+                    'message': f"{pair}: Taux de change négatif ({rate_data:.4f}) - INVALIDE. Vérifiez config.json"
+                })
+        # Nouveau format (bid/ask/bank_spread_pct)
+        elif isinstance(rate_data, dict):
+            if rate_data.get('bid', 0) < 0:
+                alerts.append({
+                    'type': 'TAUX_NEGATIF',
+                    'severity': 'ERROR',
+                    'currency': currency,
+                    'message': f"{pair}: Taux bid négatif ({rate_data['bid']:.4f}) - INVALIDE. Vérifiez config.json"
+                })
+            if rate_data.get('ask', 0) < 0:
+                alerts.append({
+                    'type': 'TAUX_NEGATIF',
+                    'severity': 'ERROR',
+                    'currency': currency,
+                    'message': f"{pair}: Taux ask négatif ({rate_data['ask']:.4f}) - INVALIDE. Vérifiez config.json"
+                })
+            if rate_data.get('bank_spread_pct', 0) < 0:
+                alerts.append({
+                    'type': 'SPREAD_NEGATIF',
+                    'severity': 'ERROR',
+                    'currency': currency,
+                    'message': f"{pair}: Spread bancaire négatif ({rate_data['bank_spread_pct']:.2f}%) - INVALIDE"
+                })
+    # Détecter le pivot (devise la plus présente dans forex_rates)
+    pivot_counts = {}
+    for pair in forex_rates.keys():
+        for curr in pair.split('/'):
+            pivot_counts[curr] = pivot_counts.get(curr, 0) + 1
+
+    pivot = max(pivot_counts, key=pivot_counts.get) if pivot_counts else 'EUR'
+
+    logging.info(f"Devise pivot détectée : {pivot}")
+
+    # Vérifier que chaque devise de marché a un taux vers le pivot
+    for market in markets:
+        currency = market['currency']
+        if currency == pivot:
+            continue
+
+        pair_to_pivot = f"{currency}/{pivot}"
+        pair_from_pivot = f"{pivot}/{currency}"
+
+        has_rate = (pair_to_pivot in forex_rates or pair_from_pivot in forex_rates)
+
+        if not has_rate:
+            alerts.append({
+                'type': 'TAUX_MANQUANT',
+                'severity': 'ERROR',
+                'message': f"{currency} non relié au pivot {pivot}"
+            })
+
+    # Vérifier les écarts buy/sell
+    for market in markets:
+        if market.get('buy_price', 0) > 0 and market.get('sell_price', 0) > 0:
+            spread_pct = ((market['buy_price'] - market['sell_price']) / market['sell_price']) * 100
+            logging.debug(f"{market['currency']}: spread {spread_pct:.2f}%")
+            # Spread inversé EXTRÊME (> 10%) = Erreur manifeste
+            if spread_pct < -10:
+                alerts.append({
+                    'type': 'SPREAD_INVERSE',
+                    'severity': 'ERROR',
+                    'message': f"{market['currency']}: Spread inversé extrême ({spread_pct:.2f}%) - Vérifiez buy_price/sell_price dans config.json"
+                })
+            # Spread inversé léger (anomalie possible = opportunité)
+            elif spread_pct < -0.5:
+                alerts.append({
+                    'type': 'ANOMALIE_SPREAD',
+                    'severity': 'WARNING',
+                    'message': f"{market['currency']}: Spread inversé ({spread_pct:.2f}%) - Opportunité d'arbitrage détectée"
+                })
+            # Spread normal mais élevé
+            elif spread_pct > 15:
+                alerts.append({
+                    'type': 'SPREAD_ANORMAL',
+                    'severity': 'WARNING',
+                    'message': f"{market['currency']}: Spread élevé ({spread_pct:.2f}%)"
+                })
+
+    return alerts
+
+
+class ValidationReport:
+    """
+    Résultat figé de validate_config_coherence() pour un contenu de config
+
+    Réutilisable tant que marchés et taux ne changent pas (même empreinte).
+    """
+
+    __slots__ = ('fingerprint', 'alerts')
+
+    def __init__(self, fingerprint, alerts):
+        self.fingerprint = fingerprint
+        self.alerts = tuple(alerts)
+
+    @property
+    def errors(self):
+        return [a for a in self.alerts if a['severity'] == 'ERROR']
+
+    @property
+    def warnings(self):
+        return [a for a in self.alerts if a['severity'] == 'WARNING']
+
+    @property
+    def critical_errors(self):
+        """Erreurs qui bloquent la recherche de routes"""
+        return [a for a in self.errors if a['type'] in CRITICAL_ALERT_TYPES]
+
+    @property
+    def is_blocking(self):
+        return bool(self.critical_errors)
+
+    def __repr__(self):
+        return (f"ValidationReport({len(self.errors)} erreurs, {len(self.warnings)} avertissements, "
+                f"{self.fingerprint[:8]})")
@@ -0,0 +1,200 @@
+# modules/price_feed_simulator.py
+
+import copy
+import json
+import math
+import random
+import socket
+import sys
+import time
+
+from src.utils.config_store import get_config_store
+
+# Régimes de marché : volatilité et dérive par tick, en points de base
+REGIMES = {
+    'calme': {'volatility_bps': 2.0, 'drift_bps': 0.0},
+    'volatil': {'volatility_bps': 25.0, 'drift_bps': 0.0},
+    'hausse': {'volatility_bps': 8.0, 'drift_bps': 3.0},
+    'baisse': {'volatility_bps': 8.0, 'drift_bps': -3.0},
+}
+FEED_MODES = ('random_walk', 'regime')
+
+
+class PriceFeedSimulator:
+    """
+    Générateur déterministe de ticks de prix à partir d'une config
+
+    Part des marchés et taux forex de la config puis fait évoluer chaque
+    prix par marche aléatoire log-normale (mode 'random_walk') ou par
+    régimes de marché enchaînés en chaîne de Markov (mode 'regime'). Achat
+    et vente d'un marché (bid et ask d'une paire) bougent du même facteur :
+    le spread relatif reste celui de la config. Même graine = mêmes ticks.
+
+    Les ticks ont le format lu par src/modules/price_stream.py.
+    """
+
+    def __init__(self, config, seed=None, mode='random_walk', volatility_bps=5.0,
+                 rate_tick_ratio=0.2, regime_switch_prob=0.001, initial_regime='calme'):
+        if mode not in FEED_MODES:
+            raise ValueError(f"Mode inconnu: {mode} (attendu: {', '.join(FEED_MODES)})")
+        if initial_regime not in REGIMES:
+            raise ValueError(f"Régime inconnu: {initial_regime}")
+
+        self.mode = mode
+        self.volatility_bps = volatility_bps
+        self.rate_tick_ratio = rate_tick_ratio
+        self.regime_switch_prob = regime_switch_prob
+        self.regime = initial_regime
+        self.seq = 0
+        self.rng = random.Random(seed)
+
+        # État courant (copies : la config d'origine n'est jamais modifiée)
+        self.markets = {
+            m['currency']: {field: m[field] for field in ('buy_price', 'sell_price', 'fee_pct')}
+            for m in copy.deepcopy(config['markets'])
+        }
+        self.forex_rates = copy.deepcopy(config['forex_rates'])
+        self._currencies = sorted(self.markets)
+        self._pairs = sorted(self.forex_rates)
+
+    # --- DYNAMIQUE ---
+    def _step_factor(self):
+        """Facteur multiplicatif d'un tick selon le mode / régime courant"""
+        if self.mode == 'regime':
+            if self.rng.random() < self.regime_switch_prob:
+                self.regime = self.rng.choice([r for r in sorted(REGIMES) if r != self.regime])
+            params = REGIMES[self.regime]
+            sigma, drift = params['volatility_bps'], params['drift_bps']
+        else:
+            sigma, drift = self.volatility_bps, 0.0
+        return math.exp((drift + sigma * self.rng.gauss(0.0, 1.0)) / 10000.0)
+
+    def _market_tick(self):
+        currency = self.rng.choice(self._currencies)
+        market = self.markets[currency]
+        factor = self._step_factor()
+        market['buy_price'] *= factor
+        market['sell_price'] *= factor
+        return {'type': 'market', 'currency': currency,
+                'buy_price': market['buy_price'], 'sell_price': market['sell_price']}
+
+    def _rate_tick(self):
+        pair = self.rng.choice(self._pairs)
+        factor = self._step_factor()
+        rate = self.forex_rates[pair]
+        if isinstance(rate, dict):
+            for key in ('bid', 'ask'):
+                if key in rate:
+                    rate[key] *= factor
+            rate = dict(rate)
+        else:
+            rate *= factor
+            self.forex_rates[pair] = rate
+        return {'type': 'rate', 'pair': pair, 'rate': rate}
+
+    def next_tick(self):
+        """Tick suivant (dict) ; part des ticks forex = rate_tick_ratio"""
+        if self._pairs and self.rng.random() < self.rate_tick_ratio:
+            tick = self._rate_tick()
+        else:
+            tick = self._market_tick()
+        self.seq += 1
+        tick['seq'] = self.seq
+        if self.mode == 'regime':
+            tick['regime'] = self.regime
+        return tick
+
+    def ticks(self, count=None):
+        """Générateur de `count` ticks (infini si None)"""
+        produced = 0
+        while count is None or produced < count:
+            yield self.next_tick()
+            produced += 1
+
+    def snapshot(self):
+        """Config courante (marchés + taux) après les ticks émis"""
+        return {
+            'markets': [{'currency': c, **values} for c, values in self.markets.items()],
+            'forex_rates': copy.deepcopy(self.forex_rates),
+        }
+
+    # --- ÉMISSION ---
+    def emit(self, output, rate=None, count=None, duration=None, batch_size=100):
+        """
+        Écrit les ticks en JSONL sur `output` (fichier, pipe, socket)
+
+        rate : ticks/seconde visés (None = au plus vite). Le rythme est tenu
+        par lots de batch_size ticks, ce qui permet plusieurs milliers de
+        ticks par seconde. S'arrête après `count` ticks ou `duration`
+        secondes (ou sur un pipe fermé côté lecteur).
+
+        Returns:
+            dict {'ticks', 'elapsed_s', 'rate_per_s'}
+        """
+        if count is None and duration is None:
+            raise ValueError("count ou duration requis")
+
+        start = time.perf_counter()
+        sent = 0
+        try:
+            while count is None or sent < count:
+                n = batch_size if count is None else min(batch_size, count - sent)
+                output.write(''.join(json.dumps(tick) + '\n' for tick in self.ticks(n)))
+                output.flush()
+                sent += n
+
+                elapsed = time.perf_counter() - start
+                if duration is not None and elapsed >= duration:
+                    break
+                if rate:
+                    ahead = sent / rate - elapsed
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except BrokenPipeError:
+            pass
+
+        elapsed = time.perf_counter() - start
+        return {
+            'ticks': sent,
+            'elapsed_s': round(elapsed, 3),
+            'rate_per_s': round(sent / elapsed, 1) if elapsed > 0 else None,
+        }
+
+
+def open_sink(spec):
+    """Destination : '-' (stdout), 'unix:CHEMIN' (socket Unix) ou fichier / pipe nommé"""
+    if spec in (None, '-'):
+        return sys.stdout
+    if spec.startswith('unix:'):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(spec[len('unix:'):])
+        return sock.makefile('w', encoding='utf-8')
+    return open(spec, 'a', encoding='utf-8')
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Simulateur de flux de prix (ticks JSONL)')
+    parser.add_argument('--config', type=str, default='config.json', help='Config de départ')
+    parser.add_argument('--seed', type=int, default=None, help='Graine (flux reproductible)')
+    parser.add_argument('--mode', choices=FEED_MODES, default='random_walk')
+    parser.add_argument('--rate', type=float, default=1000.0, help='Ticks par seconde (0 = au plus vite)')
+    parser.add_argument('--count', type=int, default=None, help='Nombre de ticks')
+    parser.add_argument('--duration', type=float, default=None, help='Durée en secondes')
+    parser.add_argument('--volatility-bps', type=float, default=5.0)
+    parser.add_argument('--out', type=str, default='-', help="'-', 'unix:CHEMIN' ou fichier")
+
+    args = parser.parse_args()
+    if args.count is None and args.duration is None:
+        args.count = 10000
+
+    simulator = PriceFeedSimulator(get_config_store(args.config).get(), seed=args.seed,
+                                   mode=args.mode, volatility_bps=args.volatility_bps)
+    sink = open_sink(args.out)
+    try:
+        result = simulator.emit(sink, rate=args.rate or None, count=args.count, duration=args.duration)
+    finally:
+        if sink is not sys.stdout:
+            sink.close()
+    print(json.dumps(result), file=sys.stderr)
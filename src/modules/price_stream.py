@@ -0,0 +1,327 @@
+# modules/price_stream.py
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+
+from src.engine.route_engine import RouteEngine
+from src.utils.latency import latency_summary
+
+# Champs d'un tick marché appliqués au MarketBook
+MARKET_TICK_FIELDS = ('buy_price', 'sell_price', 'fee_pct')
+
+
+# ========== TICKS ==========
+
+def parse_tick(line):
+    """
+    Décode une ligne JSON de tick
+
+    Formats acceptés :
+        {"type": "market", "currency": "XAF", "buy_price": ..., "sell_price": ..., "fee_pct": ...}
+        {"type": "rate", "pair": "XAF/EUR", "rate": {...} | 655.957}
+
+    Returns:
+        (clé de coalescence, données) ; lève ValueError si le tick est invalide
+    """
+    try:
+        tick = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Tick non JSON: {e}")
+    if not isinstance(tick, dict):
+        raise ValueError("Tick attendu sous forme d'objet JSON")
+
+    kind = tick.get('type')
+    if kind == 'market':
+        currency = tick.get('currency')
+        fields = {field: tick[field] for field in MARKET_TICK_FIELDS if tick.get(field) is not None}
+        if not currency or not fields:
+            raise ValueError(f"Tick marché incomplet: {tick}")
+        return ('market', currency), fields
+
+    if kind == 'rate':
+        pair = tick.get('pair')
+        rate = tick.get('rate')
+        if not isinstance(pair, str) or pair.count('/') != 1 or rate is None:
+            raise ValueError(f"Tick taux incomplet: {tick}")
+        return ('rate', pair), rate
+
+    raise ValueError(f"Type de tick inconnu: {kind}")
+
+
+# ========== SOURCES DE TICKS ==========
+
+async def jsonl_tail_source(path, poll_interval=0.05, follow=True, from_start=True):
+    """
+    Lignes d'un fichier JSONL, à la manière de `tail -f`
+
+    follow=False : s'arrête à la fin du fichier (rejeu d'un fichier de ticks).
+    Une ligne incomplète (écriture en cours) est gardée jusqu'à son '\\n'.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        partial = ''
+        while True:
+            chunk = f.readline()
+            if chunk:
+                partial += chunk
+                if partial.endswith('\n'):
+                    yield partial
+                    partial = ''
+                continue
+            if not follow:
+                if partial:
+                    yield partial
+                return
+            await asyncio.sleep(poll_interval)
+
+
+async def stdin_source():
+    """Lignes de l'entrée standard (lecture bloquante déportée dans un thread)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            return
+        yield line
+
+
+async def unix_socket_source(path):
+    """
+    Lignes reçues sur un socket Unix (plusieurs producteurs possibles)
+
+    Le socket est créé au démarrage et supprimé à l'arrêt du flux.
+    """
+    queue = asyncio.Queue()
+
+    async def handle(reader, writer):
+        try:
+            async for line in reader:
+                await queue.put(line.decode('utf-8', errors='replace'))
+        finally:
+            writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    server = await asyncio.start_unix_server(handle, path=path)
+    try:
+        while True:
+            yield await queue.get()
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def open_source(spec, follow=True):
+    """Source depuis la ligne de commande : '-'/'stdin', 'unix:CHEMIN' ou fichier JSONL"""
+    if spec in (None, '-', 'stdin'):
+        return stdin_source()
+    if spec.startswith('unix:'):
+        return unix_socket_source(spec[len('unix:'):])
+    return jsonl_tail_source(spec, follow=follow)
+
+
+# ========== SERVICE DE FLUX ==========
+
+class PriceStreamService:
+    """
+    Service asyncio : ticks de prix → classement des routes → publication NDJSON
+
+    Les ticks reçus pendant une rafale sont fusionnés par marché / paire
+    (dernière valeur gagnante, champs marché cumulés) puis appliqués en un
+    lot au RouteEngine, dont le classement incrémental ne recalcule que les
+    lignes et colonnes touchées. Chaque lot publie :
+        {"type": "top", ...}       top-N courant
+        {"type": "crossing", ...}  routes du top-N passant le seuil (up / down)
+    et, à l'arrêt, {"type": "stats", ...} avec les latences tick → publication.
+    """
+
+    def __init__(self, engine, output=None, coalesce_window=0.005, max_latency_samples=100000):
+        self.engine = engine
+        self.output = output if output is not None else sys.stdout
+        self.coalesce_window = coalesce_window
+
+        self._pending = {}    # (type, clé) → données fusionnées
+        self._received = []   # Heures de réception des ticks en attente
+        self._above = None    # Paires du top-N au-dessus du seuil (dernière publication)
+        self._wakeup = None
+        self.seq = 0
+
+        self.stats = {'ticks': 0, 'invalid': 0, 'coalesced': 0, 'applied': 0,
+                      'rejected': 0, 'publications': 0, 'crossings': 0}
+        # Latences tick → publication (secondes), fenêtre glissante
+        self.latencies = deque(maxlen=max_latency_samples)
+
+    # --- RÉCEPTION ---
+    def submit(self, line, received=None):
+        """Met un tick en attente ; renvoie False s'il est invalide (ignoré)"""
+        received = time.perf_counter() if received is None else received
+        try:
+            key, data = parse_tick(line)
+        except ValueError as e:
+            self.stats['invalid'] += 1
+            logging.warning(f"Tick ignoré: {e}")
+            return False
+
+        self.stats['ticks'] += 1
+        if key in self._pending:
+            self.stats['coalesced'] += 1
+            if key[0] == 'market':
+                self._pending[key].update(data)
+            else:
+                self._pending[key] = data
+        else:
+            self._pending[key] = data
+        self._received.append(received)
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    @property
+    def pending(self):
+        """Nombre de mises à jour distinctes en attente"""
+        return len(self._pending)
+
+    # --- APPLICATION / PUBLICATION ---
+    def flush(self):
+        """
+        Applique les ticks en attente, reclasse et publie
+
+        Returns:
+            Le message 'top' publié, ou None s'il n'y avait rien en attente
+        """
+        if not self._pending:
+            return None
+        pending, received = self._pending, self._received
+        self._pending, self._received = {}, []
+
+        for (kind, key), data in pending.items():
+            try:
+                if kind == 'market':
+                    self.engine.update_market(key, buy=data.get('buy_price'),
+                                              sell=data.get('sell_price'), fee=data.get('fee_pct'))
+                else:
+                    self.engine.update_rate(key, data)
+                self.stats['applied'] += 1
+            except (ValueError, TypeError, KeyError) as e:
+                self.stats['rejected'] += 1
+                logging.warning(f"Tick {kind} {key} rejeté: {e}")
+
+        return self.publish_top(received, updates=len(pending))
+
+    def publish_top(self, received=(), updates=0):
+        """Publie le top-N courant et les franchissements de seuil depuis la publication précédente"""
+        routes = self.engine.top_routes()
+        threshold = self.engine.threshold_pct
+        above = {
+            (r['sourcing_market_code'], r['selling_market_code']): r
+            for r in routes if r['profit_pct'] >= threshold
+        }
+        previous = self._above
+        self._above = above
+
+        now = time.perf_counter()
+        latencies = [now - t for t in received]
+        self.latencies.extend(latencies)
+
+        self.seq += 1
+        message = {
+            'type': 'top',
+            'seq': self.seq,
+            'ticks': len(received),
+            'updates': updates,
+            'latency_ms': round(max(latencies) * 1000, 3) if latencies else None,
+            'routes': [self._route_summary(r) for r in routes],
+        }
+        self._publish(message)
+        self.stats['publications'] += 1
+
+        if previous is not None:
+            for pair in above.keys() - previous.keys():
+                self._publish_crossing('up', above[pair], threshold)
+            for pair in previous.keys() - above.keys():
+                self._publish_crossing('down', previous[pair], threshold)
+        return message
+
+    def _publish_crossing(self, direction, route, threshold):
+        self.stats['crossings'] += 1
+        self._publish({
+            'type': 'crossing',
+            'seq': self.seq,
+            'direction': direction,
+            'route': f"{route['sourcing_market_code']}->{route['selling_market_code']}",
+            'profit_pct': route['profit_pct'],
+            'threshold_pct': threshold,
+        })
+
+    @staticmethod
+    def _route_summary(route):
+        return {
+            'route': f"{route['sourcing_market_code']}->{route['selling_market_code']}",
+            'profit_pct': route['profit_pct'],
+            'final_amount_usdt': route['final_amount_usdt'],
+        }
+
+    def _publish(self, message):
+        self.output.write(json.dumps(message, ensure_ascii=False) + '\n')
+        self.output.flush()
+
+    # --- LATENCES ---
+    def latency_report(self):
+        """Percentiles (ms) des latences tick → publication mesurées"""
+        return latency_summary(self.latencies)
+
+    # --- BOUCLE ---
+    async def _read(self, source):
+        async for line in source:
+            if line.strip():
+                self.submit(line)
+
+    async def run(self, source):
+        """
+        Consomme la source jusqu'à son épuisement (ou annulation)
+
+        Publie l'état initial, puis un lot par rafale : après le premier tick
+        d'une rafale, on attend coalesce_window pour fusionner les suivants.
+        """
+        self._wakeup = asyncio.Event()
+        self.publish_top()
+        reader = asyncio.ensure_future(self._read(source))
+        try:
+            while True:
+                if not self._pending:
+                    if reader.done():
+                        break
+                    wakeup = asyncio.ensure_future(self._wakeup.wait())
+                    await asyncio.wait({reader, wakeup}, return_when=asyncio.FIRST_COMPLETED)
+                    wakeup.cancel()
+                    self._wakeup.clear()
+                    continue
+                if self.coalesce_window > 0 and not reader.done():
+                    await asyncio.sleep(self.coalesce_window)
+                self._wakeup.clear()
+                self.flush()
+            reader.result()  # Propage une erreur de lecture
+        finally:
+            reader.cancel()
+            self._publish({'type': 'stats', **self.stats, 'latency': self.latency_report()})
+            self._wakeup = None
+
+
+def run_stream(config_store, source_spec, output=None, top_n=5, conversion_method='forex',
+               coalesce_window=0.005, follow=True):
+    """Point d'entrée CLI : moteur sur le ConfigStore, flux jusqu'à fin de source ou Ctrl-C"""
+    engine = RouteEngine.from_store(config_store, conversion_method=conversion_method, top_n=top_n)
+    service = PriceStreamService(engine, output=output, coalesce_window=coalesce_window)
+    try:
+        asyncio.run(service.run(open_source(source_spec, follow=follow)))
+    except KeyboardInterrupt:
+        pass
+    return service
@@ -0,0 +1,283 @@
+# modules/route_daemon.py
+
+import asyncio
+import contextlib
+import csv
+import io
+import json
+import logging
+import os
+import time
+from collections import defaultdict, deque
+
+from src.cli.daily_briefing import robust_csv_append, rotation_state_from_rows
+from src.engine.route_engine import RouteEngine
+from src.modules.route_scan import main as scan_main
+from src.utils.config_store import get_config_store
+from src.utils.daemon_client import daemon_request
+from src.utils.latency import latency_summary
+
+# Octets relus avant l'offset pour vérifier que le journal n'a pas été réécrit
+LEDGER_TAIL_CHECK_BYTES = 256
+
+
+# ========== INDEX DU JOURNAL ==========
+
+class LedgerIndex:
+    """
+    Lignes du journal des transactions (CSV ';') gardées en mémoire
+
+    Un fichier qui a seulement grandi n'est lu qu'à partir du dernier offset
+    (lignes complètes uniquement) ; un fichier raccourci, réécrit (fin déjà lue
+    modifiée) ou non UTF-8 est relu en entier.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._rows = []
+        self._fieldnames = None
+        self._offset = 0
+        self._tail = b''
+        self._stat_key = None
+        self.stats = {'full_loads': 0, 'incremental_loads': 0}
+
+    def rows(self):
+        """Lignes à jour du journal (à ne pas modifier)"""
+        self.refresh()
+        return self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def refresh(self):
+        """Relit ce qui a changé depuis le dernier accès ; True si le fichier a changé"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            changed = self._stat_key is not None
+            self._reset()
+            return changed
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        if stat_key == self._stat_key:
+            return False
+
+        with open(self.path, 'rb') as f:
+            if self._fieldnames and stat.st_size >= self._offset and self._tail_unchanged(f):
+                f.seek(self._offset)
+                if self._append(f.read()):
+                    self.stats['incremental_loads'] += 1
+                    self._stat_key = stat_key
+                    return True
+            f.seek(0)
+            self._full_load(f.read())
+        self._stat_key = stat_key
+        return True
+
+    # --- LECTURE ---
+    def _reset(self):
+        self._rows, self._fieldnames = [], None
+        self._offset, self._tail, self._stat_key = 0, b'', None
+
+    def _tail_unchanged(self, f):
+        start = max(0, self._offset - LEDGER_TAIL_CHECK_BYTES)
+        f.seek(start)
+        return f.read(self._offset - start) == self._tail
+
+    def _complete(self, data):
+        """Partie de data jusqu'au dernier saut de ligne (ligne en cours d'écriture exclue)"""
+        return data[:data.rfind(b'\n') + 1]
+
+    def _append(self, data):
+        complete = self._complete(data)
+        try:
+            text = complete.decode('utf-8')
+        except UnicodeDecodeError:
+            return False
+        reader = csv.DictReader(io.StringIO(text, newline=''), fieldnames=self._fieldnames, delimiter=';')
+        self._rows.extend(reader)
+        self._advance(self._offset + len(complete), complete)
+        return True
+
+    def _full_load(self, data):
+        self.stats['full_loads'] += 1
+        complete = self._complete(data)
+        try:
+            text, incremental = complete.decode('utf-8-sig'), True
+        except UnicodeDecodeError:
+            # Même repli que read_csv_rows() ; relu en entier à chaque changement
+            text, incremental = complete.decode('latin-1'), False
+        reader = csv.DictReader(io.StringIO(text, newline=''), delimiter=';')
+        self._rows = list(reader)
+        self._fieldnames = reader.fieldnames if incremental else None
+        self._offset, self._tail = 0, b''
+        self._advance(len(complete), complete)
+
+    def _advance(self, offset, consumed):
+        self._tail = (self._tail + consumed)[-LEDGER_TAIL_CHECK_BYTES:]
+        self._offset = offset
+
+
+# ========== DÉMON ==========
+
+class RouteDaemon:
+    """
+    Démon local : moteur, config et journal chauds, servis sur un socket Unix
+
+    Protocole : une requête JSON par ligne {"op": ..., "params": {...}}, une
+    réponse par ligne {"ok": true, "result": ...} ou {"ok": false, "error": ...}.
+    Opérations : ping, scan, state, log, stats, reload, shutdown.
+
+    La config est revérifiée (os.stat) avant chaque requête : une modification
+    de config.json recharge le moteur sans redémarrage, une config invalide
+    conserve la dernière version valide. Les requêtes sont traitées une à une
+    dans la boucle asyncio (pas d'accès concurrent au moteur ni au journal).
+    """
+
+    def __init__(self, config_path, transactions_file, plan_file_tpl, socket_path,
+                 max_latency_samples=10000):
+        self.socket_path = str(socket_path)
+        self.transactions_file = str(transactions_file)
+        self.plan_file_tpl = plan_file_tpl
+
+        self.store = get_config_store(config_path)
+        self.engine = RouteEngine.from_store(self.store)
+        self.ledger = LedgerIndex(self.transactions_file)
+        self.ledger.refresh()
+
+        self.started = time.time()
+        self.request_stats = defaultdict(lambda: {'count': 0, 'errors': 0})
+        self._latencies = defaultdict(lambda: deque(maxlen=max_latency_samples))
+        self._handlers = {
+            'ping': lambda params: 'pong',
+            'scan': self._scan,
+            'state': self._state,
+            'log': self._log,
+            'stats': lambda params: self.stats_report(),
+            'reload': self._reload,
+            'shutdown': self._shutdown,
+        }
+        self._loop = None
+        self._stop = None
+
+    # --- REQUÊTES ---
+    def handle(self, request):
+        """Traite une requête décodée et renvoie la réponse (dict sérialisable)"""
+        op = request.get('op') if isinstance(request, dict) else None
+        handler = self._handlers.get(op)
+        if handler is None:
+            return {'ok': False, 'error': f"Opération inconnue: {op}"}
+
+        start = time.perf_counter()
+        stats = self.request_stats[op]
+        try:
+            self.store.refresh()
+            return {'ok': True, 'result': handler(request.get('params') or {})}
+        except Exception as e:
+            stats['errors'] += 1
+            logging.error(f"Démon: requête {op} en échec: {e}", exc_info=True)
+            return {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+        finally:
+            stats['count'] += 1
+            self._latencies[op].append(time.perf_counter() - start)
+
+    def _scan(self, params):
+        argv = [str(arg) for arg in params.get('argv', [])]
+        # --output FICHIER : écrit par le démon (chemin absolu côté client)
+        to_file = '--output' in argv[:-1] and argv[argv.index('--output') + 1] != '-'
+        output = None if to_file else io.StringIO()
+        errors = io.StringIO()
+        with contextlib.redirect_stderr(errors):
+            code = scan_main(argv, self.store.get(), output=output, engine=self.engine)
+        return {'code': code, 'output': output.getvalue() if output else '', 'errors': errors.getvalue()}
+
+    def _state(self, params):
+        return rotation_state_from_rows(self.ledger.rows(), self.plan_file_tpl)
+
+    def _log(self, params):
+        row = params.get('row')
+        if not isinstance(row, dict):
+            raise ValueError("Paramètre 'row' attendu (dict des colonnes)")
+        written = robust_csv_append(self.transactions_file, dict(row))
+        self.ledger.refresh()
+        return {'written': written, 'ledger_rows': len(self.ledger)}
+
+    def _reload(self, params):
+        reloaded = self.store.refresh(force=True)
+        self.ledger._reset()
+        self.ledger.refresh()
+        return {'reloaded': reloaded, 'config_version': self.store.version}
+
+    def _shutdown(self, params):
+        self.stop()
+        return 'bye'
+
+    def stats_report(self):
+        """Compteurs et percentiles de latence par opération"""
+        return {
+            'uptime_s': round(time.time() - self.started, 3),
+            'config_version': self.store.version,
+            'ledger_rows': len(self.ledger),
+            'ledger': dict(self.ledger.stats),
+            'requests': {
+                op: {**stats, **latency_summary(self._latencies[op])}
+                for op, stats in sorted(self.request_stats.items())
+            },
+        }
+
+    # --- SOCKET ---
+    async def _serve_client(self, reader, writer):
+        try:
+            async for line in reader:
+                if not line.strip():
+                    continue
+                try:
+                    response = self.handle(json.loads(line))
+                except json.JSONDecodeError as e:
+                    response = {'ok': False, 'error': f"Requête non JSON: {e}"}
+                writer.write(json.dumps(response, ensure_ascii=False, default=str).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, ready=None):
+        """
+        Sert jusqu'à stop() / 'shutdown' (ready : threading.Event levé à l'écoute)
+
+        Le socket n'est accessible qu'à l'utilisateur courant ; un socket
+        orphelin est remplacé, un démon actif sur le même chemin est refusé.
+        """
+        if os.path.exists(self.socket_path):
+            if daemon_request('ping', socket_path=self.socket_path, timeout=1.0) is not None:
+                raise RuntimeError(f"Un démon écoute déjà sur {self.socket_path}")
+            os.unlink(self.socket_path)
+
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        server = await asyncio.start_unix_server(self._serve_client, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        logging.info(f"Démon de routes à l'écoute sur {self.socket_path}")
+        if ready is not None:
+            ready.set()
+        try:
+            await self._stop.wait()
+        finally:
+            server.close()
+            await server.wait_closed()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self._loop = None
+            logging.info("Démon de routes arrêté")
+
+    def serve_forever(self):
+        """Point d'entrée CLI : sert jusqu'à Ctrl-C ou requête 'shutdown'"""
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+
+    def stop(self):
+        """Arrêt propre, appelable depuis un autre thread"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
@@ -0,0 +1,172 @@
+# modules/route_scan.py
+
+import argparse
+import itertools
+import json
+import sys
+import time
+from datetime import datetime
+
+from src.engine.conversion_table import CONVERSION_METHODS
+from src.engine.route_engine import RouteEngine
+
+SCAN_OUTPUT_FORMATS = ('json', 'ndjson')
+
+# Champs textuels lourds, exportés seulement avec --full
+VERBOSE_ROUTE_KEYS = ('details', 'plan_de_vol')
+
+
+def _csv_list(value):
+    """'EUR,XAF' → ['EUR', 'XAF'] (codes en majuscules, vides ignorés)"""
+    return [item.strip().upper() for item in value.split(',') if item.strip()]
+
+
+def _csv_floats(value):
+    try:
+        amounts = [float(item) for item in value.split(',') if item.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Capital invalide: {value}")
+    if any(not amount > 0 for amount in amounts):
+        raise argparse.ArgumentTypeError(f"Capital invalide: {value}")
+    return amounts
+
+
+def build_scan_parser():
+    """Options de --scan (listes séparées par des virgules = combinaisons)"""
+    parser = argparse.ArgumentParser(
+        prog='daily_briefing.py --scan',
+        description='Recherche de routes non interactive, sortie JSON / NDJSON'
+    )
+    parser.add_argument('--sourcing', type=_csv_list, default=[None],
+                        help='Devise(s) de sourcing (défaut: toutes)')
+    parser.add_argument('--exclude', type=_csv_list, default=[],
+                        help='Marchés exclus comme marché de vente')
+    parser.add_argument('--loop', type=_csv_list, default=[None],
+                        help='Devise(s) de bouclage (prioritaire sur --exclude)')
+    parser.add_argument('--method', type=lambda v: [m.strip().lower() for m in v.split(',') if m.strip()],
+                        default=['forex'], help='Méthode(s) de conversion: forex, bank')
+    parser.add_argument('--capital', type=_csv_floats, default=[None],
+                        help='Capital(aux) en USDT, exécutés sur les carnets (recherche directe)')
+    parser.add_argument('--top', type=int, default=5, help='Routes par combinaison')
+    parser.add_argument('--mode', choices=('direct', 'cycles'), default='direct')
+    parser.add_argument('--all', action='store_true', help='Ne pas appliquer le seuil de rentabilité')
+    parser.add_argument('--full', action='store_true', help='Inclure détails et plan de vol')
+    parser.add_argument('--format', choices=SCAN_OUTPUT_FORMATS, default='json')
+    parser.add_argument('--output', type=str, default='-', help="Fichier de sortie ('-' = stdout)")
+    return parser
+
+
+def scan_combinations(sourcing=(None,), loop=(None,), methods=('forex',), capitals=(None,)):
+    """Produit cartésien des paramètres → liste de dicts (ordre stable)"""
+    return [
+        {'sourcing_currency': s, 'loop_currency': l, 'conversion_method': m, 'capital': c}
+        for s, l, m, c in itertools.product(sourcing, loop, methods, capitals)
+    ]
+
+
+def route_summary(route, full=False):
+    """Dict JSON d'une route (sans détails ni plan de vol, sauf full=True)"""
+    if full:
+        return route.materialize()
+    return {key: route[key] for key in route if key not in VERBOSE_ROUTE_KEYS}
+
+
+def run_scan(engine, combinations, top_n=5, excluded_markets=None, apply_threshold=True,
+             search_mode='direct', full=False):
+    """
+    Exécute chaque combinaison sur un même RouteEngine (config compilée une fois)
+
+    La validation de la config est faite une seule fois par le moteur ; les
+    combinaisons réutilisent sa matrice de routes.
+
+    Yields:
+        Un dict par combinaison : params, routes, count, elapsed_ms
+    """
+    for params in combinations:
+        start = time.perf_counter()
+        routes = engine.find_routes(
+            top_n=top_n,
+            skip_validation=True,
+            apply_threshold=apply_threshold,
+            sourcing_currency=params['sourcing_currency'],
+            excluded_markets=excluded_markets,
+            loop_currency=params['loop_currency'],
+            conversion_method=params['conversion_method'],
+            search_mode=search_mode,
+            trade_size=params['capital'] if search_mode == 'direct' else None
+        )
+        yield {
+            'type': 'scan',
+            'params': dict(params, excluded_markets=list(excluded_markets or []), top_n=top_n,
+                           search_mode=search_mode),
+            'count': len(routes),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 3),
+            'routes': [route_summary(route, full) for route in routes],
+        }
+
+
+def write_scan(results, output, fmt='json', header=None):
+    """Écrit les résultats : un document JSON ou une ligne NDJSON par combinaison"""
+    if fmt == 'ndjson':
+        for result in results:
+            output.write(json.dumps(result, ensure_ascii=False) + '\n')
+            output.flush()
+        return
+    document = dict(header or {})
+    document['scans'] = list(results)
+    json.dump(document, output, indent=2, ensure_ascii=False)
+    output.write('\n')
+
+
+def main(argv, config, output=None, engine=None):
+    """
+    Point d'entrée de --scan (engine : moteur déjà compilé sur config, ex. démon)
+
+    Returns:
+        Code de sortie : 0 = scan écrit, 2 = paramètres invalides,
+        3 = config bloquée par la validation (erreurs critiques)
+    """
+    parser = build_scan_parser()
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as e:
+        return 2 if e.code else 0
+
+    currencies = {m['currency'] for m in config['markets']}
+    requested = [c for c in args.sourcing + args.loop + args.exclude if c is not None]
+    unknown = sorted(set(requested) - currencies)
+    bad_methods = sorted(set(args.method) - set(CONVERSION_METHODS))
+    if unknown or bad_methods or args.top <= 0:
+        print(f"Paramètres invalides: devises {unknown}, méthodes {bad_methods}, top {args.top}", file=sys.stderr)
+        return 2
+
+    engine = engine or RouteEngine(config)
+    report = engine.validation_report()
+    header = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'threshold_pct': engine.threshold_pct if not args.all else None,
+        'warnings': len(report.warnings),
+    }
+
+    close = False
+    if output is None:
+        if args.output == '-':
+            output = sys.stdout
+        else:
+            output, close = open(args.output, 'w', encoding='utf-8'), True
+    try:
+        if report.is_blocking:
+            error = {'type': 'error', 'critical_errors': [dict(alert) for alert in report.critical_errors]}
+            output.write(json.dumps(error, ensure_ascii=False) + '\n')
+            return 3
+
+        combinations = scan_combinations(args.sourcing, args.loop, args.method, args.capital)
+        results = run_scan(engine, combinations, top_n=args.top, excluded_markets=args.exclude,
+                           apply_threshold=not args.all, search_mode=args.mode, full=args.full)
+        if args.format == 'ndjson':
+            output.write(json.dumps({'type': 'scan_header', **header}, ensure_ascii=False) + '\n')
+        write_scan(results, output, args.format, header)
+        return 0
+    finally:
+        if close:
+            output.close()
@@ -1,7 +1,7 @@
 # modules/scenario_generator.py
 
 # modules/scenario_generator.py (EXTRAIT - PARTIE À CORRIGER)
-import json
+from src.utils.config_store import get_config_store
 
 
 def calculate_transaction_amounts(capital_eur, expected_margin, nb_cycles=1):
@@ -318,9 +318,8 @@ def generate_error_scenarios():
     """Génère les scénarios d'erreurs attendues"""
     scenarios = []
 
-    # Charger le vrai config
-    with open('config.json', 'r') as f:
-        real_config = json.load(f)
+    # Charger le vrai config (ConfigStore partagé, déjà parsé si inchangé)
+    real_config = get_config_store('config.json').get()
 
     for i in range(1, 16):
         # Créer une config INVALIDE en inversant buy/sell
@@ -12,9 +12,10 @@ from rich.prompt import Confirm
 from rich.table import Table
 
 from src.cli.daily_briefing import generate_new_rotation_id, robust_csv_append
-from src.engine.arbitrage_engine import (calculate_profit_route, forex_rates,
-                                         markets)
+from src.engine.market_book import MarketBook
+from src.engine.route_engine import RouteEngine
 from src.engine.rotation_manager import RotationManager
+from src.utils.config_store import get_config_store
 from src.utils.route_params_collector import collect_simulation_parameters
 
 console = Console()
@@ -27,6 +28,9 @@ class SimulationEngine:
         self.simulation_id = None
         self.simulation_dir = None
         self.config = self._load_config()
+        self.market_book = MarketBook(self.config['markets'])
+        # Moteur propre à la config chargée (pas de globals du module moteur)
+        self.route_engine = RouteEngine(self.config)
         self.manager = RotationManager()
 
     def _get_confirmed_input(self, prompt, validation_func=None, error_msg="Saisie invalide."):
@@ -97,8 +101,8 @@ class SimulationEngine:
         project_root = Path(__file__).resolve().parent.parent.parent
         config_path = project_root / 'config.json'
 
-        with open(config_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        # ConfigStore partagé : pas de re-parsing si config.json n'a pas changé
+        return get_config_store(config_path).get()
 
     @staticmethod
     def _round_amounts(data):
@@ -220,39 +224,34 @@ class SimulationEngine:
 
     def _convert_to_usdt(self, amount, currency):
         """Convertit un montant en USDT selon les prix du marché"""
-        for market in self.config['markets']:
-            if market['currency'] == currency:
-                # Coût pour acheter 1 USDT dans cette monnaie (avec frais)
-                cost_per_usdt = market['buy_price'] * (1 + market['fee_pct'] / 100.0)
-                usdt_amount = amount / cost_per_usdt
-                return usdt_amount
-        return amount  # Fallback si monnaie non trouvée
+        market = self.market_book.get(currency)
+        if market is None:
+            return amount  # Fallback si monnaie non trouvée
+        # Coût pour acheter 1 USDT dans cette monnaie (avec frais)
+        return amount / market.cost_per_usdt
 
     def _get_market_price(self, currency, price_type):
         """Récupère le prix d'un marché"""
-        for market in self.config['markets']:
-            if market['currency'] == currency:
-                if price_type == 'buy':
-                    return market['buy_price']
-                elif price_type == 'sell':
-                    return market['sell_price']
+        market = self.market_book.get(currency)
+        if market is None:
+            return 0
+        if price_type == 'buy':
+            return market.buy_price
+        elif price_type == 'sell':
+            return market.sell_price
         return 0
 
     def _get_market_fee(self, currency):
         """Récupère les frais d'un marché"""
-        for market in self.config['markets']:
-            if market['currency'] == currency:
-                return market['fee_pct']
-        return 0
+        market = self.market_book.get(currency)
+        return market.fee_pct if market is not None else 0
 
     def _find_optimal_route(self, sourcing_currency, soft_excluded, loop_currency,conversion_method):
         """Trouve la meilleure route - SIMPLIFIÉ avec fonction centrale"""
         console.print("\n[yellow]🔍 Recherche de la route optimale...[/yellow]")
 
-        # ✅ UTILISER LA FONCTION CENTRALE
-        from src.engine.arbitrage_engine import find_routes_with_filters
-
-        all_routes = find_routes_with_filters(
+        # ✅ UTILISER LE MOTEUR DE LA CONFIG
+        all_routes = self.route_engine.find_routes(
             top_n=100,  # Récupérer plus que nécessaire pour affichage
             apply_threshold=True,
             sourcing_currency=sourcing_currency,
@@ -293,7 +292,8 @@ class SimulationEngine:
             return None
 
         choice = int(choice_str)
-        best_route = all_routes[choice - 1]
+        # Seule la route choisie est matérialisée (détails + plan de vol complet)
+        best_route = all_routes[choice - 1].materialize()
 
         console.print(f"\n[green]✓[/green] Route sélectionnée : {best_route['detailed_route']}")
         return best_route
@@ -308,92 +308,98 @@ class SimulationEngine:
 
         console.print(f"\n[cyan]Capital initial:[/cyan] {params['initial_capital']:.2f} {params['sourcing_currency']} = {current_usdt:.6f} USDT")
 
-        # Initialiser la rotation dans le manager
-        self.manager.init_rotation(rotation_id)
-        if params['loop_currency']:
-            self.manager.set_loop_currency(rotation_id, params['loop_currency'])
-
-        console.print(f"\n[yellow]📝 Génération des transactions pour {params['nb_cycles']} cycles...[/yellow]\n")
+        # Rotation, devise de bouclage et cycles : une seule écriture de l'état
+        with self.manager.batch():
+            # Initialiser la rotation dans le manager
+            self.manager.init_rotation(rotation_id)
+            if params['loop_currency']:
+                self.manager.set_loop_currency(rotation_id, params['loop_currency'])
+
+            console.print(f"\n[yellow]📝 Génération des transactions pour {params['nb_cycles']} cycles...[/yellow]\n")
+
+            for cycle in range(1, params['nb_cycles'] + 1):
+                # Cycle 1: utilise le sourcing choisi
+                # Cycles 2+: sourcing = monnaie de bouclage (réinvestissement)
+                if cycle == 1:
+                    sourcing = best_route['sourcing_market_code']
+                else:
+                    sourcing = params['loop_currency'] or 'EUR'
+
+
+                selling = best_route['selling_market_code']
+
+                # Recalculer avec le capital actuel
+                route = self.route_engine.calculate_profit_route(current_usdt, sourcing, selling)
+
+                if not route:
+                    console.print(f"[red]⚠️  Impossible de calculer le cycle {cycle}[/red]")
+                    break
+
+                console.print(f"[cyan]Cycle {cycle}:[/cyan] {route['detailed_route']} → Marge: {route['profit_pct']:.2f}%")
+
+                # Transaction 1: ACHAT
+                sourcing_market = self.market_book.market(sourcing)
+                achat_data ={
+                    'Date': datetime.now().strftime('%Y-%m-%d'),
+                    'Rotation_ID': rotation_id,
+                    'Type': 'ACHAT',
+                    'Market': sourcing,
+                    'Currency': sourcing,
+                    'Amount_USDT': current_usdt,
+                    'Price_Local': sourcing_market['buy_price'],
+                    'Amount_Local': current_usdt * sourcing_market['buy_price'],
+                    'Fee_Pct': sourcing_market['fee_pct'],
+                    'Payment_Method': 'Simulation',
+                    'Counterparty_ID': f'SIM_BUYER_{cycle}',
+                    'Notes': f'Cycle {cycle} - Achat USDT simulé'
+                }
+                transactions.append(self._round_amounts(achat_data))
+
+                # Transaction 2: VENTE
+                selling_market = self.market_book.market(selling)
+                vente_data ={
+                    'Date': datetime.now().strftime('%Y-%m-%d'),
+                    'Rotation_ID': rotation_id,
+                    'Type': 'VENTE',
+                    'Market': selling,
+                    'Currency': selling,
+                    'Amount_USDT': current_usdt,
+                    'Price_Local': selling_market['sell_price'],
+                    'Amount_Local': current_usdt * selling_market['sell_price'],
+                    'Fee_Pct': selling_market['fee_pct'],
+                    'Payment_Method': 'Simulation',
+                    'Counterparty_ID': f'SIM_SELLER_{cycle}',
+                    'Notes': f'Cycle {cycle} - Vente USDT simulée'
+                }
+
+                transactions.append(self._round_amounts(vente_data))
+
+                # Transaction 3: CONVERSION (toujours vers monnaie de bouclage)
+                loop_curr = params['loop_currency'] or 'EUR'
+                conversion_data = {
+                    'Date': datetime.now().strftime('%Y-%m-%d'),
+                    'Rotation_ID': rotation_id,
+                    'Type': 'CONVERSION',
+                    'Market': f"{selling}->{loop_curr}",
+                    'Currency': loop_curr,
+                    'Amount_USDT': route['final_amount_usdt'],
+                    'Price_Local': 1.0,
+                    'Amount_Local': route['revenue_eur'],
+                    'Fee_Pct': 0.0,
+                    'Payment_Method': 'Forex',
+                    'Counterparty_ID': 'FOREX_SIM',
+                    'Notes': f'Cycle {cycle} - Conversion {selling}→{loop_curr} simulée'
+                }
+
+                transactions.append(self._round_amounts(conversion_data))
+
+                # Mettre à jour le capital pour le prochain cycle
+                current_usdt = route['final_amount_usdt']
+                self.manager.increment_cycle(rotation_id)
 
-        for cycle in range(1, params['nb_cycles'] + 1):
-            # Cycle 1: utilise le sourcing choisi
-            # Cycles 2+: sourcing = monnaie de bouclage (réinvestissement)
-            if cycle == 1:
-                sourcing = best_route['sourcing_market_code']
             else:
-                sourcing = params['loop_currency'] or 'EUR'
-
-
-            selling = best_route['selling_market_code']
-
-            # Recalculer avec le capital actuel
-            route = calculate_profit_route(current_usdt, sourcing, selling)
-
-            if not route:
-                console.print(f"[red]⚠️  Impossible de calculer le cycle {cycle}[/red]")
-                break
-
-            console.print(f"[cyan]Cycle {cycle}:[/cyan] {route['detailed_route']} → Marge: {route['profit_pct']:.2f}%")
-
-            # Transaction 1: ACHAT
-            sourcing_market = next((m for m in self.config['markets'] if m['currency'] == sourcing), None)
-            achat_data ={
-                'Date': datetime.now().strftime('%Y-%m-%d'),
-                'Rotation_ID': rotation_id,
-                'Type': 'ACHAT',
-                'Market': sourcing,
-                'Currency': sourcing,
-                'Amount_USDT': current_usdt,
-                'Price_Local': sourcing_market['buy_price'],
-                'Amount_Local': current_usdt * sourcing_market['buy_price'],
-                'Fee_Pct': sourcing_market['fee_pct'],
-                'Payment_Method': 'Simulation',
-                'Counterparty_ID': f'SIM_BUYER_{cycle}',
-                'Notes': f'Cycle {cycle} - Achat USDT simulé'
-            }
-            transactions.append(self._round_amounts(achat_data))
-
-            # Transaction 2: VENTE
-            selling_market = next((m for m in self.config['markets'] if m['currency'] == selling), None)
-            vente_data ={
-                'Date': datetime.now().strftime('%Y-%m-%d'),
-                'Rotation_ID': rotation_id,
-                'Type': 'VENTE',
-                'Market': selling,
-                'Currency': selling,
-                'Amount_USDT': current_usdt,
-                'Price_Local': selling_market['sell_price'],
-                'Amount_Local': current_usdt * selling_market['sell_price'],
-                'Fee_Pct': selling_market['fee_pct'],
-                'Payment_Method': 'Simulation',
-                'Counterparty_ID': f'SIM_SELLER_{cycle}',
-                'Notes': f'Cycle {cycle} - Vente USDT simulée'
-            }
-
-            transactions.append(self._round_amounts(vente_data))
-
-            # Transaction 3: CONVERSION (toujours vers monnaie de bouclage)
-            loop_curr = params['loop_currency'] or 'EUR'
-            conversion_data = {
-                'Date': datetime.now().strftime('%Y-%m-%d'),
-                'Rotation_ID': rotation_id,
-                'Type': 'CONVERSION',
-                'Market': f"{selling}->{loop_curr}",
-                'Currency': loop_curr,
-                'Amount_USDT': route['final_amount_usdt'],
-                'Price_Local': 1.0,
-                'Amount_Local': route['revenue_eur'],
-                'Fee_Pct': 0.0,
-                'Payment_Method': 'Forex',
-                'Counterparty_ID': 'FOREX_SIM',
-                'Notes': f'Cycle {cycle} - Conversion {selling}→{loop_curr} simulée'
-            }
-
-            transactions.append(self._round_amounts(conversion_data))
-
-            # Mettre à jour le capital pour le prochain cycle
-            current_usdt = route['final_amount_usdt']
-            self.manager.increment_cycle(rotation_id)
+                # Tous les cycles simulés : rotation terminée, archivée hors de l'état chaud
+                self.manager.archive_rotation(rotation_id)
 
         return transactions, rotation_id, current_usdt
 
@@ -0,0 +1,186 @@
+# src/utils/config_store.py
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import weakref
+from pathlib import Path
+
+# Clés indispensables d'une config de moteur
+REQUIRED_CONFIG_KEYS = ('markets', 'forex_rates', 'SEUIL_RENTABILITE_PCT')
+
+
+class ConfigError(ValueError):
+    """Config absente, illisible ou incomplète"""
+
+
+def parse_config(payload, source='config.json'):
+    """Décode et vérifie le contenu d'un fichier de config, lève ConfigError"""
+    try:
+        config = json.loads(payload)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ConfigError(f"Le fichier '{source}' est invalide. Détail: {e}") from e
+    if not isinstance(config, dict):
+        raise ConfigError(f"Le fichier '{source}' est invalide: objet JSON attendu")
+
+    missing = [key for key in REQUIRED_CONFIG_KEYS if key not in config]
+    if missing:
+        raise ConfigError(f"Le fichier '{source}' est invalide, clés manquantes: {', '.join(missing)}")
+    return config
+
+
+class ConfigStore:
+    """
+    Config partagée d'un fichier JSON, relue uniquement quand il change
+
+    Chaque accès ne coûte qu'un os.stat() : le fichier n'est relu que si son
+    mtime ou sa taille change, et n'est re-parsé (puis validé) que si le hash
+    de son contenu change. Les abonnés sont alors notifiés avec la nouvelle
+    config, ce qui permet à un processus long de suivre les prix sans
+    redémarrer.
+
+    Une modification invalide (JSON en cours d'écriture, clé manquante)
+    conserve la dernière config valide ; seul le premier chargement lève
+    ConfigError. La config renvoyée est partagée : ne pas la modifier.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.config = None
+        self.fingerprint = None
+        self.version = 0
+        # Compteurs : lectures du fichier vs parsings effectifs
+        self.stats = {'reads': 0, 'parses': 0}
+
+        self._stat_key = None
+        self._subscribers = []
+        self._lock = threading.RLock()
+        self._watcher = None
+        self._stop_watching = threading.Event()
+
+    # --- CHARGEMENT ---
+    def get(self):
+        """Config courante, relue si le fichier a changé depuis le dernier accès"""
+        self.refresh()
+        return self.config
+
+    def refresh(self, force=False):
+        """
+        Relit le fichier si son mtime/taille (ou force) a changé
+
+        Returns:
+            True si une nouvelle config a été chargée (abonnés notifiés)
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+                stat_key = (stat.st_mtime_ns, stat.st_size)
+                if not force and stat_key == self._stat_key:
+                    return False
+                with open(self.path, 'rb') as f:
+                    payload = f.read()
+            except OSError as e:
+                if self.config is None:
+                    raise ConfigError(f"Le fichier '{self.path}' est manquant ou illisible. Détail: {e}") from e
+                logging.error(f"Config {self.path} inaccessible, dernière version conservée: {e}")
+                return False
+            self.stats['reads'] += 1
+            self._stat_key = stat_key
+
+            fingerprint = hashlib.sha256(payload).hexdigest()
+            if not force and fingerprint == self.fingerprint:
+                return False  # Fichier touché mais contenu identique
+
+            try:
+                config = parse_config(payload, self.path.name)
+            except ConfigError as e:
+                if self.config is None:
+                    raise
+                logging.error(f"{e} - dernière config valide conservée")
+                return False
+            self.stats['parses'] += 1
+
+            self.config = config
+            self.fingerprint = fingerprint
+            self.version += 1
+            logging.info(f"Config {self.path.name} chargée (version {self.version})")
+            subscribers = list(self._subscribers)
+
+        self._notify(subscribers, config)
+        return True
+
+    # --- ABONNÉS ---
+    def subscribe(self, callback):
+        """
+        Appelle callback(config) à chaque nouvelle config
+
+        Les méthodes liées sont gardées par référence faible : un objet abonné
+        (ex. RouteEngine) peut être libéré sans se désabonner.
+
+        Returns:
+            Fonction sans argument qui désabonne callback
+        """
+        if hasattr(callback, '__self__') and hasattr(callback, '__func__'):
+            ref = weakref.WeakMethod(callback)
+        else:
+            ref = lambda: callback
+        with self._lock:
+            self._subscribers.append(ref)
+        return lambda: self._unsubscribe(ref)
+
+    def _unsubscribe(self, ref):
+        with self._lock:
+            if ref in self._subscribers:
+                self._subscribers.remove(ref)
+
+    def _notify(self, subscribers, config):
+        for ref in subscribers:
+            callback = ref()
+            if callback is None:
+                self._unsubscribe(ref)
+                continue
+            try:
+                callback(config)
+            except Exception as e:
+                logging.error(f"Abonné config en échec ({callback}): {e}", exc_info=True)
+
+    # --- SURVEILLANCE EN TÂCHE DE FOND ---
+    def start_watching(self, interval=1.0):
+        """Vérifie le fichier toutes les `interval` secondes dans un thread démon"""
+        with self._lock:
+            if self._watcher is not None and self._watcher.is_alive():
+                return
+            self._stop_watching.clear()
+            self._watcher = threading.Thread(target=self._watch, args=(interval,),
+                                             name=f"ConfigStore({self.path.name})", daemon=True)
+            self._watcher.start()
+
+    def stop_watching(self):
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self, interval):
+        while not self._stop_watching.wait(interval):
+            try:
+                self.refresh()
+            except ConfigError as e:
+                logging.error(f"Surveillance config: {e}")
+
+
+# --- REGISTRE (un ConfigStore par fichier) ---
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_config_store(path):
+    """ConfigStore partagé pour ce fichier (chemin absolu)"""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = ConfigStore(key)
+        return store
@@ -0,0 +1,48 @@
+# utils/daemon_client.py
+
+import json
+import os
+import socket
+
+# Chemin du socket du démon (sinon : .route_daemon.sock à la racine du projet)
+DAEMON_SOCKET_ENV = 'ROUTES_DAEMON_SOCKET'
+
+
+class DaemonError(RuntimeError):
+    """Le démon a répondu une erreur pour la requête"""
+
+
+def daemon_request(op, params=None, socket_path=None, timeout=10.0):
+    """
+    Envoie une requête au démon de routes (une ligne JSON, une ligne en réponse)
+
+    Client minimal (socket + json) : les commandes CLI restent légères.
+
+    Returns:
+        Le champ 'result' de la réponse, ou None si aucun démon n'écoute
+        (les appelants basculent alors sur le calcul local) ; lève
+        DaemonError si le démon répond une erreur
+    """
+    path = socket_path or os.environ.get(DAEMON_SOCKET_ENV)
+    if not path or not os.path.exists(path):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        try:
+            sock.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return None  # Socket orphelin d'un démon arrêté
+        sock.sendall(json.dumps({'op': op, 'params': params or {}}).encode('utf-8') + b'\n')
+        with sock.makefile('r', encoding='utf-8') as reader:
+            line = reader.readline()
+    finally:
+        sock.close()
+
+    if not line:
+        raise DaemonError(f"Connexion fermée par le démon ({op})")
+    response = json.loads(line)
+    if not response.get('ok'):
+        raise DaemonError(response.get('error', 'erreur inconnue'))
+    return response.get('result')
@@ -0,0 +1,24 @@
+# utils/latency.py
+
+
+def latency_summary(samples):
+    """
+    Percentiles (ms) d'une série de latences mesurées en secondes
+
+    Returns:
+        {'count', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'} ({'count': 0} si vide)
+    """
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def percentile(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {
+        'count': len(ordered),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
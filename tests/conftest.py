@@ -217,6 +217,13 @@ def pytest_configure(config):
     config.addinivalue_line(
         "markers", "advanced: Tests edge cases"
     )
+    config.addinivalue_line(
+        "markers", "performance: Benchmarks avec budget (temps de démarrage)"
+    )
+    config.addinivalue_line(
+        "markers", "single_backend: Test non répété sur chaque backend d'état des rotations "
+        "(récupération des fichiers JSON, journal JSON ou backend choisi explicitement)"
+    )
 
 
 def pytest_collection_modifyitems(config, items):
@@ -229,6 +236,8 @@ def pytest_collection_modifyitems(config, items):
             item.add_marker(pytest.mark.integration)
         elif "advanced" in str(item.fspath):
             item.add_marker(pytest.mark.advanced)
+        elif "performance" in str(item.fspath):
+            item.add_marker(pytest.mark.performance)
 
 
 # Hook pour afficher résumé personnalisé
@@ -163,3 +163,44 @@ class TestSimulationErrorHandling:
             # Simulation devrait échouer proprement
             pass
 
+
+
+class TestSimulationRotationState:
+    """Rotation simulée dans l'état des rotations"""
+
+    @pytest.fixture
+    def engine(self, tmp_path, monkeypatch):
+        monkeypatch.setattr('src.engine.rotation_manager.ROTATION_STATE_FILE', str(tmp_path / "rotation_state.json"))
+        monkeypatch.setattr('src.engine.rotation_manager.BACKUP_FILE', str(tmp_path / "rotation_state.json.bak"))
+        return SimulationEngine()
+
+    def _run(self, engine, failing_cycle=None):
+        markets = [m['currency'] for m in engine.config['markets']][:2]
+        best_route = {'sourcing_market_code': markets[0], 'selling_market_code': markets[1]}
+        params = {'initial_capital': 1000, 'sourcing_currency': markets[0], 'nb_cycles': 3,
+                  'loop_currency': None}
+        calls = []
+
+        def calculate(amount, sourcing, selling):
+            calls.append(amount)
+            if len(calls) == failing_cycle:
+                return None
+            return {'detailed_route': f"{sourcing} → {selling}", 'profit_pct': 1.0,
+                    'final_amount_usdt': amount * 1.01, 'revenue_eur': amount}
+
+        with patch.object(engine.route_engine, 'calculate_profit_route', side_effect=calculate):
+            return engine._generate_simulated_transactions(params, best_route)
+
+    def test_completed_rotation_archived(self, engine):
+        transactions, rotation_id, _ = self._run(engine)
+
+        assert len(transactions) == 9
+        assert rotation_id not in engine.manager.state['active_rotations']
+        assert engine.manager.get_rotation(rotation_id)['current_cycle'] == 4
+
+    def test_interrupted_rotation_stays_active(self, engine):
+        transactions, rotation_id, _ = self._run(engine, failing_cycle=2)
+
+        assert len(transactions) == 3
+        assert engine.manager.state['active_rotations'][rotation_id]['current_cycle'] == 2
+        assert rotation_id not in engine.manager.archive
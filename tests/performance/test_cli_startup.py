@@ -0,0 +1,87 @@
+"""
+Benchmark de démarrage à froid de la CLI daily_briefing
+Échoue si l'import dépasse le budget ou charge pandas / le moteur pour rien
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+# Budget d'import à froid (ms), ajustable pour une machine lente
+CLI_IMPORT_BUDGET_MS = float(os.environ.get('CLI_IMPORT_BUDGET_MS', 250))
+
+# Modules que les commandes rapides ne doivent pas charger
+HEAVY_MODULES = ('pandas', 'numpy', 'src.engine.arbitrage_engine', 'src.engine.route_engine',
+                 'src.modules.simulation_module', 'src.utils.route_params_collector')
+
+# Logging préconfiguré : l'import de la CLI n'ouvre pas app.log du dépôt
+PRELUDE = (
+    "import sys, logging\n"
+    f"sys.path.insert(0, {str(REPO_ROOT)!r})\n"
+    "logging.basicConfig(handlers=[logging.NullHandler()])\n"
+)
+
+
+def _run(code, *flags, cwd):
+    result = subprocess.run([sys.executable, *flags, "-c", PRELUDE + code], cwd=cwd,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result
+
+
+def _cold_import_ms(cwd):
+    """Temps cumulé d'import de src.cli.daily_briefing (-X importtime), en ms"""
+    result = _run("import src.cli.daily_briefing\n", "-X", "importtime", "-B", cwd=cwd)
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| src\.cli\.daily_briefing$", line)
+        if match:
+            return int(match.group(1)) / 1000.0
+    raise AssertionError("Ligne d'import de src.cli.daily_briefing absente")
+
+
+class TestCliImportBudget:
+    """Démarrage des commandes rapides"""
+
+    def test_cold_import_within_budget(self, tmp_path):
+        # Meilleur de 3 : le budget porte sur le coût d'import, pas sur le bruit machine
+        best = min(_cold_import_ms(tmp_path) for _ in range(3))
+        assert best <= CLI_IMPORT_BUDGET_MS, \
+            f"Import de daily_briefing: {best:.0f} ms > budget {CLI_IMPORT_BUDGET_MS:.0f} ms"
+
+    def test_import_defers_heavy_modules(self, tmp_path):
+        code = (
+            "import json\n"
+            "import src.cli.daily_briefing as cli\n"
+            f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+            "print(cli.config_store.stats['reads'])\n"
+        )
+        loaded, reads = _run(code, cwd=tmp_path).stdout.split()
+        assert json.loads(loaded) == []
+        assert reads == "0"  # config.json lu seulement par les commandes qui en ont besoin
+
+    def test_state_read_without_pandas(self, tmp_path):
+        """État de rotation (--log-*, --set-loop-currency) lu sans pandas"""
+        transactions = tmp_path / "transactions.csv"
+        transactions.write_text(
+            "Date;Rotation_ID;Type;Market;Amount_USDT\n"
+            "2025-01-01;R20250101-1;ACHAT;EUR;100\n"
+            ";;;;\n"
+            "2025-01-01;R20250101-1;VENTE;XAF;100\n",
+            encoding='utf-8'
+        )
+        plan = {'plan_de_vol': {'phases': [{'type': 'ACHAT'}, {'type': 'VENTE'}, {'type': 'CONVERSION'}]}}
+        (tmp_path / "rotation_plan_R20250101-1.json").write_text(json.dumps(plan), encoding='utf-8')
+
+        code = (
+            "import src.cli.daily_briefing as cli\n"
+            f"cli.TRANSACTIONS_FILE = {str(transactions)!r}\n"
+            f"cli.PLAN_FILE_TPL = {str(tmp_path / 'rotation_plan_{}.json')!r}\n"
+            "state = cli.get_current_state()\n"
+            "print(state['rotation_id'], state['next_phase_details']['type'],\n"
+            "      state['last_transaction']['Market'], 'pandas' in sys.modules)\n"
+        )
+        assert _run(code, cwd=tmp_path).stdout.split() == ["R20250101-1", "CONVERSION", "XAF", "False"]
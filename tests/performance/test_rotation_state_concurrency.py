@@ -0,0 +1,77 @@
+"""
+Benchmark d'écritures concurrentes sur l'état des rotations
+N processus incrémentent la même rotation : aucune mise à jour perdue, débit mesuré
+"""
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from src.engine import rotation_manager
+from src.engine.rotation_manager import RotationManager
+
+# Incréments par processus écrivain
+ROTATION_STRESS_OPS = int(os.environ.get('ROTATION_STRESS_OPS', 50))
+# Débit minimal (mutations / s, tous processus confondus)
+ROTATION_STRESS_MIN_OPS_S = float(os.environ.get('ROTATION_STRESS_MIN_OPS_S', 50))
+
+
+def _use_state_file(state_file, backend):
+    rotation_manager.ROTATION_STATE_FILE = state_file
+    rotation_manager.BACKUP_FILE = state_file + '.bak'
+    rotation_manager.ROTATION_STATE_BACKEND = backend
+
+
+def _writer(state_file, backend, ops, use_batch, start):
+    _use_state_file(state_file, backend)
+    start.wait()
+    manager = RotationManager()
+    for i in range(ops):
+        if use_batch and i % 2:
+            with manager.batch():
+                manager.increment_cycle("R1")
+        else:
+            manager.increment_cycle("R1")
+        if i % 10 == 0:
+            manager.record_forced_transaction("R1", "VENTE", f"{os.getpid()}-{i}")
+
+
+@pytest.mark.skipif(rotation_manager.fcntl is None, reason="fcntl indisponible (Windows)")
+class TestRotationStateConcurrency:
+    """Plusieurs processus écrivains sur un même fichier d'état"""
+
+    @pytest.mark.parametrize("backend", rotation_manager.ROTATION_STATE_BACKENDS)
+    @pytest.mark.parametrize("writers", [1, 4])
+    def test_no_lost_updates(self, tmp_path, monkeypatch, writers, backend):
+        state_file = str(tmp_path / "rotation_state.json")
+        monkeypatch.setattr(rotation_manager, 'ROTATION_STATE_FILE', state_file)
+        monkeypatch.setattr(rotation_manager, 'BACKUP_FILE', state_file + '.bak')
+        monkeypatch.setattr(rotation_manager, 'ROTATION_STATE_BACKEND', backend)
+        # Compaction fréquente : snapshot réécrit pendant que les autres écrivent
+        monkeypatch.setattr(rotation_manager, 'JOURNAL_COMPACT_EVERY', 25)
+        RotationManager().init_rotation("R1")
+
+        context = multiprocessing.get_context('fork')
+        start_event = context.Event()
+        processes = [context.Process(target=_writer,
+                                     args=(state_file, backend, ROTATION_STRESS_OPS, bool(n % 2), start_event))
+                     for n in range(writers)]
+        for process in processes:
+            process.start()
+        started = time.perf_counter()
+        start_event.set()
+        for process in processes:
+            process.join(120)
+        elapsed = time.perf_counter() - started
+
+        assert all(process.exitcode == 0 for process in processes)
+        rotation = RotationManager().get_rotation("R1")
+        forced_per_writer = len(range(0, ROTATION_STRESS_OPS, 10))
+        assert rotation['current_cycle'] == 1 + writers * ROTATION_STRESS_OPS
+        assert len(rotation['forced_transactions']) == min(100, writers * forced_per_writer)
+
+        mutations = writers * (ROTATION_STRESS_OPS + forced_per_writer)
+        throughput = mutations / elapsed
+        print(f"\n{backend}, {writers} écrivain(s): {mutations} mutations en {elapsed:.2f} s ({throughput:.0f} / s)")
+        assert throughput >= ROTATION_STRESS_MIN_OPS_S
@@ -0,0 +1,133 @@
+"""
+Tests unitaires pour le backtest multi-snapshots
+Focus sur l'égalité avec find_routes_with_filters, les sources d'archives et le pool de processus
+"""
+import copy
+import json
+import tarfile
+import zipfile
+
+import pytest
+
+from src.analysis.backtest import (BacktestWriter, load_backtest, run_backtest,
+                                   snapshot_date)
+from src.engine import arbitrage_engine
+from src.engine.arbitrage_engine import find_routes_with_filters
+
+
+def _snapshots(config, count=6):
+    """Snapshots datés, prix de vente décalés de 0,5 % par jour"""
+    snapshots = {}
+    for day in range(count):
+        snapshot = copy.deepcopy(config)
+        for market in snapshot['markets']:
+            market['sell_price'] *= 1 + 0.005 * day
+        snapshots[f"config_2025-01-{day + 1:02d}.json"] = snapshot
+    return snapshots
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, mock_config_valid):
+    directory = tmp_path / "snapshots"
+    directory.mkdir()
+    for name, snapshot in _snapshots(mock_config_valid).items():
+        (directory / name).write_text(json.dumps(snapshot), encoding='utf-8')
+    return directory
+
+
+def _rows(path):
+    columns = load_backtest(path)
+    return list(zip(*(columns[c].tolist() for c in columns)))
+
+
+class TestBacktestExactness:
+    """Routes du backtest = find_routes_with_filters sur chaque snapshot"""
+
+    def test_matches_engine_per_snapshot(self, snapshot_dir, tmp_path, mock_config_valid):
+        out = tmp_path / "bt.npz"
+        summary = run_backtest(str(snapshot_dir), str(out), top_n=3, methods=('forex', 'bank'),
+                               apply_threshold=False, workers=1)
+        columns = load_backtest(out)
+
+        assert summary['snapshots'] == 6 and summary['errors'] == []
+        assert summary['rows'] == len(columns['rank'])
+        for name, snapshot in _snapshots(mock_config_valid).items():
+            arbitrage_engine.markets = snapshot['markets']
+            arbitrage_engine.forex_rates = snapshot['forex_rates']
+            arbitrage_engine.SEUIL_RENTABILITE_PCT = snapshot['SEUIL_RENTABILITE_PCT']
+            for method in ('forex', 'bank'):
+                expected = find_routes_with_filters(top_n=3, apply_threshold=False, conversion_method=method)
+                mask = (columns['snapshot'] == name) & (columns['conversion_method'] == method)
+                assert columns['rank'][mask].tolist() == list(range(1, len(expected) + 1))
+                assert columns['profit_pct'][mask].tolist() == [r['profit_pct'] for r in expected]
+                assert columns['selling_market_code'][mask].tolist() == \
+                    [r['selling_market_code'] for r in expected]
+
+    def test_process_pool_same_result(self, snapshot_dir, tmp_path):
+        inline, pooled = tmp_path / "inline.npz", tmp_path / "pool.npz"
+        run_backtest(str(snapshot_dir), str(inline), workers=1, apply_threshold=False)
+        summary = run_backtest(str(snapshot_dir), str(pooled), workers=2, batch_size=2, apply_threshold=False)
+
+        assert summary['workers'] == 2
+        assert _rows(pooled) == _rows(inline)
+
+    def test_sorted_by_date_and_deduplicated(self, snapshot_dir, tmp_path):
+        # Copie du 1er janvier datée du 7 : même contenu, évalué une seule fois
+        (snapshot_dir / "config_2025-01-07.json").write_bytes(
+            (snapshot_dir / "config_2025-01-01.json").read_bytes())
+        out = tmp_path / "bt.npz"
+        summary = run_backtest(str(snapshot_dir), str(out), workers=1, apply_threshold=False)
+        columns = load_backtest(out)
+
+        assert (summary['snapshots'], summary['evaluated']) == (7, 6)
+        assert columns['snapshot_date'].tolist() == sorted(columns['snapshot_date'].tolist())
+        first = columns['snapshot'] == "config_2025-01-01.json"
+        last = columns['snapshot'] == "config_2025-01-07.json"
+        assert columns['profit_pct'][first].tolist() == columns['profit_pct'][last].tolist()
+
+
+class TestBacktestSources:
+    """Archives et snapshots invalides"""
+
+    @pytest.mark.parametrize("archive", ["zip", "tar.gz"])
+    def test_archive_source(self, snapshot_dir, tmp_path, archive):
+        path = tmp_path / f"snapshots.{archive}"
+        if archive == "zip":
+            with zipfile.ZipFile(path, 'w') as z:
+                for f in snapshot_dir.iterdir():
+                    z.write(f, f"2025/{f.name}")
+        else:
+            with tarfile.open(path, 'w:gz') as t:
+                for f in snapshot_dir.iterdir():
+                    t.add(f, f"2025/{f.name}")
+
+        from_dir, from_archive = tmp_path / "dir.npz", tmp_path / "archive.npz"
+        run_backtest(str(snapshot_dir), str(from_dir), workers=1)
+        run_backtest(str(path), str(from_archive), workers=1)
+        strip = lambda rows: [row[1:] for row in rows]  # Noms préfixés par 2025/ dans l'archive
+        assert strip(_rows(from_archive)) == strip(_rows(from_dir))
+
+    def test_invalid_snapshots_reported(self, snapshot_dir, tmp_path, mock_config_valid):
+        (snapshot_dir / "config_2025-02-01.json").write_text('{"markets": [', encoding='utf-8')
+        blocked = copy.deepcopy(mock_config_valid)
+        del blocked['forex_rates']['XAF/EUR']
+        (snapshot_dir / "config_2025-02-02.json").write_text(json.dumps(blocked), encoding='utf-8')
+
+        summary = run_backtest(str(snapshot_dir), str(tmp_path / "bt.npz"), workers=1)
+        assert [e['snapshot'] for e in summary['errors']] == ["config_2025-02-01.json", "config_2025-02-02.json"]
+        assert summary['rows'] > 0
+
+    def test_invalid_source(self, tmp_path):
+        path = tmp_path / "notes.txt"
+        path.write_text("pas une archive", encoding='utf-8')
+        with pytest.raises(ValueError):
+            run_backtest(str(path), str(tmp_path / "bt.npz"))
+
+    def test_snapshot_date(self):
+        assert snapshot_date("config_20250131_143000.json") == "2025-01-31T14:30:00"
+        assert snapshot_date("2025/config_2025-01-31.json") == "2025-01-31T00:00:00"
+        assert snapshot_date("config.json") == ''
+
+    def test_unknown_format(self, tmp_path):
+        with pytest.raises(ValueError):
+            BacktestWriter(tmp_path / "bt.csv", fmt='csv')
@@ -0,0 +1,77 @@
+"""
+Tests unitaires pour le balayage de capital vectorisé
+Focus sur l'égalité exacte avec calculate_profit_route() montant par montant
+"""
+import math
+import time
+
+import numpy as np
+import pytest
+
+from src.engine import arbitrage_engine
+from src.engine.arbitrage_engine import (calculate_profit_route,
+                                         calculate_profit_routes_batch)
+from src.engine.route_engine import RouteEngine
+
+
+@pytest.fixture
+def engine_globals(mock_config_valid):
+    arbitrage_engine.markets = mock_config_valid['markets']
+    arbitrage_engine.forex_rates = mock_config_valid['forex_rates']
+    arbitrage_engine.SEUIL_RENTABILITE_PCT = mock_config_valid['SEUIL_RENTABILITE_PCT']
+    return mock_config_valid
+
+
+class TestSweepExactness:
+    """Chaque cellule = calculate_profit_route(montant, sourcing, vente)"""
+
+    def test_matches_scalar_function(self, engine_globals, conversion_method):
+        amounts = [0.5, 1, 250, 1000, 12345.678, 1e6]
+        sweep = calculate_profit_routes_batch(amounts, conversion_method=conversion_method)
+
+        for k, amount in enumerate(amounts):
+            for p, (a, b) in enumerate(sweep.pairs):
+                route = calculate_profit_route(amount, a, b, conversion_method)
+                if route is None:
+                    assert math.isnan(sweep.profit_pct[k, p])
+                    continue
+                assert sweep.final_amount_usdt[k, p] == route['final_amount_usdt']
+                assert sweep.profit_usdt[k, p] == route['profit_usdt']
+                assert sweep.profit_pct[k, p] == route['profit_pct']
+
+    def test_invalid_inputs_are_nan(self, engine_globals):
+        pairs = [('EUR', 'XAF'), ('XAF', 'XAF'), ('EUR', 'ZZZ')]
+        sweep = calculate_profit_routes_batch([0, -10, float('inf'), float('nan'), 1000], pairs)
+
+        assert sweep.profit_pct.shape == (5, 3)
+        assert np.isnan(sweep.profit_pct[:4]).all()
+        assert not math.isnan(sweep.profit_pct[4, 0])
+        assert np.isnan(sweep.profit_pct[4, 1:]).all()
+
+    def test_curve_for_one_pair(self, engine_globals):
+        amounts = np.linspace(100, 10000, 50)
+        sweep = calculate_profit_routes_batch(amounts, [('EUR', 'XAF')])
+        curve = sweep.curve('EUR', 'XAF')
+
+        assert curve['profit_usdt'].shape == (50,)
+        np.testing.assert_allclose(curve['final_amount_usdt'] - amounts, curve['profit_usdt'])
+
+    def test_engine_sweep_uses_own_config(self, mock_config_valid):
+        engine = RouteEngine(mock_config_valid)
+        sweep = engine.sweep_capital([1000], [('EUR', 'XAF')])
+
+        assert sweep.profit_pct[0, 0] == engine.calculate_profit_route(1000, 'EUR', 'XAF')['profit_pct']
+
+
+class TestSweepPerformance:
+    """Un appel vectorisé au lieu de milliers d'appels Python"""
+
+    def test_thousands_of_amounts_in_one_call(self, engine_globals):
+        amounts = np.linspace(10, 100000, 5000)
+
+        start = time.perf_counter()
+        sweep = calculate_profit_routes_batch(amounts)
+        elapsed = time.perf_counter() - start
+
+        assert sweep.profit_pct.shape == (5000, len(sweep.pairs))
+        assert elapsed < 1.0
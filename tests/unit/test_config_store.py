@@ -0,0 +1,135 @@
+"""
+Tests unitaires pour le ConfigStore partagé
+Focus sur la détection de changements (mtime/hash) et la notification des abonnés
+"""
+import gc
+import json
+import os
+
+import pytest
+
+from src.engine.route_engine import RouteEngine
+from src.utils.config_store import ConfigError, ConfigStore, get_config_store
+
+
+def _write(path, config):
+    path.write_text(json.dumps(config), encoding='utf-8')
+
+
+def _bump_mtime(path, seconds=10):
+    """Décale le mtime pour simuler une écriture ultérieure"""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 1_000_000_000))
+
+
+@pytest.fixture
+def config_file(tmp_path, mock_config_valid):
+    path = tmp_path / "config.json"
+    _write(path, mock_config_valid)
+    return path
+
+
+class TestChangeDetection:
+    """Relecture uniquement si le fichier change"""
+
+    def test_unchanged_file_parsed_once(self, config_file):
+        store = ConfigStore(config_file)
+
+        first = store.get()
+        for _ in range(10):
+            assert store.get() is first
+
+        assert store.stats == {'reads': 1, 'parses': 1}
+        assert store.version == 1
+
+    def test_touched_file_same_content_not_reparsed(self, config_file):
+        store = ConfigStore(config_file)
+        first = store.get()
+
+        _bump_mtime(config_file)
+
+        assert store.get() is first
+        assert store.stats == {'reads': 2, 'parses': 1}
+
+    def test_content_change_reloaded(self, config_file, mock_config_valid):
+        store = ConfigStore(config_file)
+        store.get()
+
+        mock_config_valid['SEUIL_RENTABILITE_PCT'] = 3.0
+        _write(config_file, mock_config_valid)
+        _bump_mtime(config_file)
+
+        assert store.get()['SEUIL_RENTABILITE_PCT'] == 3.0
+        assert store.version == 2
+
+    def test_invalid_edit_keeps_last_valid(self, config_file):
+        store = ConfigStore(config_file)
+        first = store.get()
+
+        config_file.write_text('{"markets": [', encoding='utf-8')  # Écriture en cours
+        _bump_mtime(config_file)
+
+        assert store.get() is first
+        assert store.version == 1
+
+    def test_first_load_errors(self, tmp_path):
+        with pytest.raises(ConfigError, match="manquant"):
+            ConfigStore(tmp_path / "absent.json").get()
+
+        incomplete = tmp_path / "incomplete.json"
+        _write(incomplete, {'markets': []})
+        with pytest.raises(ConfigError, match="forex_rates"):
+            ConfigStore(incomplete).get()
+
+    def test_shared_store_per_path(self, config_file):
+        assert get_config_store(config_file) is get_config_store(str(config_file))
+
+
+class TestSubscribers:
+    """Notification des abonnés à chaque nouvelle config"""
+
+    def test_subscriber_notified_on_change_only(self, config_file, mock_config_valid):
+        store = ConfigStore(config_file)
+        store.get()
+        received = []
+        unsubscribe = store.subscribe(received.append)
+
+        store.get()
+        _bump_mtime(config_file)
+        store.get()
+        assert received == []
+
+        mock_config_valid['NB_CYCLES_PAR_ROTATION'] = 5
+        _write(config_file, mock_config_valid)
+        _bump_mtime(config_file, 20)
+        store.get()
+        assert [c['NB_CYCLES_PAR_ROTATION'] for c in received] == [5]
+
+        unsubscribe()
+        store.refresh(force=True)
+        assert len(received) == 1
+
+    def test_engine_follows_file(self, config_file, mock_config_valid):
+        """Un RouteEngine abonné voit les nouveaux prix sans être recréé"""
+        store = ConfigStore(config_file)
+        engine = RouteEngine.from_store(store)
+        before = engine.calculate_profit_route(1000, 'EUR', 'XAF')
+
+        xaf = next(m for m in mock_config_valid['markets'] if m['currency'] == 'XAF')
+        xaf['sell_price'] *= 1.05
+        _write(config_file, mock_config_valid)
+        _bump_mtime(config_file)
+        store.refresh()
+
+        after = engine.calculate_profit_route(1000, 'EUR', 'XAF')
+        assert after['profit_pct'] > before['profit_pct']
+
+    def test_released_engine_unsubscribed(self, config_file):
+        """Abonnement par référence faible : un moteur libéré n'est plus notifié"""
+        store = ConfigStore(config_file)
+        engine = RouteEngine.from_store(store)
+        del engine
+        gc.collect()
+
+        assert store.refresh(force=True)
+        assert store._subscribers == []
@@ -0,0 +1,116 @@
+"""
+Tests unitaires pour la table de conversion compilée
+Focus sur l'équivalence avec get_forex_rate() et l'invalidation du cache
+"""
+import math
+
+import pytest
+
+from src.engine import arbitrage_engine, conversion_table
+from src.engine.arbitrage_engine import convert_to_eur, get_forex_rate
+from src.engine.conversion_table import ConversionTable, get_conversion_table
+
+
+class TestConversionTableEquivalence:
+    """La table reproduit exactement get_forex_rate()"""
+
+    def test_matches_get_forex_rate_for_all_pairs(self, mock_config_valid, conversion_method):
+        """Chaque couple (from, to) = get_forex_rate(), NaN si erreur"""
+        rates = mock_config_valid['forex_rates']
+        table = ConversionTable(rates)
+
+        for from_currency in table.currencies:
+            for to_currency in table.currencies:
+                try:
+                    expected = get_forex_rate(from_currency, to_currency, rates, conversion_method)
+                except ValueError:
+                    assert math.isnan(table.lookup(from_currency, to_currency, conversion_method))
+                    continue
+                assert table.lookup(from_currency, to_currency, conversion_method) == expected
+
+    def test_legacy_numeric_format(self):
+        """Ancien format numérique : RWF/EUR = 1700"""
+        table = ConversionTable({"RWF/EUR": 1700.0})
+
+        assert table.rate("RWF", "EUR") == 1.0 / 1700.0
+        assert table.rate("EUR", "RWF") == 1700.0
+        assert table.rate("RWF", "EUR", "bank") == 1.0 / 1700.0
+
+    def test_direct_pair_takes_precedence(self):
+        """Paire directe prioritaire sur la paire inverse, quel que soit l'ordre"""
+        rates = {
+            "EUR/XAF": {"bid": 600.0, "ask": 610.0, "bank_spread_pct": 1.0},
+            "XAF/EUR": {"bid": 650.0, "ask": 660.0, "bank_spread_pct": 1.0},
+        }
+        table = ConversionTable(rates)
+
+        assert table.rate("XAF", "EUR") == get_forex_rate("XAF", "EUR", rates)
+        assert table.rate("EUR", "XAF") == get_forex_rate("EUR", "XAF", rates)
+
+    def test_invalid_entry_does_not_fall_back_to_inverse(self):
+        """Paire directe invalide → taux manquant (comme get_forex_rate qui lève)"""
+        rates = {
+            "XAF/EUR": {"bid": 0.0, "ask": 660.0},
+            "EUR/XAF": {"bid": 650.0, "ask": 660.0},
+        }
+        table = ConversionTable(rates)
+
+        assert math.isnan(table.lookup("XAF", "EUR"))
+        with pytest.raises(ValueError, match="Taux de change manquant"):
+            table.rate("XAF", "EUR")
+
+    def test_unknown_currency(self):
+        """Devise inconnue → ValueError, identité → 1.0"""
+        table = ConversionTable({"XAF/EUR": {"bid": 650.0, "ask": 660.0}})
+
+        assert table.currency_id("ZZZ") is None
+        assert table.rate("ZZZ", "ZZZ") == 1.0
+        with pytest.raises(ValueError, match="Taux de change manquant pour ZZZ→EUR"):
+            table.rate("ZZZ", "EUR")
+
+    def test_rates_to_vector(self, mock_config_valid):
+        """rates_to() aligne les taux sur l'ordre des devises demandées"""
+        rates = mock_config_valid['forex_rates']
+        currencies = [m['currency'] for m in mock_config_valid['markets']]
+        vector = ConversionTable(rates).rates_to('EUR', currencies)
+
+        for pos, currency in enumerate(currencies):
+            assert vector[0, pos] == get_forex_rate(currency, 'EUR', rates, 'forex')
+            assert vector[1, pos] == get_forex_rate(currency, 'EUR', rates, 'bank')
+
+
+class TestConversionTableCache:
+    """Recompilation uniquement si le contenu de forex_rates change"""
+
+    def test_same_content_reuses_table(self, mock_config_valid):
+        """Même contenu (même copie différente) → même table"""
+        rates = mock_config_valid['forex_rates']
+        table = get_conversion_table(rates)
+
+        assert get_conversion_table(dict(rates)) is table
+
+    def test_changed_content_recompiles(self, mock_config_valid, monkeypatch):
+        """Modification d'un taux → nouvelle table"""
+        monkeypatch.setattr(conversion_table, '_cached_table', None)
+        rates = {k: dict(v) for k, v in mock_config_valid['forex_rates'].items()}
+        table = get_conversion_table(rates)
+
+        rates['XAF/EUR']['ask'] = 700.0
+        updated = get_conversion_table(rates)
+
+        assert updated is not table
+        assert updated.rate('XAF', 'EUR') == 1.0 / 700.0
+
+    def test_convert_to_eur_reuses_config_table(self, mock_config_valid, monkeypatch):
+        """Taux de la config chargée : table compilée au chargement, pas d'empreinte par conversion"""
+        monkeypatch.setattr(arbitrage_engine, '_compiled_config', arbitrage_engine._compiled_config)
+        rates = mock_config_valid['forex_rates']
+        arbitrage_engine._compile_config(mock_config_valid)
+        expected = 1000 * get_forex_rate('XAF', 'EUR', rates)
+
+        def fail(forex_rates):
+            raise AssertionError("empreinte recalculée")
+        monkeypatch.setattr(conversion_table, 'rates_fingerprint', fail)
+
+        assert convert_to_eur(1000, 'XAF', rates) == expected
+        assert convert_to_eur(1000, 'XAF', dict(rates)) == expected  # Autre dict : taux résolu directement
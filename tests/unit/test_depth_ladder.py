@@ -0,0 +1,185 @@
+"""
+Tests unitaires pour les carnets d'ordres et le pricing avec slippage
+Focus sur le VWAP par recherche dichotomique et la taille max rentable
+"""
+import copy
+import random
+import time
+
+import numpy as np
+import pytest
+
+from src.engine.conversion_table import ConversionTable
+from src.engine.depth_ladder import DepthLadder, parse_depth
+from src.engine.depth_matrix import DepthRouteMatrix
+from src.engine.market_book import MarketBook
+from src.engine.route_engine import RouteEngine
+
+
+def _depth_config(mock_config_valid):
+    """Config réelle + carnets sur EUR (achat) et XAF (vente)"""
+    config = copy.deepcopy(mock_config_valid)
+    markets = {m['currency']: m for m in config['markets']}
+    eur, xaf = markets['EUR'], markets['XAF']
+    eur['depth'] = {'buy': [[eur['buy_price'], 500], [eur['buy_price'] * 1.002, 1500],
+                            [eur['buy_price'] * 1.01, 5000]]}
+    xaf['depth'] = {'sell': [[xaf['sell_price'], 400], [xaf['sell_price'] * 0.99, 1000],
+                             [xaf['sell_price'] * 0.90, 3000]]}
+    return config
+
+
+class TestDepthLadder:
+    """Montants exécutés, VWAP et inverse"""
+
+    def test_quote_amount_walks_levels(self):
+        ladder = DepthLadder.from_levels([[101.0, 20], [100.0, 10], [103.0, 5]], 'buy')
+
+        assert ladder.quote_amount(5) == 500.0
+        assert ladder.quote_amount(10) == 1000.0
+        assert ladder.quote_amount(15) == 1000.0 + 5 * 101.0
+        assert ladder.quote_amount(35) == 1000.0 + 20 * 101.0 + 5 * 103.0
+        assert np.isnan(ladder.quote_amount(35.5))
+        assert ladder.capacity == 35.0
+
+    def test_sell_side_sorted_best_first(self):
+        ladder = DepthLadder.from_levels([[99.0, 10], [100.0, 10]], 'sell')
+
+        assert ladder.vwap(10) == 100.0
+        assert ladder.vwap(20) == 99.5
+
+    def test_vectorized_and_inverse(self):
+        ladder = DepthLadder.from_levels([[100.0, 10], [101.0, 20], [103.0, 5]], 'buy')
+        sizes = np.linspace(0.5, 35, 40)
+
+        amounts = ladder.quote_amount(sizes)
+        np.testing.assert_allclose(ladder.size_for_quote(amounts * 1.002, 1.002), sizes)
+
+    def test_flat_ladder_is_exact(self):
+        """Sans carnet : montant = taille × prix au bit près"""
+        ladder = DepthLadder.flat(595.86)
+        for size in (0.1, 1000, 123456.789):
+            assert ladder.quote_amount(size) == size * 595.86
+            assert ladder.size_for_quote(size, 1.001) == size / (595.86 * 1.001)
+
+    @pytest.mark.parametrize("depth", [
+        [[100.0, 10]],
+        {'buy': [[100.0, -1]]},
+        {'buy': [[0, 10]]},
+        {'buy': []},
+        {'buy': [["abc", 10]]},
+        {'ask': [[100.0, 10]]},
+    ])
+    def test_invalid_depth_rejected(self, depth):
+        with pytest.raises(ValueError):
+            parse_depth(depth)
+
+    def test_invalid_depth_ignored_by_market_book(self, mock_config_valid):
+        markets = copy.deepcopy(mock_config_valid['markets'])
+        markets[1]['depth'] = {'sell': [[1.0, -5]]}
+        book = MarketBook(markets)
+
+        record = book.record(markets[1]['currency'])
+        assert record.sell_depth is None
+        assert record.sell_ladder().capacity == float('inf')
+
+
+class TestDepthAwareRoutes:
+    """Routes évaluées sur les carnets"""
+
+    def test_no_depth_matches_top_of_book(self, mock_config_valid, conversion_method):
+        """Sans carnet : mêmes routes et mêmes chiffres qu'au prix affiché"""
+        engine = RouteEngine(mock_config_valid)
+        plain = engine.find_routes(top_n=5, conversion_method=conversion_method)
+        depth = engine.find_routes(top_n=5, conversion_method=conversion_method, trade_size=1000)
+
+        assert [(r['sourcing_market_code'], r['selling_market_code']) for r in depth] == \
+            [(r['sourcing_market_code'], r['selling_market_code']) for r in plain]
+        for d, p in zip(depth, plain):
+            assert d['profit_pct'] == p['profit_pct']
+            assert d['final_amount_usdt'] == p['final_amount_usdt']
+
+    def test_slippage_reduces_profit(self, mock_config_valid):
+        engine = RouteEngine(_depth_config(mock_config_valid))
+
+        small = engine.depth_route(100, 'EUR', 'XAF')
+        large = engine.depth_route(3000, 'EUR', 'XAF')
+
+        assert small['sell_vwap'] > large['sell_vwap']
+        assert small['profit_pct'] > large['profit_pct']
+        assert engine.depth_route(10000, 'EUR', 'XAF') is None  # Au-delà de la profondeur XAF
+
+    def test_max_profitable_size_is_boundary(self, mock_config_valid):
+        """Rentable juste sous la taille max, non rentable juste au-dessus"""
+        engine = RouteEngine(_depth_config(mock_config_valid))
+        route = engine.depth_route(100, 'EUR', 'XAF')
+        size = route['max_profitable_size']
+
+        assert 0 < size < 4400
+        assert engine.depth_route(size * 0.999, 'EUR', 'XAF')['profit_pct'] >= 0
+        assert engine.depth_route(size * 1.001, 'EUR', 'XAF')['profit_pct'] < 0
+        assert engine.depth_route(size, 'EUR', 'XAF')['profit_pct'] == pytest.approx(0, abs=1e-9)
+
+    def test_unlimited_liquidity_size(self, mock_config_valid):
+        route = RouteEngine(mock_config_valid).find_routes(top_n=1, trade_size=1000)[0]
+
+        assert route['max_profitable_size'] is None
+        assert route.materialize()['buy_vwap'] > 0
+
+    def test_incremental_update_matches_rebuild(self, mock_config_valid):
+        """set_record() sur un marché à carnet = matrice reconstruite depuis le MarketBook"""
+        config = _depth_config(mock_config_valid)
+        book = MarketBook(config['markets'])
+        table = ConversionTable(config['forex_rates'])
+        matrix = DepthRouteMatrix.from_market_book(book, table, 1000)
+
+        for currency in ('XAF', 'EUR'):
+            record = book.update(currency, fee_pct=book.record(currency).fee_pct + 0.5)
+            matrix.set_record(record.position, record)
+        rebuilt = DepthRouteMatrix.from_market_book(book, table, 1000)
+
+        for name in ('buy_prices', 'sell_prices', 'fees_pct', 'cost_eur', 'revenue_eur', 'valid_sourcing'):
+            np.testing.assert_array_equal(getattr(matrix, name), getattr(rebuilt, name))
+        assert matrix.ranked_keys('forex', top_n=5) == rebuilt.ranked_keys('forex', top_n=5)
+        a, b = matrix.index['EUR'], matrix.index['XAF']
+        assert matrix.make_record('forex', a, b, 1) == rebuilt.make_record('forex', a, b, 1)
+
+    def test_set_market_drops_depth(self, mock_config_valid):
+        """set_market() : prix affiché sans carnet, comme un marché sans profondeur"""
+        config = _depth_config(mock_config_valid)
+        book = MarketBook(config['markets'])
+        table = ConversionTable(config['forex_rates'])
+        matrix = DepthRouteMatrix.from_market_book(book, table, 1000)
+        record = book.record('XAF')
+        matrix.set_market(record.position, record.buy_price, record.sell_price, record.fee_pct)
+
+        flat = DepthRouteMatrix.from_market_book(MarketBook(mock_config_valid['markets']), table, 1000)
+        np.testing.assert_array_equal(matrix.revenue_eur[:, record.position], flat.revenue_eur[:, record.position])
+
+
+class TestDepthPerformance:
+    """Classement de toutes les paires sur carnets : reste interactif"""
+
+    def test_ranking_with_deep_books(self):
+        rng = random.Random(3)
+        markets = [{"currency": "EUR", "buy_price": 0.857, "sell_price": 0.851, "fee_pct": 0.1}]
+        rates = {}
+        for i in range(299):
+            code = f"C{i:03d}"
+            price = rng.uniform(100, 120)
+            markets.append({
+                "currency": code, "buy_price": price, "sell_price": price * 0.995, "fee_pct": 0.5,
+                "depth": {
+                    'buy': [[price * (1 + k / 1000), rng.uniform(50, 500)] for k in range(50)],
+                    'sell': [[price * 0.995 * (1 - k / 1000), rng.uniform(50, 500)] for k in range(50)],
+                },
+            })
+            rates[f"{code}/EUR"] = {"bid": 117.0, "ask": 118.0, "bank_spread_pct": 1.0}
+        engine = RouteEngine({'markets': markets, 'forex_rates': rates, 'SEUIL_RENTABILITE_PCT': -100.0})
+
+        start = time.perf_counter()
+        routes = engine.find_routes(top_n=10, skip_validation=True, trade_size=2000)
+        elapsed = time.perf_counter() - start
+
+        assert len(routes) == 10
+        assert all(r['max_profitable_size'] is not None for r in routes)
+        assert elapsed < 1.0
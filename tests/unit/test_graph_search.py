@@ -0,0 +1,267 @@
+"""
+Tests unitaires pour la recherche de cycles multi-sauts
+Focus sur l'optimalité (vs énumération exhaustive), les filtres et la forme des résultats
+"""
+import json
+import random
+import time
+
+import pytest
+
+from src.engine import arbitrage_engine
+from src.engine.arbitrage_engine import find_routes_with_filters
+from src.engine.conversion_table import ConversionTable
+from src.engine.graph_search import CurrencyGraph
+from src.engine.market_book import MarketBook
+from src.engine.route_record import CycleRecord
+
+
+def _brute_force_best(graph, max_hops):
+    """
+    Énumération DFS de tous les chemins forex simples : meilleur gain par (A, B)
+
+    A = B : uniquement les boucles forex rentables (pas l'aller-retour sur A)
+    """
+    n = len(graph.currencies)
+    best = {}
+
+    def explore(path, gain):
+        b, a = path[0], path[-1]
+        total = graph.sell_rate[b] * gain / graph.buy_cost[a]
+        is_loop = len(path) > 1 and a == b
+        if (a != b or (is_loop and gain > 1 + 1e-12)) and total == total and total > best.get((a, b), 0):  # pylint: disable=comparison-with-itself
+            best[(a, b)] = total
+        if is_loop or len(path) - 1 >= max_hops - 2:
+            return
+        for nxt in range(n):
+            rate = graph.fx_rates[path[-1], nxt]
+            if (nxt not in path or nxt == b) and rate == rate and rate > 0:  # pylint: disable=comparison-with-itself
+                explore(path + [nxt], gain * rate)
+
+    for b in range(n):
+        explore([b], 1.0)
+    return best
+
+
+def _cross_rates_config(mock_config_valid):
+    """Config de test + paires croisées (plusieurs chemins forex possibles)"""
+    rates = dict(mock_config_valid['forex_rates'])
+    rates["XAF/XOF"] = {"bid": 0.98, "ask": 1.02, "bank_spread_pct": 0.5}
+    rates["KES/XAF"] = {"bid": 0.22, "ask": 0.24, "bank_spread_pct": 1.0}
+    return mock_config_valid['markets'], rates
+
+
+def _forex_arbitrage_config(mock_config_valid):
+    """Paires croisées avec une incohérence : EUR → XAF → XOF → EUR rapporte"""
+    markets, rates = _cross_rates_config(mock_config_valid)
+    rates["XAF/XOF"] = {"bid": 0.88, "ask": 0.90, "bank_spread_pct": 0.5}
+    return markets, rates
+
+
+class TestCycleOptimality:
+    """Le Bellman-Ford borné trouve le meilleur cycle de chaque couple"""
+
+    @pytest.mark.parametrize("max_hops", [2, 3, 4, 5])
+    def test_matches_exhaustive_search(self, mock_config_valid, conversion_method, max_hops):
+        """Gain de chaque cycle = meilleur gain de l'énumération exhaustive"""
+        markets, rates = _cross_rates_config(mock_config_valid)
+        graph = CurrencyGraph(MarketBook(markets), ConversionTable(rates), conversion_method)
+        expected = _brute_force_best(graph, max_hops)
+
+        cycles = graph.ranked_cycles(max_hops=max_hops)
+        in_bounds = {k: v for k, v in expected.items() if -90 <= (v - 1) * 100 <= 1000}
+
+        assert len(cycles) == len(in_bounds)
+        for cycle in cycles:
+            key = (graph.index[cycle['sourcing_market_code']], graph.index[cycle['selling_market_code']])
+            assert cycle['final_amount_usdt'] / 1000 == pytest.approx(in_bounds[key], rel=1e-12)
+            assert cycle['nb_hops'] <= max_hops
+
+    @pytest.mark.parametrize("max_hops", [3, 4, 5, 6, 7])
+    def test_matches_exhaustive_search_with_forex_arbitrage(self, mock_config_valid, conversion_method, max_hops):
+        """Parcours non simples remplacés par le meilleur chemin simple : aucun couple perdu"""
+        markets, rates = _forex_arbitrage_config(mock_config_valid)
+        graph = CurrencyGraph(MarketBook(markets), ConversionTable(rates), conversion_method)
+        expected = _brute_force_best(graph, max_hops)
+
+        cycles = graph.ranked_cycles(max_hops=max_hops)
+        in_bounds = {k: v for k, v in expected.items() if -90 <= (v - 1) * 100 <= 1000}
+
+        assert len(cycles) == len(in_bounds)
+        for cycle in cycles:
+            key = (graph.index[cycle['sourcing_market_code']], graph.index[cycle['selling_market_code']])
+            assert cycle['final_amount_usdt'] / 1000 == pytest.approx(in_bounds[key], rel=1e-12)
+        profits = [c['profit_pct'] for c in cycles]
+        assert profits == sorted(profits, reverse=True)
+
+    def test_sorted_by_profit(self, mock_config_valid):
+        """Cycles triés par rentabilité décroissante"""
+        markets, rates = _cross_rates_config(mock_config_valid)
+        graph = CurrencyGraph(MarketBook(markets), ConversionTable(rates))
+        profits = [c['profit_pct'] for c in graph.ranked_cycles(max_hops=5)]
+
+        assert profits == sorted(profits, reverse=True)
+
+    def test_cycle_path_is_consistent(self, mock_config_valid):
+        """Chemin A → B → … → A et montants enchaînés avec les taux du graphe"""
+        graph = CurrencyGraph(MarketBook(mock_config_valid['markets']),
+                              ConversionTable(mock_config_valid['forex_rates']))
+
+        for cycle in graph.ranked_cycles(max_hops=4):
+            path = cycle['cycle_path']
+            assert path[0] == path[-1] == cycle['sourcing_market_code']
+            assert path[1] == cycle['selling_market_code']
+            assert len(set(path[1:])) == len(path) - 1
+
+
+class TestNegativeCycles:
+    """Cycles forex rentables (Bellman-Ford) et boucles A → … → A"""
+
+    def test_detects_forex_arbitrage(self, mock_config_valid, conversion_method):
+        markets, rates = _forex_arbitrage_config(mock_config_valid)
+        graph = CurrencyGraph(MarketBook(markets), ConversionTable(rates), conversion_method)
+
+        cycles = graph.negative_cycles()
+
+        assert [path for path, _ in cycles] == [['EUR', 'XAF', 'XOF', 'EUR']]
+        assert cycles[0][1] > 0
+
+    def test_consistent_rates_have_none(self, mock_config_valid):
+        markets, rates = _cross_rates_config(mock_config_valid)
+        graph = CurrencyGraph(MarketBook(markets), ConversionTable(rates))
+        assert graph.negative_cycles() == []
+
+    def test_max_hops(self, mock_config_valid):
+        """Cycle de 3 sauts ignoré si la borne est plus courte"""
+        markets, rates = _forex_arbitrage_config(mock_config_valid)
+        graph = CurrencyGraph(MarketBook(markets), ConversionTable(rates))
+        assert graph.negative_cycles(max_hops=2) == []
+
+    def test_same_market_only_through_forex_loop(self, mock_config_valid):
+        """Achat et vente sur le même marché : seulement avec une boucle forex rentable"""
+        markets, rates = _cross_rates_config(mock_config_valid)
+        graph = CurrencyGraph(MarketBook(markets), ConversionTable(rates))
+        assert all(c['sourcing_market_code'] != c['selling_market_code']
+                   for c in graph.ranked_cycles(max_hops=5))
+
+        markets, rates = _forex_arbitrage_config(mock_config_valid)
+        graph = CurrencyGraph(MarketBook(markets), ConversionTable(rates))
+        loops = [c for c in graph.ranked_cycles(max_hops=5)
+                 if c['sourcing_market_code'] == c['selling_market_code']]
+        assert loops
+        for cycle in loops:
+            assert len(cycle['cycle_path']) >= 4
+            assert len(set(cycle['cycle_path'][1:-1])) == len(cycle['cycle_path']) - 2
+
+
+class TestCycleFilters:
+    """Mêmes filtres que la recherche directe"""
+
+    @pytest.fixture
+    def graph(self, mock_config_valid):
+        return CurrencyGraph(MarketBook(mock_config_valid['markets']),
+                             ConversionTable(mock_config_valid['forex_rates']))
+
+    def test_sourcing_currency(self, graph):
+        cycles = graph.ranked_cycles(sourcing_currency='KES')
+        assert cycles
+        assert all(c['sourcing_market_code'] == 'KES' for c in cycles)
+
+    def test_excluded_selling_markets(self, graph):
+        cycles = graph.ranked_cycles(excluded_markets=['XAF', 'XOF'])
+        assert all(c['selling_market_code'] not in ('XAF', 'XOF') for c in cycles)
+
+    def test_loop_currency_overrides_exclusion(self, graph):
+        cycles = graph.ranked_cycles(excluded_markets=['XAF'], loop_currency='XAF')
+        assert any(c['selling_market_code'] == 'XAF' for c in cycles)
+
+    def test_threshold_and_top_n(self, graph):
+        cycles = graph.ranked_cycles(threshold=1.5, top_n=2)
+        assert len(cycles) <= 2
+        assert all(c['profit_pct'] >= 1.5 for c in cycles)
+        assert graph.ranked_cycles(top_n=0) == []
+
+    def test_too_few_hops(self, graph):
+        """Moins de 2 arêtes : aucun cycle possible"""
+        assert graph.ranked_cycles(max_hops=1) == []
+
+
+class TestCycleRoutesInEngine:
+    """Mode 'cycles' de find_routes_with_filters()"""
+
+    @pytest.fixture(autouse=True)
+    def engine_config(self, mock_config_valid):
+        arbitrage_engine.markets = mock_config_valid['markets']
+        arbitrage_engine.forex_rates = mock_config_valid['forex_rates']
+        arbitrage_engine.SEUIL_RENTABILITE_PCT = mock_config_valid['SEUIL_RENTABILITE_PCT']
+
+    def test_returns_route_dict_shape(self):
+        """Résultats lisibles comme les routes directes, sérialisables en JSON"""
+        routes = find_routes_with_filters(top_n=5, skip_validation=True, search_mode='cycles', max_hops=4)
+
+        assert routes
+        for route in routes:
+            assert isinstance(route, CycleRecord)
+            for key in ('detailed_route', 'profit_pct', 'sourcing_market_code',
+                        'selling_market_code', 'plan_de_vol', 'final_amount_usdt'):
+                assert key in route
+            json.dumps(route.materialize(), ensure_ascii=False)
+
+    def test_plan_de_vol_phases(self):
+        """Plan : ACHAT, VENTE, une CONVERSION par saut forex, puis CLOTURE"""
+        route = find_routes_with_filters(top_n=1, skip_validation=True, apply_threshold=False,
+                                         search_mode='cycles', max_hops=4)[0]
+        phases = route['plan_de_vol']['phases']
+        nb_conversions = len(route['cycle_path']) - 2
+        per_cycle = 2 + nb_conversions
+
+        assert len(phases) == per_cycle * route.nb_cycles + 1
+        assert [p['type'] for p in phases[:per_cycle]] == ['ACHAT', 'VENTE'] + ['CONVERSION'] * nb_conversions
+        assert phases[-1]['type'] == 'CLOTURE'
+        assert phases[-1]['market'] == route['sourcing_market_code']
+
+
+class TestCyclePerformance:
+    """Des centaines de devises en bien moins d'une seconde"""
+
+    @staticmethod
+    def _hundreds_of_currencies():
+        rng = random.Random(11)
+        markets = [{"currency": "EUR", "buy_price": 0.857, "sell_price": 0.851, "fee_pct": 0.1}]
+        rates = {}
+        codes = [f"C{i:03d}" for i in range(300)]
+        for code in codes:
+            price = rng.uniform(50, 2000)
+            markets.append({"currency": code, "buy_price": price, "sell_price": price * 0.995, "fee_pct": 0.5})
+            mid = price / 0.857
+            rates[f"{code}/EUR"] = {"bid": mid * 0.99, "ask": mid * 1.01, "bank_spread_pct": 1.0}
+        for _ in range(1500):
+            x, y = rng.sample(codes, 2)
+            ratio = rng.uniform(0.5, 2.0)
+            rates[f"{x}/{y}"] = {"bid": ratio * 0.99, "ask": ratio * 1.01, "bank_spread_pct": 1.0}
+        return markets, rates
+
+    @pytest.mark.parametrize("max_hops", [5, 7])
+    def test_hundreds_of_currencies(self, max_hops):
+        """Cycles forex négatifs nombreux : le repli sur chemins simples reste borné"""
+        markets, rates = self._hundreds_of_currencies()
+
+        start = time.perf_counter()
+        graph = CurrencyGraph(MarketBook(markets), ConversionTable(rates))
+        cycles = graph.ranked_cycles(max_hops=max_hops, top_n=10)
+        elapsed = time.perf_counter() - start
+
+        assert len(cycles) == 10
+        assert elapsed < 1.0
+
+    def test_all_cycles(self):
+        """Sans top_n : toutes les paires (dizaines de milliers de cycles)"""
+        markets, rates = self._hundreds_of_currencies()
+
+        start = time.perf_counter()
+        graph = CurrencyGraph(MarketBook(markets), ConversionTable(rates))
+        cycles = graph.ranked_cycles(max_hops=4)
+        elapsed = time.perf_counter() - start
+
+        assert len(cycles) > 50_000
+        assert elapsed < 1.0
@@ -0,0 +1,133 @@
+"""
+Tests unitaires pour le carnet de marchés indexé
+Focus sur la recherche par devise, la validation au chargement et le cache
+"""
+import pytest
+
+from src.engine import arbitrage_engine, market_book
+from src.engine.arbitrage_engine import get_market_data
+from src.engine.market_book import MarketBook, get_market_book
+
+
+class TestMarketBookLookup:
+    """Recherche O(1) par devise"""
+
+    def test_records_match_config(self, mock_markets):
+        """Chaque marché est accessible par sa devise avec les mêmes valeurs"""
+        book = MarketBook(mock_markets)
+
+        assert len(book) == len(mock_markets)
+        for market in mock_markets:
+            record = book.record(market['currency'])
+            assert record.buy_price == market['buy_price']
+            assert record.sell_price == market['sell_price']
+            assert record.fee_pct == market['fee_pct']
+            assert book.market(market['currency']) is market
+
+    def test_parallel_arrays_follow_config_order(self, mock_markets):
+        """Tableaux parallèles alignés sur l'ordre de config.json"""
+        book = MarketBook(mock_markets)
+
+        assert book.currencies == [m['currency'] for m in mock_markets]
+        assert book.buy_prices.tolist() == [m['buy_price'] for m in mock_markets]
+        assert book.fees_pct.tolist() == [m['fee_pct'] for m in mock_markets]
+
+    def test_unknown_currency(self, mock_markets):
+        """Devise absente : get() → None, record() → ValueError"""
+        book = MarketBook(mock_markets)
+
+        assert book.get("INVALID") is None
+        assert "INVALID" not in book
+        with pytest.raises(ValueError, match="Aucun marché trouvé"):
+            book.record("INVALID")
+
+    def test_duplicate_keeps_first(self):
+        """Doublon : le premier marché de la liste fait foi"""
+        book = MarketBook([
+            {"currency": "EUR", "buy_price": 0.86, "sell_price": 0.85, "fee_pct": 0.1},
+            {"currency": "EUR", "buy_price": 0.99, "sell_price": 0.98, "fee_pct": 0.1},
+        ])
+
+        assert book.record("EUR").buy_price == 0.86
+
+    def test_cost_per_usdt(self):
+        """Coût d'1 USDT frais compris"""
+        book = MarketBook([{"currency": "XAF", "buy_price": 600.0, "sell_price": 590.0, "fee_pct": 1.0}])
+
+        assert book.record("XAF").cost_per_usdt == 600.0 * 1.01
+
+
+class TestMarketBookValidation:
+    """Validation unique au chargement"""
+
+    @pytest.mark.parametrize("market", [
+        {"buy_price": 1.0, "sell_price": 1.0, "fee_pct": 0.0},
+        {"currency": "XAF", "sell_price": 1.0, "fee_pct": 0.0},
+        {"currency": "XAF", "buy_price": "abc", "sell_price": 1.0, "fee_pct": 0.0},
+        {"currency": "XAF", "buy_price": float('inf'), "sell_price": 1.0, "fee_pct": 0.0},
+    ])
+    def test_invalid_market_skipped(self, market):
+        """Marché inutilisable ignoré, les autres restent accessibles"""
+        valid = {"currency": "EUR", "buy_price": 0.86, "sell_price": 0.85, "fee_pct": 0.1}
+        book = MarketBook([market, valid])
+
+        assert len(book) == 1
+        assert "XAF" not in book
+        assert book.record("EUR").buy_price == 0.86
+
+    def test_numeric_strings_converted(self):
+        """Valeurs numériques en chaîne converties une fois"""
+        book = MarketBook([{"currency": "XAF", "buy_price": "600", "sell_price": "590", "fee_pct": "1"}])
+
+        assert book.record("XAF").buy_price == 600.0
+
+
+class TestMarketBookCache:
+    """Le carnet partagé n'est reconstruit que si les marchés changent"""
+
+    def test_same_content_reuses_book(self, mock_markets):
+        """Même contenu → même carnet"""
+        book = get_market_book(mock_markets)
+
+        assert get_market_book(list(mock_markets)) is book
+
+    def test_price_change_rebuilds_book(self, mock_markets, monkeypatch):
+        """Changement de prix → nouveau carnet"""
+        monkeypatch.setattr(market_book, '_cached_book', None)
+        markets = [dict(m) for m in mock_markets]
+        book = get_market_book(markets)
+
+        markets[0]['buy_price'] = 42.0
+        updated = get_market_book(markets)
+
+        assert updated is not book
+        assert updated.record(markets[0]['currency']).buy_price == 42.0
+
+    def test_get_market_data_uses_book(self, mock_markets):
+        """get_market_data() retourne le dict du marché (contenu identique)"""
+        expected = next(m for m in mock_markets if m['currency'] == "EUR")
+
+        assert get_market_data("EUR", mock_markets) == expected
+
+    def test_config_markets_use_compiled_book(self, mock_config_valid, monkeypatch):
+        """Liste de la config chargée : carnet compilé au chargement, pas d'empreinte par appel"""
+        monkeypatch.setattr(arbitrage_engine, '_compiled_config', arbitrage_engine._compiled_config)
+        arbitrage_engine._compile_config(mock_config_valid)
+
+        def fail(markets_list):
+            raise AssertionError("empreinte recalculée")
+        monkeypatch.setattr(market_book, 'markets_fingerprint', fail)
+
+        markets = mock_config_valid['markets']
+        assert get_market_data("XAF", markets) is next(m for m in markets if m['currency'] == "XAF")
+
+    def test_incomplete_market_still_returned(self, mock_config_valid, monkeypatch):
+        """Marché écarté du carnet (prix manquant) : retourné comme par l'ancien parcours"""
+        monkeypatch.setattr(arbitrage_engine, '_compiled_config', arbitrage_engine._compiled_config)
+        markets = mock_config_valid['markets'] + [{"currency": "MGA", "name": "Madagascar"}]
+        arbitrage_engine._compile_config({**mock_config_valid, 'markets': markets})
+
+        assert get_market_data("MGA", markets) == {"currency": "MGA", "name": "Madagascar"}
+        assert get_market_data("MGA", list(markets)) == {"currency": "MGA", "name": "Madagascar"}
+        with pytest.raises(ValueError):
+            get_market_data("ZZZ", markets)
@@ -0,0 +1,113 @@
+"""
+Tests unitaires pour le simulateur de flux de prix
+Focus sur le déterminisme, la cohérence des prix et le rythme d'émission
+"""
+import asyncio
+import io
+import json
+
+import pytest
+
+from src.engine.route_engine import RouteEngine
+from src.engine.validation_report import ValidationReport, validate_config_coherence
+from src.modules.price_feed_simulator import REGIMES, PriceFeedSimulator
+from src.modules.price_stream import PriceStreamService, jsonl_tail_source
+
+
+class TestDeterminism:
+    """Même graine = même flux"""
+
+    def test_same_seed_same_ticks(self, mock_config_valid):
+        a = list(PriceFeedSimulator(mock_config_valid, seed=7, mode='regime').ticks(500))
+        b = list(PriceFeedSimulator(mock_config_valid, seed=7, mode='regime').ticks(500))
+        c = list(PriceFeedSimulator(mock_config_valid, seed=8, mode='regime').ticks(500))
+
+        assert a == b
+        assert a != c
+
+    def test_config_not_modified(self, mock_config_valid):
+        before = json.dumps(mock_config_valid, sort_keys=True)
+        list(PriceFeedSimulator(mock_config_valid, seed=1).ticks(200))
+        assert json.dumps(mock_config_valid, sort_keys=True) == before
+
+    def test_invalid_mode(self, mock_config_valid):
+        with pytest.raises(ValueError):
+            PriceFeedSimulator(mock_config_valid, mode='brownien')
+
+
+class TestPriceDynamics:
+    """Spreads conservés, mélange marchés / taux, régimes"""
+
+    def test_spread_ratio_preserved(self, mock_config_valid):
+        simulator = PriceFeedSimulator(mock_config_valid, seed=3, volatility_bps=50)
+        initial = {m['currency']: m['sell_price'] / m['buy_price'] for m in mock_config_valid['markets']}
+
+        for tick in simulator.ticks(1000):
+            if tick['type'] == 'market':
+                ratio = tick['sell_price'] / tick['buy_price']
+                assert ratio == pytest.approx(initial[tick['currency']], rel=1e-9)
+            else:
+                rate = tick['rate']
+                if isinstance(rate, dict):
+                    assert rate['ask'] > rate['bid'] > 0
+
+    def test_rate_tick_ratio(self, mock_config_valid):
+        ticks = list(PriceFeedSimulator(mock_config_valid, seed=5, rate_tick_ratio=0.3).ticks(5000))
+        share = sum(t['type'] == 'rate' for t in ticks) / len(ticks)
+        assert 0.25 < share < 0.35
+
+    def test_regimes_switch(self, mock_config_valid):
+        simulator = PriceFeedSimulator(mock_config_valid, seed=11, mode='regime', regime_switch_prob=0.05)
+        regimes = {tick['regime'] for tick in simulator.ticks(2000)}
+        assert len(regimes) > 1
+        assert regimes <= set(REGIMES)
+
+    def test_snapshot_stays_valid(self, mock_config_valid):
+        """Après des milliers de ticks, la config simulée passe toujours la validation"""
+        simulator = PriceFeedSimulator(mock_config_valid, seed=2, mode='regime')
+        list(simulator.ticks(5000))
+        snapshot = simulator.snapshot()
+
+        alerts = validate_config_coherence(snapshot['markets'], snapshot['forex_rates'])
+        assert not ValidationReport(None, alerts).is_blocking
+
+
+class TestEmission:
+    """Écriture JSONL et rythme"""
+
+    def test_emit_count_and_format(self, mock_config_valid):
+        output = io.StringIO()
+        result = PriceFeedSimulator(mock_config_valid, seed=1).emit(output, count=250, batch_size=64)
+
+        lines = output.getvalue().splitlines()
+        assert result['ticks'] == 250 and len(lines) == 250
+        assert [json.loads(line)['seq'] for line in lines] == list(range(1, 251))
+
+    def test_emit_rate_limited(self, mock_config_valid):
+        result = PriceFeedSimulator(mock_config_valid, seed=1).emit(io.StringIO(), rate=5000, count=1000)
+        assert result['elapsed_s'] >= 0.15
+        assert result['rate_per_s'] <= 5000 * 1.2
+
+    def test_emit_requires_bound(self, mock_config_valid):
+        with pytest.raises(ValueError):
+            PriceFeedSimulator(mock_config_valid).emit(io.StringIO())
+
+
+class TestLoadStream:
+    """Rejeu du flux simulé dans le service de flux de prix"""
+
+    def test_replay_through_stream(self, mock_config_valid, tmp_path):
+        ticks = tmp_path / "feed.jsonl"
+        simulator = PriceFeedSimulator(mock_config_valid, seed=4, mode='regime')
+        with open(ticks, 'w', encoding='utf-8') as f:
+            simulator.emit(f, count=3000)
+
+        output = io.StringIO()
+        service = PriceStreamService(RouteEngine(mock_config_valid), output=output)
+        asyncio.run(service.run(jsonl_tail_source(ticks, follow=False)))
+
+        assert service.stats['ticks'] == 3000
+        assert service.stats['invalid'] == service.stats['rejected'] == 0
+        expected = RouteEngine({**mock_config_valid, **simulator.snapshot()}).top_routes()
+        assert [r['profit_pct'] for r in service.engine.top_routes()] == \
+            pytest.approx([r['profit_pct'] for r in expected], rel=1e-12)
@@ -0,0 +1,198 @@
+"""
+Tests unitaires pour le service de flux de prix (asyncio)
+Focus sur la fusion des rafales, la publication du top-N et les franchissements de seuil
+"""
+import asyncio
+import copy
+import io
+import json
+
+import pytest
+
+from src.engine.route_engine import RouteEngine
+from src.modules.price_stream import (PriceStreamService, jsonl_tail_source,
+                                      parse_tick, unix_socket_source)
+
+
+def _messages(output):
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def _market(config, currency):
+    return next(m for m in config['markets'] if m['currency'] == currency)
+
+
+class TestParseTick:
+    """Décodage et rejet des ticks"""
+
+    def test_market_and_rate_ticks(self):
+        key, data = parse_tick('{"type": "market", "currency": "XAF", "sell_price": 640, "fee_pct": null}')
+        assert key == ('market', 'XAF')
+        assert data == {'sell_price': 640}
+
+        key, data = parse_tick('{"type": "rate", "pair": "XAF/EUR", "rate": 655.957}')
+        assert key == ('rate', 'XAF/EUR')
+        assert data == 655.957
+
+    @pytest.mark.parametrize("line", [
+        'pas du json',
+        '[1, 2]',
+        '{"type": "market", "currency": "XAF"}',
+        '{"type": "rate", "pair": "XAFEUR", "rate": 1}',
+        '{"type": "trade"}',
+    ])
+    def test_invalid_ticks(self, line):
+        with pytest.raises(ValueError):
+            parse_tick(line)
+
+
+class TestCoalescing:
+    """Une rafale de ticks = un seul lot appliqué"""
+
+    def test_burst_is_merged_per_market(self, mock_config_valid):
+        service = PriceStreamService(RouteEngine(mock_config_valid), output=io.StringIO())
+        service.submit('{"type": "market", "currency": "XAF", "sell_price": 600}')
+        service.submit('{"type": "market", "currency": "XAF", "fee_pct": 0.2}')
+        service.submit('{"type": "market", "currency": "XAF", "sell_price": 610}')
+        assert not service.submit('{"type": "market"}')
+
+        assert service.pending == 1
+        assert service.stats['coalesced'] == 2
+        assert service.stats['invalid'] == 1
+
+        message = service.flush()
+        record = service.engine.market_book.record('XAF')
+        assert (record.sell_price, record.fee_pct) == (610.0, 0.2)
+        assert message['ticks'] == 3 and message['updates'] == 1
+        assert service.flush() is None
+
+    def test_published_top_matches_fresh_engine(self, mock_config_valid):
+        """Le classement après ticks = celui d'un moteur construit sur les nouveaux prix"""
+        output = io.StringIO()
+        service = PriceStreamService(RouteEngine(mock_config_valid, top_n=3), output=output)
+        service.publish_top()
+        service.submit('{"type": "market", "currency": "XAF", "sell_price": 700}')
+        service.submit('{"type": "market", "currency": "EUR", "buy_price": 0.9}')
+        message = service.flush()
+
+        config = copy.deepcopy(mock_config_valid)
+        _market(config, 'XAF')['sell_price'] = 700
+        _market(config, 'EUR')['buy_price'] = 0.9
+        expected = RouteEngine(config, top_n=3).top_routes()
+
+        assert [r['route'] for r in message['routes']] == \
+            [f"{r['sourcing_market_code']}->{r['selling_market_code']}" for r in expected]
+        assert [r['profit_pct'] for r in message['routes']] == [r['profit_pct'] for r in expected]
+
+    def test_rejected_update_does_not_stop_batch(self, mock_config_valid):
+        service = PriceStreamService(RouteEngine(mock_config_valid), output=io.StringIO())
+        service.submit('{"type": "market", "currency": "ZZZ", "buy_price": 1}')
+        service.submit('{"type": "market", "currency": "XAF", "sell_price": "abc"}')
+        service.submit('{"type": "market", "currency": "EUR", "buy_price": 0.86}')
+
+        service.flush()
+        assert service.stats['rejected'] == 2
+        assert service.stats['applied'] == 1
+
+
+class TestThresholdCrossings:
+    """Franchissements du seuil de rentabilité publiés"""
+
+    def test_up_then_down(self, mock_config_valid):
+        config = copy.deepcopy(mock_config_valid)
+        config['SEUIL_RENTABILITE_PCT'] = 50.0
+        output = io.StringIO()
+        service = PriceStreamService(RouteEngine(config, top_n=3), output=output)
+        service.publish_top()
+        assert not [m for m in _messages(output) if m['type'] == 'crossing']
+
+        xaf_sell = _market(config, 'XAF')['sell_price']
+        service.submit(json.dumps({'type': 'market', 'currency': 'XAF', 'sell_price': xaf_sell * 3}))
+        service.flush()
+        service.submit(json.dumps({'type': 'market', 'currency': 'XAF', 'sell_price': xaf_sell}))
+        service.flush()
+
+        crossings = [m for m in _messages(output) if m['type'] == 'crossing']
+        assert {m['direction'] for m in crossings} == {'up', 'down'}
+        up = [m for m in crossings if m['direction'] == 'up']
+        assert all(m['route'].endswith('->XAF') and m['profit_pct'] >= 50.0 for m in up)
+        assert len([m for m in crossings if m['direction'] == 'down']) == len(up)
+
+
+class TestStreamLoop:
+    """Boucle asyncio de bout en bout"""
+
+    def test_jsonl_replay(self, mock_config_valid, tmp_path):
+        ticks = tmp_path / "ticks.jsonl"
+        xaf_sell = _market(mock_config_valid, 'XAF')['sell_price']
+        lines = [json.dumps({'type': 'market', 'currency': 'XAF', 'sell_price': xaf_sell + k})
+                 for k in range(50)]
+        lines.append('ligne invalide')
+        ticks.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+        output = io.StringIO()
+        service = PriceStreamService(RouteEngine(mock_config_valid), output=output)
+        asyncio.run(service.run(jsonl_tail_source(ticks, follow=False)))
+
+        messages = _messages(output)
+        tops = [m for m in messages if m['type'] == 'top']
+        assert tops[0]['ticks'] == 0  # État initial
+        assert sum(m['ticks'] for m in tops) == 50
+        assert service.engine.market_book.record('XAF').sell_price == xaf_sell + 49
+
+        stats = messages[-1]
+        assert stats['type'] == 'stats'
+        assert stats['invalid'] == 1
+        assert stats['latency']['count'] == 50
+        assert 0 <= stats['latency']['p50_ms'] <= stats['latency']['max_ms']
+
+    def test_tail_picks_up_appended_ticks(self, mock_config_valid, tmp_path):
+        ticks = tmp_path / "ticks.jsonl"
+        ticks.write_text('', encoding='utf-8')
+        output = io.StringIO()
+        service = PriceStreamService(RouteEngine(mock_config_valid), output=output)
+
+        async def scenario():
+            task = asyncio.ensure_future(service.run(jsonl_tail_source(ticks, poll_interval=0.01)))
+            await asyncio.sleep(0.05)
+            with open(ticks, 'a', encoding='utf-8') as f:
+                f.write('{"type": "market", "currency": "XAF", "sell_price": 650}\n')
+            for _ in range(100):
+                if service.stats['publications'] >= 2:
+                    break
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(scenario())
+        assert service.engine.market_book.record('XAF').sell_price == 650.0
+        assert _messages(output)[-1]['type'] == 'stats'
+
+    def test_unix_socket_source(self, mock_config_valid, tmp_path):
+        socket_path = str(tmp_path / "ticks.sock")
+        output = io.StringIO()
+        service = PriceStreamService(RouteEngine(mock_config_valid), output=output)
+
+        async def scenario():
+            task = asyncio.ensure_future(service.run(unix_socket_source(socket_path)))
+            for _ in range(100):
+                try:
+                    reader, writer = await asyncio.open_unix_connection(socket_path)
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    await asyncio.sleep(0.01)
+            writer.write(b'{"type": "rate", "pair": "XAF/EUR", "rate": 650.0}\n')
+            await writer.drain()
+            writer.close()
+            for _ in range(100):
+                if service.stats['applied']:
+                    break
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(scenario())
+        assert service.stats['applied'] == 1
+        assert service.engine.forex_rates['XAF/EUR'] == 650.0
@@ -0,0 +1,87 @@
+"""
+Tests unitaires pour l'archive des rotations terminées
+Focus sur la lecture indexée, la compatibilité gzip et la reprise après crash
+"""
+import gzip
+import json
+
+from src.engine.rotation_archive import RotationArchive
+
+
+def _rotation(rotation_id, cycles=3):
+    return {"rotation_id": rotation_id, "current_cycle": cycles, "forced_transactions": []}
+
+
+class TestRotationArchive:
+    """Ajout, lecture directe, format"""
+
+    def test_point_lookup(self, tmp_path):
+        archive = RotationArchive(tmp_path / "archive.gz")
+        for i in range(50):
+            archive.append(f"R{i}", _rotation(f"R{i}", i))
+
+        reopened = RotationArchive(tmp_path / "archive.gz")
+        assert len(reopened) == 50
+        assert reopened.get("R17")['current_cycle'] == 17
+        assert reopened.get("R99") is None and "R99" not in reopened
+
+    def test_valid_gzip_stream(self, tmp_path):
+        """Membres concaténés = un .gz lisible par zcat"""
+        path = tmp_path / "archive.gz"
+        archive = RotationArchive(path)
+        archive.append("R1", _rotation("R1"))
+        archive.append("R2", _rotation("R2"))
+
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            assert [json.loads(line)['rotation_id'] for line in f] == ["R1", "R2"]
+
+    def test_last_copy_wins(self, tmp_path):
+        archive = RotationArchive(tmp_path / "archive.gz")
+        archive.append("R1", _rotation("R1", 2))
+        archive.append("R1", _rotation("R1", 5))
+        assert RotationArchive(tmp_path / "archive.gz").get("R1")['current_cycle'] == 5
+
+
+class TestRotationArchiveRecovery:
+    """Index perdu, en retard ou interrompu ; membre incomplet"""
+
+    def test_lost_index_rebuilt(self, tmp_path):
+        archive = RotationArchive(tmp_path / "archive.gz")
+        for i in range(5):
+            archive.append(f"R{i}", _rotation(f"R{i}", i))
+        (tmp_path / "archive.gz.idx").unlink()
+
+        rebuilt = RotationArchive(tmp_path / "archive.gz")
+        assert rebuilt.rotation_ids() == [f"R{i}" for i in range(5)]
+        assert rebuilt.get("R3")['current_cycle'] == 3
+        assert not (tmp_path / "archive.gz.idx").exists()  # Lecture : index reconstruit en mémoire seulement
+
+        rebuilt.append("R5", _rotation("R5", 5))
+        assert len((tmp_path / "archive.gz.idx").read_text(encoding='utf-8').splitlines()) == 6
+
+    def test_torn_index_line_and_member(self, tmp_path):
+        path = tmp_path / "archive.gz"
+        archive = RotationArchive(path)
+        archive.append("R1", _rotation("R1"))
+        archive.append("R2", _rotation("R2"))
+        index = tmp_path / "archive.gz.idx"
+        index.write_bytes(index.read_bytes()[:-8])  # Dernière ligne d'index interrompue
+        with open(path, 'ab') as f:
+            f.write(gzip.compress(b'{"rotation_id": "R3"')[:12])  # Membre interrompu
+
+        recovered = RotationArchive(path)
+        torn = path.read_bytes(), index.read_bytes()
+        assert recovered.rotation_ids() == ["R1", "R2"]
+        assert recovered.get("R2")['rotation_id'] == "R2"
+        assert (path.read_bytes(), index.read_bytes()) == torn  # Lecture : fin incomplète ignorée, pas tronquée
+
+        recovered.append("R3", _rotation("R3"))
+        assert RotationArchive(path).get("R3")['rotation_id'] == "R3"
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            assert len(f.readlines()) == 3
+
+    def test_index_reloaded_after_external_append(self, tmp_path):
+        reader = RotationArchive(tmp_path / "archive.gz")
+        assert reader.get("R1") is None
+        RotationArchive(tmp_path / "archive.gz").append("R1", _rotation("R1"))
+        assert reader.get("R1")['rotation_id'] == "R1"
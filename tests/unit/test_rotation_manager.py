@@ -7,29 +7,46 @@ from pathlib import Path
 
 import pytest
 
-from src.engine.rotation_manager import RotationManager
+from src.engine.rotation_manager import ROTATION_STATE_BACKENDS, RotationManager
+
+
+def pytest_generate_tests(metafunc):
+    """Chaque test sur chaque backend, sauf ceux liés à un backend (fichiers JSON, backend explicite)"""
+    if 'rotation_backend' in metafunc.fixturenames:
+        single = metafunc.definition.get_closest_marker('single_backend') is not None
+        metafunc.parametrize('rotation_backend', ['json'] if single else list(ROTATION_STATE_BACKENDS),
+                             indirect=True)
+
+
+@pytest.fixture(autouse=True)
+def rotation_backend(request, monkeypatch):
+    monkeypatch.setattr('src.engine.rotation_manager.ROTATION_STATE_BACKEND', request.param)
+    return request.param
+
+
+@pytest.fixture
+def state_file(tmp_path, monkeypatch):
+    """Fichier d'état (et sauvegarde) isolé dans tmp_path"""
+    state_file = tmp_path / "rotation_state.json"
+    monkeypatch.setattr('src.engine.rotation_manager.ROTATION_STATE_FILE', str(state_file))
+    monkeypatch.setattr('src.engine.rotation_manager.BACKUP_FILE', str(tmp_path / "rotation_state.json.bak"))
+    return state_file
+
+
+def _persisted_state():
+    """État relu du disque par un nouveau manager (snapshot + rejeu du journal)"""
+    return RotationManager().state
 
 
 class TestRotationManagerInit:
     """Tests initialisation et création rotations"""
 
-    def test_init_rotation_creates_entry(self, tmp_path, monkeypatch):
+    def test_init_rotation_creates_entry(self, state_file):
         """init_rotation() crée entrée dans state"""
-        # Utiliser tmp_path pour state file
-        state_file = tmp_path / "rotation_state.json"
-
-        # Monkeypatch le chemin du fichier
-        monkeypatch.setattr('src.engine.rotation_manager.ROTATION_STATE_FILE', str(state_file))
-
         manager = RotationManager()
         manager.init_rotation("R20250101-1")
 
-        # Vérifier que le fichier existe
-        assert state_file.exists()
-
-        # Vérifier contenu
-        with open(state_file, 'r', encoding='utf-8') as f:
-            state = json.load(f)
+        state = _persisted_state()
 
         assert "R20250101-1" in state['active_rotations']
         assert state['active_rotations']["R20250101-1"]['current_cycle'] == 1
@@ -43,8 +60,7 @@ class TestRotationManagerInit:
         manager.init_rotation("R20250101-1")
         manager.increment_cycle("R20250101-1")
 
-        with open(state_file, 'r', encoding='utf-8') as f:
-            state = json.load(f)
+        state = _persisted_state()
 
         assert state['active_rotations']["R20250101-1"]['current_cycle'] == 2
 
@@ -57,8 +73,7 @@ class TestRotationManagerInit:
         manager.init_rotation("R20250101-1")
         manager.set_loop_currency("R20250101-1", "XAF")
 
-        with open(state_file, 'r', encoding='utf-8') as f:
-            state = json.load(f)
+        state = _persisted_state()
 
         assert state['active_rotations']["R20250101-1"]['loop_currency'] == "XAF"
 
@@ -78,8 +93,9 @@ class TestRotationManagerInit:
 class TestRotationManagerRecovery:
     """Tests récupération erreurs"""
 
+    @pytest.mark.single_backend
     def test_corrupted_json_recovers_from_backup(self, tmp_path, monkeypatch):
-        """JSON corrompu restaure backup"""
+        """JSON corrompu restaure backup (récupération des fichiers JSON : backend json)"""
         state_file = tmp_path / "rotation_state.json"
         backup_file = tmp_path / "rotation_state.json.backup"
 
@@ -107,8 +123,9 @@ class TestRotationManagerRecovery:
 
         assert "R20250101-1" in state['active_rotations']
 
+    @pytest.mark.single_backend
     def test_missing_file_creates_new(self, tmp_path, monkeypatch):
-        """Fichier manquant crée nouveau state"""
+        """Fichier manquant crée nouveau state (fichier rotation_state.json : backend json)"""
         state_file = tmp_path / "rotation_state.json"
         monkeypatch.setattr('src.engine.rotation_manager.ROTATION_STATE_FILE', str(state_file))
 
@@ -134,8 +151,7 @@ class TestRotationManagerForcedTransactions:
         manager.init_rotation("R20250101-1")
         manager.record_forced_transaction("R20250101-1", "VENTE", "Opportunité marché")
 
-        with open(state_file, 'r', encoding='utf-8') as f:
-            state = json.load(f)
+        state = _persisted_state()
 
         forced = state['active_rotations']["R20250101-1"]['forced_transactions']
         assert len(forced) == 1
@@ -154,12 +170,24 @@ class TestRotationManagerForcedTransactions:
         for i in range(150):
             manager.record_forced_transaction("R20250101-1", "VENTE", f"Raison {i}")
 
-        with open(state_file, 'r', encoding='utf-8') as f:
-            state = json.load(f)
+        state = _persisted_state()
 
         forced = state['active_rotations']["R20250101-1"]['forced_transactions']
-        # Doit être limité à 100
-        assert len(forced) <= 100
+        # Limité aux 100 dernières
+        assert len(forced) == 100
+        assert forced[-1]['reason'] == "Raison 149"
+
+    def test_forced_history_kept_by_backend(self, state_file, rotation_backend):
+        """forced_transactions() : 100 dernières en JSON, historique complet en SQLite"""
+        manager = RotationManager()
+        manager.init_rotation("R20250101-1")
+        for i in range(150):
+            manager.record_forced_transaction("R20250101-1", "VENTE", f"Raison {i}")
+
+        history = RotationManager().forced_transactions("R20250101-1")
+
+        assert len(history) == (150 if rotation_backend == 'sqlite' else 100)
+        assert history[-1]['reason'] == "Raison 149"
 
 
 class TestRotationManagerStats:
@@ -181,3 +209,332 @@ class TestRotationManagerStats:
         assert stats['current_cycle'] == 2
         assert stats['loop_currency'] == "XAF"
 
+
+
+@pytest.mark.single_backend
+class TestRotationManagerJournal:
+    """Journal des mutations, compaction et reprise après crash"""
+
+    def test_mutations_append_without_rewriting_snapshot(self, state_file):
+        """Une mutation = une ligne de journal, snapshot inchangé"""
+        manager = RotationManager()
+        manager.init_rotation("R20250101-1")
+        snapshot = state_file.read_bytes()
+
+        manager.increment_cycle("R20250101-1")
+        manager.set_loop_currency("R20250101-1", "xaf")
+        manager.record_forced_transaction("R20250101-1", "VENTE", "Test")
+
+        journal = Path(f"{state_file}.journal").read_text(encoding='utf-8').splitlines()
+        assert state_file.read_bytes() == snapshot
+        assert [json.loads(line)['op'] for line in journal] == ['set', 'set', 'forced']
+        assert _persisted_state() == manager.state
+
+    def test_periodic_compaction(self, state_file, monkeypatch):
+        """Snapshot réécrit toutes les JOURNAL_COMPACT_EVERY mutations, journal vidé"""
+        monkeypatch.setattr('src.engine.rotation_manager.JOURNAL_COMPACT_EVERY', 5)
+        manager = RotationManager()
+        manager.init_rotation("R20250101-1")
+        for _ in range(7):
+            manager.increment_cycle("R20250101-1")
+
+        with open(state_file, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        journal = Path(f"{state_file}.journal").read_text(encoding='utf-8').splitlines()
+        assert snapshot['active_rotations']["R20250101-1"]['current_cycle'] == 6
+        assert len(journal) == 2
+        assert _persisted_state()['active_rotations']["R20250101-1"]['current_cycle'] == 8
+
+    def test_torn_tail_ignored_and_truncated(self, state_file):
+        """Ligne interrompue par un crash : ignorée puis retirée du journal"""
+        manager = RotationManager()
+        manager.init_rotation("R20250101-1")
+        manager.increment_cycle("R20250101-1")
+        journal = Path(f"{state_file}.journal")
+        with open(journal, 'a', encoding='utf-8') as f:
+            f.write('{"seq": 3, "op": "set", "rotation_id": "R2025')
+
+        recovered = RotationManager()
+        assert recovered.get_rotation_stats("R20250101-1")['current_cycle'] == 2
+        assert journal.read_text(encoding='utf-8').endswith('\n')
+
+        recovered.increment_cycle("R20250101-1")
+        assert _persisted_state()['active_rotations']["R20250101-1"]['current_cycle'] == 3
+
+    def test_crash_before_journal_truncation(self, state_file):
+        """Journal non vidé après compaction : mutations du snapshot non rejouées"""
+        manager = RotationManager()
+        manager.init_rotation("R20250101-1")
+        for i in range(3):
+            manager.record_forced_transaction("R20250101-1", "VENTE", f"Raison {i}")
+        journal = Path(f"{state_file}.journal")
+        stale = journal.read_bytes()
+
+        manager.save_state()
+        journal.write_bytes(stale)
+
+        forced = _persisted_state()['active_rotations']["R20250101-1"]['forced_transactions']
+        assert [f['reason'] for f in forced] == ["Raison 0", "Raison 1", "Raison 2"]
+
+    @pytest.mark.parametrize("bad_line", [
+        '{"seq": 3, "op": "set", "rotation_id": "R-inconnue", "fields": {"current_cycle": 9}}\n',
+        '{"seq": 3, "op": "se\n',
+    ])
+    def test_invalid_record_stops_replay_without_truncation(self, state_file, bad_line):
+        """Enregistrement non applicable ou illisible suivi d'autres : journal conservé, écritures refusées"""
+        manager = RotationManager()
+        manager.init_rotation("R20250101-1")
+        manager.increment_cycle("R20250101-1")
+        journal = Path(f"{state_file}.journal")
+        with open(journal, 'a', encoding='utf-8') as f:
+            f.write(bad_line)
+            f.write('{"seq": 4, "op": "set", "rotation_id": "R20250101-1", "fields": {"current_cycle": 5}}\n')
+        content = journal.read_bytes()
+
+        recovered = RotationManager()
+        assert recovered.get_rotation_stats("R20250101-1")['current_cycle'] == 2
+        assert not recovered.increment_cycle("R20250101-1")
+        assert not recovered.save_state()
+        assert journal.read_bytes() == content
+
+    def test_batch_with_invalid_record_not_half_applied(self, state_file):
+        manager = RotationManager()
+        manager.init_rotation("R20250101-1")
+        with open(f"{state_file}.journal", 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'seq': 2, 'op': 'batch', 'records': [
+                {'op': 'set', 'rotation_id': "R20250101-1", 'fields': {'current_cycle': 7}},
+                {'op': 'forced', 'rotation_id': "R-inconnue", 'record': {'type': "VENTE"}},
+            ]}) + '\n')
+
+        assert _persisted_state()['active_rotations']["R20250101-1"]['current_cycle'] == 1
+
+
+class TestRotationManagerBatch:
+    """Lots de mutations : une écriture, annulation sur exception"""
+
+    @pytest.mark.single_backend
+    def test_batch_single_journal_record(self, state_file):
+        """100 cycles dans un lot = une ligne de journal"""
+        manager = RotationManager()
+        manager.init_rotation("R20250101-1")
+        snapshot = state_file.read_bytes()
+
+        with manager.batch():
+            manager.init_rotation("R20250101-2")
+            manager.set_loop_currency("R20250101-2", "XAF")
+            for _ in range(100):
+                manager.increment_cycle("R20250101-2")
+
+        journal = Path(f"{state_file}.journal").read_text(encoding='utf-8').splitlines()
+        assert state_file.read_bytes() == snapshot
+        assert len(journal) == 1 and len(json.loads(journal[0])['records']) == 102
+        assert manager.get_rotation_stats("R20250101-2")['current_cycle'] == 101
+        assert _persisted_state() == manager.state
+
+    @pytest.mark.single_backend
+    def test_exception_rolls_back(self, state_file):
+        """Exception dans le lot : mémoire et disque inchangés"""
+        manager = RotationManager()
+        manager.init_rotation("R20250101-1")
+        before = json.loads(json.dumps(manager.state))
+
+        with pytest.raises(RuntimeError):
+            with manager.batch():
+                manager.increment_cycle("R20250101-1")
+                manager.record_forced_transaction("R20250101-1", "VENTE", "Test")
+                manager.init_rotation("R20250101-2")
+                raise RuntimeError("Cycle impossible")
+
+        assert manager.state == before
+        assert Path(f"{state_file}.journal").read_text(encoding='utf-8') == ''
+        assert _persisted_state() == before
+
+        manager.increment_cycle("R20250101-1")
+        assert _persisted_state()['active_rotations']["R20250101-1"]['current_cycle'] == 2
+
+    def test_init_and_mutations_in_batch_reload_identically(self, state_file):
+        """Rotation créée puis modifiée dans le lot : rejouée à l'identique"""
+        manager = RotationManager()
+        manager.init_rotation("R20250101-0")  # Snapshot existant : le lot va au journal
+        with manager.batch():
+            manager.init_rotation("R20250101-1")
+            manager.record_forced_transaction("R20250101-1", "VENTE", "Test")
+            manager.increment_cycle("R20250101-1")
+
+        state = _persisted_state()
+        assert state == manager.state
+        assert len(state['active_rotations']["R20250101-1"]['forced_transactions']) == 1
+        assert state['active_rotations']["R20250101-1"]['current_cycle'] == 2
+
+    def test_nested_batch_joins_outer(self, state_file):
+        """Lot imbriqué écrit avec le lot englobant"""
+        manager = RotationManager()
+        with manager.batch():
+            manager.init_rotation("R20250101-1")
+            with manager.batch():
+                manager.increment_cycle("R20250101-1")
+            assert not state_file.exists()
+
+        assert _persisted_state()['active_rotations']["R20250101-1"]['current_cycle'] == 2
+
+    @pytest.mark.single_backend
+    def test_torn_batch_discarded_entirely(self, state_file):
+        """Lot interrompu par un crash : aucune de ses mutations rejouée"""
+        manager = RotationManager()
+        manager.init_rotation("R20250101-1")
+        with manager.batch():
+            for _ in range(3):
+                manager.increment_cycle("R20250101-1")
+        journal = Path(f"{state_file}.journal")
+        journal.write_bytes(journal.read_bytes()[:-10])
+
+        assert _persisted_state()['active_rotations']["R20250101-1"]['current_cycle'] == 1
+
+
+class TestRotationManagerConcurrency:
+    """Managers concurrents sur le même fichier d'état"""
+
+    def test_stale_manager_rereads_before_mutation(self, state_file):
+        """Écriture d'un autre manager détectée : pas de mise à jour perdue"""
+        first = RotationManager()
+        first.init_rotation("R20250101-1")
+        second = RotationManager()
+
+        second.increment_cycle("R20250101-1")
+        second.set_loop_currency("R20250101-1", "XAF")
+        assert first.increment_cycle("R20250101-1") == 3
+
+        state = _persisted_state()['active_rotations']["R20250101-1"]
+        assert (state['current_cycle'], state['loop_currency']) == (3, "XAF")
+        assert first.version == second.version + 1
+
+    def test_rewrite_by_compaction_detected(self, state_file):
+        """Snapshot réécrit ailleurs (compaction) : relu avant la mutation suivante"""
+        first = RotationManager()
+        first.init_rotation("R20250101-1")
+        second = RotationManager()
+        second.record_forced_transaction("R20250101-1", "VENTE", "Ailleurs")
+        second.save_state()
+
+        first.record_forced_transaction("R20250101-1", "ACHAT", "Ici")
+        forced = _persisted_state()['active_rotations']["R20250101-1"]['forced_transactions']
+        assert [f['reason'] for f in forced] == ["Ailleurs", "Ici"]
+
+
+class TestRotationManagerArchive:
+    """Rotations terminées déplacées hors de l'état chaud"""
+
+    def test_archive_rotation(self, state_file):
+        manager = RotationManager()
+        manager.init_rotation("R20250101-1")
+        manager.set_loop_currency("R20250101-1", "XAF")
+        manager.init_rotation("R20250101-2")
+
+        assert manager.archive_rotation("R20250101-1")
+        assert not manager.archive_rotation("R20250101-9")
+
+        reloaded = RotationManager()
+        assert list(reloaded.state['active_rotations']) == ["R20250101-2"]
+        assert reloaded.get_loop_currency("R20250101-1") == "XAF"
+        assert reloaded.get_rotation_stats("R20250101-1")['loop_currency'] == "XAF"
+
+    @pytest.mark.single_backend
+    def test_state_size_constant_as_history_grows(self, state_file):
+        """Snapshot compacté de taille constante malgré 300 rotations clôturées"""
+        manager = RotationManager()
+        manager.init_rotation("R-live")
+        manager.save_state()
+        size = state_file.stat().st_size
+
+        for i in range(300):
+            with manager.batch():
+                manager.init_rotation(f"R-{i}")
+                manager.increment_cycle(f"R-{i}")
+                manager.archive_rotation(f"R-{i}")
+        manager.save_state()
+
+        assert len(manager.archive) == 300
+        assert abs(state_file.stat().st_size - size) < 10  # Seul journal_seq change
+        assert RotationManager().get_rotation("R-123")['current_cycle'] == 2
+
+    def test_archive_rolled_back_in_batch(self, state_file):
+        manager = RotationManager()
+        manager.init_rotation("R20250101-1")
+
+        with pytest.raises(RuntimeError):
+            with manager.batch():
+                manager.archive_rotation("R20250101-1")
+                raise RuntimeError("Annulé")
+
+        assert "R20250101-1" in RotationManager().state['active_rotations']
+
+
+@pytest.mark.single_backend
+class TestRotationManagerSqlite:
+    """Backend SQLite : historique complet, requêtes agrégées, reprise de l'état JSON"""
+
+    def test_unknown_backend(self, state_file):
+        with pytest.raises(ValueError):
+            RotationManager(backend='csv')
+
+    def test_wal_database(self, state_file):
+        manager = RotationManager(backend='sqlite')
+        manager.init_rotation("R20250101-1")
+
+        assert manager.path == str(state_file.with_suffix('.db'))
+        assert manager._db.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert not state_file.exists()
+
+    def test_forced_history_uncapped(self, state_file):
+        """Historique complet en base, vue get_rotation() limitée comme en JSON"""
+        manager = RotationManager(backend='sqlite')
+        manager.init_rotation("R20250101-1")
+        with manager.batch():
+            for i in range(150):
+                manager.record_forced_transaction("R20250101-1", "VENTE", f"Raison {i}")
+
+        reloaded = RotationManager(backend='sqlite')
+        history = reloaded.forced_transactions("R20250101-1")
+        assert [f['reason'] for f in history] == [f"Raison {i}" for i in range(150)]
+        assert reloaded.get_rotation_stats("R20250101-1")['forced_transactions_count'] == 150
+        forced = reloaded.get_rotation("R20250101-1")['forced_transactions']
+        assert [f['reason'] for f in forced] == [f"Raison {i}" for i in range(50, 150)]
+
+    @pytest.mark.parametrize("backend", ROTATION_STATE_BACKENDS)
+    def test_forced_counts_by_type_include_archive(self, state_file, backend):
+        manager = RotationManager(backend=backend)
+        for rotation_id, types in (("R1", ["VENTE", "ACHAT"]), ("R2", ["VENTE"]), ("R3", [])):
+            manager.init_rotation(rotation_id)
+            for trans_type in types:
+                manager.record_forced_transaction(rotation_id, trans_type, "Test")
+        manager.archive_rotation("R1")
+
+        assert RotationManager(backend=backend).forced_transaction_counts_by_type() == {"ACHAT": 1, "VENTE": 2}
+
+    def test_exception_rolls_back_transaction(self, state_file):
+        manager = RotationManager(backend='sqlite')
+        manager.init_rotation("R20250101-1")
+        before, version = manager.state, manager.version
+
+        with pytest.raises(RuntimeError):
+            with manager.batch():
+                manager.increment_cycle("R20250101-1")
+                manager.archive_rotation("R20250101-1")
+                raise RuntimeError("Cycle impossible")
+
+        assert manager.state == before == RotationManager(backend='sqlite').state
+        assert manager.version == version
+
+    def test_new_database_imports_json_state(self, state_file):
+        """Première ouverture SQLite : rotations en cours et archivées reprises du JSON"""
+        source = RotationManager(backend='json')
+        source.init_rotation("R1")
+        source.record_forced_transaction("R1", "VENTE", "Test")
+        source.init_rotation("R2")
+        source.set_loop_currency("R2", "XAF")
+        source.archive_rotation("R2")
+
+        manager = RotationManager(backend='sqlite')
+        assert manager.state == source.state
+        assert manager.get_loop_currency("R2") == "XAF"
+        assert list(manager.archive.rotation_ids()) == ["R2"]
@@ -0,0 +1,121 @@
+"""
+Tests unitaires pour le cache disque des tables de routes
+Focus sur l'égalité avec le calcul complet et l'invalidation par contenu
+"""
+import copy
+import time
+
+import pytest
+
+from src.engine import arbitrage_engine
+from src.engine.arbitrage_engine import find_cached_routes, find_routes_with_filters
+from src.engine.route_cache import (build_route_tables, load_route_tables,
+                                    route_cache_key, save_route_tables)
+from src.engine.route_engine import RouteEngine
+
+
+@pytest.fixture
+def engine_globals(mock_config_valid):
+    arbitrage_engine.markets = copy.deepcopy(mock_config_valid['markets'])
+    arbitrage_engine.forex_rates = copy.deepcopy(mock_config_valid['forex_rates'])
+    arbitrage_engine.SEUIL_RENTABILITE_PCT = mock_config_valid['SEUIL_RENTABILITE_PCT']
+    return mock_config_valid
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "routes.npz")
+
+
+def _same_routes(cached, computed):
+    assert [r.materialize() for r in cached] == [r.materialize() for r in computed]
+
+
+class TestCachedRoutesExactness:
+    """Routes du cache = routes recalculées, champ par champ"""
+
+    @pytest.mark.parametrize("top_n", [1, 5, 50])
+    @pytest.mark.parametrize("apply_threshold", [True, False])
+    def test_matches_full_search(self, engine_globals, cache_path, conversion_method, top_n, apply_threshold):
+        computed = find_routes_with_filters(top_n=top_n, apply_threshold=apply_threshold,
+                                            conversion_method=conversion_method)
+        cold = find_cached_routes(top_n, apply_threshold, conversion_method, cache_path=cache_path)
+        warm = find_cached_routes(top_n, apply_threshold, conversion_method, cache_path=cache_path)
+
+        _same_routes(cold, computed)
+        _same_routes(warm, computed)
+
+    def test_warm_cache_skips_computation(self, engine_globals, cache_path, monkeypatch):
+        expected = find_cached_routes(cache_path=cache_path)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("tables recalculées malgré un cache valide")
+        monkeypatch.setattr(arbitrage_engine, 'build_route_tables', fail)
+        monkeypatch.setattr(arbitrage_engine, 'get_default_engine', fail)
+
+        _same_routes(find_cached_routes(cache_path=cache_path), expected)
+        _same_routes(find_cached_routes(conversion_method='bank', cache_path=cache_path),
+                     RouteEngine(engine_globals).find_routes(conversion_method='bank'))
+
+
+class TestCacheInvalidation:
+    """Clé = contenu de la config : tout changement force le recalcul"""
+
+    def test_price_change_recomputes(self, engine_globals, cache_path):
+        before = find_cached_routes(top_n=None, apply_threshold=False, cache_path=cache_path)
+        xaf = next(m for m in arbitrage_engine.markets if m['currency'] == 'XAF')
+        xaf['sell_price'] *= 1.05
+
+        after = find_cached_routes(top_n=None, apply_threshold=False, cache_path=cache_path)
+        assert [r['profit_pct'] for r in after] != [r['profit_pct'] for r in before]
+        _same_routes(after, find_routes_with_filters(top_n=None, apply_threshold=False))
+
+    def test_key_depends_on_content(self, mock_config_valid):
+        markets, rates = mock_config_valid['markets'], mock_config_valid['forex_rates']
+        key = route_cache_key(markets, rates, 3, 1000.0)
+
+        assert route_cache_key(copy.deepcopy(markets), copy.deepcopy(rates), 3, 1000.0) == key
+        assert route_cache_key(markets, rates, 2, 1000.0) != key
+        changed = copy.deepcopy(rates)
+        changed['XAF/EUR'] = 650.0
+        assert route_cache_key(markets, changed, 3, 1000.0) != key
+
+    @pytest.mark.parametrize("content", [b"", b"pas un npz", b"PK\x03\x04tronque"])
+    def test_corrupt_file_ignored(self, engine_globals, cache_path, content):
+        with open(cache_path, 'wb') as f:
+            f.write(content)
+
+        _same_routes(find_cached_routes(cache_path=cache_path), find_routes_with_filters())
+        assert load_route_tables(cache_path, 'autre clé') is None
+
+    def test_blocking_config_not_cached(self, engine_globals, cache_path):
+        del arbitrage_engine.forex_rates['XAF/EUR']
+
+        assert find_cached_routes(cache_path=cache_path) == []
+        assert load_route_tables(cache_path, route_cache_key(
+            arbitrage_engine.markets, arbitrage_engine.forex_rates, 3, 1000.0)) is None
+
+
+class TestCacheLoadSpeed:
+    """Lecture du cache en quelques millisecondes"""
+
+    def test_large_table_load(self, tmp_path):
+        markets = [{"currency": "EUR", "buy_price": 0.857, "sell_price": 0.851, "fee_pct": 0.1}]
+        rates = {}
+        for i in range(199):
+            code = f"C{i:03d}"
+            markets.append({"currency": code, "buy_price": 100 + i * 0.01, "sell_price": 99.5 + i * 0.01,
+                            "fee_pct": 0.5})
+            rates[f"{code}/EUR"] = {"bid": 117.0, "ask": 118.0, "bank_spread_pct": 1.0}
+        engine = RouteEngine({'markets': markets, 'forex_rates': rates, 'SEUIL_RENTABILITE_PCT': 0.0})
+        path = str(tmp_path / "routes.npz")
+        save_route_tables(path, 'k', build_route_tables(engine.matrix, 3))
+
+        start = time.perf_counter()
+        tables = load_route_tables(path, 'k')
+        routes = tables['forex'].routes(top_n=5)
+        elapsed = time.perf_counter() - start
+
+        assert len(tables['forex']) == 200 * 199
+        _same_routes(routes, engine.find_routes(top_n=5, skip_validation=True, apply_threshold=False))
+        assert elapsed < 0.1
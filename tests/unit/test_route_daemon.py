@@ -0,0 +1,198 @@
+"""
+Tests unitaires pour le démon de routes (socket Unix)
+Focus sur les opérations, le rechargement de config et l'index incrémental du journal
+"""
+import asyncio
+import io
+import json
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.cli import daily_briefing
+from src.cli.daily_briefing import rotation_state_from_rows
+from src.modules.route_daemon import LedgerIndex, RouteDaemon
+from src.modules.route_scan import main as scan_main
+from src.utils.daemon_client import DaemonError, daemon_request
+
+HEADER = "Date;Rotation_ID;Type;Market;Currency;Amount_USDT\n"
+
+
+def _row(rotation_id, kind, market):
+    return {'Date': '2025-01-01', 'Rotation_ID': rotation_id, 'Type': kind, 'Market': market,
+            'Currency': market, 'Amount_USDT': '100'}
+
+
+@pytest.fixture
+def daemon(tmp_path, mock_config_valid):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps(mock_config_valid), encoding='utf-8')
+    plan = {'plan_de_vol': {'phases': [{'type': 'ACHAT'}, {'type': 'VENTE'}, {'type': 'CONVERSION'}]}}
+    (tmp_path / "rotation_plan_R1.json").write_text(json.dumps(plan), encoding='utf-8')
+
+    # Chemin court : limite de longueur des sockets Unix
+    with tempfile.TemporaryDirectory(prefix='rd') as socket_dir:
+        daemon = RouteDaemon(config_path, tmp_path / "transactions.csv",
+                             str(tmp_path / "rotation_plan_{}.json"), Path(socket_dir) / "d.sock")
+        ready = threading.Event()
+        thread = threading.Thread(target=lambda: asyncio.run(daemon.serve(ready)), daemon=True)
+        thread.start()
+        assert ready.wait(5)
+        yield daemon
+        daemon.stop()
+        thread.join(5)
+        assert not Path(daemon.socket_path).exists()
+
+
+def _ask(daemon, op, params=None):
+    return daemon_request(op, params, socket_path=daemon.socket_path)
+
+
+class TestDaemonOperations:
+    """Requêtes servies par le démon"""
+
+    def test_ping_and_unknown_op(self, daemon):
+        assert _ask(daemon, 'ping') == 'pong'
+        with pytest.raises(DaemonError, match="inconnue"):
+            _ask(daemon, 'danse')
+
+    def test_scan_matches_local(self, daemon, mock_config_valid):
+        argv = ['--method', 'forex,bank', '--top', '3', '--format', 'ndjson']
+        remote = _ask(daemon, 'scan', {'argv': argv})
+        local = io.StringIO()
+        scan_main(argv, mock_config_valid, output=local)
+
+        assert remote['code'] == 0
+        strip = lambda text: [{k: v for k, v in json.loads(line).items() if k not in ('elapsed_ms', 'generated_at')}
+                              for line in text.splitlines()]
+        assert strip(remote['output']) == strip(local.getvalue())
+
+    def test_scan_invalid_parameters(self, daemon):
+        remote = _ask(daemon, 'scan', {'argv': ['--sourcing', 'ZZZ']})
+        assert remote['code'] == 2 and remote['output'] == ''
+        assert 'ZZZ' in remote['errors']
+
+    def test_log_advances_state(self, daemon):
+        assert _ask(daemon, 'state') == {'rotation_id': None, 'is_finished': True}
+
+        assert _ask(daemon, 'log', {'row': _row('R1', 'ACHAT', 'EUR')})['written']
+        state = _ask(daemon, 'state')
+        assert state['rotation_id'] == 'R1' and state['next_phase_details']['type'] == 'VENTE'
+
+        _ask(daemon, 'log', {'row': _row('R1', 'VENTE', 'XAF')})
+        state = _ask(daemon, 'state')
+        assert state['next_phase_details']['type'] == 'CONVERSION'
+        assert state['last_transaction']['Market'] == 'XAF'
+        assert state == rotation_state_from_rows(
+            LedgerIndex(daemon.transactions_file).rows(), daemon.plan_file_tpl)
+
+    def test_config_change_reloads_engine(self, daemon, mock_config_valid):
+        version = _ask(daemon, 'stats')['config_version']
+        before = _ask(daemon, 'scan', {'argv': ['--top', '1', '--all']})
+
+        changed = json.loads(json.dumps(mock_config_valid))
+        for market in changed['markets']:
+            market['sell_price'] *= 1.10
+        daemon.store.path.write_text(json.dumps(changed, indent=1), encoding='utf-8')
+
+        after = _ask(daemon, 'scan', {'argv': ['--top', '1', '--all']})
+        assert _ask(daemon, 'stats')['config_version'] == version + 1
+        profit = lambda r: json.loads(r['output'])['scans'][0]['routes'][0]['profit_pct']
+        assert profit(after) != profit(before)
+
+        # Config invalide : dernière version valide conservée
+        daemon.store.path.write_text('{"markets": [', encoding='utf-8')
+        kept = _ask(daemon, 'scan', {'argv': ['--top', '1', '--all']})
+        assert profit(kept) == profit(after)
+        assert _ask(daemon, 'stats')['config_version'] == version + 1
+
+    def test_stats_latencies(self, daemon):
+        for _ in range(5):
+            _ask(daemon, 'ping')
+        with pytest.raises(DaemonError):
+            _ask(daemon, 'log', {})
+
+        requests = _ask(daemon, 'stats')['requests']
+        assert requests['ping']['count'] == 5 and requests['ping']['errors'] == 0
+        assert 0 <= requests['ping']['p50_ms'] <= requests['ping']['max_ms']
+        assert (requests['log']['count'], requests['log']['errors']) == (1, 1)
+
+    def test_shutdown_and_fallback(self, daemon):
+        assert _ask(daemon, 'shutdown') == 'bye'
+        deadline = time.monotonic() + 5
+        while Path(daemon.socket_path).exists() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert not Path(daemon.socket_path).exists()
+        assert _ask(daemon, 'ping') is None  # Plus de démon : calcul local côté CLI
+
+
+class TestScanCommand:
+    """--scan via le démon : jamais de second scan local une fois la requête envoyée"""
+
+    def test_scan_waits_without_timeout(self, daemon, monkeypatch, capsys):
+        calls = []
+
+        def request(op, params=None, socket_path=None, timeout=10.0):
+            calls.append(timeout)
+            return daemon_request(op, params, socket_path=daemon.socket_path, timeout=timeout)
+
+        monkeypatch.setattr(daily_briefing, 'daemon_request', request)
+        daily_briefing.handle_scan_command(['main.py', '--scan', '--top', '2'])
+
+        assert calls == [None]
+        assert json.loads(capsys.readouterr().out)
+
+    def test_daemon_failure_does_not_rescan_locally(self, monkeypatch):
+        def request(op, params=None, socket_path=None, timeout=10.0):
+            raise socket.timeout("timed out")
+
+        monkeypatch.setattr(daily_briefing, 'daemon_request', request)
+        monkeypatch.setattr('src.modules.route_scan.main',
+                            lambda *args, **kwargs: pytest.fail("scan local relancé"))
+
+        with pytest.raises(SystemExit) as excinfo:
+            daily_briefing.handle_scan_command(['main.py', '--scan', '--output', 'routes.json'])
+        assert excinfo.value.code == 1
+
+
+class TestLedgerIndex:
+    """Index incrémental du journal des transactions"""
+
+    def test_append_is_incremental(self, tmp_path):
+        path = tmp_path / "transactions.csv"
+        path.write_text(HEADER + "2025-01-01;R1;ACHAT;EUR;EUR;100\n", encoding='utf-8')
+        ledger = LedgerIndex(path)
+        assert [r['Type'] for r in ledger.rows()] == ['ACHAT']
+
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write("2025-01-01;R1;VENTE;XAF;XAF;100\n2025-01-01;R1;CONV")  # Dernière ligne incomplète
+        assert [r['Type'] for r in ledger.rows()] == ['ACHAT', 'VENTE']
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write("ERSION;XAF;EUR;100\n")
+        assert [r['Type'] for r in ledger.rows()] == ['ACHAT', 'VENTE', 'CONVERSION']
+        assert ledger.stats == {'full_loads': 1, 'incremental_loads': 2}
+
+    def test_rewrite_triggers_full_reload(self, tmp_path):
+        path = tmp_path / "transactions.csv"
+        path.write_text(HEADER + "2025-01-01;R1;ACHAT;EUR;EUR;100\n;;;;;\n", encoding='utf-8')
+        ledger = LedgerIndex(path)
+        assert len(ledger.rows()) == 2
+
+        # Nettoyage de la ligne vide + ajout (comme robust_csv_append) : fichier plus long mais réécrit
+        path.write_text(HEADER + "2025-01-01;R1;ACHAT;EUR;EUR;100\n2025-01-01;R1;VENTE;XAF;XAF;1000\n",
+                        encoding='utf-8')
+        assert [r['Type'] for r in ledger.rows()] == ['ACHAT', 'VENTE']
+        assert ledger.stats['full_loads'] == 2
+
+        path.unlink()
+        assert ledger.rows() == []
+
+    def test_latin1_file(self, tmp_path):
+        path = tmp_path / "transactions.csv"
+        path.write_bytes((HEADER + "2025-01-01;R1;ACHAT;EUR;EUR;100\n").encode('utf-8') +
+                         "2025-01-01;R1;VENTE;Côte;XOF;100\n".encode('latin-1'))
+        assert [r['Market'] for r in LedgerIndex(path).rows()] == ['EUR', 'Côte']
@@ -0,0 +1,255 @@
+"""
+Tests unitaires pour le moteur de routes incrémental
+Focus sur l'exactitude du classement après mises à jour (vs recalcul complet)
+"""
+import random
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.engine.conversion_table import ConversionTable
+from src.engine import arbitrage_engine
+from src.engine.route_engine import ConfigError, RouteEngine
+from src.engine.route_matrix import RouteMatrix
+
+
+def _full_ranking(engine):
+    """Référence : matrice reconstruite de zéro à partir de la config courante"""
+    matrix = RouteMatrix.from_markets(engine.markets, ConversionTable(engine.forex_rates))
+    pairs = matrix.ranked_pairs(engine.conversion_method, top_n=engine.top_n, **engine.filters)
+    return [(matrix.currencies[a], matrix.currencies[b], float(matrix.profit_row(engine.conversion_method, a)[b]))
+            for a, b in pairs]
+
+
+def _engine_ranking(engine):
+    return [(r['sourcing_market_code'], r['selling_market_code'], r['profit_pct']) for r in engine.top_routes()]
+
+
+def _engine_config(markets, rates, threshold_pct=1.5):
+    return {'markets': markets, 'forex_rates': rates, 'SEUIL_RENTABILITE_PCT': threshold_pct}
+
+
+def _synthetic_config(nb_markets, seed):
+    rng = random.Random(seed)
+    markets = [{"currency": "EUR", "buy_price": 0.857, "sell_price": 0.851, "fee_pct": 0.1}]
+    rates = {}
+    for i in range(nb_markets - 1):
+        code = f"C{i:03d}"
+        price = rng.uniform(100, 120)
+        markets.append({"currency": code, "buy_price": price, "sell_price": price * 0.995, "fee_pct": 0.5})
+        rates[f"{code}/EUR"] = {"bid": 117.0, "ask": 118.0, "bank_spread_pct": 1.0}
+    return markets, rates
+
+
+class TestIncrementalExactness:
+    """Après chaque mise à jour, classement = recalcul complet"""
+
+    @pytest.mark.parametrize("top_n", [1, 5, 20, None])
+    @pytest.mark.parametrize("filters", [
+        {},
+        {'sourcing_currency': 'C003'},
+        {'excluded_markets': ['C001', 'C002'], 'loop_currency': 'C002'},
+        {'threshold': 0.0},
+    ])
+    def test_random_market_updates(self, top_n, filters, conversion_method):
+        markets, rates = _synthetic_config(25, seed=5)
+        engine = RouteEngine(_engine_config(markets, rates), conversion_method=conversion_method, top_n=top_n, **filters)
+        rng = random.Random(9)
+
+        for _ in range(20):
+            code = rng.choice([m['currency'] for m in markets[1:]])
+            engine.update_market(code, buy=rng.uniform(95, 125), sell=rng.uniform(95, 125))
+            assert _engine_ranking(engine) == _full_ranking(engine)
+
+    def test_rate_updates(self, conversion_method):
+        markets, rates = _synthetic_config(25, seed=2)
+        engine = RouteEngine(_engine_config(markets, rates), conversion_method=conversion_method, top_n=5)
+        rng = random.Random(4)
+
+        for _ in range(20):
+            code = rng.choice([m['currency'] for m in markets[1:]])
+            bid = rng.uniform(110, 125)
+            engine.update_rate(f"{code}/EUR", {"bid": bid, "ask": bid + 1.0, "bank_spread_pct": 1.0})
+            assert _engine_ranking(engine) == _full_ranking(engine)
+
+    def test_eur_market_update(self):
+        """EUR sans prix → plus aucune route ; prix rétabli → classement restauré"""
+        markets, rates = _synthetic_config(10, seed=1)
+        engine = RouteEngine(_engine_config(markets, rates), top_n=5)
+        initial = _engine_ranking(engine)
+
+        assert engine.update_market('EUR', buy=0) == []
+        engine.update_market('EUR', buy=0.857)
+
+        assert _engine_ranking(engine) == initial
+
+    def test_unknown_pair_recompiles(self, mock_config_valid):
+        """Paire avec une devise inconnue → recompilation, classement exact"""
+        engine = RouteEngine(mock_config_valid, top_n=5)
+        engine.update_rate("USD/EUR", {"bid": 1.08, "ask": 1.09, "bank_spread_pct": 1.0})
+
+        assert _engine_ranking(engine) == _full_ranking(engine)
+
+    def test_caller_config_untouched(self, mock_config_valid):
+        """Les mises à jour ne modifient pas la config passée au moteur"""
+        xaf_price = next(m for m in mock_config_valid['markets'] if m['currency'] == 'XAF')['sell_price']
+        engine = RouteEngine(mock_config_valid)
+        engine.update_market('XAF', sell=1.0)
+
+        assert next(m for m in mock_config_valid['markets'] if m['currency'] == 'XAF')['sell_price'] == xaf_price
+
+    def test_invalid_update_rejected(self, mock_config_valid):
+        engine = RouteEngine(mock_config_valid)
+
+        with pytest.raises(ValueError):
+            engine.update_market('XAF', sell='abc')
+        with pytest.raises(ValueError, match="Aucun marché trouvé"):
+            engine.update_market('ZZZ', sell=1.0)
+
+
+class TestEngineIsolation:
+    """Moteurs indépendants : chacun sa config, pas d'état global"""
+
+    def test_engines_with_different_configs(self, mock_config_valid):
+        markets, rates = _synthetic_config(15, seed=6)
+        synthetic = RouteEngine(_engine_config(markets, rates, threshold_pct=-100.0))
+        real = RouteEngine(mock_config_valid)
+
+        synthetic_routes = synthetic.find_routes(top_n=3, skip_validation=True)
+        real_routes = real.find_routes(top_n=3, skip_validation=True)
+
+        assert {r['sourcing_market_code'] for r in synthetic_routes} <= set(m['currency'] for m in markets)
+        assert {r['selling_market_code'] for r in real_routes} <= {m['currency'] for m in mock_config_valid['markets']}
+        assert synthetic.threshold_pct == -100.0
+        assert real.threshold_pct == mock_config_valid['SEUIL_RENTABILITE_PCT']
+
+    def test_matches_module_functions(self, mock_config_valid):
+        """Même calcul que les fonctions du module sur la même config"""
+        arbitrage_engine.markets = mock_config_valid['markets']
+        arbitrage_engine.forex_rates = mock_config_valid['forex_rates']
+        arbitrage_engine.SEUIL_RENTABILITE_PCT = mock_config_valid['SEUIL_RENTABILITE_PCT']
+        engine = RouteEngine(mock_config_valid)
+
+        for method in ('forex', 'bank'):
+            expected = arbitrage_engine.find_routes_with_filters(top_n=5, conversion_method=method)
+            routes = engine.find_routes(top_n=5, conversion_method=method)
+            assert [r.materialize() for r in routes] == [r.materialize() for r in expected]
+
+        assert engine.calculate_profit_route(1000, 'EUR', 'XAF') == \
+            arbitrage_engine.calculate_profit_route(1000, 'EUR', 'XAF')
+
+    def test_missing_keys_rejected(self):
+        with pytest.raises(ConfigError, match="SEUIL_RENTABILITE_PCT"):
+            RouteEngine({'markets': [], 'forex_rates': {}})
+
+    def test_update_does_not_leak_between_engines(self, mock_config_valid):
+        first = RouteEngine(mock_config_valid)
+        second = RouteEngine(mock_config_valid)
+        before = second.calculate_profit_route(1000, 'EUR', 'XAF')
+
+        first.update_market('XAF', sell=1.0)
+
+        assert second.calculate_profit_route(1000, 'EUR', 'XAF') == before
+        assert first.calculate_profit_route(1000, 'EUR', 'XAF') != before
+
+
+class TestThreadSafety:
+    """Utilisation concurrente d'un moteur et de plusieurs moteurs"""
+
+    def test_concurrent_updates_and_reads(self):
+        markets, rates = _synthetic_config(40, seed=7)
+        engine = RouteEngine(_engine_config(markets, rates), top_n=5)
+        codes = [m['currency'] for m in markets[1:]]
+        errors = []
+
+        def writer(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(50):
+                    engine.update_market(rng.choice(codes), sell=rng.uniform(95, 125))
+            except Exception as e:  # pragma: no cover - remonté par l'assertion
+                errors.append(e)
+
+        def reader():
+            try:
+                for _ in range(50):
+                    engine.find_routes(top_n=3, skip_validation=True, apply_threshold=False)
+            except Exception as e:  # pragma: no cover
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(s,)) for s in range(3)]
+        threads += [threading.Thread(target=reader) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+        assert _engine_ranking(engine) == _full_ranking(engine)
+
+    def test_engines_in_parallel_threads(self):
+        """Deux configs en parallèle = mêmes résultats qu'en séquentiel"""
+        configs = [_engine_config(*_synthetic_config(30, seed=s), threshold_pct=-100.0) for s in (11, 12)]
+        expected = [
+            [r.materialize() for r in RouteEngine(c).find_routes(top_n=5, skip_validation=True)]
+            for c in configs
+        ]
+        results = [None, None]
+
+        def run(k):
+            engine = RouteEngine(configs[k])
+            for _ in range(10):
+                results[k] = [r.materialize() for r in engine.find_routes(top_n=5, skip_validation=True)]
+
+        threads = [threading.Thread(target=run, args=(k,)) for k in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert results == expected
+
+
+class TestModuleImport:
+    """Import du module moteur sans E/S"""
+
+    def test_import_without_config_file(self, tmp_path):
+        """Import hors du dossier projet : pas de lecture de config.json"""
+        repo_root = Path(__file__).resolve().parents[2]
+        code = (
+            "import sys\n"
+            f"sys.path.insert(0, {str(repo_root)!r})\n"
+            "from src.engine import arbitrage_engine\n"
+            "from src.engine.route_engine import ConfigError\n"
+            "try:\n"
+            "    arbitrage_engine.markets\n"
+            "except ConfigError:\n"
+            "    print('lazy')\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=tmp_path,
+                                capture_output=True, text=True, timeout=60)
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "lazy"
+
+
+class TestIncrementalPerformance:
+    """Re-classement sous la milliseconde sous un flux de prix"""
+
+    def test_updates_are_incremental_and_fast(self):
+        markets, rates = _synthetic_config(200, seed=3)
+        engine = RouteEngine(_engine_config(markets, rates), top_n=5)
+        rng = random.Random(8)
+        codes = [m['currency'] for m in markets[1:]]
+
+        start = time.perf_counter()
+        for _ in range(500):
+            engine.update_market(rng.choice(codes), sell=rng.uniform(95, 125))
+        per_update = (time.perf_counter() - start) / 500
+
+        assert engine.stats['incremental'] > engine.stats['full']
+        assert per_update < 0.005
@@ -0,0 +1,285 @@
+"""
+Tests unitaires pour la matrice vectorisée des routes
+Focus sur l'équivalence avec calculate_profit_route() et les masques de filtres
+"""
+import time
+
+import pytest
+
+from src.engine import arbitrage_engine
+from src.engine.arbitrage_engine import (calculate_profit_route,
+                                         find_routes_with_filters)
+from src.engine.conversion_table import ConversionTable
+from src.engine.route_matrix import RouteMatrix, method_index
+
+
+def _reference_routes(markets, sourcing_currency=None, excluded_markets=None,
+                      loop_currency=None, conversion_method='forex', threshold=None):
+    """Ancienne double boucle Python : référence pour l'équivalence"""
+    excluded_markets = excluded_markets or []
+    routes = []
+    for market_a in markets:
+        if sourcing_currency and market_a['currency'] != sourcing_currency:
+            continue
+        for market_b in markets:
+            if market_a['currency'] == market_b['currency']:
+                continue
+            if market_b['currency'] in excluded_markets:
+                if not (loop_currency and market_b['currency'] == loop_currency):
+                    continue
+            route = calculate_profit_route(1000, market_a['currency'], market_b['currency'], conversion_method)
+            if route:
+                routes.append(route)
+
+    routes = sorted(routes, key=lambda x: x['profit_pct'], reverse=True)
+    return [
+        r for r in routes
+        if -90 <= r['profit_pct'] <= 1000 and (threshold is None or r['profit_pct'] >= threshold)
+    ]
+
+
+@pytest.fixture
+def engine_config(mock_config_valid):
+    """Installe la config de test dans le moteur"""
+    arbitrage_engine.markets = mock_config_valid['markets']
+    arbitrage_engine.forex_rates = mock_config_valid['forex_rates']
+    arbitrage_engine.SEUIL_RENTABILITE_PCT = mock_config_valid['SEUIL_RENTABILITE_PCT']
+    return mock_config_valid
+
+
+class TestRouteMatrixEquivalence:
+    """La matrice reproduit exactement calculate_profit_route()"""
+
+    def test_profit_matrix_matches_scalar_engine(self, engine_config, conversion_method):
+        """Chaque cellule valide = profit_pct de calculate_profit_route()"""
+        markets = engine_config['markets']
+        matrix = RouteMatrix.from_markets(
+            markets,
+            ConversionTable(engine_config['forex_rates'])
+        )
+        m = method_index(conversion_method)
+
+        for a, market_a in enumerate(markets):
+            for b, market_b in enumerate(markets):
+                route = calculate_profit_route(1000, market_a['currency'], market_b['currency'], conversion_method)
+                if route is None:
+                    assert not matrix.valid[m, a, b]
+                else:
+                    assert matrix.valid[m, a, b]
+                    assert matrix.profit_pct[m, a, b] == route['profit_pct']
+
+    @pytest.mark.parametrize("filters", [
+        {},
+        {'sourcing_currency': 'EUR'},
+        {'excluded_markets': ['XAF', 'KES']},
+        {'excluded_markets': ['XAF'], 'loop_currency': 'XAF'},
+        {'sourcing_currency': 'XOF', 'excluded_markets': ['EUR']},
+    ])
+    def test_find_routes_matches_reference_loop(self, engine_config, conversion_method, filters):
+        """find_routes_with_filters() = ancienne double boucle, ordre compris"""
+        routes = find_routes_with_filters(
+            top_n=100, apply_threshold=False, conversion_method=conversion_method, **filters
+        )
+        expected = _reference_routes(engine_config['markets'], conversion_method=conversion_method, **filters)
+
+        assert routes == expected
+
+    def test_threshold_mask(self, engine_config):
+        """Le seuil de rentabilité est appliqué comme un masque"""
+        routes = find_routes_with_filters(top_n=100, apply_threshold=True)
+        expected = _reference_routes(engine_config['markets'], threshold=engine_config['SEUIL_RENTABILITE_PCT'])
+
+        assert routes == expected
+
+
+class TestRouteMatrixMasks:
+    """Tests des masques de validité"""
+
+    def test_diagonal_is_invalid(self, engine_config):
+        """Routes circulaires (A→A) jamais candidates"""
+        matrix = RouteMatrix.from_markets(
+            engine_config['markets'],
+            ConversionTable(engine_config['forex_rates'])
+        )
+        for i in range(len(matrix.currencies)):
+            assert not matrix.valid[:, i, i].any()
+
+    def test_missing_rate_invalidates_row_and_column(self, engine_config):
+        """Devise sans taux vers EUR → ni sourcing ni vente"""
+        rates = dict(engine_config['forex_rates'])
+        rates.pop('KES/EUR')
+        matrix = RouteMatrix.from_markets(
+            engine_config['markets'],
+            ConversionTable(rates)
+        )
+        kes = matrix.index['KES']
+
+        assert not matrix.valid[:, kes, :].any()
+        assert not matrix.valid[:, :, kes].any()
+
+    def test_no_eur_market_invalidates_everything(self, engine_config):
+        """Sans marché EUR, aucun réinvestissement possible"""
+        markets = [m for m in engine_config['markets'] if m['currency'] != 'EUR']
+        matrix = RouteMatrix.from_markets(
+            markets,
+            ConversionTable(engine_config['forex_rates'])
+        )
+
+        assert not matrix.valid.any()
+
+
+class TestStreamingSelection:
+    """Sélection top_n par tas borné = tri complet de la matrice"""
+
+    @staticmethod
+    def _synthetic_matrix(nb_markets, seed):
+        """Marchés aléatoires avec prix arrondis (beaucoup d'égalités)"""
+        import random
+        rng = random.Random(seed)
+        markets = [{"currency": "EUR", "buy_price": 0.86, "sell_price": 0.85, "fee_pct": 0.0}]
+        rates = {}
+        for i in range(nb_markets - 1):
+            code = f"C{i:03d}"
+            price = rng.choice([100.0, 101.0, 102.0, 103.0])
+            markets.append({"currency": code, "buy_price": price, "sell_price": price - rng.choice([0.0, 1.0]), "fee_pct": 0.0})
+            rates[f"{code}/EUR"] = {"bid": 117.0, "ask": 118.0, "bank_spread_pct": 1.0}
+        return RouteMatrix.from_markets(markets, ConversionTable(rates))
+
+    @staticmethod
+    def _full_sort(matrix, method, threshold=None):
+        """Référence : tri stable de toutes les paires valides"""
+        m = method_index(method)
+        n = len(matrix.currencies)
+        pairs = [
+            (a, b) for a in range(n) for b in range(n)
+            if matrix.valid[m, a, b] and -90 <= matrix.profit_pct[m, a, b] <= 1000
+            and (threshold is None or matrix.profit_pct[m, a, b] >= threshold)
+        ]
+        return sorted(pairs, key=lambda p: -matrix.profit_pct[m, p[0], p[1]])
+
+    @pytest.mark.parametrize("seed", [3, 7, 11, 19])
+    @pytest.mark.parametrize("top_n", [1, 5, 37, 100, None])
+    def test_heap_matches_full_sort_with_ties(self, top_n, seed, conversion_method):
+        """Même résultat et même ordre que le tri complet, égalités comprises"""
+        matrix = self._synthetic_matrix(40, seed=seed)
+        expected = self._full_sort(matrix, conversion_method)
+        if top_n is not None:
+            expected = expected[:top_n]
+
+        assert matrix.ranked_pairs(conversion_method, top_n=top_n) == expected
+
+    @pytest.mark.parametrize("top_n,sourcing_currency", [(1, None), (3, None), (5, "C003"), (12, None)])
+    def test_ties_at_cutoff_keep_config_order(self, top_n, sourcing_currency, conversion_method):
+        """Égalités exactes à la coupure top_n : les premières paires de config.json gagnent"""
+        markets = [{"currency": "EUR", "buy_price": 0.86, "sell_price": 0.85, "fee_pct": 0.0}]
+        rates = {}
+        for i in range(16):
+            code = f"C{i:03d}"
+            # Deux niveaux de prix de vente : chaque ligne a des blocs d'égalités
+            markets.append({"currency": code, "buy_price": 100.0, "sell_price": 100.0 if i % 2 else 99.0, "fee_pct": 0.0})
+            rates[f"{code}/EUR"] = {"bid": 117.0, "ask": 118.0, "bank_spread_pct": 1.0}
+        matrix = RouteMatrix.from_markets(markets, ConversionTable(rates))
+
+        expected = self._full_sort(matrix, conversion_method)
+        if sourcing_currency:
+            expected = [p for p in expected if matrix.currencies[p[0]] == sourcing_currency]
+        m = method_index(conversion_method)
+        cutoff = matrix.profit_pct[m, expected[top_n - 1][0], expected[top_n - 1][1]]
+        assert sum(matrix.profit_pct[m, a, b] == cutoff for a, b in expected) > top_n  # Égalité à la coupure
+
+        assert matrix.ranked_pairs(conversion_method, top_n=top_n,
+                                   sourcing_currency=sourcing_currency) == expected[:top_n]
+
+    def test_threshold_pruned_during_generation(self):
+        """Le seuil est appliqué avant l'entrée dans le tas"""
+        matrix = self._synthetic_matrix(30, seed=3)
+        expected = self._full_sort(matrix, 'forex', threshold=0.5)
+
+        assert matrix.ranked_pairs('forex', top_n=1000, threshold=0.5) == expected
+
+    def test_full_matrix_never_built_by_scan(self):
+        """Le scan ne matérialise pas la matrice N×N"""
+        matrix = self._synthetic_matrix(30, seed=1)
+        matrix.ranked_pairs('forex', top_n=100)
+
+        assert matrix._profit_pct is None
+        assert matrix._valid is None
+
+    def test_non_positive_top_n(self):
+        """top_n ≤ 0 → aucune route"""
+        matrix = self._synthetic_matrix(10, seed=1)
+        assert matrix.ranked_pairs('forex', top_n=0) == []
+
+
+class TestBranchAndBound:
+    """Élagage des lignes sans espoir : même résultat, moins de paires évaluées"""
+
+    @staticmethod
+    def _spread_matrix(nb_markets, seed):
+        """Marchés aux coûts d'acquisition très dispersés (la plupart sans espoir)"""
+        import random
+        rng = random.Random(seed)
+        markets = [{"currency": "EUR", "buy_price": 0.857, "sell_price": 0.851, "fee_pct": 0.1}]
+        rates = {}
+        for i in range(nb_markets - 1):
+            code = f"C{i:03d}"
+            price = rng.uniform(80, 140)
+            markets.append({"currency": code, "buy_price": price, "sell_price": price * 0.99, "fee_pct": 0.5})
+            rates[f"{code}/EUR"] = {"bid": 117.0, "ask": 118.0, "bank_spread_pct": 1.0}
+        return RouteMatrix.from_markets(markets, ConversionTable(rates))
+
+    @pytest.mark.parametrize("top_n", [1, 5, None])
+    @pytest.mark.parametrize("threshold", [None, 0.0, 1.5, 20.0])
+    def test_pruning_is_exact(self, top_n, threshold, conversion_method):
+        matrix = self._spread_matrix(60, seed=4)
+        expected = TestStreamingSelection._full_sort(matrix, conversion_method, threshold)
+        if top_n is not None:
+            expected = expected[:top_n]
+
+        assert matrix.ranked_pairs(conversion_method, top_n=top_n, threshold=threshold) == expected
+
+    def test_counters_cover_all_candidate_pairs(self):
+        matrix = self._spread_matrix(60, seed=4)
+        matrix.ranked_pairs('forex', top_n=5, threshold=1.5, excluded_markets=['C001'])
+        stats = matrix.last_scan_stats
+
+        assert stats['pairs_evaluated'] + stats['pairs_pruned'] == matrix.count_valid_pairs('forex') - 59  # Colonne C001 exclue
+        assert stats['rows_pruned'] > 0
+
+    def test_pruned_share_grows_with_market_count(self):
+        shares = []
+        for nb_markets in (50, 400):
+            matrix = self._spread_matrix(nb_markets, seed=2)
+            matrix.ranked_pairs('forex', top_n=5, threshold=1.5)
+            stats = matrix.last_scan_stats
+            shares.append(stats['pairs_pruned'] / (stats['pairs_pruned'] + stats['pairs_evaluated']))
+
+        assert shares[1] > 0.9
+        assert shares[1] >= shares[0]
+
+    def test_engine_exposes_counters(self, engine_config):
+        find_routes_with_filters(top_n=3)
+
+        stats = arbitrage_engine.get_default_engine().last_scan_stats
+        assert set(stats) == {'pairs_evaluated', 'pairs_pruned', 'rows_pruned'}
+
+
+class TestRouteMatrixPerformance:
+    """La recherche reste en millisecondes avec beaucoup de marchés"""
+
+    def test_large_market_scan_is_fast(self):
+        """200 marchés (~40 000 paires) évalués bien en dessous de la seconde"""
+        markets = [{"currency": "EUR", "buy_price": 0.857, "sell_price": 0.851, "fee_pct": 0.1}]
+        rates = {}
+        for i in range(199):
+            code = f"C{i:03d}"
+            markets.append({"currency": code, "buy_price": 100.0 + i, "sell_price": 99.5 + i, "fee_pct": 0.5})
+            rates[f"{code}/EUR"] = {"bid": 115.0 + i, "ask": 117.0 + i, "bank_spread_pct": 1.0}
+
+        start = time.perf_counter()
+        matrix = RouteMatrix.from_markets(markets, ConversionTable(rates))
+        pairs = matrix.ranked_pairs('forex', top_n=5)
+        elapsed = time.perf_counter() - start
+
+        assert len(pairs) == 5
+        assert elapsed < 0.5
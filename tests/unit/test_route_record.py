@@ -0,0 +1,75 @@
+"""
+Tests unitaires pour RouteRecord
+Focus sur la matérialisation paresseuse et la compatibilité dict
+"""
+import json
+
+import pytest
+
+from src.engine.route_record import ROUTE_KEYS, RouteRecord
+
+
+@pytest.fixture
+def record():
+    """Route EUR→XAF à 1000 USDT"""
+    return RouteRecord(
+        "EUR", "XAF", "forex",
+        initial_amount_usdt=1000.0,
+        cost_eur=857.857,
+        revenue_local=593650.0,
+        revenue_eur=899.4696969,
+        final_amount_usdt=1048.50,
+        nb_cycles=3
+    )
+
+
+class TestRouteRecordLaziness:
+    """Détails et plan de vol construits à la demande"""
+
+    def test_nothing_built_at_creation(self, record):
+        """Aucune chaîne ni phase allouée à la création"""
+        assert record._detailed_route is None
+        assert record._details is None
+        assert record._plan_de_vol is None
+
+    def test_detailed_route_does_not_build_plan(self, record):
+        """Afficher la route ne construit pas le plan de vol"""
+        assert record['detailed_route'] == "EUR'(DC)' → USDT → XAF → EUR → USDT"
+        assert record._plan_de_vol is None
+
+    def test_plan_built_once(self, record):
+        """Le plan de vol est mémorisé après le premier accès"""
+        plan = record['plan_de_vol']
+
+        assert record['plan_de_vol'] is plan
+        assert len(plan['phases']) == 3 * 3 + 1
+        assert plan['phases'][-1]['type'] == 'CLOTURE'
+
+    def test_contains_does_not_materialize(self, record):
+        """'plan_de_vol' in route ne déclenche pas la construction"""
+        assert 'plan_de_vol' in record
+        assert record._plan_de_vol is None
+
+
+class TestRouteRecordDictCompatibility:
+    """Lecture identique au dict historique"""
+
+    def test_numeric_fields(self, record):
+        """profit_pct et profit_usdt calculés comme calculate_profit_route()"""
+        assert record['profit_usdt'] == pytest.approx(48.50)
+        expected_pct = ((record['revenue_eur'] - record['cost_eur']) / record['cost_eur']) * 100
+        assert record['profit_pct'] == expected_pct
+
+    def test_materialize_is_json_serializable(self, record):
+        """materialize() retourne un dict complet sérialisable"""
+        data = record.materialize()
+
+        assert isinstance(data, dict)
+        assert tuple(data.keys()) == ROUTE_KEYS
+        json.dumps(data, ensure_ascii=False)
+
+    def test_unknown_key(self, record):
+        """Clé inconnue → KeyError / get() → défaut"""
+        with pytest.raises(KeyError):
+            record['use_double_cycle']
+        assert record.get('use_double_cycle', False) is False
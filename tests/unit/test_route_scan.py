@@ -0,0 +1,110 @@
+"""
+Tests unitaires pour la recherche de routes non interactive (--scan)
+Focus sur les combinaisons de paramètres, la sortie JSON/NDJSON et les codes de sortie
+"""
+import copy
+import io
+import json
+
+import pytest
+
+from src.engine.route_engine import RouteEngine
+from src.modules.route_scan import main as scan_main
+from src.modules.route_scan import scan_combinations
+
+
+def _scan(config, *argv):
+    output = io.StringIO()
+    code = scan_main(list(argv), config, output=output)
+    return code, output.getvalue()
+
+
+class TestScanCombinations:
+    """Produit cartésien des options"""
+
+    def test_cartesian_product(self):
+        combos = scan_combinations(['EUR', 'KES'], [None], ['forex', 'bank'], [1000.0, 5000.0])
+
+        assert len(combos) == 8
+        assert combos[0] == {'sourcing_currency': 'EUR', 'loop_currency': None,
+                             'conversion_method': 'forex', 'capital': 1000.0}
+
+    def test_each_combination_matches_engine(self, mock_config_valid):
+        code, text = _scan(mock_config_valid, '--sourcing', 'EUR,KES', '--method', 'forex,bank',
+                           '--exclude', 'RWF', '--top', '3', '--all')
+        document = json.loads(text)
+
+        assert code == 0
+        assert document['threshold_pct'] is None
+        assert len(document['scans']) == 4
+        engine = RouteEngine(mock_config_valid)
+        for scan in document['scans']:
+            params = scan['params']
+            expected = engine.find_routes(top_n=3, apply_threshold=False,
+                                          sourcing_currency=params['sourcing_currency'],
+                                          excluded_markets=['RWF'],
+                                          conversion_method=params['conversion_method'])
+            assert [(r['sourcing_market_code'], r['selling_market_code'], r['profit_pct'])
+                    for r in scan['routes']] == \
+                [(r['sourcing_market_code'], r['selling_market_code'], r['profit_pct']) for r in expected]
+            assert all(r['selling_market_code'] != 'RWF' for r in scan['routes'])
+            assert 'plan_de_vol' not in scan['routes'][0]
+
+
+class TestScanOutput:
+    """Formats et options de sortie"""
+
+    def test_ndjson_one_line_per_combination(self, mock_config_valid):
+        code, text = _scan(mock_config_valid, '--method', 'forex,bank', '--format', 'ndjson')
+        lines = [json.loads(line) for line in text.splitlines()]
+
+        assert code == 0
+        assert lines[0]['type'] == 'scan_header'
+        assert [line['params']['conversion_method'] for line in lines[1:]] == ['forex', 'bank']
+
+    def test_full_and_capital(self, mock_config_valid):
+        code, text = _scan(mock_config_valid, '--capital', '2500', '--top', '1', '--full')
+        route = json.loads(text)['scans'][0]['routes'][0]
+
+        assert code == 0
+        assert route['initial_amount_usdt'] == 2500.0
+        assert 'plan_de_vol' in route and 'max_profitable_size' in route
+
+    def test_cycles_mode(self, mock_config_valid):
+        code, text = _scan(mock_config_valid, '--mode', 'cycles', '--top', '2')
+        scan = json.loads(text)['scans'][0]
+
+        assert code == 0
+        assert scan['count'] == len(scan['routes']) <= 2
+        assert all('cycle_path' in r for r in scan['routes'])
+
+    def test_output_file(self, mock_config_valid, tmp_path):
+        path = tmp_path / "scan.json"
+        assert scan_main(['--output', str(path)], mock_config_valid) == 0
+        assert json.loads(path.read_text(encoding='utf-8'))['scans']
+
+
+class TestScanErrors:
+    """Codes de sortie pour les planificateurs"""
+
+    @pytest.mark.parametrize("argv", [
+        ['--sourcing', 'ZZZ'],
+        ['--method', 'swift'],
+        ['--top', '0'],
+        ['--capital', '-5'],
+        ['--inconnu'],
+    ])
+    def test_invalid_parameters(self, mock_config_valid, argv):
+        code, text = _scan(mock_config_valid, *argv)
+        assert code == 2
+        assert text == ''
+
+    def test_blocking_config(self, mock_config_valid):
+        config = copy.deepcopy(mock_config_valid)
+        del config['forex_rates']['XAF/EUR']
+
+        code, text = _scan(config)
+        error = json.loads(text)
+        assert code == 3
+        assert error['type'] == 'error'
+        assert any(a['type'] == 'TAUX_MANQUANT' for a in error['critical_errors'])
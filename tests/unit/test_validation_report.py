@@ -0,0 +1,102 @@
+"""
+Tests unitaires pour le cache de validation de la config
+Focus sur la mémorisation par empreinte et le rapport réutilisable
+"""
+import copy
+
+import pytest
+
+from src.engine import arbitrage_engine
+from src.engine.arbitrage_engine import (find_routes_with_filters,
+                                         get_validation_report,
+                                         invalidate_validation_cache)
+from src.engine.validation_report import ValidationReport
+
+
+@pytest.fixture
+def counted_validation(monkeypatch):
+    """Compte les appels réels à validate_config_coherence()"""
+    calls = []
+    original = arbitrage_engine.validate_config_coherence
+
+    def counting(markets_list, forex_rates_dict):
+        calls.append(1)
+        return original(markets_list, forex_rates_dict)
+
+    monkeypatch.setattr(arbitrage_engine, 'validate_config_coherence', counting)
+    invalidate_validation_cache()
+    yield calls
+    invalidate_validation_cache()
+
+
+class TestValidationCache:
+    """Revalidation uniquement si marchés ou taux changent"""
+
+    def test_same_content_validated_once(self, mock_config_valid, counted_validation):
+        markets = mock_config_valid['markets']
+        rates = mock_config_valid['forex_rates']
+
+        report = get_validation_report(markets, rates)
+        again = get_validation_report(copy.deepcopy(markets), copy.deepcopy(rates))
+
+        assert again is report
+        assert len(counted_validation) == 1
+
+    def test_content_change_revalidates(self, mock_config_valid, counted_validation):
+        markets = copy.deepcopy(mock_config_valid['markets'])
+        rates = mock_config_valid['forex_rates']
+        get_validation_report(markets, rates)
+
+        markets[1]['sell_price'] = markets[1]['buy_price'] * 2  # Spread inversé extrême
+        report = get_validation_report(markets, rates)
+
+        assert len(counted_validation) == 2
+        assert any(a['type'] == 'SPREAD_INVERSE' for a in report.critical_errors)
+
+    def test_explicit_revalidation(self, mock_config_valid, counted_validation):
+        markets = mock_config_valid['markets']
+        rates = mock_config_valid['forex_rates']
+
+        get_validation_report(markets, rates)
+        get_validation_report(markets, rates, force=True)
+        invalidate_validation_cache()
+        get_validation_report(markets, rates)
+
+        assert len(counted_validation) == 3
+
+    def test_repeated_searches_validate_once(self, mock_config_valid, counted_validation):
+        """Recherches répétées sur une config inchangée : une seule validation"""
+        arbitrage_engine.markets = mock_config_valid['markets']
+        arbitrage_engine.forex_rates = mock_config_valid['forex_rates']
+        arbitrage_engine.SEUIL_RENTABILITE_PCT = mock_config_valid['SEUIL_RENTABILITE_PCT']
+
+        for _ in range(5):
+            find_routes_with_filters(top_n=3)
+
+        assert len(counted_validation) == 1
+
+    def test_no_stdout_noise(self, mock_config_valid, capsys):
+        """La validation n'écrit plus rien sur la sortie standard"""
+        get_validation_report(mock_config_valid['markets'], mock_config_valid['forex_rates'], force=True)
+
+        assert capsys.readouterr().out == ""
+
+
+class TestValidationReport:
+    """Classement des alertes"""
+
+    def test_alert_classification(self):
+        alerts = [
+            {'type': 'TAUX_MANQUANT', 'severity': 'ERROR', 'message': 'a'},
+            {'type': 'PRIX_NEGATIF', 'severity': 'ERROR', 'message': 'b'},
+            {'type': 'ANOMALIE_SPREAD', 'severity': 'WARNING', 'message': 'c'},
+        ]
+        report = ValidationReport("abc", alerts)
+
+        assert len(report.errors) == 2
+        assert len(report.warnings) == 1
+        assert [a['type'] for a in report.critical_errors] == ['TAUX_MANQUANT']
+        assert report.is_blocking
+
+    def test_clean_report_not_blocking(self):
+        assert not ValidationReport("abc", []).is_blocking